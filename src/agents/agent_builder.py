@@ -0,0 +1,145 @@
+"""
+Declarative agent construction from config/adk.yaml.
+
+Each agent's description, model, instruction file and tool list come from its
+adk.yaml entry; tool names are resolved through the tool registry.
+"""
+
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents import LlmAgent
+
+from .config_loader import load_agent_definitions, get_model_for_agent
+from .tool_registry import resolve_tools, validate_tool_names, consolidate_srd_lookup_tools
+from .dynamic_tools import GameStateToolset, validate_tool_profiles
+from .instruction_sections import CORE_SECTION, SectionedInstruction, parse_sections
+from data.tools.srd_batch import SRD_LOOKUP_INSTRUCTION
+from core.context_cache import context_cache_callback
+from core.model_fallback import build_model_fallback, validate_fallback_models
+from core.checkpoints import checkpoint_before_tool, checkpoint_after_tool
+from core.tool_memo import memo_before_tool, memo_after_tool
+from core.usage import usage_before_model, usage_after_model
+from core.history import compact_history
+from core.lazy_state import hydrate_lazy_fields
+from core.tool_outputs import (
+    EXPAND_TOOL_NAME, EXPAND_TOOL_OUTPUT_INSTRUCTION, elide_tool_outputs, get_tool_output_elider,
+)
+from core.tracing import (
+    trace_before_agent, trace_after_agent, trace_before_model, trace_after_model,
+    trace_model_error, trace_before_tool, trace_after_tool,
+)
+
+
+def load_instructions(filename: str) -> str:
+    """
+    Load instructions from a text file in the instructions directory.
+    """
+    instructions_path = os.path.join(os.path.dirname(__file__), 'instructions', filename)
+    try:
+        with open(instructions_path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        print(f"ERROR: Instructions file {filename} not found at {instructions_path}")
+        print("Please ensure the instructions file exists in the agents/instructions/ directory.")
+        sys.exit(1)
+
+
+def validate_agent_definitions(definitions: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Validate every agent definition in adk.yaml against the tool registry and
+    the set of defined agents, so configuration mistakes fail at startup.
+
+    Args:
+        definitions: Dict[str, Dict[str, Any]] - Agent definitions keyed by name
+
+    Raises:
+        ValueError: If a tool or sub agent reference is invalid
+    """
+    for agent_name, definition in definitions.items():
+        tool_names = validate_tool_names(agent_name, definition.get('tools', []))
+        validate_tool_profiles(agent_name, tool_names, definition.get('tool_profiles'))
+        unknown_sub_agents = [name for name in definition.get('sub_agents', []) or [] if name not in definitions]
+        if unknown_sub_agents:
+            raise ValueError(f"Invalid sub_agents for agent '{agent_name}' in adk.yaml: unknown agents {unknown_sub_agents}")
+        validate_fallback_models(agent_name, definition.get('model'), definition.get('fallback_models'))
+
+
+def build_agent(agent_name: str, sub_agents: Optional[List[LlmAgent]] = None) -> LlmAgent:
+    """
+    Build an LlmAgent from its adk.yaml definition.
+
+    Args:
+        agent_name: str - The name of the agent in adk.yaml
+        sub_agents: List[LlmAgent] - Already-built sub agents, in the order listed in adk.yaml
+
+    Returns:
+        LlmAgent - The configured agent
+    """
+    definitions = load_agent_definitions()
+    validate_agent_definitions(definitions)
+    if agent_name not in definitions:
+        raise ValueError(f"Agent '{agent_name}' is not defined in adk.yaml")
+    definition = definitions[agent_name]
+
+    instruction_file = definition.get('instruction_file') or f"{agent_name}.txt"
+
+    blocks = parse_sections(load_instructions(os.path.basename(instruction_file)))
+    tool_names = definition.get('tools', [])
+    tool_profiles = definition.get('tool_profiles') or {}
+    if definition.get('srd_lookup'):
+        # One batch lookup tool in place of the per-category wrappers
+        tool_names = consolidate_srd_lookup_tools(tool_names)
+        tool_profiles = {state: consolidate_srd_lookup_tools(names) for state, names in tool_profiles.items()}
+        blocks.append((CORE_SECTION, SRD_LOOKUP_INSTRUCTION))
+    if tool_names and get_tool_output_elider() is not None:
+        # Tool results elided from the history can be fetched again in full
+        tool_names = tool_names + [EXPAND_TOOL_NAME]
+        tool_profiles = {state: (names or []) + [EXPAND_TOOL_NAME] for state, names in tool_profiles.items()}
+        blocks.append((CORE_SECTION, EXPAND_TOOL_OUTPUT_INSTRUCTION))
+
+    instruction = SectionedInstruction(agent_name, blocks, definition.get('instruction_sections'))
+    if not instruction.profiles:
+        # Without per-state sections the instruction is static text
+        instruction = instruction.render()
+
+    tools = resolve_tools(agent_name, tool_names)
+    if tool_profiles:
+        # Narrow the tool schemas sent per request to the current game_state
+        tools = [GameStateToolset(agent_name, tools, tool_profiles)]
+
+    model = get_model_for_agent(agent_name)
+    # context_cache_callback runs after every callback that changes the request,
+    # so it caches the final instruction and tool prefix; tracing only observes it
+    before_model_callbacks = [
+        usage_before_model, hydrate_lazy_fields, elide_tool_outputs, compact_history, context_cache_callback,
+        trace_before_model,
+    ]
+    after_model_callbacks = [trace_after_model, usage_after_model]
+    model_error_callbacks = [trace_model_error]
+    fallback = build_model_fallback(agent_name, model, definition.get('fallback_models'))
+    if fallback is not None:
+        # Pick the model first: budgets may override it and the context cache is keyed by model
+        before_model_callbacks.insert(0, fallback.before_model)
+        after_model_callbacks.append(fallback.after_model)
+        model_error_callbacks.append(fallback.on_model_error)
+
+    return LlmAgent(
+        name=agent_name,
+        model=model,
+        description=definition.get('description', ''),
+        instruction=instruction,
+        sub_agents=sub_agents or [],
+        tools=tools,
+        before_agent_callback=[trace_before_agent],
+        after_agent_callback=[trace_after_agent],
+        before_model_callback=before_model_callbacks,
+        after_model_callback=after_model_callbacks,
+        on_model_error_callback=model_error_callbacks,
+        # Retried turns replay completed state-changing tool calls instead of re-running them,
+        # and repeated lookups are answered from the session memo; the tool span opens
+        # first so replayed and memoized calls are traced too
+        before_tool_callback=[trace_before_tool, checkpoint_before_tool, memo_before_tool],
+        after_tool_callback=[checkpoint_after_tool, memo_after_tool, trace_after_tool],
+    )
@@ -4,32 +4,25 @@ Configuration loader for agent model names from YAML file.
 
 import yaml
 import os
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
-def load_agent_config() -> Dict[str, str]:
+def _get_config_path() -> str:
+    """Return the absolute path of config/adk.yaml."""
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(project_root, 'config', 'adk.yaml')
+
+def load_yaml_config() -> Dict[str, Any]:
     """
-    Load agent configuration from adk.yaml file.
+    Load the raw adk.yaml configuration.
     
     Returns:
-        Dict[str, str]: Dictionary mapping agent names to model names
+        Dict[str, Any]: The parsed YAML document, or an empty dict on error
     """
-    project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    yaml_path = os.path.join(project_root, 'config', 'adk.yaml')
+    yaml_path = _get_config_path()
     
     try:
         with open(yaml_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        
-        agent_configs = {}
-        if 'agents' in config:
-            for agent in config['agents']:
-                agent_name = agent.get('name')
-                model_name = agent.get('model')
-                if agent_name and model_name:
-                    agent_configs[agent_name] = model_name
-        
-        print(f"[ConfigLoader] Loaded {len(agent_configs)} agent configurations from {yaml_path}")
-        return agent_configs
+            return yaml.safe_load(f) or {}
         
     except FileNotFoundError:
         print(f"ERROR: adk.yaml file not found at {yaml_path}")
@@ -44,6 +37,70 @@ def load_agent_config() -> Dict[str, str]:
         print("Using default model configuration.")
         return {}
 
+def load_agent_config() -> Dict[str, str]:
+    """
+    Load agent configuration from adk.yaml file.
+    
+    Returns:
+        Dict[str, str]: Dictionary mapping agent names to model names
+    """
+    agent_configs = {}
+    for agent_name, definition in load_agent_definitions().items():
+        model_name = definition.get('model')
+        if model_name:
+            agent_configs[agent_name] = model_name
+    
+    print(f"[ConfigLoader] Loaded {len(agent_configs)} agent configurations from {_get_config_path()}")
+    return agent_configs
+
+def load_agent_definitions() -> Dict[str, Dict[str, Any]]:
+    """
+    Load the full agent definitions (description, model, instruction file,
+    tools and sub agents) from adk.yaml.
+    
+    Returns:
+        Dict[str, Dict[str, Any]]: Dictionary mapping agent names to their definition
+    """
+    config = load_yaml_config()
+    
+    definitions = {}
+    for agent in config.get('agents', []) or []:
+        agent_name = agent.get('name')
+        if agent_name:
+            definitions[agent_name] = agent
+    return definitions
+
+def get_agent_definition(agent_name: str) -> Dict[str, Any]:
+    """
+    Get the adk.yaml definition for a specific agent.
+    
+    Args:
+        agent_name: str - The name of the agent
+    
+    Returns:
+        Dict[str, Any] - The agent definition
+    
+    Raises:
+        KeyError: If the agent is not defined in adk.yaml
+    """
+    definitions = load_agent_definitions()
+    if agent_name not in definitions:
+        raise KeyError(f"Agent '{agent_name}' is not defined in {_get_config_path()}")
+    return definitions[agent_name]
+
+def get_config_section(section_name: str) -> Dict[str, Any]:
+    """
+    Get a top-level (non-agent) section of adk.yaml, e.g. runtime settings.
+    
+    Args:
+        section_name: str - The top-level key in adk.yaml
+    
+    Returns:
+        Dict[str, Any] - The section, or an empty dict if it is not configured
+    """
+    section = load_yaml_config().get(section_name)
+    return section if isinstance(section, dict) else {}
+
 def get_model_for_agent(agent_name: str, default_model: str = "gemini-2.5-flash") -> str:
     """
     Get the model name for a specific agent.
@@ -0,0 +1,81 @@
+"""
+Game-state-aware tool sets.
+
+An agent with `tool_profiles` in adk.yaml only sees the tools listed for the
+current session `game_state` on each model request (e.g. the rules lawyer only
+gets combat, dice and stat-block tools while `game_state` is 'combat'). States
+without a profile expose the agent's full tool list.
+"""
+
+from typing import Callable, Dict, List, Optional
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools import FunctionTool
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+
+
+def validate_tool_profiles(agent_name: str, tool_names: List[str], tool_profiles: Dict[str, List[str]]) -> None:
+    """
+    Validate that every profile only references tools configured for the agent.
+
+    Args:
+        agent_name: str - The agent the profiles belong to (used in errors)
+        tool_names: List[str] - The agent's full tool list
+        tool_profiles: Dict[str, List[str]] - Tool names keyed by game_state
+
+    Raises:
+        ValueError: If a profile references a tool the agent does not have
+    """
+    for game_state, profile in (tool_profiles or {}).items():
+        unknown = [name for name in profile or [] if name not in tool_names]
+        if unknown:
+            raise ValueError(
+                f"Invalid tool_profiles.{game_state} for agent '{agent_name}' in adk.yaml: "
+                f"tools {unknown} are not in the agent's tools list"
+            )
+
+
+class GameStateToolset(BaseToolset):
+    """Toolset that exposes a per-game_state subset of an agent's tools."""
+
+    def __init__(self, agent_name: str, tools: List[Callable], tool_profiles: Dict[str, List[str]]):
+        """
+        Args:
+            agent_name: str - The agent this toolset belongs to
+            tools: List[Callable] - The agent's full list of tool functions
+            tool_profiles: Dict[str, List[str]] - Tool names keyed by game_state
+        """
+        super().__init__()
+        self.agent_name = agent_name
+        self._tools: Dict[str, BaseTool] = {}
+        for func in tools:
+            tool = func if isinstance(func, BaseTool) else FunctionTool(func)
+            self._tools[tool.name] = tool
+        validate_tool_profiles(agent_name, list(self._tools), tool_profiles)
+        self.tool_profiles = {state: list(names or []) for state, names in (tool_profiles or {}).items()}
+
+    @property
+    def tool_names(self) -> List[str]:
+        """All tool names in this toolset, in configured order."""
+        return list(self._tools)
+
+    def tool_names_for_state(self, game_state: Optional[str]) -> List[str]:
+        """
+        Get the tool names exposed for a given game_state.
+
+        Args:
+            game_state: str - The current session game_state
+
+        Returns:
+            List[str] - The profile's tools, or every tool if the state has no profile
+        """
+        profile = self.tool_profiles.get(game_state) if game_state else None
+        if profile is None:
+            return self.tool_names
+        return [name for name in self._tools if name in profile]
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        """Return the tools for the session's current game_state."""
+        game_state = readonly_context.state.get('game_state') if readonly_context else None
+        return [self._tools[name] for name in self.tool_names_for_state(game_state)]
@@ -0,0 +1,163 @@
+"""
+Game-state-aware agent instructions.
+
+Instruction files can be divided into named sections with marker lines:
+
+    <!-- section: combat -->
+
+Text before the first marker, and after a `<!-- section: core -->` marker, is
+the core of the instruction and is always sent. An agent with
+`instruction_sections` in adk.yaml only receives the sections listed for the
+`game_state` at the start of each turn, plus the sections listed under `startup`
+on the startup turn of a session. States without an entry receive every section.
+The startup turn is the one opened by a startup message ("NEW CAMPAIGN" or
+"EXISTING CAMPAIGN" on its first line), which the CLI sends whenever it starts
+or resumes a session and the web app sends when it starts one for a campaign.
+It is not inferred from the session's events, since a resumed durable session
+keeps the events of earlier runs.
+The instruction is fixed for the rest of the turn, so a game_state change made
+mid-turn (e.g. the root agent moving from new_campaign to exploration) does not
+drop the workflow the agent is still following.
+"""
+
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from google.adk.agents.readonly_context import ReadonlyContext
+
+# Always-included section name
+CORE_SECTION = 'core'
+
+# Pseudo game_state whose sections are added on the startup turn of a session
+STARTUP_PHASE = 'startup'
+
+# Messages that open a session's startup turn
+NEW_CAMPAIGN_MESSAGE = 'NEW CAMPAIGN'
+EXISTING_CAMPAIGN_MESSAGE = 'EXISTING CAMPAIGN'
+STARTUP_MESSAGES = (NEW_CAMPAIGN_MESSAGE, EXISTING_CAMPAIGN_MESSAGE)
+
+# Turns whose assembled instruction is remembered per agent
+MAX_PINNED_TURNS = 64
+
+SECTION_MARKER = re.compile(r'^<!--\s*section:\s*([\w-]+)\s*-->[ \t]*$', re.MULTILINE)
+
+
+def parse_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Split instruction text into (section name, text) blocks in file order.
+
+    Args:
+        text: str - The instruction file contents
+
+    Returns:
+        List[Tuple[str, str]] - Blocks in file order; unmarked text belongs to the core section
+    """
+    blocks = []
+    name, start = CORE_SECTION, 0
+    for marker in SECTION_MARKER.finditer(text):
+        blocks.append((name, text[start:marker.start()]))
+        name, start = marker.group(1), marker.end()
+    blocks.append((name, text[start:]))
+    return [(name, body.strip()) for name, body in blocks if body.strip()]
+
+
+def validate_instruction_sections(agent_name: str, section_names: List[str], profiles: Dict[str, List[str]]) -> None:
+    """
+    Validate that every profile only references sections of the agent's instruction file.
+
+    Args:
+        agent_name: str - The agent the profiles belong to (used in errors)
+        section_names: List[str] - Sections defined in the instruction file
+        profiles: Dict[str, List[str]] - Section names keyed by game_state
+
+    Raises:
+        ValueError: If a profile references an unknown section
+    """
+    for game_state, sections in (profiles or {}).items():
+        unknown = [name for name in sections or [] if name not in section_names]
+        if unknown:
+            raise ValueError(
+                f"Invalid instruction_sections.{game_state} for agent '{agent_name}' in adk.yaml: "
+                f"sections {unknown} are not in the agent's instruction file"
+            )
+
+
+def is_startup_message(content) -> bool:
+    """
+    Check whether a turn's user content opens the session's startup turn.
+
+    Args:
+        content: types.Content - The user content that started the turn
+
+    Returns:
+        bool - True if its first line is one of the STARTUP_MESSAGES
+    """
+    parts = content.parts if content is not None and content.parts else []
+    text = next((part.text for part in parts if part.text), '')
+    lines = text.strip().splitlines()
+    return bool(lines) and lines[0].strip().upper() in STARTUP_MESSAGES
+
+
+class SectionedInstruction:
+    """Instruction provider that assembles an agent's instruction for the current game_state."""
+
+    def __init__(self, agent_name: str, blocks: List[Tuple[str, str]], profiles: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            agent_name: str - The agent this instruction belongs to
+            blocks: List[Tuple[str, str]] - Sections in order, as returned by parse_sections
+            profiles: Dict[str, List[str]] - Section names keyed by game_state (and 'startup')
+        """
+        self.agent_name = agent_name
+        self.blocks = list(blocks)
+        validate_instruction_sections(agent_name, self.section_names, profiles)
+        self.profiles = {state: list(names or []) for state, names in (profiles or {}).items()}
+        self._pinned: 'OrderedDict[str, str]' = OrderedDict()
+
+    @property
+    def section_names(self) -> List[str]:
+        """Names of the optional sections, in file order."""
+        return list(dict.fromkeys(name for name, _ in self.blocks if name != CORE_SECTION))
+
+    def sections_for_state(self, game_state: Optional[str], startup: bool = False) -> List[str]:
+        """
+        Get the optional sections included for a given game_state.
+
+        Args:
+            game_state: str - The current session game_state
+            startup: bool - Whether this is the startup turn of the session
+
+        Returns:
+            List[str] - Section names, or every section if the state has no entry
+        """
+        profile = self.profiles.get(game_state) if game_state else None
+        if profile is None:
+            return self.section_names
+        if startup:
+            profile = profile + self.profiles.get(STARTUP_PHASE, [])
+        return [name for name in self.section_names if name in profile]
+
+    def render(self, game_state: Optional[str] = None, startup: bool = False) -> str:
+        """
+        Assemble the instruction text for a given game_state.
+
+        Args:
+            game_state: str - The current session game_state (None for every section)
+            startup: bool - Whether this is the startup turn of the session
+
+        Returns:
+            str - The core instruction with the relevant sections, in file order
+        """
+        included = set(self.sections_for_state(game_state, startup)) | {CORE_SECTION}
+        return "\n\n".join(body for name, body in self.blocks if name in included)
+
+    def __call__(self, readonly_context: ReadonlyContext) -> str:
+        """Build the instruction for the game_state the current turn started in."""
+        invocation_id = readonly_context.invocation_id
+        if invocation_id not in self._pinned:
+            self._pinned[invocation_id] = self.render(readonly_context.state.get('game_state'),
+                                                      is_startup_message(readonly_context.user_content))
+            while len(self._pinned) > MAX_PINNED_TURNS:
+                self._pinned.popitem(last=False)
+        return self._pinned[invocation_id]
@@ -0,0 +1,207 @@
+"""
+Tool registry for declarative agent construction.
+
+Maps the tool names used in config/adk.yaml to the Python functions that
+implement them, so each agent's tool set is a configuration change rather
+than a code change. Tool lists are validated against the registry at startup.
+"""
+
+from typing import Callable, Dict, Iterable, List
+
+from data.tools.character_data import (
+    get_ability_score_details, get_alignment_details, get_background_details,
+    get_skill_details, get_proficiency_details, get_language_details,
+    get_all_backgrounds, get_all_languages, get_all_proficiencies,
+    get_all_skills, get_all_ability_scores, get_all_alignments,
+    finalize_character, set_character,
+)
+from data.tools.classes import (
+    get_class_details, get_spellcasting_info, get_multiclassing_info,
+    get_subclasses_available_for_class, get_spells_available_for_class,
+    get_features_available_for_class, get_proficiencies_available_for_class,
+    get_all_classes,
+)
+from data.tools.equipment import (
+    get_equipment_details, get_all_equipment, get_all_equipment_categories,
+    get_equipment_by_category,
+)
+from data.tools.game_mechanics import (
+    get_condition_details, get_damage_type_details, get_all_conditions,
+    get_all_damage_types, calculate_hp, start_combat, get_combat_state,
+    update_combat_participant_hp, end_combat, get_next_turn, advance_turn,
+    classify_npc_for_combat, get_monster_for_npc_classification,
+    resolve_npc_to_monster, create_combat_result, get_combat_result,
+    clear_combat_result,
+)
+from data.tools.magic_items import get_magic_item_details, get_all_magic_items, get_all_magic_schools
+from data.tools.monsters import get_monster_details, get_monster_by_challenge_rating, get_all_monsters
+from data.tools.races import (
+    get_race_details, get_subraces_available_for_race,
+    get_proficiencies_available_for_race, get_traits_available_for_race,
+    get_all_races,
+)
+from data.tools.rules import get_rules_details, get_rules_by_section, get_all_rules, get_all_rules_sections
+from data.tools.spells import (
+    get_spell_details, get_spells_by_level, get_spells_by_school,
+    get_spells_by_level_and_school, get_all_spells,
+)
+from data.tools.subclasses import get_subclass_details, get_features_available_for_subclass, get_all_subclasses
+from data.tools.subraces import get_subrace_details, get_all_subraces
+from data.tools.traits import get_trait_details, get_all_traits
+from data.tools.weapons import get_weapon_property_details, get_all_weapon_properties
+from data.tools.misc_tools import (
+    roll_dice, get_state, set_state, create_campaign, save_campaign, load_campaign,
+    return_control_to_root,
+)
+from data.tools.tools import get_starting_equipment
+from data.tools.srd_batch import srd_lookup, SRD_LOOKUP_REPLACES
+from core.tool_outputs import expand_tool_output
+
+# Registry of every function that may be exposed to an agent as a tool,
+# keyed by the name used in adk.yaml.
+TOOL_REGISTRY: Dict[str, Callable] = {}
+
+
+def register_tool(func: Callable, name: str = None) -> Callable:
+    """
+    Register a function as an agent tool.
+
+    Args:
+        func: Callable - The tool function
+        name: str - Registry name (defaults to the function name)
+
+    Returns:
+        Callable - The function, unchanged, so this can be used as a decorator
+    """
+    tool_name = name or func.__name__
+    if tool_name in TOOL_REGISTRY and TOOL_REGISTRY[tool_name] is not func:
+        raise ValueError(f"Tool '{tool_name}' is already registered to a different function.")
+    TOOL_REGISTRY[tool_name] = func
+    return func
+
+
+for _tool in [
+    # --- Campaign state and persistence ---
+    get_state, set_state, create_campaign, save_campaign, load_campaign,
+    set_character, roll_dice, return_control_to_root,
+    # --- Character data ---
+    get_ability_score_details, get_all_ability_scores,
+    get_alignment_details, get_all_alignments,
+    get_background_details, get_all_backgrounds,
+    get_skill_details, get_all_skills,
+    get_proficiency_details, get_all_proficiencies,
+    get_language_details, get_all_languages,
+    finalize_character, get_starting_equipment,
+    # --- Classes, subclasses, races, subraces, traits ---
+    get_class_details, get_all_classes, get_spellcasting_info,
+    get_multiclassing_info, get_subclasses_available_for_class,
+    get_spells_available_for_class, get_features_available_for_class,
+    get_proficiencies_available_for_class,
+    get_subclass_details, get_all_subclasses, get_features_available_for_subclass,
+    get_race_details, get_all_races, get_subraces_available_for_race,
+    get_proficiencies_available_for_race, get_traits_available_for_race,
+    get_subrace_details, get_all_subraces,
+    get_trait_details, get_all_traits,
+    # --- Equipment and magic items ---
+    get_equipment_details, get_all_equipment, get_all_equipment_categories,
+    get_equipment_by_category, get_weapon_property_details,
+    get_all_weapon_properties, get_magic_item_details, get_all_magic_items,
+    get_all_magic_schools,
+    # --- Spells, monsters and rules ---
+    get_spell_details, get_all_spells, get_spells_by_level, get_spells_by_school,
+    get_spells_by_level_and_school,
+    get_monster_details, get_all_monsters, get_monster_by_challenge_rating,
+    get_rules_details, get_rules_by_section, get_all_rules, get_all_rules_sections,
+    get_condition_details, get_all_conditions,
+    get_damage_type_details, get_all_damage_types,
+    # --- Combat mechanics ---
+    calculate_hp, start_combat, get_combat_state, update_combat_participant_hp,
+    end_combat, get_next_turn, advance_turn,
+    create_combat_result, get_combat_result, clear_combat_result,
+    classify_npc_for_combat, get_monster_for_npc_classification,
+    resolve_npc_to_monster,
+    # --- Consolidated SRD lookup ---
+    srd_lookup,
+    # --- Conversation history ---
+    expand_tool_output,
+]:
+    register_tool(_tool)
+
+
+def get_tool(name: str) -> Callable:
+    """
+    Look up a registered tool by name.
+
+    Args:
+        name: str - The registry name of the tool
+
+    Returns:
+        Callable - The tool function
+
+    Raises:
+        KeyError: If no tool is registered under that name
+    """
+    if name not in TOOL_REGISTRY:
+        raise KeyError(f"Tool '{name}' is not registered.")
+    return TOOL_REGISTRY[name]
+
+
+def validate_tool_names(agent_name: str, tool_names: Iterable[str]) -> List[str]:
+    """
+    Validate an agent's configured tool names against the registry.
+
+    Args:
+        agent_name: str - The agent the tools are configured for (used in errors)
+        tool_names: Iterable[str] - Tool names from adk.yaml
+
+    Returns:
+        List[str] - The validated tool names, in configured order
+
+    Raises:
+        ValueError: If a tool is unknown or listed more than once
+    """
+    tool_names = list(tool_names or [])
+    unknown = [name for name in tool_names if name not in TOOL_REGISTRY]
+    duplicates = sorted({name for name in tool_names if tool_names.count(name) > 1})
+
+    problems = []
+    if unknown:
+        problems.append(f"unknown tools {unknown}")
+    if duplicates:
+        problems.append(f"duplicate tools {duplicates}")
+    if problems:
+        raise ValueError(f"Invalid tool configuration for agent '{agent_name}' in adk.yaml: {'; '.join(problems)}")
+    return tool_names
+
+
+def resolve_tools(agent_name: str, tool_names: Iterable[str]) -> List[Callable]:
+    """
+    Resolve an agent's configured tool names to tool functions.
+
+    Args:
+        agent_name: str - The agent the tools are configured for
+        tool_names: Iterable[str] - Tool names from adk.yaml
+
+    Returns:
+        List[Callable] - The tool functions, in configured order
+    """
+    return [TOOL_REGISTRY[name] for name in validate_tool_names(agent_name, tool_names)]
+
+
+def consolidate_srd_lookup_tools(tool_names: Iterable[str]) -> List[str]:
+    """
+    Replace per-category SRD wrapper tools with the single srd_lookup tool.
+
+    Args:
+        tool_names: Iterable[str] - Tool names from adk.yaml
+
+    Returns:
+        List[str] - Tool names with covered wrappers collapsed into srd_lookup,
+        which takes the position of the first wrapper it replaces
+    """
+    consolidated = []
+    for name in tool_names or []:
+        name = 'srd_lookup' if name in SRD_LOOKUP_REPLACES else name
+        if name not in consolidated:
+            consolidated.append(name)
+    return consolidated
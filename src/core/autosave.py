@@ -0,0 +1,240 @@
+"""
+Background autosave of campaign state.
+
+Campaigns used to be persisted only when the root agent chose to call
+save_campaign: a model-driven tool call on the turn's critical path, and
+progress was lost whenever the agent forgot. The autosave scheduler saves at
+the runtime level instead. Every finished turn requests a snapshot of its
+session, and sessions are also snapshotted every interval_seconds (which
+covers state changed during a long turn). A background task on the agents'
+event loop reads the session state (without its events) and hands the
+campaign fields to the write-behind writer, which queues only the fields
+that changed and writes them off the loop.
+
+    coalescing      requests for a session that is already waiting are
+                    merged; the writer merges snapshots further per field
+    backpressure    while the writer has max_pending_campaigns campaigns
+                    waiting to be written, snapshots are deferred (the
+                    requests are kept, so nothing is lost)
+    retry           a failed snapshot is retried with exponential backoff;
+                    failed writes are retried by the writer
+
+Autosave needs write-behind persistence. Settings come from the autosave
+section of adk.yaml.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+SessionKey = Tuple[str, str, str]
+
+
+class _TrackedSession:
+    """A session the scheduler snapshots."""
+
+    def __init__(self, session_service):
+        self.session_service = session_service
+        self.dirty = False
+        self.last_snapshot: Optional[float] = None
+        self.not_before = 0.0
+        self.failures = 0
+
+
+class AutosaveScheduler:
+    """Snapshots session state into the write-behind writer on turn boundaries and timers."""
+
+    def __init__(self, writer, snapshot_fields: Callable[[Any], Dict[str, Any]], interval_seconds: float = 30.0,
+                 max_pending_campaigns: int = 100, retry_base_seconds: float = 1.0, retry_max_seconds: float = 60.0,
+                 max_sessions: int = 500, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            writer: WriteBehindWriter - Queues and writes the changed campaign fields
+            snapshot_fields: Callable - Campaign fields to store from a session state (including campaign_id)
+            interval_seconds: float - Time between timer snapshots of a session
+            max_pending_campaigns: int - Writer backlog (campaigns) above which snapshots are deferred
+            retry_base_seconds: float - First retry delay after a failed snapshot, doubled per failure
+            retry_max_seconds: float - Cap on the retry delay
+            max_sessions: int - Sessions tracked for timer snapshots, least recently active first out
+            clock: Callable - Time source, injectable for tests
+        """
+        self.writer = writer
+        self.snapshot_fields = snapshot_fields
+        self.interval_seconds = interval_seconds
+        self.max_pending_campaigns = max_pending_campaigns
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self._sessions: 'OrderedDict[SessionKey, _TrackedSession]' = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {'requests': 0, 'coalesced': 0, 'snapshots': 0, 'fields_queued': 0, 'deferred': 0,
+                      'failures': 0}
+
+    def request(self, session_service, app_name: str, user_id: str, session_id: str) -> None:
+        """Ask for a snapshot of a session (e.g. at the end of a turn). Must be called on the event loop."""
+        key = (app_name, user_id, session_id)
+        tracked = self._sessions.get(key)
+        if tracked is None:
+            tracked = self._sessions[key] = _TrackedSession(session_service)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(key)
+        self.stats['requests'] += 1
+        if tracked.dirty:
+            self.stats['coalesced'] += 1
+        tracked.dirty = True
+        self._ensure_task()
+        self._wakeup.set()
+
+    def _ensure_task(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run(), name='campaign-autosave')
+
+    def _due(self, tracked: _TrackedSession, now: float) -> bool:
+        if now < tracked.not_before:
+            return False
+        return tracked.dirty or (tracked.last_snapshot is not None and now - tracked.last_snapshot >= self.interval_seconds)
+
+    def _next_wake(self, now: float) -> Optional[float]:
+        """Seconds until a session is next due, or None if none is tracked."""
+        times = []
+        for tracked in self._sessions.values():
+            due = tracked.not_before if tracked.dirty else (tracked.last_snapshot or now) + self.interval_seconds
+            times.append(max(due, tracked.not_before))
+        return max(0.0, min(times) - now) if times else None
+
+    def _backpressured(self) -> bool:
+        return self.writer.metrics()['pending_campaigns'] >= self.max_pending_campaigns
+
+    async def _snapshot(self, key: SessionKey, tracked: _TrackedSession) -> None:
+        from google.adk.sessions.base_session_service import GetSessionConfig
+        app_name, user_id, session_id = key
+        session = await tracked.session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id,
+                                                            config=GetSessionConfig(num_recent_events=0))
+        if session is None:
+            self._sessions.pop(key, None)
+            return
+        fields = self.snapshot_fields(session.state)
+        campaign_id = fields.get('campaign_id')
+        if not campaign_id:
+            return
+        changed = self.writer.mark(campaign_id, fields)
+        self.stats['snapshots'] += 1
+        self.stats['fields_queued'] += len(changed)
+
+    async def run_once(self, force: bool = False) -> int:
+        """
+        Snapshot the sessions that are due (all of them with force).
+
+        Returns:
+            int - Sessions snapshotted
+        """
+        if not force and self._backpressured():
+            self.stats['deferred'] += 1
+            return 0
+        now = self.clock()
+        done = 0
+        for key, tracked in list(self._sessions.items()):
+            if not force and not self._due(tracked, now):
+                continue
+            # Cleared first: a request arriving during the snapshot marks it dirty again
+            tracked.dirty = False
+            try:
+                await self._snapshot(key, tracked)
+            except Exception as e:
+                tracked.dirty = True
+                tracked.failures += 1
+                tracked.not_before = now + min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (tracked.failures - 1))
+                self.stats['failures'] += 1
+                print(f"[Autosave] Snapshot of session '{key[2]}' failed, will retry: {e}")
+                continue
+            tracked.failures = 0
+            tracked.not_before = 0.0
+            tracked.last_snapshot = now
+            done += 1
+        return done
+
+    async def _run(self) -> None:
+        while True:
+            wait = self._next_wake(self.clock())
+            if self._backpressured():
+                wait = self.retry_base_seconds if wait is None else max(wait, self.retry_base_seconds)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.run_once()
+
+    async def close(self) -> None:
+        """Stop the background task and snapshot every tracked session (called on shutdown)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.run_once(force=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, 'sessions': len(self._sessions),
+                'waiting': sum(1 for tracked in self._sessions.values() if tracked.dirty)}
+
+
+_scheduler: Optional[AutosaveScheduler] = None
+
+
+def get_autosave_scheduler() -> Optional[AutosaveScheduler]:
+    """
+    Get the process-wide autosave scheduler configured by the autosave section
+    of adk.yaml, or None if autosave (or write-behind persistence) is disabled.
+    """
+    global _scheduler
+    if _scheduler is None:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('autosave')
+        if not settings.get('enabled', False):
+            return None
+        from .campaign_store import get_campaign_store
+        from .persistence import get_campaign_writer
+        from data.tools.misc_tools import campaign_state_fields
+        store = get_campaign_store()
+        writer = get_campaign_writer(store.write_fields) if store is not None else None
+        if writer is None:
+            return None
+        _scheduler = AutosaveScheduler(
+            writer,
+            campaign_state_fields,
+            interval_seconds=settings.get('interval_seconds', 30.0),
+            max_pending_campaigns=settings.get('max_pending_campaigns', 100),
+            retry_base_seconds=settings.get('retry_base_seconds', 1.0),
+            retry_max_seconds=settings.get('retry_max_seconds', 60.0),
+            max_sessions=settings.get('max_sessions', 500),
+        )
+    return _scheduler
+
+
+def set_autosave_scheduler(scheduler: Optional[AutosaveScheduler]) -> None:
+    """Replace the process-wide scheduler (e.g. with one over a test writer)."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def request_autosave(runner, user_id: str, session_id: str) -> None:
+    """Request a snapshot of a session after a turn; a no-op when autosave is disabled."""
+    scheduler = get_autosave_scheduler()
+    if scheduler is not None:
+        scheduler.request(runner.session_service, runner.app_name, user_id, session_id)
+
+
+async def close_autosave() -> None:
+    """Snapshot every tracked session and stop the scheduler (call before flushing the writer)."""
+    if _scheduler is not None:
+        await _scheduler.close()
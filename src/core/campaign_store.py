@@ -0,0 +1,706 @@
+"""
+Pluggable campaign storage.
+
+create_campaign, save_campaign, load_campaign and the campaign outline tools
+go through a CampaignStore instead of calling Firestore directly. Two
+backends implement the same semantics:
+
+    FirestoreCampaignStore   the campaign's state documents in its own collection
+                             (collection(campaign_id)), outlines in the
+                             'campaigns' collection
+    SQLiteCampaignStore      a local SQLite database in WAL mode, one row per
+                             state field, for small deployments, local runs
+                             and hermetic persistence benchmarks
+
+Both store state as a flat {field: value} mapping, merge written fields into
+the existing state and stamp last_saved on every write, and only save an
+outline for a campaign that exists.
+
+Both also keep a campaign catalog: one small entry per campaign (title, party
+summary, location, game state, last_saved), updated in the same write as the
+state fields it is derived from. list_campaigns pages through the catalog,
+most recently saved first, with an opaque cursor, so listing costs one index
+range read per page however many campaigns exist.
+
+The backend is chosen by the persistence section of adk.yaml.
+`python -m core.campaign_store [path]` benchmarks saves against a scratch
+SQLite database; `python -m core.campaign_store --rebuild-catalog` fills the
+catalog of the configured store from the stored campaigns.
+"""
+
+import abc
+import asyncio
+import base64
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CATALOG_COLLECTION = 'campaign_catalog'
+# State fields the catalog entry is derived from
+CATALOG_SOURCE_FIELDS = ('campaign_outline', 'characters', 'location', 'game_state')
+MAX_PAGE_SIZE = 100
+# Large, independently changing state fields kept in their own Firestore documents next to
+# collection(campaign_id)/state, so no single document nears the 1 MiB limit
+FIRESTORE_SHARDS = {
+    'characters': 'characters',
+    'campaign_outline': 'outline',
+    'combat_participants': 'combat',
+    'campaign_memory': 'log',
+}
+
+
+def catalog_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The catalog entry fields derived from (some of) a campaign's state fields.
+
+    Args:
+        fields: Dict[str, Any] - State fields being written; only the ones present are derived
+
+    Returns:
+        dict - Any of title, party, location and game_state
+    """
+    entry = {}
+    if 'campaign_outline' in fields:
+        outline = fields['campaign_outline']
+        title = outline.get('title') if isinstance(outline, dict) else None
+        # An empty outline leaves a title saved with save_outline alone
+        if title:
+            entry['title'] = title
+    if 'characters' in fields:
+        characters = fields['characters'] if isinstance(fields['characters'], dict) else {}
+        entry['party'] = [{'name': character.get('name', name), 'race': character.get('race', ''),
+                           'class': character.get('class', ''), 'level': character.get('level', 1)}
+                          for name, character in characters.items() if isinstance(character, dict)]
+    for name in ('location', 'game_state'):
+        if name in fields:
+            entry[name] = fields[name] or ''
+    return entry
+
+
+def encode_cursor(last_saved: float, campaign_id: str) -> str:
+    payload = json.dumps([last_saved, campaign_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Raises ValueError for a cursor that list_campaigns did not return."""
+    try:
+        last_saved, campaign_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(last_saved), str(campaign_id)
+    except Exception:
+        raise ValueError(f"Invalid campaign list cursor '{cursor}'")
+
+
+class CampaignStore(abc.ABC):
+    """Campaign state and outline storage; backends implement every abstract method."""
+
+    @abc.abstractmethod
+    def create_campaign(self, campaign_id: str, state: Dict[str, Any]) -> None:
+        """Create (or reset) a campaign with its initial state."""
+
+    @abc.abstractmethod
+    def campaign_exists(self, campaign_id: str) -> bool:
+        """Whether the campaign has been created."""
+
+    @abc.abstractmethod
+    def load_state(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """The campaign's state fields, or None if the campaign does not exist."""
+
+    @abc.abstractmethod
+    def load_fields(self, campaign_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Some of a campaign's state fields, reading only what holds them.
+
+        Returns:
+            dict | None - The stored fields among those requested, or None if the campaign does not exist
+        """
+
+    @abc.abstractmethod
+    def load_catalog_entry(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """The campaign's catalog entry, or None if it has none."""
+
+    @abc.abstractmethod
+    def write_fields(self, campaign_fields: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Merge fields into the state of one or more campaigns in one write, stamping last_saved.
+
+        Args:
+            campaign_fields: Dict[str, Dict[str, Any]] - {campaign_id: {field: value}}
+        """
+
+    @abc.abstractmethod
+    def save_outline(self, campaign_id: str, outline: Dict[str, Any]) -> bool:
+        """Store the campaign outline; False if the campaign does not exist."""
+
+    @abc.abstractmethod
+    def load_outline(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """The campaign outline, or None if there is none."""
+
+    @abc.abstractmethod
+    def list_campaigns(self, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of the campaign catalog, most recently saved first.
+
+        Args:
+            limit: int - Entries per page (at most MAX_PAGE_SIZE)
+            cursor: str - The next_cursor of the previous page, or None for the first page
+
+        Returns:
+            tuple - (catalog entries, cursor of the next page or None on the last page)
+        """
+
+    @abc.abstractmethod
+    def rebuild_catalog(self) -> int:
+        """Rewrite the catalog from the stored campaigns (e.g. ones saved before it existed); returns the count."""
+
+    # Coroutine variants for tools running on the event loop. By default they run the blocking
+    # method in a worker thread; backends with an async client override them.
+
+    async def load_state_async(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.load_state, campaign_id)
+
+    async def campaign_exists_async(self, campaign_id: str) -> bool:
+        return await asyncio.to_thread(self.campaign_exists, campaign_id)
+
+    async def load_fields_async(self, campaign_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.load_fields, campaign_id, fields)
+
+    async def load_catalog_entry_async(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.load_catalog_entry, campaign_id)
+
+    async def write_fields_async(self, campaign_fields: Dict[str, Dict[str, Any]]) -> None:
+        await asyncio.to_thread(self.write_fields, campaign_fields)
+
+    async def save_outline_async(self, campaign_id: str, outline: Dict[str, Any]) -> bool:
+        return await asyncio.to_thread(self.save_outline, campaign_id, outline)
+
+    async def load_outline_async(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.load_outline, campaign_id)
+
+    def close(self) -> None:
+        pass
+
+
+class FirestoreCampaignStore(CampaignStore):
+    """
+    Campaign storage in Cloud Firestore.
+
+    The small state fields live in collection(campaign_id)/state; each field in
+    FIRESTORE_SHARDS lives in its own document of the same collection as
+    {'value': ...}. A save writes only the documents of the fields it changes,
+    a load reads all of a campaign's documents in one batched get and
+    reassembles the state. Fields of campaigns saved before sharding are read
+    from the state document and moved to their shard on their next save.
+    """
+
+    def __init__(self, client, async_client: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            client: google.cloud.firestore.Client - The shared Firestore client
+            async_client: Callable - Returns the running event loop's firestore.AsyncClient (or None);
+                without it the coroutine methods use worker threads
+        """
+        self.client = client
+        self.async_client = async_client
+
+    def _async_client(self):
+        return self.async_client() if self.async_client is not None else None
+
+    def _state_ref(self, campaign_id: str):
+        return self.client.collection(campaign_id).document('state')
+
+    def _catalog_ref(self, campaign_id: str):
+        return self.client.collection(CATALOG_COLLECTION).document(campaign_id)
+
+    @staticmethod
+    def _document_refs(client, campaign_id: str) -> list:
+        """The state document and every shard document of a campaign."""
+        collection = client.collection(campaign_id)
+        return [collection.document('state')] + [collection.document(shard) for shard in FIRESTORE_SHARDS.values()]
+
+    @staticmethod
+    def _assemble(snapshots) -> Optional[Dict[str, Any]]:
+        """Reassemble the state from the snapshots of a campaign's documents; None without a state document."""
+        documents = {snapshot.id: snapshot.to_dict() for snapshot in snapshots if snapshot.exists}
+        if 'state' not in documents:
+            return None
+        state = documents['state']
+        state.pop('last_saved', None)
+        for field, shard in FIRESTORE_SHARDS.items():
+            if shard in documents:
+                state[field] = documents[shard].get('value')
+        return state
+
+    def create_campaign(self, campaign_id: str, state: Dict[str, Any]) -> None:
+        now = time.time()
+        collection = self.client.collection(campaign_id)
+        batch = self.client.batch()
+        batch.set(collection.document('state'), {field: value for field, value in state.items() if field not in FIRESTORE_SHARDS})
+        for field, shard in FIRESTORE_SHARDS.items():
+            if field in state:
+                batch.set(collection.document(shard), {'value': state[field]})
+            else:
+                batch.delete(collection.document(shard))
+        batch.set(self._catalog_ref(campaign_id), {'campaign_id': campaign_id, 'title': '', **catalog_fields(state),
+                                                   'created_at': now, 'last_saved': now})
+        batch.commit()
+
+    def campaign_exists(self, campaign_id: str) -> bool:
+        return self._state_ref(campaign_id).get().exists
+
+    def load_state(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        return self._assemble(self.client.get_all(self._document_refs(self.client, campaign_id)))
+
+    @staticmethod
+    def _field_refs(client, campaign_id: str, fields: List[str]) -> list:
+        """The documents holding some of a campaign's fields."""
+        collection = client.collection(campaign_id)
+        shards = sorted({FIRESTORE_SHARDS[field] for field in fields if field in FIRESTORE_SHARDS})
+        # The state document is always read: it marks the campaign as existing
+        return [collection.document('state')] + [collection.document(shard) for shard in shards]
+
+    @classmethod
+    def _pick(cls, snapshots, fields: List[str]) -> Optional[Dict[str, Any]]:
+        state = cls._assemble(snapshots)
+        if state is None:
+            return None
+        return {field: state[field] for field in fields if field in state}
+
+    def load_fields(self, campaign_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        return self._pick(self.client.get_all(self._field_refs(self.client, campaign_id, fields)), fields)
+
+    def load_catalog_entry(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        doc = self._catalog_ref(campaign_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    @staticmethod
+    def _batch_fields(client, batch, campaign_fields: Dict[str, Dict[str, Any]]) -> None:
+        """Add the writes that save some campaign fields to a batch."""
+        from google.cloud import firestore
+        now = time.time()
+        for campaign_id, fields in campaign_fields.items():
+            collection = client.collection(campaign_id)
+            state_update = {'last_saved': firestore.SERVER_TIMESTAMP}
+            for field, value in fields.items():
+                shard = FIRESTORE_SHARDS.get(field)
+                if shard is None:
+                    state_update[field] = value
+                else:
+                    batch.set(collection.document(shard), {'value': value, 'last_saved': firestore.SERVER_TIMESTAMP})
+                    # Drops the copy a campaign saved before sharding kept in its state document
+                    state_update[field] = firestore.DELETE_FIELD
+            batch.set(collection.document('state'), state_update, merge=True)
+            # The catalog keeps an epoch last_saved so list cursors are plain values
+            batch.set(client.collection(CATALOG_COLLECTION).document(campaign_id),
+                      {'campaign_id': campaign_id, **catalog_fields(fields), 'last_saved': now}, merge=True)
+
+    def write_fields(self, campaign_fields: Dict[str, Dict[str, Any]]) -> None:
+        batch = self.client.batch()
+        self._batch_fields(self.client, batch, campaign_fields)
+        batch.commit()
+
+    def save_outline(self, campaign_id: str, outline: Dict[str, Any]) -> bool:
+        from google.cloud import firestore
+        if not self.campaign_exists(campaign_id):
+            return False
+        batch = self.client.batch()
+        batch.set(self.client.collection('campaigns').document(campaign_id),
+                  {'campaign_outline': outline, 'outline_created': firestore.SERVER_TIMESTAMP}, merge=True)
+        batch.set(self._catalog_ref(campaign_id), {'campaign_id': campaign_id, **catalog_fields({'campaign_outline': outline})},
+                  merge=True)
+        batch.commit()
+        return True
+
+    def load_outline(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        doc = self.client.collection('campaigns').document(campaign_id).get()
+        if not doc.exists:
+            return None
+        return doc.to_dict().get('campaign_outline') or None
+
+    async def load_state_async(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        client = self._async_client()
+        if client is None:
+            return await super().load_state_async(campaign_id)
+        return self._assemble([snapshot async for snapshot in client.get_all(self._document_refs(client, campaign_id))])
+
+    async def campaign_exists_async(self, campaign_id: str) -> bool:
+        client = self._async_client()
+        if client is None:
+            return await super().campaign_exists_async(campaign_id)
+        return (await client.collection(campaign_id).document('state').get()).exists
+
+    async def load_fields_async(self, campaign_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        client = self._async_client()
+        if client is None:
+            return await super().load_fields_async(campaign_id, fields)
+        return self._pick([snapshot async for snapshot in client.get_all(self._field_refs(client, campaign_id, fields))], fields)
+
+    async def load_catalog_entry_async(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        client = self._async_client()
+        if client is None:
+            return await super().load_catalog_entry_async(campaign_id)
+        doc = await client.collection(CATALOG_COLLECTION).document(campaign_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    async def write_fields_async(self, campaign_fields: Dict[str, Dict[str, Any]]) -> None:
+        client = self._async_client()
+        if client is None:
+            return await super().write_fields_async(campaign_fields)
+        batch = client.batch()
+        self._batch_fields(client, batch, campaign_fields)
+        await batch.commit()
+
+    async def save_outline_async(self, campaign_id: str, outline: Dict[str, Any]) -> bool:
+        from google.cloud import firestore
+        client = self._async_client()
+        if client is None:
+            return await super().save_outline_async(campaign_id, outline)
+        if not await self.campaign_exists_async(campaign_id):
+            return False
+        batch = client.batch()
+        batch.set(client.collection('campaigns').document(campaign_id),
+                  {'campaign_outline': outline, 'outline_created': firestore.SERVER_TIMESTAMP}, merge=True)
+        batch.set(client.collection(CATALOG_COLLECTION).document(campaign_id),
+                  {'campaign_id': campaign_id, **catalog_fields({'campaign_outline': outline})}, merge=True)
+        await batch.commit()
+        return True
+
+    async def load_outline_async(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        client = self._async_client()
+        if client is None:
+            return await super().load_outline_async(campaign_id)
+        doc = await client.collection('campaigns').document(campaign_id).get()
+        if not doc.exists:
+            return None
+        return doc.to_dict().get('campaign_outline') or None
+
+    def list_campaigns(self, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        from google.cloud import firestore
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        # Needs the composite index campaign_catalog(last_saved desc, campaign_id desc)
+        query = (self.client.collection(CATALOG_COLLECTION)
+                 .order_by('last_saved', direction=firestore.Query.DESCENDING)
+                 .order_by('campaign_id', direction=firestore.Query.DESCENDING))
+        if cursor:
+            last_saved, campaign_id = decode_cursor(cursor)
+            query = query.start_after({'last_saved': last_saved, 'campaign_id': campaign_id})
+        entries = [doc.to_dict() for doc in query.limit(limit + 1).stream()]
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor(entries[-1]['last_saved'], entries[-1]['campaign_id'])
+        return entries, next_cursor
+
+    def rebuild_catalog(self) -> int:
+        count = 0
+        for collection in self.client.collections():
+            if collection.id in ('campaigns', CATALOG_COLLECTION):
+                continue
+            doc = collection.document('state').get()
+            if not doc.exists:
+                continue
+            saved = doc.to_dict().get('last_saved')
+            state = self.load_state(collection.id)
+            outline = self.load_outline(collection.id) or state.get('campaign_outline')
+            self._catalog_ref(collection.id).set({
+                'campaign_id': collection.id, 'title': '', **catalog_fields({**state, 'campaign_outline': outline}),
+                'last_saved': saved.timestamp() if hasattr(saved, 'timestamp') else time.time(),
+            })
+            count += 1
+        return count
+
+
+class SQLiteCampaignStore(CampaignStore):
+    """Campaign storage in a local SQLite database (WAL mode)."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS campaigns (
+            campaign_id TEXT PRIMARY KEY,
+            created_at REAL NOT NULL,
+            last_saved REAL,
+            outline TEXT,
+            outline_created REAL
+        );
+        CREATE TABLE IF NOT EXISTS campaign_fields (
+            campaign_id TEXT NOT NULL REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
+            field TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (campaign_id, field)
+        );
+        CREATE TABLE IF NOT EXISTS campaign_catalog (
+            campaign_id TEXT PRIMARY KEY REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
+            title TEXT NOT NULL DEFAULT '',
+            party TEXT NOT NULL DEFAULT '[]',
+            location TEXT NOT NULL DEFAULT '',
+            game_state TEXT NOT NULL DEFAULT '',
+            created_at REAL NOT NULL,
+            last_saved REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS campaign_catalog_by_last_saved
+            ON campaign_catalog (last_saved DESC, campaign_id DESC);
+    """
+    CATALOG_COLUMNS = ('campaign_id', 'title', 'party', 'location', 'game_state', 'created_at', 'last_saved')
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: str - Database file (created if missing), or ':memory:'
+        """
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        # One connection shared by tool calls and the write-behind thread, serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('PRAGMA foreign_keys=ON')
+            self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _dump(value: Any) -> str:
+        return json.dumps(value, default=str)
+
+    def _update_catalog(self, campaign_id: str, fields: Dict[str, Any], now: float) -> None:
+        """Upsert the catalog entry derived from fields. Caller holds the lock inside a transaction."""
+        entry = catalog_fields(fields)
+        if 'party' in entry:
+            entry['party'] = self._dump(entry['party'])
+        columns = ['campaign_id', 'created_at', 'last_saved', *entry]
+        updates = ', '.join(f'{column} = excluded.{column}' for column in ['last_saved', *entry])
+        self._conn.execute(
+            f'INSERT INTO campaign_catalog ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))}) '
+            f'ON CONFLICT(campaign_id) DO UPDATE SET {updates}',
+            (campaign_id, now, now, *entry.values()))
+
+    def create_campaign(self, campaign_id: str, state: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('DELETE FROM campaign_fields WHERE campaign_id = ?', (campaign_id,))
+                self._conn.execute('DELETE FROM campaign_catalog WHERE campaign_id = ?', (campaign_id,))
+                self._conn.execute(
+                    'INSERT INTO campaigns (campaign_id, created_at) VALUES (?, ?) '
+                    'ON CONFLICT(campaign_id) DO UPDATE SET created_at = excluded.created_at, last_saved = NULL',
+                    (campaign_id, now))
+                self._conn.executemany(
+                    'INSERT INTO campaign_fields (campaign_id, field, value) VALUES (?, ?, ?)',
+                    [(campaign_id, field, self._dump(value)) for field, value in state.items()])
+                self._update_catalog(campaign_id, state, now)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def campaign_exists(self, campaign_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM campaigns WHERE campaign_id = ?', (campaign_id,)).fetchone()
+        return row is not None
+
+    def load_state(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._conn.execute('SELECT 1 FROM campaigns WHERE campaign_id = ?', (campaign_id,)).fetchone() is None:
+                return None
+            rows = self._conn.execute('SELECT field, value FROM campaign_fields WHERE campaign_id = ?', (campaign_id,)).fetchall()
+        return {field: json.loads(value) for field, value in rows}
+
+    def load_fields(self, campaign_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._conn.execute('SELECT 1 FROM campaigns WHERE campaign_id = ?', (campaign_id,)).fetchone() is None:
+                return None
+            rows = self._conn.execute(
+                f'SELECT field, value FROM campaign_fields WHERE campaign_id = ? AND field IN ({", ".join("?" * len(fields))})',
+                (campaign_id, *fields)).fetchall() if fields else []
+        return {field: json.loads(value) for field, value in rows}
+
+    def load_catalog_entry(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f'SELECT {", ".join(self.CATALOG_COLUMNS)} FROM campaign_catalog WHERE campaign_id = ?',
+                                     (campaign_id,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(self.CATALOG_COLUMNS, row))
+        entry['party'] = json.loads(entry['party'])
+        return entry
+
+    def write_fields(self, campaign_fields: Dict[str, Dict[str, Any]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for campaign_id, fields in campaign_fields.items():
+                    # Like a Firestore merge, writing to a missing campaign creates it
+                    self._conn.execute(
+                        'INSERT INTO campaigns (campaign_id, created_at, last_saved) VALUES (?, ?, ?) '
+                        'ON CONFLICT(campaign_id) DO UPDATE SET last_saved = excluded.last_saved',
+                        (campaign_id, now, now))
+                    self._conn.executemany(
+                        'INSERT INTO campaign_fields (campaign_id, field, value) VALUES (?, ?, ?) '
+                        'ON CONFLICT(campaign_id, field) DO UPDATE SET value = excluded.value',
+                        [(campaign_id, field, self._dump(value)) for field, value in fields.items()])
+                    self._update_catalog(campaign_id, fields, now)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def save_outline(self, campaign_id: str, outline: Dict[str, Any]) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = self._conn.execute(
+                    'UPDATE campaigns SET outline = ?, outline_created = ? WHERE campaign_id = ?',
+                    (self._dump(outline), now, campaign_id))
+                if cursor.rowcount > 0:
+                    title = catalog_fields({'campaign_outline': outline}).get('title')
+                    if title:
+                        self._conn.execute('UPDATE campaign_catalog SET title = ? WHERE campaign_id = ?', (title, campaign_id))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return cursor.rowcount > 0
+
+    def load_outline(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute('SELECT outline FROM campaigns WHERE campaign_id = ?', (campaign_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(row[0]) or None
+
+    def list_campaigns(self, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        query = f'SELECT {", ".join(self.CATALOG_COLUMNS)} FROM campaign_catalog'
+        params: tuple = ()
+        if cursor:
+            last_saved, campaign_id = decode_cursor(cursor)
+            # Row-value comparison keeps the seek on campaign_catalog_by_last_saved
+            query += ' WHERE (last_saved, campaign_id) < (?, ?)'
+            params = (last_saved, campaign_id)
+        query += ' ORDER BY last_saved DESC, campaign_id DESC LIMIT ?'
+        with self._lock:
+            rows = self._conn.execute(query, (*params, limit + 1)).fetchall()
+        entries = [dict(zip(self.CATALOG_COLUMNS, row)) for row in rows[:limit]]
+        for entry in entries:
+            entry['party'] = json.loads(entry['party'])
+        next_cursor = encode_cursor(entries[-1]['last_saved'], entries[-1]['campaign_id']) if len(rows) > limit else None
+        return entries, next_cursor
+
+    def rebuild_catalog(self) -> int:
+        with self._lock:
+            campaigns = self._conn.execute('SELECT campaign_id, created_at, last_saved, outline FROM campaigns').fetchall()
+        for campaign_id, created_at, last_saved, outline in campaigns:
+            state = self.load_state(campaign_id) or {}
+            if outline:
+                state['campaign_outline'] = json.loads(outline)
+            with self._lock:
+                self._conn.execute('BEGIN IMMEDIATE')
+                try:
+                    self._conn.execute('DELETE FROM campaign_catalog WHERE campaign_id = ?', (campaign_id,))
+                    self._update_catalog(campaign_id, state, last_saved or created_at)
+                    self._conn.execute('UPDATE campaign_catalog SET created_at = ? WHERE campaign_id = ?', (created_at, campaign_id))
+                    self._conn.execute('COMMIT')
+                except Exception:
+                    self._conn.execute('ROLLBACK')
+                    raise
+        return len(campaigns)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _project_path(path: str) -> str:
+    if os.path.isabs(path) or path == ':memory:':
+        return path
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, path)
+
+
+_store: Optional[CampaignStore] = None
+_store_lock = threading.Lock()
+
+
+def get_campaign_store() -> Optional[CampaignStore]:
+    """
+    Get the process-wide campaign store selected by the persistence section of
+    adk.yaml (backend: firestore or sqlite), or None if the Firestore client
+    is not available. The Firestore store uses the shared clients of
+    core.firestore_client.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            from agents.config_loader import get_config_section
+            settings = get_config_section('persistence')
+            backend = settings.get('backend', 'firestore')
+            if backend == 'sqlite':
+                _store = SQLiteCampaignStore(_project_path(settings.get('sqlite_path', 'data/campaigns.db')))
+            elif backend == 'firestore':
+                from .firestore_client import get_firestore_manager
+                manager = get_firestore_manager()
+                client = manager.client()
+                if client is None:
+                    return None
+                _store = FirestoreCampaignStore(client, manager.async_client)
+            else:
+                raise ValueError(f"Unknown persistence backend '{backend}' in adk.yaml (expected firestore or sqlite)")
+        return _store
+
+
+def set_campaign_store(store: Optional[CampaignStore]) -> None:
+    """Replace the process-wide store (e.g. with an in-memory SQLite store in tests)."""
+    global _store
+    _store = store
+
+
+def benchmark_store(store: CampaignStore, campaigns: int = 20, saves: int = 50) -> Dict[str, float]:
+    """
+    Time creates, field saves and loads against a store.
+
+    Returns:
+        dict - Median and p95 latency in milliseconds per operation
+    """
+    timings: Dict[str, list] = {'create': [], 'save': [], 'load': []}
+
+    def timed(operation, fn):
+        start = time.perf_counter()
+        fn()
+        timings[operation].append((time.perf_counter() - start) * 1000)
+
+    characters = {f'Hero {i}': {'class': 'fighter', 'hp': 12, 'inventory': ['sword'] * 20} for i in range(4)}
+    for index in range(campaigns):
+        campaign_id = f'bench-{index}'
+        timed('create', lambda: store.create_campaign(campaign_id, {'campaign_id': campaign_id, 'characters': characters}))
+        for save in range(saves):
+            timed('save', lambda: store.write_fields({campaign_id: {'last_scene': f'Scene {save}', 'location': 'Phandalin'}}))
+        timed('load', lambda: store.load_state(campaign_id))
+    report = {}
+    for operation, values in timings.items():
+        values.sort()
+        report[f'{operation}_p50_ms'] = values[len(values) // 2]
+        report[f'{operation}_p95_ms'] = values[min(len(values) - 1, int(len(values) * 0.95))]
+    return report
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['--rebuild-catalog']:
+        configured_store = get_campaign_store()
+        if configured_store is None:
+            sys.exit('The campaign store is not available (check the Firestore credentials)')
+        print(f"Rebuilt catalog entries for {configured_store.rebuild_catalog()} campaigns")
+        sys.exit(0)
+    with tempfile.TemporaryDirectory() as scratch:
+        db_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(scratch, 'bench.db')
+        bench_store = SQLiteCampaignStore(db_path)
+        for name, value in benchmark_store(bench_store).items():
+            print(f"{name:<16} {value:8.3f}")
+        bench_store.close()
@@ -0,0 +1,135 @@
+"""
+Turn checkpoints for retried agent turns.
+
+A retried turn replays from the player's message, so the agents tend to call
+the same tools again. For the tools listed in the turn_checkpoints section of
+adk.yaml (state writes, dice rolls, combat updates, saves), each completed
+call is journaled for the duration of the turn. When a retry makes the same
+call again (same agent, tool and arguments, in the same order), the journaled
+result is returned and the tool does not run a second time: damage is not
+applied twice and dice are not re-rolled. Only the step that failed is redone.
+
+The current turn is tracked with a context variable set by turn_checkpoint();
+tool callbacks outside a turn (e.g. the ADK dev UI) run tools normally.
+"""
+
+import contextlib
+import contextvars
+import copy
+import itertools
+import json
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .tool_results import is_error_result
+
+_turn_ids = itertools.count(1)
+
+
+class TurnJournal:
+    """Completed tool calls of one player turn, across its attempts."""
+
+    def __init__(self, turn_id: str, tool_names: Set[str]):
+        self.turn_id = turn_id
+        self.tool_names = tool_names
+        self.attempt = 0
+        self._results: Dict[Tuple[str, str, str], List[Any]] = {}
+        # How many journaled results each attempt has consumed, per call key
+        self._cursors: Dict[Tuple[int, Tuple[str, str, str]], int] = {}
+        self._replayed_call_ids: Set[str] = set()
+        self.stats = {'recorded': 0, 'replayed': 0}
+
+    @staticmethod
+    def call_key(agent_name: str, tool_name: str, args: Dict[str, Any]) -> Tuple[str, str, str]:
+        return agent_name, tool_name, json.dumps(args or {}, sort_keys=True, default=str)
+
+    @property
+    def completed_calls(self) -> int:
+        return sum(len(results) for results in self._results.values())
+
+    def start_attempt(self) -> None:
+        self.attempt += 1
+
+    def replay(self, key: Tuple[str, str, str], call_id: Optional[str]) -> Optional[Any]:
+        """
+        Get the journaled result for the next occurrence of a call in this attempt.
+
+        Returns:
+            Any | None - A copy of the recorded result, or None if the call has not completed before
+        """
+        results = self._results.get(key, [])
+        cursor_key = (self.attempt, key)
+        index = self._cursors.get(cursor_key, 0)
+        if index >= len(results):
+            return None
+        self._cursors[cursor_key] = index + 1
+        if call_id:
+            self._replayed_call_ids.add(call_id)
+        self.stats['replayed'] += 1
+        return copy.deepcopy(results[index])
+
+    def record(self, key: Tuple[str, str, str], call_id: Optional[str], result: Any) -> None:
+        """Journal a completed call, unless it was itself a replay."""
+        if call_id and call_id in self._replayed_call_ids:
+            return
+        self._results.setdefault(key, []).append(copy.deepcopy(result))
+        # The call consumed an occurrence in this attempt, so a later identical call is a new one
+        cursor_key = (self.attempt, key)
+        self._cursors[cursor_key] = self._cursors.get(cursor_key, 0) + 1
+        self.stats['recorded'] += 1
+
+
+_current_journal: contextvars.ContextVar[Optional[TurnJournal]] = contextvars.ContextVar('turn_journal', default=None)
+
+
+def _get_settings() -> dict:
+    from agents.config_loader import get_config_section
+    return get_config_section('turn_checkpoints')
+
+
+@contextlib.contextmanager
+def turn_checkpoint(session_id: str) -> Iterator[Optional[TurnJournal]]:
+    """
+    Journal checkpointed tool calls for one player turn (all of its attempts).
+    Yields None when turn checkpoints are disabled in adk.yaml.
+    """
+    settings = _get_settings()
+    if not settings.get('enabled', False):
+        yield None
+        return
+    journal = TurnJournal(f"{session_id}:{next(_turn_ids)}", set(settings.get('tools', []) or []))
+    token = _current_journal.set(journal)
+    try:
+        yield journal
+    finally:
+        _current_journal.reset(token)
+
+
+def start_attempt(journal: Optional[TurnJournal]) -> None:
+    """Mark the start of an attempt, reporting the checkpoint a retry resumes from."""
+    if journal is None:
+        return
+    journal.start_attempt()
+    if journal.attempt > 1 and journal.completed_calls:
+        print(f"[Checkpoint] Retry {journal.attempt - 1}: {journal.completed_calls} completed tool calls will be replayed from the journal")
+
+
+async def checkpoint_before_tool(tool, args, tool_context):
+    """before_tool_callback that answers a repeated checkpointed call from the turn journal."""
+    journal = _current_journal.get()
+    if journal is None or tool.name not in journal.tool_names:
+        return None
+    key = TurnJournal.call_key(tool_context.agent_name, tool.name, args)
+    result = journal.replay(key, tool_context.function_call_id)
+    if result is None:
+        return None
+    print(f"[Checkpoint] Replaying {tool.name} for {tool_context.agent_name} from the turn journal")
+    return result if isinstance(result, dict) else {'result': result}
+
+
+async def checkpoint_after_tool(tool, args, tool_context, tool_response):
+    """after_tool_callback that journals a completed checkpointed call."""
+    journal = _current_journal.get()
+    if journal is None or tool.name not in journal.tool_names or is_error_result(tool_response):
+        return None
+    journal.record(TurnJournal.call_key(tool_context.agent_name, tool.name, args), tool_context.function_call_id, tool_response)
+    return None
@@ -0,0 +1,319 @@
+"""
+Provider-side context caching for static agent instructions.
+
+Each agent's system instruction and tool declarations are identical on every
+model call, so they are uploaded once as a cached content prefix and referenced
+by name afterwards instead of being resent. The cache manager owns the cache
+lifecycle: creation on first use, TTL refresh before expiry, replacement when
+the instruction or tool set changes, LRU eviction and deletion on shutdown.
+A prefix the provider refuses to cache (a model without explicit caching, a
+prefix under its minimum size) is not retried on every call: the failure is
+remembered per agent and prefix and retried with exponential backoff.
+
+The backend is pluggable: GeminiCacheBackend talks to the Gemini caching API
+and InMemoryCacheBackend is a local fake for tests and offline runs.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class GeminiCacheBackend:
+    """Cache backend using the Gemini API cached contents endpoints."""
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client()
+        return self._client
+
+    async def create(self, model: str, system_instruction: Any, tools: Optional[list], ttl_seconds: int, display_name: str) -> str:
+        from google.genai import types
+        cached_content = await self.client.aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                tools=tools or None,
+                ttl=f"{ttl_seconds}s",
+                display_name=display_name,
+            ),
+        )
+        return cached_content.name
+
+    async def refresh(self, name: str, ttl_seconds: int) -> None:
+        from google.genai import types
+        await self.client.aio.caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=f"{ttl_seconds}s"))
+
+    async def delete(self, name: str) -> None:
+        await self.client.aio.caches.delete(name=name)
+
+
+class InMemoryCacheBackend:
+    """Local fake cache backend that records every call."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self.caches: Dict[str, dict] = {}
+        self.calls: List[Tuple[str, str]] = []
+
+    async def create(self, model: str, system_instruction: Any, tools: Optional[list], ttl_seconds: int, display_name: str) -> str:
+        name = f"cachedContents/fake-{next(self._ids)}"
+        self.caches[name] = {
+            'model': model,
+            'system_instruction': system_instruction,
+            'tools': tools,
+            'ttl_seconds': ttl_seconds,
+            'display_name': display_name,
+        }
+        self.calls.append(('create', name))
+        return name
+
+    async def refresh(self, name: str, ttl_seconds: int) -> None:
+        if name not in self.caches:
+            raise KeyError(f"Cached content '{name}' does not exist")
+        self.caches[name]['ttl_seconds'] = ttl_seconds
+        self.calls.append(('refresh', name))
+
+    async def delete(self, name: str) -> None:
+        self.caches.pop(name, None)
+        self.calls.append(('delete', name))
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return len(text) // 4
+
+
+def _serialize(value: Any) -> Any:
+    """Convert genai objects to JSON-compatible data for fingerprinting."""
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json', exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_serialize(v) for v in value]
+    return value
+
+
+def fingerprint_prefix(model: str, system_instruction: Any, tools: Optional[list]) -> str:
+    """
+    Fingerprint the static request prefix (model, instruction and tool declarations).
+
+    Args:
+        model: str - The model name
+        system_instruction: Any - The system instruction
+        tools: list - The tool declarations
+
+    Returns:
+        str - A hex digest identifying the prefix
+    """
+    payload = json.dumps([model, _serialize(system_instruction), _serialize(tools or [])], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ContextCacheManager:
+    """Creates, reuses, refreshes and deletes cached instruction prefixes."""
+
+    def __init__(self, backend=None, ttl_seconds: int = 1800, refresh_margin_seconds: int = 120,
+                 min_tokens: int = 2048, max_entries_per_agent: int = 4, retry_base_seconds: float = 60.0,
+                 retry_max_seconds: float = 3600.0, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            backend: Cache backend (defaults to GeminiCacheBackend)
+            ttl_seconds: int - Lifetime of each cache
+            refresh_margin_seconds: int - Extend a cache's TTL when it is this close to expiry
+            min_tokens: int - Skip caching prefixes smaller than this (provider minimum)
+            max_entries_per_agent: int - Distinct prefixes kept per agent (instruction sections and
+                tool profiles change the prefix); the least recently used is deleted beyond this
+            retry_base_seconds: float - Wait before retrying a prefix whose cache creation failed, doubled per failure
+            retry_max_seconds: float - Cap on that wait
+            clock: Callable - Time source, injectable for tests
+        """
+        self.backend = backend or GeminiCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.min_tokens = min_tokens
+        self.max_entries_per_agent = max_entries_per_agent
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.clock = clock
+        self._entries: Dict[Tuple[str, str], dict] = {}
+        # Prefixes whose cache creation failed: {key: {'failures': n, 'retry_at': t}}
+        self._failures: Dict[Tuple[str, str], dict] = {}
+        # One lock per prefix: a slow create or refresh only holds up requests for the same prefix
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.stats = {'hits': 0, 'created': 0, 'refreshed': 0, 'deleted': 0, 'skipped': 0, 'errors': 0,
+                      'backed_off': 0}
+
+    async def acquire(self, agent_name: str, model: str, system_instruction: Any, tools: Optional[list]) -> Optional[str]:
+        """
+        Get the cached content name for an agent's static prefix, creating or
+        refreshing the cache as needed.
+
+        Args:
+            agent_name: str - The agent making the request
+            model: str - The model the request is sent to (caches are model-specific)
+            system_instruction: Any - The request's system instruction
+            tools: list - The request's tool declarations
+
+        Returns:
+            str | None - The cached content name, or None if the prefix should not be cached
+        """
+        if _estimate_tokens(json.dumps(_serialize(system_instruction), default=str) + json.dumps(_serialize(tools or []), default=str)) < self.min_tokens:
+            self.stats['skipped'] += 1
+            return None
+
+        key = (agent_name, fingerprint_prefix(model, system_instruction, tools))
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            now = self.clock()
+            entry = self._entries.get(key)
+
+            if entry and entry['expires_at'] <= now:
+                # Expired on the provider side already; drop our record and recreate
+                self._entries.pop(key)
+                entry = None
+
+            if entry:
+                # Marked used first, so eviction during the refresh picks another entry
+                entry['last_used'] = now
+                if entry['expires_at'] - now <= self.refresh_margin_seconds:
+                    await self.backend.refresh(entry['name'], self.ttl_seconds)
+                    entry['expires_at'] = now + self.ttl_seconds
+                    self.stats['refreshed'] += 1
+                self.stats['hits'] += 1
+                return entry['name']
+
+            failure = self._failures.get(key)
+            if failure and now < failure['retry_at']:
+                self.stats['backed_off'] += 1
+                return None
+            try:
+                name = await self.backend.create(model, system_instruction, tools, self.ttl_seconds, f"{agent_name}-{key[1][:12]}")
+            except Exception:
+                failures = failure['failures'] + 1 if failure else 1
+                delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (failures - 1))
+                self._failures[key] = {'failures': failures, 'retry_at': now + delay}
+                raise
+            self._failures.pop(key, None)
+            self._entries[key] = {'name': name, 'agent': agent_name, 'model': model, 'expires_at': now + self.ttl_seconds, 'last_used': now}
+            self.stats['created'] += 1
+            print(f"[ContextCache] Created cache {name} for {agent_name} ({model})")
+        await self._evict(agent_name)
+        return name
+
+    async def _evict(self, agent_name: str) -> None:
+        """Delete the least recently used caches of an agent beyond the per-agent limit."""
+        agent_keys = sorted(
+            (key for key, entry in self._entries.items() if entry['agent'] == agent_name),
+            key=lambda key: self._entries[key]['last_used'],
+        )
+        # Taken out of the table before any await, so concurrent requests do not delete them twice
+        evicted = [self._pop(key) for key in agent_keys[:max(0, len(agent_keys) - self.max_entries_per_agent)]]
+        for entry in evicted:
+            await self._delete(entry)
+
+    def _pop(self, key: Tuple[str, str]) -> dict:
+        lock = self._locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._locks[key]
+        return self._entries.pop(key)
+
+    async def _delete(self, entry: dict) -> None:
+        try:
+            await self.backend.delete(entry['name'])
+            self.stats['deleted'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"[ContextCache] Could not delete cache {entry['name']}: {e}")
+
+    async def invalidate(self, agent_name: Optional[str] = None) -> None:
+        """
+        Delete the caches of one agent, or every cache.
+
+        Args:
+            agent_name: str - The agent to invalidate; None for all agents
+        """
+        entries = [self._pop(key) for key in [k for k, e in self._entries.items() if agent_name is None or e['agent'] == agent_name]]
+        for entry in entries:
+            await self._delete(entry)
+
+    async def close(self) -> None:
+        """Delete every cache created by this manager (call on shutdown)."""
+        await self.invalidate()
+
+    async def apply(self, agent_name: str, llm_request) -> Optional[str]:
+        """
+        Point an outgoing LLM request at the cached prefix, removing the
+        instruction and tool declarations it would otherwise resend.
+
+        Args:
+            agent_name: str - The agent making the request
+            llm_request: LlmRequest - The request to rewrite in place
+
+        Returns:
+            str | None - The cached content name used, if any
+        """
+        config = llm_request.config
+        if config is None or config.cached_content or config.tool_config or not (config.system_instruction or config.tools):
+            return None
+        try:
+            name = await self.acquire(agent_name, llm_request.model, config.system_instruction, config.tools)
+        except Exception as e:
+            # Caching is an optimization: fall back to the uncached request
+            self.stats['errors'] += 1
+            print(f"[ContextCache] Caching unavailable for {agent_name}, sending full prefix (retrying later): {e}")
+            return None
+        if name:
+            config.cached_content = name
+            config.system_instruction = None
+            config.tools = None
+        return name
+
+
+_cache_manager: Optional[ContextCacheManager] = None
+
+
+def get_cache_manager() -> Optional[ContextCacheManager]:
+    """
+    Get the process-wide cache manager configured by the context_cache section
+    of adk.yaml, or None if context caching is disabled.
+    """
+    global _cache_manager
+    if _cache_manager is None:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('context_cache')
+        if not settings.get('enabled', False):
+            return None
+        _cache_manager = ContextCacheManager(
+            ttl_seconds=settings.get('ttl_seconds', 1800),
+            refresh_margin_seconds=settings.get('refresh_margin_seconds', 120),
+            min_tokens=settings.get('min_tokens', 2048),
+            max_entries_per_agent=settings.get('max_entries_per_agent', 4),
+            retry_base_seconds=settings.get('retry_base_seconds', 60.0),
+            retry_max_seconds=settings.get('retry_max_seconds', 3600.0),
+        )
+    return _cache_manager
+
+
+def set_cache_manager(manager: Optional[ContextCacheManager]) -> None:
+    """Replace the process-wide cache manager (e.g. with an InMemoryCacheBackend in tests)."""
+    global _cache_manager
+    _cache_manager = manager
+
+
+async def context_cache_callback(callback_context, llm_request):
+    """
+    before_model_callback that serves the agent's static prefix from the context cache.
+    Must run after any callback that changes llm_request.model.
+    """
+    manager = get_cache_manager()
+    if manager is not None:
+        await manager.apply(callback_context.agent_name, llm_request)
+    return None
@@ -0,0 +1,121 @@
+"""
+Sticky dispatch to specialist agents.
+
+While the session game_state is a specialist phase (e.g. 'combat' owned by
+rules_lawyer_agent), player messages are sent straight to the owning agent's
+runner instead of going through root_agent first, saving one model call per
+turn. The owner hands control back by calling return_control_to_root (or any
+transfer to the root agent); after that, messages go to root_agent until the
+owner is transferred to again. Leaving the phase also ends the sticky routing.
+
+Phases are configured in the sticky_dispatch section of adk.yaml.
+"""
+
+import weakref
+from typing import Dict, Optional
+
+from google.adk.runners import Runner
+
+
+class StickyDispatcher:
+    """Chooses the runner for each player message based on the session's game_state."""
+
+    def __init__(self, root_runner: Runner, phases: Dict[str, str]):
+        """
+        Args:
+            root_runner: Runner - The runner for the root agent
+            phases: Dict[str, str] - Owning agent name keyed by game_state
+
+        Raises:
+            ValueError: If a phase owner is not a sub agent of the root agent
+        """
+        self.root_runner = root_runner
+        self.phases = dict(phases or {})
+        root_agent = root_runner.agent
+        for game_state, agent_name in self.phases.items():
+            if agent_name == root_agent.name or root_agent.find_sub_agent(agent_name) is None:
+                raise ValueError(
+                    f"Invalid sticky_dispatch.phases.{game_state} in adk.yaml: "
+                    f"'{agent_name}' is not a sub agent of {root_agent.name}"
+                )
+        self._runners: Dict[str, Runner] = {}
+
+    def runner_for_agent(self, agent_name: str) -> Runner:
+        """Get (creating on first use) a runner rooted at the given sub agent, sharing the session service."""
+        if agent_name not in self._runners:
+            self._runners[agent_name] = Runner(
+                agent=self.root_runner.agent.find_sub_agent(agent_name),
+                app_name=self.root_runner.app_name,
+                session_service=self.root_runner.session_service,
+            )
+        return self._runners[agent_name]
+
+    def owner_in_control(self, session) -> Optional[str]:
+        """
+        Get the agent that owns the session's current phase and still holds control.
+
+        Args:
+            session: Session - The current session
+
+        Returns:
+            str | None - The owning agent name, or None if messages should go to the root agent
+        """
+        owner = self.phases.get(session.state.get('game_state'))
+        if owner is None:
+            return None
+        root_name = self.root_runner.agent.name
+        for event in reversed(session.events):
+            if event.actions and event.actions.transfer_to_agent == root_name:
+                # Explicit hand-back: root_agent handles messages until it transfers to the owner again
+                return None
+            if event.author == owner:
+                return owner
+        # The owner has not taken part yet; let root_agent route the first message of the phase
+        return None
+
+    async def select_runner(self, user_id: str, session_id: str) -> Runner:
+        """
+        Choose the runner for the next player message.
+
+        Args:
+            user_id: str - User ID for the session
+            session_id: str - Session ID
+
+        Returns:
+            Runner - The owning agent's runner during a sticky phase, otherwise the root runner
+        """
+        session = await self.root_runner.session_service.get_session(
+            app_name=self.root_runner.app_name, user_id=user_id, session_id=session_id
+        )
+        owner = self.owner_in_control(session) if session else None
+        if owner is None:
+            return self.root_runner
+        print(f"[StickyDispatch] game_state '{session.state.get('game_state')}': sending message directly to {owner}")
+        return self.runner_for_agent(owner)
+
+
+_dispatchers: 'weakref.WeakKeyDictionary[Runner, Optional[StickyDispatcher]]' = weakref.WeakKeyDictionary()
+
+
+def get_dispatcher(root_runner: Runner) -> Optional[StickyDispatcher]:
+    """
+    Get the sticky dispatcher for a root runner, configured by the sticky_dispatch
+    section of adk.yaml, or None if sticky dispatch is disabled.
+    """
+    if root_runner not in _dispatchers:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('sticky_dispatch')
+        enabled = settings.get('enabled', False)
+        _dispatchers[root_runner] = StickyDispatcher(root_runner, settings.get('phases', {})) if enabled else None
+    return _dispatchers[root_runner]
+
+
+async def select_runner(root_runner: Runner, user_id: str, session_id: str) -> Runner:
+    """
+    Choose the runner for the next player message (the root runner unless a
+    specialist phase is in progress).
+    """
+    dispatcher = get_dispatcher(root_runner)
+    if dispatcher is None:
+        return root_runner
+    return await dispatcher.select_runner(user_id, session_id)
@@ -0,0 +1,184 @@
+"""
+Deterministic fast path for well-formed player commands.
+
+Trivial commands ("save campaign", "roll 2d6+3", "show my character", "what is
+the location") are matched against a small compiled grammar and answered by
+calling the matching tool directly, without a root_agent model call. Anything
+the grammar does not match exactly falls through to the agents.
+
+The command and its result are appended to the session as a user/root_agent
+event pair, so the agents see fast-path turns in the conversation history.
+"""
+
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from google.adk.agents.invocation_context import new_invocation_context_id
+from google.adk.events import Event
+from google.genai import types
+
+from data.tools.misc_tools import roll_dice, get_state, save_campaign
+
+_PREFIX = r"^\s*/?(?:please\s+)?"
+_SUFFIX = r"\s*(?:please)?\s*[.!?]*\s*$"
+
+# State variables that can be read with "show/what is the <name>"
+STATE_ALIASES = {
+    'game state': 'game_state',
+    'state': 'game_state',
+    'location': 'location',
+    'current location': 'location',
+    'act': 'current_act',
+    'current act': 'current_act',
+    'last scene': 'last_scene',
+    'scene': 'last_scene',
+    'last action': 'last_action',
+}
+
+SAVE_PATTERN = re.compile(_PREFIX + r"save(?:\s+(?:the\s+|my\s+)?(?:campaign|game|progress))?" + _SUFFIX, re.IGNORECASE)
+ROLL_PATTERN = re.compile(
+    _PREFIX + r"roll\s+(?:an?\s+)?(?P<count>\d{0,3})\s*d\s*(?P<sides>\d{1,3})(?:\s*(?P<sign>[+-])\s*(?P<modifier>\d{1,3}))?" + _SUFFIX,
+    re.IGNORECASE,
+)
+CHARACTER_PATTERN = re.compile(
+    _PREFIX + r"(?:show|display|view|list)\s+(?:me\s+)?(?:my\s+|the\s+|our\s+)?(?:characters?|party|character\s+sheets?)" + _SUFFIX,
+    re.IGNORECASE,
+)
+STATE_PATTERN = re.compile(
+    _PREFIX + r"(?:show|get|what(?:'s|\s+is)|where(?:'s|\s+is))\s+(?:me\s+)?(?:the\s+|my\s+|our\s+)?(?P<name>"
+    + "|".join(sorted((re.escape(alias) for alias in STATE_ALIASES), key=len, reverse=True))
+    + r")" + _SUFFIX,
+    re.IGNORECASE,
+)
+
+
+class _StateContext:
+    """Minimal ToolContext stand-in exposing the session state to fast-path tools."""
+
+    def __init__(self, state: dict):
+        self.state = state
+
+
+def _format_character(name: str, data) -> str:
+    """One line per character: name, race, class and level where known."""
+    if not isinstance(data, dict):
+        return f"- {name}: {data}"
+    char_class = data.get('char_class') or data.get('class') or ''
+    details = " ".join(str(part) for part in [data.get('race', ''), char_class] if part)
+    if data.get('level'):
+        details = f"{details} (Level {data['level']})".strip()
+    line = f"- {data.get('name', name)}" + (f": {details}" if details else "")
+    scores = data.get('ability_scores')
+    if isinstance(scores, dict) and scores:
+        line += "\n  " + " | ".join(f"{str(score)[:3].upper()} {value}" for score, value in scores.items())
+    return line
+
+
+async def _run_save(match: re.Match, state: dict) -> str:
+    result = await save_campaign(_StateContext(state))
+    return result.get('message', 'Campaign saved.' if result.get('saved') else 'Campaign could not be saved.')
+
+
+async def _run_roll(match: re.Match, state: dict) -> str:
+    notation = f"{match.group('count') or 1}d{match.group('sides')}"
+    if match.group('modifier'):
+        notation += f"{match.group('sign')}{match.group('modifier')}"
+    return f"🎲 {notation}: {roll_dice(notation)}"
+
+
+async def _run_characters(match: re.Match, state: dict) -> str:
+    characters = (await get_state('characters', _StateContext(state))).get('state_value') or {}
+    if not characters:
+        return "No characters have been created for this campaign yet."
+    if not isinstance(characters, dict):
+        return f"Characters: {characters}"
+    return "Characters:\n" + "\n".join(_format_character(name, data) for name, data in characters.items())
+
+
+async def _run_get_state(match: re.Match, state: dict) -> str:
+    alias = re.sub(r"\s+", " ", match.group('name').lower())
+    state_name = STATE_ALIASES[alias]
+    value = (await get_state(state_name, _StateContext(state))).get('state_value')
+    return f"{alias.capitalize()}: {value if value not in (None, '') else '(not set)'}"
+
+
+# Grammar, tried in order: (command name, pattern, handler)
+COMMANDS: List[Tuple[str, re.Pattern, Callable[[re.Match, dict], Awaitable[str]]]] = [
+    ('save_campaign', SAVE_PATTERN, _run_save),
+    ('roll_dice', ROLL_PATTERN, _run_roll),
+    ('show_characters', CHARACTER_PATTERN, _run_characters),
+    ('get_state', STATE_PATTERN, _run_get_state),
+]
+
+
+def match_command(text: str) -> Optional[Tuple[str, re.Match, Callable[[re.Match, dict], Awaitable[str]]]]:
+    """
+    Match player input against the fast-path grammar.
+
+    Args:
+        text: str - The player's message
+
+    Returns:
+        tuple | None - (command name, match, handler), or None if the input is not a well-formed command
+    """
+    if not text or len(text) > 80:
+        return None
+    for name, pattern, handler in COMMANDS:
+        match = pattern.match(text)
+        if match:
+            return name, match, handler
+    return None
+
+
+def _get_settings() -> Dict:
+    from agents.config_loader import get_config_section
+    return get_config_section('fast_path')
+
+
+async def try_fast_path(runner, user_id: str, session_id: str, query: str) -> Optional[str]:
+    """
+    Answer a player command directly if it is a well-formed fast-path command.
+
+    Args:
+        runner: Runner - The runner whose session service holds the session
+        user_id: str - User ID for the session
+        session_id: str - Session ID
+        query: str - The player's message
+
+    Returns:
+        str | None - The response text, or None if the message should go to the agents
+    """
+    settings = _get_settings()
+    if not settings.get('enabled', False):
+        return None
+
+    command = match_command(query)
+    if command is None:
+        return None
+    name, match, handler = command
+
+    session = await runner.session_service.get_session(app_name=runner.app_name, user_id=user_id, session_id=session_id)
+    if session is None:
+        return None
+    if session.state.get('game_state') in settings.get('skip_game_states', []):
+        # Mid-conversation phases (e.g. character creation) interpret these commands themselves
+        return None
+
+    try:
+        response = await handler(match, session.state)
+    except Exception as e:
+        print(f"[FastPath] {name} failed, falling back to the agents: {e}")
+        return None
+    print(f"[FastPath] Handled '{query}' as {name}")
+
+    if settings.get('record_in_session', True):
+        invocation_id = new_invocation_context_id()
+        await runner.session_service.append_event(session, Event(
+            invocation_id=invocation_id, author='user',
+            content=types.Content(role='user', parts=[types.Part(text=query)]),
+        ))
+        await runner.session_service.append_event(session, Event(
+            invocation_id=invocation_id, author=runner.agent.name,
+            content=types.Content(role='model', parts=[types.Part(text=response)]),
+        ))
+    return response
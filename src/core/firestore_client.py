@@ -0,0 +1,146 @@
+"""
+Shared Firestore clients.
+
+Building a Firestore client reads the service account key and opens new gRPC
+channels, so the process keeps one client and every tool, store and web
+request reuses it (and its channels). The manager also hands out an
+AsyncClient for coroutines running on an event loop: gRPC aio channels are
+bound to the loop that created them, so there is one AsyncClient per loop,
+dropped with the loop.
+
+Clients are created on first use, not at import. If credentials are missing
+the failure is remembered for retry_seconds instead of re-reading the key on
+every call. Settings come from the firestore section of adk.yaml.
+"""
+
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+
+class FirestoreClientManager:
+    """Process-wide Firestore Client and per-event-loop AsyncClients."""
+
+    def __init__(self, credentials_path: str, project: Optional[str] = None, retry_seconds: float = 60.0,
+                 clock=time.monotonic):
+        """
+        Args:
+            credentials_path: str - Service account key file
+            project: str - Google Cloud project (default: the key's project)
+            retry_seconds: float - How long a failed client creation is remembered before retrying
+            clock: Callable - Time source, injectable for tests
+        """
+        self.credentials_path = credentials_path
+        self.project = project
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._client = None
+        self._async_clients: 'weakref.WeakKeyDictionary[Any, Any]' = weakref.WeakKeyDictionary()
+        self._failed_at: Optional[float] = None
+        self.stats = {'clients_created': 0, 'async_clients_created': 0, 'client_requests': 0, 'failures': 0}
+
+    def _load_credentials(self):
+        """Caller holds the lock."""
+        if self._credentials is None:
+            from google.oauth2 import service_account
+            self._credentials = service_account.Credentials.from_service_account_file(self.credentials_path)
+        return self._credentials
+
+    def _create(self, factory_name: str):
+        """Create a client, or None if creation failed recently. Caller holds the lock."""
+        if self._failed_at is not None and self.clock() - self._failed_at < self.retry_seconds:
+            return None
+        from google.cloud import firestore
+        try:
+            client = getattr(firestore, factory_name)(project=self.project, credentials=self._load_credentials())
+        except Exception as e:
+            self._failed_at = self.clock()
+            self.stats['failures'] += 1
+            print(f"[DatabaseManager] FATAL: Could not initialize Firestore client: {e}")
+            print(f"[DatabaseManager] Please ensure the service account key file exists at: {self.credentials_path}")
+            return None
+        self._failed_at = None
+        return client
+
+    def client(self):
+        """The shared Firestore Client, or None if it cannot be created."""
+        with self._lock:
+            self.stats['client_requests'] += 1
+            if self._client is None:
+                self._client = self._create('Client')
+                if self._client is not None:
+                    self.stats['clients_created'] += 1
+                    print("[DatabaseManager] Firestore client initialized successfully.")
+            return self._client
+
+    def async_client(self):
+        """
+        The AsyncClient of the running event loop, or None if it cannot be created.
+
+        Must be called from a coroutine; each event loop gets its own client.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.stats['client_requests'] += 1
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = self._create('AsyncClient')
+                if client is not None:
+                    self._async_clients[loop] = client
+                    self.stats['async_clients_created'] += 1
+            return client
+
+    def close(self) -> None:
+        """Close the shared Client's channels (called on shutdown)."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'async_clients': len(self._async_clients)}
+
+
+def _project_path(path: str) -> str:
+    if os.path.isabs(path):
+        return path
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, path)
+
+
+_manager: Optional[FirestoreClientManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_firestore_manager() -> FirestoreClientManager:
+    """Get the process-wide Firestore client manager configured by the firestore section of adk.yaml."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            import atexit
+            from agents.config_loader import get_config_section
+            settings = get_config_section('firestore')
+            _manager = FirestoreClientManager(
+                _project_path(settings.get('credentials_path', 'config/service-account-key.json')),
+                project=settings.get('project'),
+                retry_seconds=settings.get('retry_seconds', 60.0),
+            )
+            atexit.register(_manager.close)
+        return _manager
+
+
+def set_firestore_manager(manager: Optional[FirestoreClientManager]) -> None:
+    """Replace the process-wide manager (e.g. with one returning fake clients in tests)."""
+    global _manager
+    _manager = manager
+
+
+def get_firestore_client():
+    """The shared Firestore Client, or None if it is not available."""
+    return get_firestore_manager().client()
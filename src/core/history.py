@@ -0,0 +1,344 @@
+"""
+Bounded conversation history with rolling summarization.
+
+ADK sends a session's whole event history with every model call, so over a
+long campaign night each request grows and latency climbs with it. The
+compact_history before_model_callback bounds the history in the request:
+once the turns in it exceed max_history_tokens, every turn but the most
+recent keep_recent_turns is folded into a rolling summary, the campaign
+memory, and dropped from the request. Later requests carry the memory in
+place of those turns, so the request size stays flat across the session.
+
+Summarizing does not hold up the turn that crosses the threshold: that
+request is sent with its full history while the summary is made in a
+background task, and the next request of the session folds the finished
+summary into the memory.
+
+The campaign memory lives in session state (campaign_memory) and is saved
+and loaded with the campaign. The summarizer also reports the current scene
+and location, which fill last_scene and location when the agents have not
+set them. The session keeps its raw events; only the model's context
+window is bounded. Summarizer calls are background work for the turn
+scheduler, so they queue behind the players' turns; they are retried by the
+retry engine and their tokens are recorded in the usage ledger against the
+campaign.
+
+Settings come from the history section of adk.yaml.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+MEMORY_KEY = 'campaign_memory'
+# Agent name of summarizer calls in the usage ledger
+SUMMARIZER_AGENT = 'history_summarizer'
+# Sessions whose summary can be running or waiting for their next request
+MAX_PENDING_SUMMARIES = 256
+MEMORY_HEADER = 'Campaign memory (a summary of the earlier turns of this session):'
+
+SUMMARY_PROMPT = """You maintain the memory of a Dungeons & Dragons campaign run by an AI dungeon master.
+Merge the existing memory and the new transcript into one updated memory of at most {max_words} words.
+Keep what later play depends on: plot and quest progress, decisions the party made, NPCs met and their
+attitudes, items gained or lost, injuries, open threads and where the party is. Drop banter and rules chatter.
+
+Existing memory:
+{summary}
+
+New transcript:
+{transcript}
+
+Respond with JSON only: {{"summary": "...", "last_scene": "one sentence describing the current scene", "location": "the party's current location"}}"""
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return len(text) // 4
+
+
+def _part_text(part) -> str:
+    if part.text:
+        return part.text
+    if part.function_call:
+        return f"[called {part.function_call.name}({json.dumps(part.function_call.args or {}, default=str)})]"
+    if part.function_response:
+        return f"[{part.function_response.name} returned {json.dumps(part.function_response.response or {}, default=str)}]"
+    return ''
+
+
+def content_tokens(contents: List[Any]) -> int:
+    """Estimated tokens of request contents, including tool calls and results."""
+    return sum(_estimate_tokens(_part_text(part)) for content in contents for part in (content.parts or []))
+
+
+def render_transcript(turns: List[List[Any]]) -> str:
+    """Plain-text transcript of request contents, for the summarizer."""
+    lines = []
+    for contents in turns:
+        for content in contents:
+            speaker = 'Player' if content.role == 'user' else 'Dungeon master'
+            text = ' '.join(filter(None, (_part_text(part) for part in content.parts or [])))
+            if text:
+                lines.append(f"{speaker}: {text}")
+    return '\n'.join(lines)
+
+
+def player_messages(session) -> List[Tuple[float, str]]:
+    """(timestamp, text) of the player's messages in the session, in order."""
+    messages = []
+    for event in session.events:
+        if event.author != 'user' or event.content is None:
+            continue
+        text = ''.join(part.text or '' for part in event.content.parts or [])
+        if text:
+            messages.append((event.timestamp, text))
+    return messages
+
+
+def split_turns(contents: List[Any], player_messages: List[Tuple[float, str]]) -> Tuple[List[Any], List[Tuple[float, List[Any]]]]:
+    """
+    Split request contents into player turns.
+
+    A turn starts at one of the player's messages and runs up to the next one;
+    contents are matched to the session's player messages in order, so agent
+    text that happens to be sent with the user role does not start a turn.
+
+    Returns:
+        tuple - (contents before the first player message, [(turn start timestamp, turn contents)])
+    """
+    preamble: List[Any] = []
+    turns: List[Tuple[float, List[Any]]] = []
+    next_message = 0
+    for content in contents:
+        if content.role == 'user' and next_message < len(player_messages):
+            text = ''.join(part.text or '' for part in content.parts or [])
+            match = next((index for index in range(next_message, len(player_messages))
+                          if player_messages[index][1] == text), None) if text else None
+            if match is not None:
+                next_message = match + 1
+                turns.append((player_messages[match][0], [content]))
+                continue
+        if turns:
+            turns[-1][1].append(content)
+        else:
+            preamble.append(content)
+    return preamble, turns
+
+
+class GeminiSummarizer:
+    """Summarizes campaign history with a Gemini model."""
+
+    def __init__(self, model: str = 'gemini-2.5-flash-lite', max_words: int = 400, client=None):
+        self.model = model
+        self.max_words = max_words
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client()
+        return self._client
+
+    async def summarize(self, summary: str, transcript: str) -> Dict[str, str]:
+        """
+        Fold a transcript into the existing summary.
+
+        Returns:
+            dict - summary, last_scene and location, and the call's usage metadata (usage)
+        """
+        from google.genai import types
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=SUMMARY_PROMPT.format(max_words=self.max_words, summary=summary or '(none yet)', transcript=transcript),
+            config=types.GenerateContentConfig(response_mime_type='application/json', temperature=0.2),
+        )
+        text = response.text or ''
+        try:
+            result = json.loads(text)
+        except ValueError:
+            result = None
+        if not isinstance(result, dict):
+            result = {'summary': text.strip()}
+        result['usage'] = response.usage_metadata
+        return result
+
+
+class _PendingSummary(NamedTuple):
+    """A summary being made in the background for one session."""
+    task: asyncio.Task
+    summarized_from: float
+    summarized_until: float
+    turns: int
+
+
+class HistoryCompactor:
+    """Keeps the history sent to the model under a token threshold by summarizing older turns."""
+
+    def __init__(self, summarizer=None, max_history_tokens: int = 24000, keep_recent_turns: int = 4):
+        """
+        Args:
+            summarizer: Any - Object with an async summarize(summary, transcript) method (defaults to GeminiSummarizer)
+            max_history_tokens: int - History size above which older turns are summarized
+            keep_recent_turns: int - Most recent turns always sent verbatim, including the current one
+        """
+        self.summarizer = summarizer or GeminiSummarizer()
+        self.max_history_tokens = max_history_tokens
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.stats = {'compactions': 0, 'turns_summarized': 0, 'tokens_dropped': 0, 'errors': 0}
+        self._pending: 'OrderedDict[str, _PendingSummary]' = OrderedDict()
+
+    async def compact(self, callback_context, llm_request) -> Optional[Dict[str, Any]]:
+        """
+        Drop already-summarized turns from the request, summarizing more when it is still too large.
+
+        Returns:
+            dict | None - The campaign memory used for the request, if any
+        """
+        state = callback_context.state
+        # The memory is normally a hot field; this only waits if lazy loading left it out
+        from .lazy_state import resolve_lazy_fields_async
+        await resolve_lazy_fields_async(state, MEMORY_KEY)
+        session_id = callback_context.session.id
+        memory = self._collect(session_id, state, dict(state.get(MEMORY_KEY) or {}))
+        preamble, turns = split_turns(llm_request.contents, player_messages(callback_context.session))
+        summarized_until = memory.get('summarized_until', 0)
+        kept = [(started, contents) for started, contents in turns if started >= summarized_until]
+        dropped = [contents for started, contents in turns if started < summarized_until]
+
+        history_tokens = sum(content_tokens(contents) for _, contents in kept)
+        if history_tokens > self.max_history_tokens and len(kept) > self.keep_recent_turns \
+                and session_id not in self._pending:
+            # This request goes with the full history; a later one gets the summary
+            older = [contents for _, contents in kept[:-self.keep_recent_turns]]
+            campaign_id = state.get('campaign_id') or session_id
+            task = asyncio.get_running_loop().create_task(
+                self._summarize(session_id, campaign_id, memory.get('summary', ''), render_transcript(older)))
+            task.add_done_callback(self._finished)
+            self._pending[session_id] = _PendingSummary(task, summarized_until, kept[-self.keep_recent_turns][0], len(older))
+            while len(self._pending) > MAX_PENDING_SUMMARIES:
+                self._pending.popitem(last=False)
+            print(f"[History] Summarizing {len(older)} older turns in the background "
+                  f"({history_tokens} history tokens over {self.max_history_tokens})")
+
+        if not memory.get('summary'):
+            return None
+        # The memory also carries a reloaded campaign's history into its new session
+        self.stats['tokens_dropped'] += sum(content_tokens(contents) for contents in dropped)
+        from google.genai import types
+        memory_content = types.Content(role='user', parts=[types.Part(text=f"{MEMORY_HEADER}\n{memory.get('summary', '')}")])
+        llm_request.contents = preamble + [memory_content] + [content for _, contents in kept for content in contents]
+        return memory
+
+    async def wait(self, session_id: str) -> None:
+        """Wait for the session's background summary, if one is running (e.g. before shutdown)."""
+        pending = self._pending.get(session_id)
+        if pending is not None:
+            await asyncio.wait([pending.task])
+
+    def _collect(self, session_id: str, state, memory: Dict[str, Any]) -> Dict[str, Any]:
+        """Fold the session's finished background summary into its memory."""
+        pending = self._pending.get(session_id)
+        if pending is None:
+            return memory
+        task = pending.task
+        if not task.done():
+            if task.get_loop() is not asyncio.get_running_loop():
+                # Its event loop has gone away; a new one is started if still needed
+                del self._pending[session_id]
+            return memory
+        del self._pending[session_id]
+        if task.cancelled() or task.exception() is not None:
+            return memory
+        if memory.get('summarized_until', 0) != pending.summarized_from:
+            # The memory changed while the summary was made (e.g. the campaign was reloaded)
+            return memory
+        memory = self._update_memory(state, memory, task.result(), pending.summarized_until, pending.turns)
+        self.stats['compactions'] += 1
+        self.stats['turns_summarized'] += pending.turns
+        print(f"[History] Summarized {pending.turns} older turns into the campaign memory")
+        return memory
+
+    def _finished(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            # Compaction is an optimization: the full history is sent until a summary succeeds
+            self.stats['errors'] += 1
+            print(f"[History] Summarizing older turns failed, sending full history: {task.exception()}")
+
+    async def _summarize(self, session_id: str, campaign_id: str, summary: str, transcript: str) -> Dict[str, str]:
+        """Run the summarizer as retried background work, recording its usage against the campaign."""
+        from .retry import get_retry_engine
+        from .scheduler import BACKGROUND, schedule_turn
+        from .usage import get_usage_ledger
+        async for attempt in get_retry_engine().attempts():
+            async with attempt:
+                # The slot is given back before any backoff sleep
+                async with schedule_turn(session_id, BACKGROUND) as slot:
+                    result = await self.summarizer.summarize(summary, transcript)
+                    usage = result.pop('usage', None)
+                    if usage is not None:
+                        slot.tokens_used += usage.total_token_count or 0
+        ledger = get_usage_ledger()
+        if usage is not None and ledger is not None:
+            ledger.record(campaign_id, SUMMARIZER_AGENT, getattr(self.summarizer, 'model', 'unknown'), usage)
+        return result
+
+    @staticmethod
+    def _update_memory(state, memory: Dict[str, Any], result: Dict[str, str], summarized_until: float,
+                       turns: int) -> Dict[str, Any]:
+        memory = {
+            'summary': (result.get('summary') or memory.get('summary', '')).strip(),
+            'summarized_until': summarized_until,
+            'turns_summarized': memory.get('turns_summarized', 0) + turns,
+            'updated_at': time.time(),
+        }
+        state[MEMORY_KEY] = memory
+        # The agents' own last_scene and location are newer than a summary of older turns
+        for key in ('last_scene', 'location'):
+            if result.get(key) and not state.get(key):
+                state[key] = result[key]
+        return memory
+
+
+_compactor: Optional[HistoryCompactor] = None
+
+
+def get_history_compactor() -> Optional[HistoryCompactor]:
+    """
+    Get the process-wide history compactor configured by the history section
+    of adk.yaml, or None if history compaction is disabled.
+    """
+    global _compactor
+    if _compactor is None:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('history')
+        if not settings.get('enabled', False):
+            return None
+        _compactor = HistoryCompactor(
+            summarizer=GeminiSummarizer(
+                model=settings.get('summary_model', 'gemini-2.5-flash-lite'),
+                max_words=settings.get('max_summary_words', 400),
+            ),
+            max_history_tokens=settings.get('max_history_tokens', 24000),
+            keep_recent_turns=settings.get('keep_recent_turns', 4),
+        )
+    return _compactor
+
+
+def set_history_compactor(compactor: Optional[HistoryCompactor]) -> None:
+    """Replace the process-wide compactor (e.g. with a fake summarizer in tests)."""
+    global _compactor
+    _compactor = compactor
+
+
+async def compact_history(callback_context, llm_request):
+    """
+    before_model_callback that bounds the history sent to the model.
+    Runs before the context cache, which only caches the instruction and tools.
+    """
+    compactor = get_history_compactor()
+    if compactor is not None and llm_request.contents:
+        await compactor.compact(callback_context, llm_request)
+    return None
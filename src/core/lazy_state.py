@@ -0,0 +1,227 @@
+"""
+Lazy, partial campaign loading.
+
+Resuming a campaign used to read every state field, including the full
+outline and every character sheet, before the first turn could start. With
+lazy loading, load_campaign reads only the hot fields (game_state, location,
+last_scene, the campaign memory, ...) plus the party roster from the campaign
+catalog. The session state lists the fields that are still missing under
+LAZY_FIELDS_KEY, and the CampaignLoader fetches them straight away in a
+background task on the event loop, through the store's async methods (the
+per-loop AsyncClient for Firestore).
+
+The missing fields reach the session state in two ways:
+
+    hydrate_lazy_fields        before_model_callback that merges them in once
+                               the background fetch has finished, without waiting
+    resolve_lazy_fields_async  accessor for code that needs one of them now
+                               (get_state, set_character, ...); awaits the
+                               fetch, or starts one after a process restart
+
+The tools that need a missing field are coroutines: ADK runs sync tools
+inline on the event loop, so waiting for a fetch there would stall every
+other session served by that loop.
+
+save_campaign skips fields that are still missing, so a save never
+overwrites stored data with an empty default. Settings come from the
+persistence section of adk.yaml.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+LAZY_FIELDS_KEY = 'lazy_fields'
+PARTY_ROSTER_KEY = 'party_roster'
+
+
+def lazy_fields(state) -> List[str]:
+    """State fields of a lazily loaded campaign that have not been loaded yet."""
+    return list(state.get(LAZY_FIELDS_KEY) or [])
+
+
+class CampaignLoader:
+    """Background fetches of the fields a partial load left out."""
+
+    def __init__(self, store, hot_fields: Iterable[str], max_workers: int = 2,
+                 on_loaded: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        Args:
+            store: CampaignStore - Where the campaigns are stored
+            hot_fields: Iterable[str] - State fields loaded before the first turn
+            max_workers: int - Campaigns fetched at the same time on each event loop
+            on_loaded: Callable - Called with (campaign_id, fields) after a fetch (e.g. to prime the write-behind writer)
+        """
+        self.store = store
+        self.hot_fields = list(hot_fields)
+        self.max_workers = max_workers
+        self.on_loaded = on_loaded
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Tasks and semaphores belong to one event loop
+        self._semaphores: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.stats = {'prefetches': 0, 'fields_loaded': 0, 'waits': 0, 'hydrations': 0, 'errors': 0}
+
+    async def _load(self, campaign_id: str, fields: List[str]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_workers)
+        async with semaphore:
+            try:
+                loaded = await self.store.load_fields_async(campaign_id, fields) or {}
+            except Exception:
+                with self._lock:
+                    self.stats['errors'] += 1
+                raise
+        if self.on_loaded is not None:
+            self.on_loaded(campaign_id, loaded)
+        with self._lock:
+            self.stats['fields_loaded'] += len(loaded)
+        return loaded
+
+    async def load_hot(self, campaign_id: str, defaults: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Load a campaign's hot fields and party roster, and start fetching the rest.
+
+        Args:
+            campaign_id: str - The campaign to load
+            defaults: Dict[str, Any] - Every campaign state field with its value when it is not stored
+
+        Returns:
+            dict | None - The partial session state, or None if the campaign does not exist
+        """
+        hot = [name for name in defaults if name in self.hot_fields]
+        stored = await self.store.load_fields_async(campaign_id, hot)
+        if stored is None:
+            return None
+        state = {name: stored.get(name, defaults[name]) for name in hot}
+        state['campaign_id'] = stored.get('campaign_id') or campaign_id
+        entry = await self.store.load_catalog_entry_async(campaign_id)
+        state[PARTY_ROSTER_KEY] = entry.get('party', []) if entry else []
+        state[LAZY_FIELDS_KEY] = [name for name in defaults if name not in state]
+        if state[LAZY_FIELDS_KEY]:
+            self.prefetch(campaign_id, state[LAZY_FIELDS_KEY])
+        return state
+
+    def prefetch(self, campaign_id: str, fields: Iterable[str]) -> asyncio.Task:
+        """
+        Start fetching a campaign's fields on the running event loop unless a
+        fetch is already running there or done; a failed or cancelled fetch is retried.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._tasks.get(campaign_id)
+            if task is None or task.cancelled() or (task.done() and task.exception() is not None) \
+                    or (not task.done() and task.get_loop() is not loop):
+                task = self._tasks[campaign_id] = loop.create_task(self._load(campaign_id, list(fields)))
+                self.stats['prefetches'] += 1
+            return task
+
+    def ready(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """The fetched fields if the campaign's fetch has finished successfully, None otherwise."""
+        with self._lock:
+            task = self._tasks.get(campaign_id)
+        if task is None or not task.done() or task.cancelled() or task.exception() is not None:
+            return None
+        return task.result()
+
+    async def wait(self, campaign_id: str, fields: Iterable[str]) -> Dict[str, Any]:
+        """The fetched fields, waiting for (or starting) the fetch."""
+        task = self.prefetch(campaign_id, fields)
+        if not task.done():
+            with self._lock:
+                self.stats['waits'] += 1
+        # A session giving up on the fields does not cancel the fetch other sessions may share
+        return await asyncio.shield(task)
+
+    def apply(self, state, loaded: Dict[str, Any]) -> None:
+        """Merge fetched fields into a session state, clear its list of missing fields and drop the fetch."""
+        for name in lazy_fields(state):
+            if name in loaded:
+                state[name] = loaded[name]
+        state[LAZY_FIELDS_KEY] = []
+        self.forget(state.get('campaign_id'))
+        with self._lock:
+            self.stats['hydrations'] += 1
+
+    def forget(self, campaign_id: str) -> None:
+        """Drop a campaign's fetched fields (e.g. once its session has them)."""
+        with self._lock:
+            self._tasks.pop(campaign_id, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'campaigns': len(self._tasks)}
+
+
+_loader: Optional[CampaignLoader] = None
+_loader_lock = threading.Lock()
+
+
+def get_campaign_loader() -> Optional[CampaignLoader]:
+    """
+    Get the process-wide campaign loader, or None if lazy loading is disabled
+    in the persistence section of adk.yaml or no campaign store is available.
+    """
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            from agents.config_loader import get_config_section
+            settings = get_config_section('persistence')
+            if not settings.get('lazy_load', False):
+                return None
+            from .campaign_store import get_campaign_store
+            from .persistence import get_campaign_writer
+            store = get_campaign_store()
+            if store is None:
+                return None
+            writer = get_campaign_writer(store.write_fields)
+            _loader = CampaignLoader(store, settings.get('hot_fields', []) or [],
+                                     max_workers=settings.get('prefetch_workers', 2),
+                                     on_loaded=writer.prime if writer is not None else None)
+        return _loader
+
+
+def set_campaign_loader(loader: Optional[CampaignLoader]) -> None:
+    """Replace the process-wide loader (e.g. with one over an in-memory store in tests)."""
+    global _loader
+    _loader = loader
+
+
+async def resolve_lazy_fields_async(state, name: Optional[str] = None) -> None:
+    """
+    Load the fields a partial load left out into the state, waiting for them
+    without blocking the event loop if needed.
+
+    Args:
+        state: State or dict - The session state
+        name: str - Only resolve if this field is missing (default: if any field is)
+    """
+    missing = lazy_fields(state)
+    if name is not None and name not in missing:
+        return
+    loader = get_campaign_loader() if missing else None
+    if loader is None:
+        return
+    loader.apply(state, await loader.wait(state.get('campaign_id'), missing))
+
+
+async def hydrate_lazy_fields(callback_context, llm_request):
+    """before_model_callback that merges in the missing fields once their background fetch has finished."""
+    state = callback_context.state
+    missing = lazy_fields(state)
+    loader = get_campaign_loader() if missing else None
+    if loader is None:
+        return None
+    campaign_id = state.get('campaign_id')
+    loaded = loader.ready(campaign_id)
+    if loaded is None:
+        # Started here when the process restarted after the partial load
+        loader.prefetch(campaign_id, missing)
+        return None
+    loader.apply(state, loaded)
+    print(f"[LazyLoad] Campaign '{campaign_id}' fields loaded in the background: {', '.join(missing)}")
+    return None
@@ -0,0 +1,204 @@
+"""
+Per-agent model fallback tiers.
+
+Each agent in adk.yaml may list fallback_models after its primary model. A
+process-wide health tracker counts consecutive transient errors (overload,
+quota) per model; once a model reaches the failure threshold it is skipped for
+a cooldown period and requests go to the agent's next healthy tier. When the
+cooldown ends the primary is tried again, so agents drift back to it as soon
+as it recovers; a model that keeps failing gets a longer cooldown each time.
+
+ModelFallback supplies the agent callbacks: before_model picks the model for
+the request, after_model and on_model_error report the outcome. A failed call
+still fails the turn, but the error is tagged with the fallback model so the
+retry engine retries right away instead of backing off. Later callbacks may
+still change the model (the usage budgets switch to a budget model), so the
+outcome is recorded against the model the request was actually sent to, and
+only a failed tier is failed over.
+
+Settings come from the model_fallback section of adk.yaml.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from .retry import classify_error
+
+# Model calls awaiting an outcome, kept per (invocation, agent)
+MAX_PENDING_CALLS = 256
+
+
+class ModelHealthTracker:
+    """Tracks transient failures per model name and decides which models to skip."""
+
+    def __init__(self, failure_threshold: int = 2, cooldown_seconds: float = 30.0,
+                 max_cooldown_seconds: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            failure_threshold: int - Consecutive transient failures before a model is skipped
+            cooldown_seconds: float - How long a failing model is skipped the first time
+            max_cooldown_seconds: float - Cap on the cooldown, which doubles each time the model fails again
+            clock: Callable - Time source, injectable for tests
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.clock = clock
+        self._models: Dict[str, dict] = {}
+
+    def _health(self, model: str) -> dict:
+        return self._models.setdefault(model, {'failures': 0, 'trips': 0, 'unhealthy_until': 0.0})
+
+    def is_healthy(self, model: str) -> bool:
+        return self.clock() >= self._health(model)['unhealthy_until']
+
+    def record_success(self, model: str) -> None:
+        health = self._health(model)
+        if health['trips']:
+            print(f"[ModelFallback] {model} has recovered")
+        health.update(failures=0, trips=0, unhealthy_until=0.0)
+
+    def record_failure(self, model: str) -> None:
+        """Count a transient failure, skipping the model for a cooldown once the threshold is reached."""
+        health = self._health(model)
+        health['failures'] += 1
+        # A model back from cooldown is on probation: one more failure sends it back
+        if health['failures'] >= self.failure_threshold or health['trips']:
+            health['trips'] += 1
+            cooldown = min(self.max_cooldown_seconds, self.cooldown_seconds * 2 ** (health['trips'] - 1))
+            health['failures'] = 0
+            health['unhealthy_until'] = self.clock() + cooldown
+            print(f"[ModelFallback] {model} is failing; skipping it for {cooldown:.0f}s")
+
+    def select_model(self, tiers: List[str]) -> str:
+        """
+        Choose the model for a request.
+
+        Args:
+            tiers: List[str] - The agent's models, primary first
+
+        Returns:
+            str - The first healthy tier, or the tier that recovers soonest if none is healthy
+        """
+        for model in tiers:
+            if self.is_healthy(model):
+                return model
+        return min(tiers, key=lambda model: self._health(model)['unhealthy_until'])
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Current health per model, with seconds left in any cooldown."""
+        now = self.clock()
+        return {
+            model: {**health, 'cooldown_remaining': max(0.0, health['unhealthy_until'] - now)}
+            for model, health in self._models.items()
+        }
+
+
+class ModelFallback:
+    """Model-selection callbacks for one agent's fallback tiers."""
+
+    def __init__(self, agent_name: str, tiers: List[str], tracker: Optional[ModelHealthTracker] = None):
+        """
+        Args:
+            agent_name: str - The agent these tiers belong to
+            tiers: List[str] - Primary model followed by the fallback models, in order
+            tracker: ModelHealthTracker - Health tracker (defaults to the process-wide one)
+        """
+        self.agent_name = agent_name
+        self.tiers = list(tiers)
+        self._tracker = tracker
+        # The requests of calls awaiting an outcome, read after the other callbacks have run
+        self._pending: 'OrderedDict[tuple, object]' = OrderedDict()
+
+    @property
+    def tracker(self) -> ModelHealthTracker:
+        return self._tracker or get_model_health_tracker()
+
+    def _remember(self, callback_context, llm_request) -> None:
+        self._pending[(callback_context.invocation_id, self.agent_name)] = llm_request
+        while len(self._pending) > MAX_PENDING_CALLS:
+            self._pending.popitem(last=False)
+
+    async def before_model(self, callback_context, llm_request):
+        """before_model_callback that points the request at the agent's first healthy tier."""
+        model = self.tracker.select_model(self.tiers)
+        if model != llm_request.model:
+            print(f"[ModelFallback] {self.agent_name}: using {model} instead of {llm_request.model}")
+            llm_request.model = model
+        self._remember(callback_context, llm_request)
+        return None
+
+    async def after_model(self, callback_context, llm_response):
+        """after_model_callback that marks the model used by this call as healthy."""
+        llm_request = self._pending.pop((callback_context.invocation_id, self.agent_name), None)
+        if llm_request is not None and llm_request.model and not llm_response.error_code:
+            self.tracker.record_success(llm_request.model)
+        return None
+
+    async def on_model_error(self, callback_context, llm_request, error):
+        """
+        on_model_error_callback that records transient failures and tags the error
+        with the model the retry will use, if that differs from the failed one.
+        A model forced by a later callback (e.g. the budget model) is not one of
+        the tiers, so the retry would use it again and the error is not tagged.
+        """
+        self._pending.pop((callback_context.invocation_id, self.agent_name), None)
+        if classify_error(error) is None:
+            return None
+        self.tracker.record_failure(llm_request.model)
+        if llm_request.model not in self.tiers:
+            return None
+        next_model = self.tracker.select_model(self.tiers)
+        if next_model != llm_request.model:
+            try:
+                error.fallback_model = next_model
+            except AttributeError:
+                pass
+        return None
+
+
+_health_tracker: Optional[ModelHealthTracker] = None
+
+
+def get_model_health_tracker() -> ModelHealthTracker:
+    """Get the process-wide model health tracker configured by the model_fallback section of adk.yaml."""
+    global _health_tracker
+    if _health_tracker is None:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('model_fallback')
+        _health_tracker = ModelHealthTracker(
+            failure_threshold=settings.get('failure_threshold', 2),
+            cooldown_seconds=settings.get('cooldown_seconds', 30),
+            max_cooldown_seconds=settings.get('max_cooldown_seconds', 300),
+        )
+    return _health_tracker
+
+
+def build_model_fallback(agent_name: str, model: str, fallback_models: Optional[List[str]]) -> Optional[ModelFallback]:
+    """
+    Get the fallback callbacks for an agent, or None if it has no fallback
+    models or model fallback is disabled in adk.yaml.
+    """
+    from agents.config_loader import get_config_section
+    if not fallback_models or not get_config_section('model_fallback').get('enabled', False):
+        return None
+    return ModelFallback(agent_name, [model] + list(fallback_models))
+
+
+def validate_fallback_models(agent_name: str, model: str, fallback_models) -> None:
+    """
+    Validate an agent's fallback_models entry from adk.yaml.
+
+    Raises:
+        ValueError: If the entry is not a list of distinct model names other than the primary
+    """
+    if fallback_models is None:
+        return
+    if not isinstance(fallback_models, list) or not all(isinstance(name, str) and name for name in fallback_models):
+        raise ValueError(f"Invalid fallback_models for agent '{agent_name}' in adk.yaml: expected a list of model names")
+    if model in fallback_models or len(set(fallback_models)) != len(fallback_models):
+        raise ValueError(
+            f"Invalid fallback_models for agent '{agent_name}' in adk.yaml: "
+            f"models must be distinct and differ from the primary model '{model}'"
+        )
@@ -0,0 +1,282 @@
+"""
+Write-behind persistence for campaign state.
+
+save_campaign used to read the campaign's state document to check that it
+exists and then rewrite every state field, including the large characters
+and campaign_outline blobs, on the turn's critical path. The writer instead
+tracks which fields changed since they were last persisted (by content
+fingerprint) and queues only those. A background thread writes them in
+batches once a campaign has been quiet for debounce_seconds (or has waited
+max_delay_seconds), retries failed writes with backoff, and flushes whatever
+is pending on shutdown. A save therefore never blocks a turn.
+
+The writer is storage-agnostic: it hands {campaign_id: {field: value}}
+batches to a write function. Settings come from the persistence section of
+adk.yaml.
+"""
+
+import atexit
+import copy
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+def field_fingerprint(value: Any) -> str:
+    """Content fingerprint of a state field value."""
+    payload = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _PendingWrite:
+    """Dirty fields of one campaign awaiting a write."""
+
+    def __init__(self, now: float):
+        self.fields: Dict[str, Any] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.first_dirty = now
+        self.last_dirty = now
+        self.not_before = 0.0
+        self.failures = 0
+
+
+class WriteBehindWriter:
+    """Debounced, batched background writes of changed campaign fields."""
+
+    def __init__(self, write_batch: Callable[[Dict[str, Dict[str, Any]]], None], debounce_seconds: float = 2.0,
+                 max_delay_seconds: float = 10.0, max_batch: int = 50, retry_base_seconds: float = 1.0,
+                 retry_max_seconds: float = 60.0, clock: Callable[[], float] = time.monotonic, start: bool = True):
+        """
+        Args:
+            write_batch: Callable - Writes {campaign_id: {field: value}}; raises on failure
+            debounce_seconds: float - Quiet time after the last change before a campaign is written
+            max_delay_seconds: float - Longest a change waits while a campaign keeps changing
+            max_batch: int - Campaigns per write_batch call
+            retry_base_seconds: float - First retry delay after a failed write, doubled per failure
+            retry_max_seconds: float - Cap on the retry delay
+            clock: Callable - Time source, injectable for tests
+            start: bool - Start the background thread (tests flush by hand)
+        """
+        self.write_batch = write_batch
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.max_batch = max_batch
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.clock = clock
+        self._persisted: Dict[str, Dict[str, str]] = {}
+        self._pending: Dict[str, _PendingWrite] = {}
+        # Fingerprints of the batch being written, which becomes the persisted value once it lands
+        self._in_flight: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # Serializes writes so a campaign's batches land in order
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self.stats = {'marked': 0, 'fields_queued': 0, 'fields_skipped': 0, 'batches': 0, 'fields_written': 0,
+                      'failures': 0}
+        self._thread: Optional[threading.Thread] = None
+        if start:
+            self._thread = threading.Thread(target=self._run, name='campaign-write-behind', daemon=True)
+            self._thread.start()
+
+    def prime(self, campaign_id: str, fields: Dict[str, Any]) -> None:
+        """Record fields as already persisted (e.g. just loaded or created)."""
+        with self._lock:
+            persisted = self._persisted.setdefault(campaign_id, {})
+            for name, value in fields.items():
+                persisted[name] = field_fingerprint(value)
+
+    def mark(self, campaign_id: str, fields: Dict[str, Any]) -> List[str]:
+        """
+        Queue the fields that differ from what was last persisted, or from
+        what is being written if a write of the field is in flight.
+
+        Args:
+            campaign_id: str - The campaign the fields belong to
+            fields: Dict[str, Any] - Current values of the campaign's state fields
+
+        Returns:
+            List[str] - Names of the fields queued for writing
+        """
+        now = self.clock()
+        dirty = []
+        with self._lock:
+            self.stats['marked'] += 1
+            persisted = {**self._persisted.get(campaign_id, {}), **self._in_flight.get(campaign_id, {})}
+            pending = self._pending.get(campaign_id)
+            for name, value in fields.items():
+                fingerprint = field_fingerprint(value)
+                if pending is not None and pending.fingerprints.get(name) == fingerprint:
+                    continue
+                if persisted.get(name) == fingerprint:
+                    if pending is not None and name in pending.fields:
+                        # Changed back to the stored value before it was written
+                        del pending.fields[name]
+                        del pending.fingerprints[name]
+                    self.stats['fields_skipped'] += 1
+                    continue
+                if pending is None:
+                    pending = self._pending[campaign_id] = _PendingWrite(now)
+                pending.fields[name] = copy.deepcopy(value)
+                pending.fingerprints[name] = fingerprint
+                pending.last_dirty = now
+                dirty.append(name)
+            if pending is not None and not pending.fields:
+                del self._pending[campaign_id]
+            self.stats['fields_queued'] += len(dirty)
+            if dirty:
+                self._wakeup.notify()
+        return dirty
+
+    def pending_fields(self) -> Dict[str, List[str]]:
+        """Names of the fields awaiting a write, per campaign."""
+        with self._lock:
+            return {campaign_id: sorted(pending.fields) for campaign_id, pending in self._pending.items()}
+
+    def _due_at(self, pending: _PendingWrite) -> float:
+        return max(pending.not_before,
+                   min(pending.last_dirty + self.debounce_seconds, pending.first_dirty + self.max_delay_seconds))
+
+    def _take(self, force: bool) -> Dict[str, _PendingWrite]:
+        """Remove up to max_batch due campaigns from the pending set. Caller holds the lock."""
+        now = self.clock()
+        due = [campaign_id for campaign_id, pending in self._pending.items() if force or self._due_at(pending) <= now]
+        batch = {campaign_id: self._pending.pop(campaign_id) for campaign_id in due[:self.max_batch]}
+        for campaign_id, pending in batch.items():
+            self._in_flight[campaign_id] = dict(pending.fingerprints)
+        return batch
+
+    def _write(self, batch: Dict[str, _PendingWrite]) -> bool:
+        try:
+            self.write_batch({campaign_id: pending.fields for campaign_id, pending in batch.items()})
+        except Exception as e:
+            self._requeue(batch)
+            print(f"[Persistence] Writing {len(batch)} campaigns failed, will retry: {e}")
+            return False
+        with self._lock:
+            self.stats['batches'] += 1
+            for campaign_id, pending in batch.items():
+                self._in_flight.pop(campaign_id, None)
+                self._persisted.setdefault(campaign_id, {}).update(pending.fingerprints)
+                self.stats['fields_written'] += len(pending.fields)
+        return True
+
+    def _requeue(self, batch: Dict[str, _PendingWrite]) -> None:
+        """Put a failed batch back, keeping any newer values queued meanwhile."""
+        now = self.clock()
+        with self._lock:
+            self.stats['failures'] += 1
+            for campaign_id, failed in batch.items():
+                self._in_flight.pop(campaign_id, None)
+                newer = self._pending.get(campaign_id)
+                if newer is not None:
+                    for name, value in failed.fields.items():
+                        if name not in newer.fields:
+                            newer.fields[name] = value
+                            newer.fingerprints[name] = failed.fingerprints[name]
+                    newer.first_dirty = min(newer.first_dirty, failed.first_dirty)
+                    failed = newer
+                failed.failures += 1
+                failed.not_before = now + min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (failed.failures - 1))
+                self._pending[campaign_id] = failed
+
+    def flush(self) -> bool:
+        """
+        Write everything pending now, in the calling thread.
+
+        Returns:
+            bool - True if every write succeeded
+        """
+        ok = True
+        with self._write_lock:
+            while True:
+                with self._lock:
+                    batch = self._take(force=True)
+                if not batch:
+                    return ok
+                if not self._write(batch):
+                    return False
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._closed:
+                    now = self.clock()
+                    if self._pending:
+                        wait = min(self._due_at(pending) for pending in self._pending.values()) - now
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._wakeup.wait(wait)
+                if self._closed:
+                    return
+            with self._write_lock:
+                with self._lock:
+                    batch = self._take(force=False)
+                if batch:
+                    self._write(batch)
+
+    def close(self) -> bool:
+        """Stop the background thread and flush everything pending (called on shutdown)."""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        ok = self.flush()
+        pending = self.pending_fields()
+        if pending:
+            print(f"[Persistence] Unsaved fields at shutdown: {pending}")
+        return ok
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'pending_campaigns': len(self._pending),
+                    'pending_fields': sum(len(pending.fields) for pending in self._pending.values())}
+
+
+_writer: Optional[WriteBehindWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_campaign_writer(write_batch: Callable[[Dict[str, Dict[str, Any]]], None]) -> Optional[WriteBehindWriter]:
+    """
+    Get the process-wide write-behind writer configured by the persistence
+    section of adk.yaml, or None if write-behind is disabled. The writer is
+    flushed at interpreter exit.
+
+    Args:
+        write_batch: Callable - The storage write function, used when the writer is first created
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            from agents.config_loader import get_config_section
+            settings = get_config_section('persistence')
+            if not settings.get('write_behind', False):
+                return None
+            _writer = WriteBehindWriter(
+                write_batch,
+                debounce_seconds=settings.get('debounce_seconds', 2.0),
+                max_delay_seconds=settings.get('max_delay_seconds', 10.0),
+                max_batch=settings.get('max_batch', 50),
+                retry_base_seconds=settings.get('retry_base_seconds', 1.0),
+                retry_max_seconds=settings.get('retry_max_seconds', 60.0),
+            )
+            atexit.register(_writer.close)
+        return _writer
+
+
+def set_campaign_writer(writer: Optional[WriteBehindWriter]) -> None:
+    """Replace the process-wide writer (e.g. with one writing to a list in tests)."""
+    global _writer
+    _writer = writer
+
+
+def flush_campaign_writes() -> bool:
+    """Write all pending campaign changes now; True if nothing failed."""
+    return _writer.flush() if _writer is not None else True
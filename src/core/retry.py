@@ -0,0 +1,427 @@
+"""
+Retry policy engine for model calls.
+
+Transient model errors are classified as 'overloaded' (503/500, "model is
+overloaded") or 'rate_limited' (429, RESOURCE_EXHAUSTED, quota exceeded) and
+retried with exponential backoff and full jitter, so concurrent sessions spread
+out instead of retrying in lockstep. Server retry hints (Retry-After headers,
+google.rpc.RetryInfo details, "retry in Ns" messages) set a lower bound on the
+delay.
+
+A process-wide circuit breaker counts consecutive transient failures across
+all sessions. Once open, callers wait for the recovery timeout instead of
+calling the model, then a single half-open probe decides whether to close the
+breaker again.
+
+Errors tagged with a fallback_model (see model_fallback.py) are retried after
+a short failover delay on the next tier and do not count against the breaker.
+
+Policies and breaker settings come from the retry section of adk.yaml.
+"""
+
+import asyncio
+import email.utils
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+OVERLOADED = 'overloaded'
+RATE_LIMITED = 'rate_limited'
+
+_RETRY_DELAY_PATTERN = re.compile(
+    r"(?:retry in|retryDelay['\"]?\s*[:=]\s*['\"]?|retry_delay\s*\{\s*seconds:\s*)\s*(\d+(?:\.\d+)?)\s*(ms|s)?",
+    re.IGNORECASE,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker stays open longer than a caller is willing to wait."""
+
+
+def classify_error(error: Exception) -> Optional[str]:
+    """
+    Classify a model call error as retryable.
+
+    Args:
+        error: Exception - The error raised by the model call
+
+    Returns:
+        str | None - OVERLOADED, RATE_LIMITED, or None if the error should not be retried
+    """
+    code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    status = str(getattr(error, 'status', '') or '')
+    message = str(error)
+    if (code == 429 or 'RESOURCE_EXHAUSTED' in status or 'RESOURCE_EXHAUSTED' in message
+            or 'exceeded your current quota' in message or type(error).__name__ == 'RateLimitError'):
+        return RATE_LIMITED
+    if (code in (500, 502, 503, 504) or 'UNAVAILABLE' in status or 'overloaded' in message.lower()
+            or type(error).__name__ in ('ServiceUnavailableError', 'InternalServerError')):
+        return OVERLOADED
+    return None
+
+
+def _parse_seconds(value: Any) -> Optional[float]:
+    """Parse '27s', '1.5', '500ms' or a number of seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(ms|s)?\s*", str(value))
+    if not match:
+        return None
+    seconds = float(match.group(1))
+    return seconds / 1000 if match.group(2) == 'ms' else seconds
+
+
+def _find_retry_delay(details: Any) -> Optional[float]:
+    """Find a google.rpc.RetryInfo retryDelay anywhere in an error's details."""
+    if isinstance(details, dict):
+        if 'retryDelay' in details:
+            return _parse_seconds(details['retryDelay'])
+        values = details.values()
+    elif isinstance(details, list):
+        values = details
+    else:
+        return None
+    for value in values:
+        delay = _find_retry_delay(value)
+        if delay is not None:
+            return delay
+    return None
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """
+    Extract the server's retry hint from an error, if any.
+
+    Args:
+        error: Exception - The error raised by the model call
+
+    Returns:
+        float | None - Seconds the server asked us to wait
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        if value:
+            seconds = _parse_seconds(value)
+            if seconds is None:
+                # HTTP-date form
+                try:
+                    seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    seconds = None
+            if seconds is not None:
+                return max(0.0, seconds)
+
+    delay = _find_retry_delay(getattr(error, 'details', None))
+    if delay is not None:
+        return delay
+
+    match = _RETRY_DELAY_PATTERN.search(str(error))
+    if match:
+        seconds = float(match.group(1))
+        return seconds / 1000 if (match.group(2) or '').lower() == 'ms' else seconds
+    return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for one class of errors."""
+
+    def __init__(self, base_delay: float = 2.0, max_delay: float = 60.0, multiplier: float = 2.0,
+                 rng: Callable[[float, float], float] = random.uniform):
+        """
+        Args:
+            base_delay: float - Upper bound of the first retry's delay, in seconds
+            max_delay: float - Cap on the backoff window
+            multiplier: float - Growth of the backoff window per attempt
+            rng: Callable - uniform(a, b) random source, injectable for tests
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.rng = rng
+
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Get the delay before a retry.
+
+        Args:
+            attempt: int - The retry number, starting at 1
+            retry_after: float - The server's retry hint, if any
+
+        Returns:
+            float - Seconds to wait: a random point in the backoff window, and never
+            less than the server hint (plus jitter so hinted callers do not align)
+        """
+        window = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        delay = self.rng(0, window)
+        if retry_after is not None:
+            delay = max(delay, retry_after + self.rng(0, self.base_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """Process-wide breaker over consecutive transient model failures."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            failure_threshold: int - Consecutive transient failures that open the breaker
+            recovery_timeout: float - Seconds the breaker stays open before a probe is allowed
+            clock: Callable - Time source, injectable for tests
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Whether a model call may start now; in half-open state only one probe is let through."""
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def time_until_retry(self) -> float:
+        """Seconds until the breaker lets a probe through (0 if it is not open)."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (self.clock() - self.opened_at))
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            print("[Retry] Circuit breaker closed: model calls are succeeding again")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """
+        Count a transient failure.
+
+        Returns:
+            bool - True if this failure opened the breaker
+        """
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            was_open = self.state == self.OPEN
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+            self.probe_in_flight = False
+            return not was_open
+        return False
+
+    def release_probe(self) -> None:
+        """Let another probe through after one ended with a non-transient error."""
+        self.probe_in_flight = False
+
+
+class RetryEngine:
+    """Runs model calls under per-error-class retry policies and a shared circuit breaker."""
+
+    def __init__(self, policies: Optional[Dict[str, RetryPolicy]] = None, max_attempts: int = 6,
+                 breaker: Optional[CircuitBreaker] = None, max_breaker_wait: float = 120.0,
+                 failover_delay: float = 1.0, sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        """
+        Args:
+            policies: Dict[str, RetryPolicy] - Policy per error class (OVERLOADED, RATE_LIMITED)
+            max_attempts: int - Total attempts per call, including the first
+            breaker: CircuitBreaker - Shared breaker (defaults to a new one)
+            max_breaker_wait: float - Longest a caller waits for an open breaker before giving up
+            failover_delay: float - Upper bound of the delay before retrying on a fallback model
+            sleep: Callable - Async sleep, injectable for tests
+        """
+        self.policies = policies or {
+            OVERLOADED: RetryPolicy(base_delay=2.0, max_delay=60.0),
+            RATE_LIMITED: RetryPolicy(base_delay=10.0, max_delay=120.0),
+        }
+        self.max_attempts = max_attempts
+        self.breaker = breaker or CircuitBreaker()
+        self.max_breaker_wait = max_breaker_wait
+        self.failover_delay = failover_delay
+        self.sleep = sleep
+        self.metrics = {
+            'calls': 0, 'attempts': 0, 'successes': 0, 'retries': 0, 'give_ups': 0,
+            'non_retryable': 0, 'failovers': 0, 'circuit_opened': 0, 'circuit_waits': 0,
+            'backoff_seconds': 0.0, 'errors': {OVERLOADED: 0, RATE_LIMITED: 0},
+        }
+
+    async def acquire(self) -> None:
+        """
+        Wait until the circuit breaker lets a call through.
+
+        Raises:
+            CircuitOpenError: If the breaker stays open longer than max_breaker_wait
+        """
+        waited = 0.0
+        while not self.breaker.allow_request():
+            if waited >= self.max_breaker_wait:
+                raise CircuitOpenError(f"Model calls are paused after repeated failures (waited {waited:.0f}s)")
+            # Wake at the probe time, spread out so waiting sessions do not all retry at once
+            delay = self.breaker.time_until_retry() + random.uniform(0.5, 2.0)
+            self.metrics['circuit_waits'] += 1
+            await self.sleep(delay)
+            waited += delay
+
+    def record_success(self) -> None:
+        self.metrics['successes'] += 1
+        self.breaker.record_success()
+
+    def next_delay(self, error: Exception, attempt: int, can_retry: bool = True) -> Optional[float]:
+        """
+        Record a failed attempt and decide whether to retry.
+
+        Args:
+            error: Exception - The error raised by the attempt
+            attempt: int - The attempt that failed, starting at 1
+            can_retry: bool - False if the caller cannot safely repeat the call
+
+        Returns:
+            float | None - Seconds to wait before the next attempt, or None to give up
+        """
+        error_class = classify_error(error)
+        if error_class is None:
+            self.metrics['non_retryable'] += 1
+            self.breaker.release_probe()
+            return None
+        self.metrics['errors'][error_class] += 1
+        if getattr(error, 'fallback_model', None) and can_retry and attempt < self.max_attempts:
+            # Another model tier is healthy: switch right away instead of backing off
+            self.breaker.release_probe()
+            delay = random.uniform(0, self.failover_delay)
+            self.metrics['failovers'] += 1
+            self.metrics['retries'] += 1
+            self.metrics['backoff_seconds'] += delay
+            return delay
+        if self.breaker.record_failure():
+            self.metrics['circuit_opened'] += 1
+            print(f"[Retry] Circuit breaker opened after {self.breaker.consecutive_failures} consecutive {error_class} errors")
+        if not can_retry or attempt >= self.max_attempts:
+            self.metrics['give_ups'] += 1
+            return None
+        delay = self.policies[error_class].compute_delay(attempt, parse_retry_after(error))
+        self.metrics['retries'] += 1
+        self.metrics['backoff_seconds'] += delay
+        return delay
+
+    async def attempts(self, max_attempts: Optional[int] = None,
+                       on_retry: Optional[Callable[[Exception, int, float], None]] = None) -> AsyncIterator['RetryAttempt']:
+        """
+        Attempts of one retried call, each waiting for the circuit breaker first.
+
+        Run each attempt's body inside `async with attempt:`. The iteration
+        ends after the first attempt that succeeds. A retryable error is
+        swallowed after the backoff sleep and the next attempt follows; any
+        other error, or the last one, propagates to the caller.
+
+            async for attempt in engine.attempts():
+                async with attempt:
+                    result = await call_model()
+
+        Args:
+            max_attempts: int - Total attempts, including the first (default: the engine's)
+            on_retry: Callable - Called with (error, attempt, delay) before each retry sleep
+
+        Yields:
+            RetryAttempt - The next attempt
+
+        Raises:
+            CircuitOpenError: If the breaker stays open longer than max_breaker_wait
+        """
+        self.metrics['calls'] += 1
+        limit = self.max_attempts if max_attempts is None else max_attempts
+        number = 0
+        while True:
+            number += 1
+            await self.acquire()
+            self.metrics['attempts'] += 1
+            attempt = RetryAttempt(self, number, limit, on_retry)
+            yield attempt
+            if attempt.succeeded:
+                return
+
+
+class RetryAttempt:
+    """One attempt of a call retried by RetryEngine.attempts, used as an async context manager."""
+
+    def __init__(self, engine: RetryEngine, number: int, max_attempts: int,
+                 on_retry: Optional[Callable[[Exception, int, float], None]] = None):
+        self.engine = engine
+        self.number = number
+        self.max_attempts = max_attempts
+        self.on_retry = on_retry
+        # Cleared by callers that cannot safely repeat the call (e.g. once output was streamed)
+        self.can_retry = True
+        self.succeeded = False
+
+    async def __aenter__(self) -> 'RetryAttempt':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.succeeded = True
+            self.engine.record_success()
+            return False
+        if not isinstance(exc, Exception):
+            # Cancellation and generator shutdown are not failed attempts, but a
+            # cancelled half-open probe must let the next one through
+            self.engine.breaker.release_probe()
+            return False
+        delay = self.engine.next_delay(exc, self.number, can_retry=self.can_retry and self.number < self.max_attempts)
+        if delay is None:
+            return False
+        if self.on_retry is not None:
+            self.on_retry(exc, self.number, delay)
+        await self.engine.sleep(delay)
+        return True
+
+
+_retry_engine: Optional[RetryEngine] = None
+
+
+def get_retry_engine() -> RetryEngine:
+    """Get the process-wide retry engine configured by the retry section of adk.yaml."""
+    global _retry_engine
+    if _retry_engine is None:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('retry')
+        breaker_settings = settings.get('circuit_breaker', {})
+        policies = {}
+        for error_class, defaults in ((OVERLOADED, (2.0, 60.0)), (RATE_LIMITED, (10.0, 120.0))):
+            policy = settings.get(error_class, {})
+            policies[error_class] = RetryPolicy(
+                base_delay=policy.get('base_delay', defaults[0]),
+                max_delay=policy.get('max_delay', defaults[1]),
+                multiplier=policy.get('multiplier', 2.0),
+            )
+        _retry_engine = RetryEngine(
+            policies=policies,
+            max_attempts=settings.get('max_attempts', 6),
+            breaker=CircuitBreaker(
+                failure_threshold=breaker_settings.get('failure_threshold', 5),
+                recovery_timeout=breaker_settings.get('recovery_timeout', 30),
+            ),
+            max_breaker_wait=breaker_settings.get('max_wait', 120),
+            failover_delay=settings.get('failover_delay', 1.0),
+        )
+    return _retry_engine
+
+
+def get_retry_metrics() -> dict:
+    """Snapshot of the retry engine's counters and breaker state."""
+    engine = get_retry_engine()
+    return {**engine.metrics, 'errors': dict(engine.metrics['errors']), 'circuit_state': engine.breaker.state}
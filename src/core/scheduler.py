@@ -0,0 +1,310 @@
+"""
+Process-wide scheduler for agent turns.
+
+Every runner.run_async turn takes a slot from the scheduler first, so the
+process never runs more than max_concurrent_turns turns at once and stays
+within a token-rate budget (a token bucket refilled at tokens_per_minute;
+each turn is charged an estimate on admission and settled with its actual
+usage when it finishes).
+
+Waiting turns are ordered by weighted fair queuing across campaigns: each
+campaign's virtual clock advances by the tokens its turns use divided by its
+weight, and the turn with the smallest virtual finish time goes next. A
+chatty campaign therefore queues behind quieter tables instead of starving
+them. Interactive (player) turns always go before background work, which is
+additionally capped at background_max_concurrent.
+
+Settings come from the scheduler section of adk.yaml.
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+# Weight of the latest turn in a campaign's running token estimate
+ESTIMATE_SMOOTHING = 0.3
+
+
+class TurnSlot:
+    """A running turn's claim on the scheduler; collects the turn's token usage."""
+
+    def __init__(self, key: str, priority: int, estimate: float, weight: float, waited: float = 0.0):
+        self.key = key
+        self.priority = priority
+        self.estimate = estimate
+        self.weight = weight
+        self.waited = waited
+        self.tokens_used = 0
+
+    def record_event(self, event) -> None:
+        """Add a runner event's token usage to the turn."""
+        usage = getattr(event, 'usage_metadata', None)
+        if usage is not None and not getattr(event, 'partial', False):
+            self.tokens_used += usage.total_token_count or 0
+
+
+class _Waiter:
+    """A queued turn."""
+
+    def __init__(self, finish: float, seq: int, slot: TurnSlot, future: asyncio.Future, enqueued_at: float):
+        self.finish = finish
+        self.seq = seq
+        self.slot = slot
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+    def __lt__(self, other: '_Waiter') -> bool:
+        return (self.finish, self.seq) < (other.finish, other.seq)
+
+
+class TurnScheduler:
+    """Admits agent turns under a concurrency limit and token budget, fairly across campaigns."""
+
+    def __init__(self, max_concurrent: int = 8, tokens_per_minute: Optional[float] = None,
+                 burst_tokens: Optional[float] = None, default_turn_tokens: float = 4000,
+                 background_max_concurrent: Optional[int] = None, weights: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_concurrent: int - Turns allowed to run at once
+            tokens_per_minute: float - Token budget refill rate, or None for no token limit
+            burst_tokens: float - Token bucket capacity (defaults to one minute of budget)
+            default_turn_tokens: float - Token estimate for a campaign's first turn
+            background_max_concurrent: int - Cap on concurrent background turns (defaults to max_concurrent)
+            weights: Dict[str, float] - Fair-share weight per campaign key (default 1)
+            clock: Callable - Time source, injectable for tests
+        """
+        self.max_concurrent = max_concurrent
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_tokens = burst_tokens or tokens_per_minute
+        self.default_turn_tokens = default_turn_tokens
+        self.background_max_concurrent = background_max_concurrent or max_concurrent
+        self.weights = dict(weights or {})
+        self.clock = clock
+
+        self._tokens = self.burst_tokens or 0.0
+        self._refilled_at = clock()
+        self._queues: Dict[int, List[_Waiter]] = {INTERACTIVE: [], BACKGROUND: []}
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._estimates: Dict[str, float] = {}
+        self._running = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {'admitted': 0, 'completed': 0, 'cancelled': 0, 'tokens_used': 0,
+                      'total_wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+
+    # --- token bucket ---
+
+    def _refill(self) -> None:
+        if not self.tokens_per_minute:
+            return
+        now = self.clock()
+        self._tokens = min(self.burst_tokens, self._tokens + (now - self._refilled_at) * self.tokens_per_minute / 60)
+        self._refilled_at = now
+
+    def _needed_tokens(self, slot: TurnSlot) -> float:
+        # A turn estimated above the bucket size only needs a full bucket
+        return min(slot.estimate, self.burst_tokens)
+
+    def _seconds_until_tokens(self, needed: float) -> float:
+        return max(0.0, needed - self._tokens) * 60 / self.tokens_per_minute + 0.01
+
+    # --- admission ---
+
+    def _has_capacity(self, priority: int) -> bool:
+        if sum(self._running.values()) >= self.max_concurrent:
+            return False
+        return priority != BACKGROUND or self._running[BACKGROUND] < self.background_max_concurrent
+
+    def _has_tokens(self, slot: TurnSlot) -> bool:
+        if not self.tokens_per_minute:
+            return True
+        self._refill()
+        return self._tokens >= self._needed_tokens(slot)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """Head of the highest-priority non-empty queue, dropping cancelled waiters."""
+        for priority in (INTERACTIVE, BACKGROUND):
+            queue = self._queues[priority]
+            while queue and queue[0].future.done():
+                heapq.heappop(queue)
+            if queue:
+                return queue[0]
+        return None
+
+    def _dispatch(self) -> None:
+        """Admit queued turns while there is capacity."""
+        self._timer = None
+        while True:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            if not self._has_capacity(waiter.slot.priority):
+                return
+            if not self._has_tokens(waiter.slot):
+                if self._timer is None:
+                    delay = self._seconds_until_tokens(self._needed_tokens(waiter.slot))
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._queues[waiter.slot.priority])
+            self._virtual_time = max(self._virtual_time, waiter.finish - waiter.slot.estimate / waiter.slot.weight)
+            waiter.slot.waited = self.clock() - waiter.enqueued_at
+            self._start(waiter.slot)
+            waiter.future.set_result(waiter.slot)
+
+    def _start(self, slot: TurnSlot) -> None:
+        self._running[slot.priority] += 1
+        if self.tokens_per_minute:
+            self._tokens -= slot.estimate
+        self.stats['admitted'] += 1
+        self.stats['total_wait_seconds'] += slot.waited
+        self.stats['max_wait_seconds'] = max(self.stats['max_wait_seconds'], slot.waited)
+
+    async def acquire(self, key: str, priority: int = INTERACTIVE) -> TurnSlot:
+        """
+        Wait for a turn slot.
+
+        Args:
+            key: str - The campaign (session) the turn belongs to
+            priority: int - INTERACTIVE or BACKGROUND
+
+        Returns:
+            TurnSlot - The slot; pass it to release() when the turn ends
+        """
+        weight = float(self.weights.get(key, 1.0))
+        estimate = self._estimates.get(key, self.default_turn_tokens)
+        slot = TurnSlot(key, priority, estimate, weight)
+        start = max(self._virtual_time, self._last_finish.get(key, 0.0))
+        finish = start + estimate / weight
+        if not any(self._queues.values()) and self._has_capacity(priority) and self._has_tokens(slot):
+            self._virtual_time = start
+            self._last_finish[key] = finish
+            self._start(slot)
+            return slot
+
+        self._last_finish[key] = finish
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queues[priority], _Waiter(finish, next(self._seq), slot, future, self.clock()))
+        self._dispatch()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller gave up: hand the slot straight back
+                self.release(slot)
+            else:
+                self.stats['cancelled'] += 1
+            raise
+
+    def release(self, slot: TurnSlot) -> None:
+        """
+        End a turn, settling its token charge with the actual usage.
+
+        Args:
+            slot: TurnSlot - The slot returned by acquire()
+        """
+        self._running[slot.priority] -= 1
+        actual = slot.tokens_used or slot.estimate
+        if self.tokens_per_minute:
+            self._tokens += slot.estimate - actual
+        # Campaigns that use more tokens than estimated fall back in the fair queue
+        self._last_finish[slot.key] = self._last_finish.get(slot.key, 0.0) + (actual - slot.estimate) / slot.weight
+        if slot.tokens_used:
+            self._estimates[slot.key] = (1 - ESTIMATE_SMOOTHING) * slot.estimate + ESTIMATE_SMOOTHING * slot.tokens_used
+        self.stats['completed'] += 1
+        self.stats['tokens_used'] += slot.tokens_used
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, key: str, priority: int = INTERACTIVE) -> AsyncIterator[TurnSlot]:
+        """Hold a turn slot for the duration of the block."""
+        turn_slot = await self.acquire(key, priority)
+        try:
+            yield turn_slot
+        finally:
+            self.release(turn_slot)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depths, running turns, token budget and wait statistics (read-only, safe from other threads)."""
+        tokens_available = None
+        if self.tokens_per_minute:
+            elapsed = self.clock() - self._refilled_at
+            tokens_available = min(self.burst_tokens, self._tokens + elapsed * self.tokens_per_minute / 60)
+        queued_by_campaign: Dict[str, int] = {}
+        queue_depth = {}
+        for priority, queue in list(self._queues.items()):
+            live = [waiter for waiter in list(queue) if not waiter.future.done()]
+            queue_depth[PRIORITY_NAMES[priority]] = len(live)
+            for waiter in live:
+                queued_by_campaign[waiter.slot.key] = queued_by_campaign.get(waiter.slot.key, 0) + 1
+        admitted = self.stats['admitted']
+        return {
+            **self.stats,
+            'queue_depth': queue_depth,
+            'queued_by_campaign': queued_by_campaign,
+            'running': {PRIORITY_NAMES[priority]: count for priority, count in self._running.items()},
+            'tokens_available': tokens_available,
+            'avg_wait_seconds': self.stats['total_wait_seconds'] / admitted if admitted else 0.0,
+        }
+
+
+_scheduler: Optional[TurnScheduler] = None
+
+
+def get_scheduler() -> Optional[TurnScheduler]:
+    """
+    Get the process-wide turn scheduler configured by the scheduler section of
+    adk.yaml, or None if scheduling is disabled.
+    """
+    global _scheduler
+    if _scheduler is None:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('scheduler')
+        if not settings.get('enabled', False):
+            return None
+        _scheduler = TurnScheduler(
+            max_concurrent=settings.get('max_concurrent_turns', 8),
+            tokens_per_minute=settings.get('tokens_per_minute'),
+            burst_tokens=settings.get('burst_tokens'),
+            default_turn_tokens=settings.get('default_turn_tokens', 4000),
+            background_max_concurrent=settings.get('background_max_concurrent'),
+            weights=settings.get('campaign_weights'),
+        )
+    return _scheduler
+
+
+def get_scheduler_metrics() -> Optional[Dict[str, Any]]:
+    """Metrics of the process-wide scheduler, or None if scheduling is disabled."""
+    scheduler = get_scheduler()
+    return scheduler.metrics() if scheduler is not None else None
+
+
+def set_scheduler(scheduler: Optional[TurnScheduler]) -> None:
+    """Replace the process-wide scheduler (e.g. with a small one in tests)."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+@contextlib.asynccontextmanager
+async def schedule_turn(key: str, priority: int = INTERACTIVE) -> AsyncIterator[TurnSlot]:
+    """
+    Hold a slot from the process-wide scheduler while running one agent turn.
+    Yields an untracked slot when scheduling is disabled.
+    """
+    scheduler = get_scheduler()
+    if scheduler is None:
+        yield TurnSlot(key, priority, 0.0, 1.0)
+        return
+    async with scheduler.slot(key, priority) as turn_slot:
+        if turn_slot.waited >= 1:
+            print(f"[Scheduler] Turn for {key} waited {turn_slot.waited:.1f}s for a slot")
+        yield turn_slot
@@ -0,0 +1,374 @@
+"""
+Durable agent sessions.
+
+The agents' sessions used to live in an InMemorySessionService: every
+session (state and full event history) stayed in RAM for the life of the
+process, and a restart dropped every game in progress. The
+PersistentSessionService keeps ADK's in-memory service as a hot tier and
+writes through to a local SQLite database (WAL mode):
+
+    write-through   every appended event and its state delta are committed
+                    in one transaction, so a restart loses nothing
+    hot tier        at most max_hot_sessions sessions stay in memory, least
+                    recently used first out; sessions idle for idle_seconds
+                    are hibernated (dropped from memory, they are already
+                    on disk)
+    rehydration     a hibernated session is read back on its next access:
+                    its state, plus only the events the model still sees
+                    (those after the campaign memory's summarized_until,
+                    see core.history), so a long campaign reloads quickly
+    peeks           a get_session without events (the autosave snapshots)
+                    reads the state from disk without rehydrating
+
+Settings come from the sessions section of adk.yaml; backend: memory keeps
+the plain InMemorySessionService.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+from .history import MEMORY_KEY
+
+SessionKey = Tuple[str, str, str]
+
+
+def split_state(state: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Split a state (delta) into its app, user and session parts, without prefixes; temp keys are dropped."""
+    app, user, session = {}, {}, {}
+    for key, value in state.items():
+        if key.startswith(State.APP_PREFIX):
+            app[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+class PersistentSessionService(InMemorySessionService):
+    """Session service with an in-memory LRU hot tier over a SQLite database."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            app_name TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            last_update_time REAL NOT NULL,
+            PRIMARY KEY (app_name, user_id, session_id)
+        );
+        CREATE TABLE IF NOT EXISTS session_state (
+            app_name TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (app_name, user_id, session_id, key)
+        );
+        CREATE TABLE IF NOT EXISTS session_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            app_name TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            event TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS session_events_by_session
+            ON session_events (app_name, user_id, session_id, timestamp);
+        CREATE TABLE IF NOT EXISTS app_state (
+            app_name TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (app_name, key)
+        );
+        CREATE TABLE IF NOT EXISTS user_state (
+            app_name TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (app_name, user_id, key)
+        );
+    """
+
+    def __init__(self, path: str, max_hot_sessions: int = 200, idle_seconds: float = 900.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            path: str - Database file (created if missing), or ':memory:'
+            max_hot_sessions: int - Sessions kept in memory, least recently used first out
+            idle_seconds: float - Time without access after which a session is hibernated
+            clock: Callable - Time source for idleness, injectable for tests
+        """
+        super().__init__()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_hot_sessions = max_hot_sessions
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        # Hot sessions, least recently used first, with their last access time
+        self._hot: 'OrderedDict[SessionKey, float]' = OrderedDict()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(self.SCHEMA)
+        self.stats = {'rehydrations': 0, 'hibernations': 0, 'peeks': 0, 'events_written': 0,
+                      'events_rehydrated': 0}
+
+    @staticmethod
+    def _dump(value: Any) -> str:
+        return json.dumps(value, default=str)
+
+    # Hot tier
+
+    def _is_hot(self, key: SessionKey) -> bool:
+        app_name, user_id, session_id = key
+        return session_id in self.sessions.get(app_name, {}).get(user_id, {})
+
+    def _touch(self, key: SessionKey) -> None:
+        """Mark a hot session as just used, then hibernate whatever is over the limits."""
+        self._hot[key] = self.clock()
+        self._hot.move_to_end(key)
+        self.hibernate_idle(keep=key)
+
+    def hibernate_idle(self, keep: Optional[SessionKey] = None) -> int:
+        """
+        Drop least recently used sessions from memory while there are too many
+        or they have been idle for idle_seconds. Their state is already on disk.
+
+        Returns:
+            int - Sessions hibernated
+        """
+        now = self.clock()
+        hibernated = 0
+        while self._hot:
+            key, last_access = next(iter(self._hot.items()))
+            if key == keep or (len(self._hot) <= self.max_hot_sessions and now - last_access < self.idle_seconds):
+                break
+            self._drop_hot(key)
+            hibernated += 1
+        self.stats['hibernations'] += hibernated
+        return hibernated
+
+    def _drop_hot(self, key: SessionKey) -> None:
+        app_name, user_id, session_id = key
+        self._hot.pop(key, None)
+        self.sessions.get(app_name, {}).get(user_id, {}).pop(session_id, None)
+
+    # Disk
+
+    def _load_scoped_state(self, app_name: str, user_id: str) -> None:
+        """Read the app and user state into memory on first use."""
+        if app_name not in self.app_state:
+            with self._lock:
+                rows = self._conn.execute('SELECT key, value FROM app_state WHERE app_name = ?', (app_name,)).fetchall()
+            self.app_state[app_name] = {key: json.loads(value) for key, value in rows}
+        if user_id not in self.user_state.get(app_name, {}):
+            with self._lock:
+                rows = self._conn.execute('SELECT key, value FROM user_state WHERE app_name = ? AND user_id = ?',
+                                          (app_name, user_id)).fetchall()
+            self.user_state.setdefault(app_name, {})[user_id] = {key: json.loads(value) for key, value in rows}
+
+    def _read_session(self, key: SessionKey, with_events: bool) -> Optional[Session]:
+        """A stored session; with_events loads the events after the campaign memory's summarized_until."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?', key
+            ).fetchone()
+            if row is None:
+                return None
+            state = {name: json.loads(value) for name, value in self._conn.execute(
+                'SELECT key, value FROM session_state WHERE app_name = ? AND user_id = ? AND session_id = ?', key)}
+            events = []
+            if with_events:
+                memory = state.get(MEMORY_KEY)
+                summarized_until = memory.get('summarized_until', 0) if isinstance(memory, dict) else 0
+                events = [Event.model_validate_json(text) for text, in self._conn.execute(
+                    'SELECT event FROM session_events WHERE app_name = ? AND user_id = ? AND session_id = ? '
+                    'AND timestamp >= ? ORDER BY seq', (*key, summarized_until))]
+        app_name, user_id, session_id = key
+        return Session(app_name=app_name, user_id=user_id, id=session_id, state=state, events=events,
+                       last_update_time=row[0])
+
+    def _rehydrate(self, key: SessionKey) -> bool:
+        """Make a session hot, reading it from disk if it was hibernated. False if it does not exist."""
+        if not self._is_hot(key):
+            session = self._read_session(key, with_events=True)
+            if session is None:
+                return False
+            app_name, user_id, session_id = key
+            self._load_scoped_state(app_name, user_id)
+            self.sessions.setdefault(app_name, {}).setdefault(user_id, {})[session_id] = session
+            self.stats['rehydrations'] += 1
+            self.stats['events_rehydrated'] += len(session.events)
+        self._touch(key)
+        return True
+
+    def _write(self, key: SessionKey, last_update_time: float, state: Dict[str, Any],
+               event: Optional[Event] = None) -> None:
+        """Commit a session row, a state delta and optionally an event in one transaction."""
+        app_name, user_id, _ = key
+        app_delta, user_delta, session_delta = split_state(state)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute(
+                    'INSERT INTO sessions (app_name, user_id, session_id, last_update_time) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (app_name, user_id, session_id) DO UPDATE SET last_update_time = excluded.last_update_time',
+                    (*key, last_update_time))
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO session_state (app_name, user_id, session_id, key, value) VALUES (?, ?, ?, ?, ?)',
+                    [(*key, name, self._dump(value)) for name, value in session_delta.items()])
+                self._conn.executemany('INSERT OR REPLACE INTO app_state (app_name, key, value) VALUES (?, ?, ?)',
+                                       [(app_name, name, self._dump(value)) for name, value in app_delta.items()])
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO user_state (app_name, user_id, key, value) VALUES (?, ?, ?, ?)',
+                    [(app_name, user_id, name, self._dump(value)) for name, value in user_delta.items()])
+                if event is not None:
+                    self._conn.execute(
+                        'INSERT INTO session_events (app_name, user_id, session_id, timestamp, event) VALUES (?, ?, ?, ?, ?)',
+                        (*key, event.timestamp, event.model_dump_json(exclude_none=True)))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    # BaseSessionService
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = session_id.strip() if session_id else None
+        if session_id and not self._is_hot((app_name, user_id, session_id)):
+            with self._lock:
+                exists = self._conn.execute(
+                    'SELECT 1 FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?',
+                    (app_name, user_id, session_id)).fetchone()
+            if exists:
+                raise AlreadyExistsError(f'Session with id {session_id} already exists.')
+        self._load_scoped_state(app_name, user_id)
+        session = await super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        key = (app_name, user_id, session.id)
+        self._write(key, session.last_update_time, state or {})
+        self._touch(key)
+        return session
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        session_id = session_id.strip() if session_id else session_id
+        key = (app_name, user_id, session_id)
+        if config is not None and config.num_recent_events == 0 and not self._is_hot(key):
+            # State only: read it without bringing the session back into memory
+            session = self._read_session(key, with_events=False)
+            if session is None:
+                return None
+            self.stats['peeks'] += 1
+            self._load_scoped_state(app_name, user_id)
+            return self._merge_state(app_name, user_id, session)
+        if not self._rehydrate(key):
+            return None
+        return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        """Stored sessions, hot or hibernated, oldest update first (without state or events)."""
+        query = 'SELECT user_id, session_id, last_update_time FROM sessions WHERE app_name = ?'
+        params: List[Any] = [app_name]
+        if user_id is not None:
+            query += ' AND user_id = ?'
+            params.append(user_id)
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY last_update_time, user_id, session_id', params).fetchall()
+        return ListSessionsResponse(sessions=[
+            Session(app_name=app_name, user_id=uid, id=sid, state={}, events=[], last_update_time=updated)
+            for uid, sid, updated in rows])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        session_id = session_id.strip() if session_id else session_id
+        key = (app_name, user_id, session_id)
+        self._drop_hot(key)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            for table in ('sessions', 'session_state', 'session_events'):
+                self._conn.execute(f'DELETE FROM {table} WHERE app_name = ? AND user_id = ? AND session_id = ?', key)
+            self._conn.execute('COMMIT')
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> Dict[str, Any]:
+        self._load_scoped_state(app_name, user_id)
+        return await super().get_user_state(app_name=app_name, user_id=user_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        key = (session.app_name, session.user_id, session.id)
+        # A session hibernated mid-turn is read back first; the caller's copy stays valid
+        self._rehydrate(key)
+        stored = self.sessions.get(session.app_name, {}).get(session.user_id, {}).get(session.id)
+        appended = len(stored.events) if stored is not None else 0
+        event = await super().append_event(session, event)
+        if stored is not None and len(stored.events) > appended:
+            delta = event.actions.state_delta if event.actions and event.actions.state_delta else {}
+            self._write(key, stored.last_update_time, delta, event)
+            self.stats['events_written'] += 1
+        return event
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, 'hot_sessions': len(self._hot)}
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_session_service():
+    """
+    Get the process-wide agent session service selected by the sessions
+    section of adk.yaml (backend: sqlite for durable sessions, memory for
+    ADK's InMemorySessionService).
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            from agents.config_loader import get_config_section
+            from .campaign_store import _project_path
+            settings = get_config_section('sessions')
+            backend = settings.get('backend', 'memory')
+            if backend == 'sqlite':
+                _service = PersistentSessionService(
+                    _project_path(settings.get('path', 'data/sessions.db')),
+                    max_hot_sessions=settings.get('max_hot_sessions', 200),
+                    idle_seconds=settings.get('idle_seconds', 900.0),
+                )
+            elif backend == 'memory':
+                _service = InMemorySessionService()
+            else:
+                raise ValueError(f"Unknown sessions backend '{backend}' in adk.yaml (expected sqlite or memory)")
+        return _service
+
+
+def set_session_service(service) -> None:
+    """Replace the process-wide session service (e.g. with one over ':memory:' in tests)."""
+    global _service
+    _service = service
+
+
+def close_session_service() -> None:
+    """Close the durable session database, if one is open (call on shutdown)."""
+    global _service
+    if isinstance(_service, PersistentSessionService):
+        _service.close()
+    _service = None
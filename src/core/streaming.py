@@ -0,0 +1,115 @@
+"""
+Incremental agent output for streaming clients.
+
+stream_agent_events runs one player turn and yields small JSON-serializable
+dicts as the runner produces events, instead of waiting for the final
+response:
+
+- {'type': 'text', 'author', 'text'}        partial text to append to the current message
+- {'type': 'message', 'author', 'text'}     a complete message (replaces the partial text)
+- {'type': 'tool_call', 'author', 'name'}   an agent started a tool call
+- {'type': 'tool_result', 'author', 'name'} the tool call finished
+- {'type': 'error', 'message'}              the turn failed
+- {'type': 'done'}                          end of the turn
+
+The fast path and sticky dispatch apply exactly as in call_agent_async.
+Transient model errors are retried through the shared retry engine as long
+as nothing has been streamed for the turn yet; once the player has seen
+partial output, the error is reported instead. Each attempt runs in a slot
+from the turn scheduler, and completed tool calls are replayed from the turn
+journal on retries. The turn is traced and its token usage recorded like call_agent_async.
+"""
+
+from typing import AsyncGenerator, Dict
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.genai import types
+
+from .fast_path import try_fast_path
+from .dispatch import select_runner
+from .retry import get_retry_engine
+from .scheduler import schedule_turn, INTERACTIVE
+from .checkpoints import turn_checkpoint, start_attempt
+from .tracing import trace_turn, annotate_turn
+from .usage import record_turn_usage
+from .autosave import request_autosave
+
+
+def event_to_updates(event) -> list:
+    """
+    Convert one runner event to stream updates.
+
+    Args:
+        event: Event - An event from runner.run_async
+
+    Returns:
+        list - Update dicts, in the order of the event's parts
+    """
+    updates = []
+    if not event.content or not event.content.parts:
+        return updates
+    text = ""
+    for part in event.content.parts:
+        if part.function_call:
+            updates.append({'type': 'tool_call', 'author': event.author, 'name': part.function_call.name})
+        elif part.function_response:
+            updates.append({'type': 'tool_result', 'author': event.author, 'name': part.function_response.name})
+        elif part.text and not part.thought:
+            text += part.text
+    if text and not text.isspace():
+        updates.append({'type': 'text' if event.partial else 'message', 'author': event.author, 'text': text})
+    return updates
+
+
+async def stream_agent_events(runner, user_id: str, session_id: str, query: str,
+                              priority: int = INTERACTIVE) -> AsyncGenerator[Dict, None]:
+    """
+    Run one player turn and yield stream updates as they arrive.
+
+    Args:
+        runner: Runner - The root agent runner
+        user_id: str - User ID for the session
+        session_id: str - Session ID
+        query: str - The player's message
+        priority: int - Scheduler priority of the turn
+
+    Yields:
+        dict - Stream updates (see module docstring)
+    """
+    with trace_turn(session_id, query) as trace, record_turn_usage(session_id):
+        try:
+            fast_response = await try_fast_path(runner, user_id, session_id, query)
+            if fast_response is not None:
+                yield {'type': 'message', 'author': runner.agent.name, 'text': fast_response}
+            else:
+                runner = await select_runner(runner, user_id, session_id)
+                content = types.Content(role="user", parts=[types.Part(text=query)])
+                scheduler_wait = 0.0
+
+                def report_retry(e, attempt, delay):
+                    print(f"[Streaming] Transient error ({e}); retry {attempt} in {delay:.1f}s")
+
+                with turn_checkpoint(session_id) as journal:
+                    async for attempt in get_retry_engine().attempts(on_retry=report_retry):
+                        async with attempt:
+                            start_attempt(journal)
+                            async with schedule_turn(session_id, priority) as slot:
+                                scheduler_wait += slot.waited
+                                annotate_turn(attempts=attempt.number, scheduler_wait_ms=round(scheduler_wait * 1000, 3))
+                                async for event in runner.run_async(
+                                    user_id=user_id, session_id=session_id, new_message=content,
+                                    run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+                                ):
+                                    slot.record_event(event)
+                                    for update in event_to_updates(event):
+                                        # The player has seen output of this attempt: it cannot be repeated
+                                        attempt.can_retry = False
+                                        yield update
+        except Exception as e:
+            print(f"[Streaming] Error during agent run: {e}")
+            if trace is not None:
+                trace.status = 'error'
+            yield {'type': 'error', 'message': str(e)}
+    # Persisted in the background, so the player gets 'done' without waiting for a save
+    request_autosave(runner, user_id, session_id)
+    yield {'type': 'done'}
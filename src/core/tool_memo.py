@@ -0,0 +1,208 @@
+"""
+Session-scoped memoization of identical tool calls.
+
+Within a campaign the agents repeat the same lookups: get_all_classes and
+get_race_details('elf') come up several times during character creation
+alone. The memo keeps each session's tool results keyed by tool name and
+arguments, and memo_before_tool answers a repeated call without running the
+tool (and without another SRD API round trip).
+
+Results of state_tools (get_state, combat state lookups) depend on the
+campaign state: they are dropped whenever one of the mutating_tools runs, and
+are only reused while the session state is unchanged. Mutating tools and the
+tools listed in exclude are never memoized, and neither are error results.
+
+The model is told that a repeated result is unchanged: when the same agent
+already got it earlier in the turn, it receives a short notice instead of the
+full result again; in later turns it receives the result marked unchanged.
+
+Settings come from the tool_memo section of adk.yaml.
+"""
+
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from .tool_results import is_error_result
+
+UNCHANGED_KEY = 'unchanged_since_last_call'
+
+
+def _fingerprint(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _MemoEntry:
+    """A memoized tool result."""
+
+    def __init__(self, result: Any, state_fingerprint: Optional[str]):
+        self.result = result
+        self.state_fingerprint = state_fingerprint
+        # (invocation, agent) pairs that have already received the result in full
+        self.seen: Set[Tuple[str, str]] = set()
+
+
+class ToolMemo:
+    """Per-session tool results, with invalidation when campaign state changes."""
+
+    def __init__(self, mutating_tools: Iterable[str] = (), state_tools: Iterable[str] = (), exclude: Iterable[str] = (),
+                 max_sessions: int = 200, max_entries_per_session: int = 256):
+        """
+        Args:
+            mutating_tools: Iterable[str] - Tools that change campaign state; never memoized, and clear state_tools results
+            state_tools: Iterable[str] - Tools whose results depend on campaign state
+            exclude: Iterable[str] - Other tools that are never memoized (e.g. dice rolls)
+            max_sessions: int - Sessions with memoized results kept, least recently used first out
+            max_entries_per_session: int - Results kept per session, least recently used first out
+        """
+        self.mutating_tools = set(mutating_tools)
+        self.state_tools = set(state_tools)
+        self.exclude = set(exclude)
+        self.max_sessions = max_sessions
+        self.max_entries_per_session = max_entries_per_session
+        self._sessions: 'OrderedDict[str, OrderedDict[Tuple[str, str], _MemoEntry]]' = OrderedDict()
+        # Function call ids answered from the memo, so after_tool does not store them again
+        self._served_call_ids: Set[str] = set()
+        self.stats = {'hits': 0, 'misses': 0, 'unchanged_notices': 0, 'stored': 0, 'invalidations': 0}
+
+    def is_memoizable(self, tool_name: str) -> bool:
+        return tool_name not in self.mutating_tools and tool_name not in self.exclude
+
+    @staticmethod
+    def call_key(tool_name: str, args: Dict[str, Any]) -> Tuple[str, str]:
+        return tool_name, json.dumps(args or {}, sort_keys=True, default=str)
+
+    def _state_fingerprint(self, tool_name: str, state: Dict[str, Any]) -> Optional[str]:
+        return _fingerprint(state) if tool_name in self.state_tools else None
+
+    def _session(self, session_id: str) -> 'OrderedDict[Tuple[str, str], _MemoEntry]':
+        entries = self._sessions.get(session_id)
+        if entries is None:
+            entries = self._sessions[session_id] = OrderedDict()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return entries
+
+    def lookup(self, session_id: str, tool_name: str, args: Dict[str, Any], state: Dict[str, Any],
+               invocation_id: str, agent_name: str, call_id: Optional[str] = None) -> Optional[Any]:
+        """
+        Get the memoized result of a call.
+
+        Returns:
+            Any | None - A notice that the result is unchanged if this agent already received it in this
+            invocation, the memoized result marked unchanged otherwise, or None on a miss
+        """
+        if not self.is_memoizable(tool_name):
+            return None
+        entries = self._session(session_id)
+        key = self.call_key(tool_name, args)
+        entry = entries.get(key)
+        if entry is None or entry.state_fingerprint != self._state_fingerprint(tool_name, state):
+            self.stats['misses'] += 1
+            return None
+        entries.move_to_end(key)
+        self.stats['hits'] += 1
+        if call_id:
+            self._served_call_ids.add(call_id)
+        seen_key = (invocation_id, agent_name)
+        if seen_key in entry.seen:
+            self.stats['unchanged_notices'] += 1
+            return {UNCHANGED_KEY: True,
+                    'message': f"{tool_name} returns the same result as your earlier call with these arguments in this turn; use that result."}
+        entry.seen.add(seen_key)
+        result = copy.deepcopy(entry.result)
+        if isinstance(result, dict):
+            return {**result, UNCHANGED_KEY: True}
+        return {'result': result, UNCHANGED_KEY: True}
+
+    def store(self, session_id: str, tool_name: str, args: Dict[str, Any], state: Dict[str, Any], result: Any,
+              invocation_id: str, agent_name: str, call_id: Optional[str] = None) -> None:
+        """Record a completed call, or invalidate state-dependent results if the tool mutates state."""
+        if call_id and call_id in self._served_call_ids:
+            self._served_call_ids.discard(call_id)
+            return
+        if tool_name in self.mutating_tools:
+            self.invalidate(session_id)
+            return
+        if not self.is_memoizable(tool_name) or is_error_result(result):
+            return
+        entries = self._session(session_id)
+        entry = _MemoEntry(copy.deepcopy(result), self._state_fingerprint(tool_name, state))
+        entry.seen.add((invocation_id, agent_name))
+        key = self.call_key(tool_name, args)
+        entries[key] = entry
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries_per_session:
+            entries.popitem(last=False)
+        self.stats['stored'] += 1
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop a session's state-dependent results."""
+        entries = self._sessions.get(session_id)
+        if not entries:
+            return
+        stale = [key for key in entries if key[0] in self.state_tools]
+        for key in stale:
+            del entries[key]
+        if stale:
+            self.stats['invalidations'] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, 'sessions': len(self._sessions),
+                'entries': sum(len(entries) for entries in list(self._sessions.values()))}
+
+
+_memo: Optional[ToolMemo] = None
+
+
+def get_tool_memo() -> Optional[ToolMemo]:
+    """
+    Get the process-wide tool memo configured by the tool_memo section of
+    adk.yaml, or None if memoization is disabled.
+    """
+    global _memo
+    if _memo is None:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('tool_memo')
+        if not settings.get('enabled', False):
+            return None
+        _memo = ToolMemo(
+            mutating_tools=settings.get('mutating_tools', []) or [],
+            state_tools=settings.get('state_tools', []) or [],
+            exclude=settings.get('exclude', []) or [],
+            max_sessions=settings.get('max_sessions', 200),
+            max_entries_per_session=settings.get('max_entries_per_session', 256),
+        )
+    return _memo
+
+
+def set_tool_memo(memo: Optional[ToolMemo]) -> None:
+    """Replace the process-wide tool memo (e.g. with a test tool list)."""
+    global _memo
+    _memo = memo
+
+
+async def memo_before_tool(tool, args, tool_context):
+    """before_tool_callback that answers a repeated call from the session's memo."""
+    memo = get_tool_memo()
+    if memo is None:
+        return None
+    result = memo.lookup(tool_context.session.id, tool.name, args, tool_context.state.to_dict(),
+                         tool_context.invocation_id, tool_context.agent_name, tool_context.function_call_id)
+    if result is not None:
+        print(f"[ToolMemo] {tool.name} for {tool_context.agent_name} answered from the session memo")
+    return result
+
+
+async def memo_after_tool(tool, args, tool_context, tool_response):
+    """after_tool_callback that memoizes a completed call, or invalidates the memo after a state change."""
+    memo = get_tool_memo()
+    if memo is not None:
+        memo.store(tool_context.session.id, tool.name, args, tool_context.state.to_dict(), tool_response,
+                   tool_context.invocation_id, tool_context.agent_name, tool_context.function_call_id)
+    return None
@@ -0,0 +1,208 @@
+"""
+Elision of large tool outputs in the conversation history.
+
+SRD lookups return full stat blocks, spell lists and rules sections, and ADK
+re-sends every tool result in the session history on each later model call.
+The elide_tool_outputs before_model_callback replaces tool results from
+earlier turns in the request with a compact stub: the fields that fit in a
+line, a size note for the rest, and a reference. Results larger than
+max_output_bytes are elided from the turn after they were fetched; smaller
+ones (above min_output_bytes) once they are elide_after_turns turns old.
+Results of the current turn are always sent in full.
+
+An agent that needs an elided result again calls expand_tool_output(ref),
+which finds the original in the session's events; the session itself is
+never changed. Agents get the tool and its instruction automatically when
+elision is enabled.
+
+Settings come from the tool_outputs section of adk.yaml.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from google.adk.tools.tool_context import ToolContext
+
+from .history import player_messages, split_turns
+
+EXPAND_TOOL_NAME = 'expand_tool_output'
+
+# Appended to the instructions of agents with tools while elision is enabled
+EXPAND_TOOL_OUTPUT_INSTRUCTION = """## ELIDED TOOL RESULTS
+Large results of tool calls from earlier turns are shortened in the conversation to a stub with `"elided": true`
+and a `ref`. The stub keeps the short fields of the result. If you need the rest of it, call
+**expand_tool_output(ref)** to get the full result instead of repeating the original lookup."""
+
+# Longest string field kept verbatim in a stub
+MAX_STUB_FIELD_CHARS = 120
+
+
+def output_ref(name: str, response: Any) -> str:
+    """Stable reference to a tool result, derived from its tool name and content."""
+    payload = json.dumps(response, sort_keys=True, default=str)
+    return f"{name}#{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]}"
+
+
+def output_bytes(response: Any) -> int:
+    return len(json.dumps(response, default=str).encode('utf-8'))
+
+
+def _describe(value: Any) -> Any:
+    """A value if it is short, otherwise a note of its size."""
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= MAX_STUB_FIELD_CHARS else f"<{len(value)} chars>"
+    if isinstance(value, (list, tuple)):
+        return f"<list of {len(value)} items>"
+    if isinstance(value, dict):
+        return f"<object with {len(value)} fields>"
+    return f"<{type(value).__name__}>"
+
+
+def elision_stub(name: str, response: Any) -> Dict[str, Any]:
+    """
+    Compact stand-in for a tool result.
+
+    Returns:
+        dict - The result's short fields, size notes for the rest, and the ref to expand it
+    """
+    if isinstance(response, dict):
+        fields = {key: _describe(value) for key, value in response.items()}
+    else:
+        fields = {'result': _describe(response)}
+    return {**fields, 'elided': True, 'ref': output_ref(name, response), 'bytes': output_bytes(response)}
+
+
+class ToolOutputElider:
+    """Replaces large or old tool results in model requests with references."""
+
+    def __init__(self, max_output_bytes: int = 4000, elide_after_turns: int = 2, min_output_bytes: int = 400):
+        """
+        Args:
+            max_output_bytes: int - Results larger than this are elided from the next turn on
+            elide_after_turns: int - Results are elided once this many turns old
+            min_output_bytes: int - Results this small are never elided
+        """
+        self.max_output_bytes = max_output_bytes
+        self.elide_after_turns = max(1, elide_after_turns)
+        self.min_output_bytes = min_output_bytes
+        self.stats = {'elided': 0, 'bytes_saved': 0, 'expanded': 0}
+
+    def should_elide(self, response: Any, age: int) -> bool:
+        """
+        Args:
+            response: Any - The tool result
+            age: int - How many turns ago the result was returned (0 for the current turn)
+        """
+        if age < 1:
+            return False
+        size = output_bytes(response)
+        if size <= self.min_output_bytes:
+            return False
+        return size > self.max_output_bytes or age >= self.elide_after_turns
+
+    def elide(self, llm_request, session) -> int:
+        """
+        Replace tool results in the request's contents; the session's events are not modified.
+
+        Returns:
+            int - Number of results elided
+        """
+        from google.genai import types
+        preamble, turns = split_turns(llm_request.contents, player_messages(session))
+        # Contents before the first player message are as old as the oldest turn
+        aged = [(len(turns), content) for content in preamble]
+        aged += [(len(turns) - 1 - index, content) for index, (_, contents) in enumerate(turns) for content in contents]
+
+        elided = 0
+        contents = []
+        for age, content in aged:
+            parts = []
+            changed = False
+            for part in content.parts or []:
+                response = part.function_response
+                if response is None or response.response is None or response.response.get('elided') \
+                        or not self.should_elide(response.response, age):
+                    parts.append(part)
+                    continue
+                stub = elision_stub(response.name, response.response)
+                parts.append(types.Part(function_response=types.FunctionResponse(id=response.id, name=response.name, response=stub)))
+                self.stats['elided'] += 1
+                self.stats['bytes_saved'] += stub['bytes'] - output_bytes(stub)
+                elided += 1
+                changed = True
+            # Rebuild changed contents instead of editing them: they may be shared with session events
+            contents.append(types.Content(role=content.role, parts=parts) if changed else content)
+        if elided:
+            llm_request.contents = contents
+        return elided
+
+    def find_output(self, session, ref: str) -> Optional[Any]:
+        """The original tool result with this ref in the session, if any."""
+        name = ref.split('#', 1)[0]
+        for event in reversed(session.events):
+            for part in (event.content.parts if event.content else None) or []:
+                response = part.function_response
+                if response is not None and response.name == name and response.response is not None \
+                        and output_ref(name, response.response) == ref:
+                    return response.response
+        return None
+
+
+_elider: Optional[ToolOutputElider] = None
+
+
+def get_tool_output_elider() -> Optional[ToolOutputElider]:
+    """
+    Get the process-wide tool output elider configured by the tool_outputs
+    section of adk.yaml, or None if elision is disabled.
+    """
+    global _elider
+    if _elider is None:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('tool_outputs')
+        if not settings.get('enabled', False):
+            return None
+        _elider = ToolOutputElider(
+            max_output_bytes=settings.get('max_output_bytes', 4000),
+            elide_after_turns=settings.get('elide_after_turns', 2),
+            min_output_bytes=settings.get('min_output_bytes', 400),
+        )
+    return _elider
+
+
+def set_tool_output_elider(elider: Optional[ToolOutputElider]) -> None:
+    """Replace the process-wide elider (e.g. with test thresholds)."""
+    global _elider
+    _elider = elider
+
+
+async def elide_tool_outputs(callback_context, llm_request):
+    """
+    before_model_callback that shortens large and old tool results in the request.
+    Runs before history compaction, so compaction measures the elided history.
+    """
+    elider = get_tool_output_elider()
+    if elider is not None and llm_request.contents:
+        elider.elide(llm_request, callback_context.session)
+    return None
+
+
+def expand_tool_output(ref: str, tool_context: ToolContext) -> dict:
+    """
+    Returns the full result of an earlier tool call that was shortened in the conversation.
+
+    Args:
+        ref: str - The ref from the shortened result, e.g. 'get_spell_details#1a2b3c4d5e6f'
+
+    Returns:
+        dict - The original tool result, or an error if the ref is unknown
+    """
+    elider = get_tool_output_elider() or ToolOutputElider()
+    output = elider.find_output(tool_context.session, ref)
+    if output is None:
+        return {'error': f"No earlier tool result with ref '{ref}' in this session. Repeat the original tool call instead."}
+    elider.stats['expanded'] += 1
+    return output
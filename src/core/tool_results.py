@@ -0,0 +1,20 @@
+"""
+Helpers for inspecting tool results.
+
+Tool callbacks that keep results beyond the call (turn checkpoints, the tool
+memo) must not keep failures, or a failed call would be replayed instead of
+being retried. Tools report failures in several shapes: an error dict, a
+string starting with "Error" (the campaign and combat tools), or None (the
+SRD lookups when the API request fails).
+"""
+
+from typing import Any
+
+
+def is_error_result(result: Any) -> bool:
+    """True if a tool result reports a failure (or carries no result at all)."""
+    if result is None:
+        return True
+    if isinstance(result, str):
+        return result.startswith('Error')
+    return isinstance(result, dict) and ('error' in result or result.get('success') is False or result.get('status') == 'error')
@@ -0,0 +1,415 @@
+"""
+Per-turn latency tracing across agents, model calls and tools.
+
+Each player turn is a trace of nested spans:
+
+    turn                      run_agent_with_retry / stream_agent_events
+      agent                   before/after_agent_callback (sub agents nest under the agent that transferred)
+        model                 before/after_model_callback, with request/response sizes and token counts
+        tool                  before/after_tool_callback, with argument and result sizes
+
+Spans are collected in memory while the turn runs and exported when it ends:
+to a JSONL file (one span per line), and/or to the process's OpenTelemetry
+tracer provider, so any OTLP collector configured through the SDK receives
+them. The most recent turns are kept in memory for slowest_spans(), and
+`python -m core.tracing [path]` summarizes a JSONL trace file.
+
+Settings come from the tracing section of adk.yaml.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+TURN = 'turn'
+AGENT = 'agent'
+MODEL = 'model'
+TOOL = 'tool'
+
+
+class Span:
+    """One timed operation within a turn."""
+
+    def __init__(self, trace_id: str, name: str, kind: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status = 'ok'
+
+    @property
+    def finished(self) -> bool:
+        return self.duration_ms is not None
+
+    def end(self, status: str = 'ok', **attributes) -> None:
+        if self.finished:
+            return
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        self.status = status
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_time': self.start_time,
+            'duration_ms': round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+class TurnTrace:
+    """The spans of one player turn."""
+
+    def __init__(self, session_id: str, query: str):
+        self.trace_id = uuid.uuid4().hex
+        self.root = Span(self.trace_id, 'turn', TURN, attributes={'session_id': session_id, 'query_chars': len(query or '')})
+        self.spans: List[Span] = [self.root]
+        # Set by the caller when the turn fails without raising
+        self.status: Optional[str] = None
+        self._agent_stack: List[Span] = []
+        self._open: Dict[tuple, Span] = {}
+
+    def _parent_for(self, agent_name: Optional[str]) -> Span:
+        for span in reversed(self._agent_stack):
+            if span.name == agent_name:
+                return span
+        return self._agent_stack[-1] if self._agent_stack else self.root
+
+    def start(self, key: tuple, name: str, kind: str, agent_name: Optional[str] = None, **attributes) -> Span:
+        parent = self.root if kind == AGENT and not self._agent_stack else self._parent_for(agent_name)
+        span = Span(self.trace_id, name, kind, parent.span_id, attributes)
+        self.spans.append(span)
+        self._open[key] = span
+        if kind == AGENT:
+            self._agent_stack.append(span)
+        return span
+
+    def end(self, key: tuple, status: str = 'ok', **attributes) -> Optional[Span]:
+        span = self._open.pop(key, None)
+        if span is None:
+            return None
+        span.end(status, **attributes)
+        if span in self._agent_stack:
+            self._agent_stack.remove(span)
+        return span
+
+    def get_open(self, key: tuple) -> Optional[Span]:
+        return self._open.get(key)
+
+    def finish(self, status: str = 'ok', **attributes) -> None:
+        """End the turn, closing spans left open by a failed attempt."""
+        for key in list(self._open):
+            self.end(key, status='unfinished')
+        self.root.end(status, **attributes)
+
+
+class JsonlExporter:
+    """Appends spans to a JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + '\n')
+
+
+class OpenTelemetryExporter:
+    """Re-emits spans through the OpenTelemetry tracer provider, if the API is installed."""
+
+    def __init__(self, tracer_provider=None):
+        from opentelemetry import trace
+        self._trace = trace
+        self._tracer = trace.get_tracer('dungeon_master.turns', tracer_provider=tracer_provider)
+
+    def export(self, spans: List[Span]) -> None:
+        otel_spans = {}
+        for span in spans:
+            parent = otel_spans.get(span.parent_id)
+            context = self._trace.set_span_in_context(parent) if parent is not None else None
+            start_ns = int(span.start_time * 1e9)
+            otel_span = self._tracer.start_span(
+                span.name if span.kind == TURN else f"{span.kind} {span.name}", context=context, start_time=start_ns,
+                attributes={f"dm.{key}": value for key, value in span.attributes.items()
+                            if isinstance(value, (str, bool, int, float))},
+            )
+            otel_span.set_attribute('dm.kind', span.kind)
+            otel_span.set_attribute('dm.status', span.status)
+            otel_spans[span.span_id] = otel_span
+        # Children end before their parents
+        for span in reversed(spans):
+            otel_spans[span.span_id].end(end_time=int((span.start_time + (span.duration_ms or 0) / 1000) * 1e9))
+
+
+class Tracer:
+    """Collects turn traces and hands finished turns to the exporters."""
+
+    def __init__(self, exporters: Optional[List[Any]] = None, recent_turns: int = 200):
+        self.exporters = list(exporters or [])
+        self.recent: deque = deque(maxlen=recent_turns)
+
+    @contextlib.contextmanager
+    def turn(self, session_id: str, query: str) -> Iterator[TurnTrace]:
+        trace = TurnTrace(session_id, query)
+        token = _current_trace.set(trace)
+        status = 'ok'
+        try:
+            yield trace
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            _current_trace.reset(token)
+            trace.finish(trace.status or status)
+            self.record(trace)
+
+    def record(self, trace: TurnTrace) -> None:
+        self.recent.append([span.to_dict() for span in trace.spans])
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace.spans)
+            except Exception as e:
+                print(f"[Tracing] Export to {type(exporter).__name__} failed: {e}")
+
+    def slowest_spans(self, limit: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The slowest spans of the recent turns, optionally of one kind."""
+        return slowest_spans((span for spans in list(self.recent) for span in spans), limit, kind)
+
+
+_current_trace: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar('turn_trace', default=None)
+_tracer: Optional[Tracer] = None
+
+
+def _project_path(path: str) -> str:
+    if os.path.isabs(path):
+        return path
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, path)
+
+
+def get_tracer() -> Optional[Tracer]:
+    """
+    Get the process-wide tracer configured by the tracing section of adk.yaml,
+    or None if tracing is disabled.
+    """
+    global _tracer
+    if _tracer is None:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('tracing')
+        if not settings.get('enabled', False):
+            return None
+        exporters = []
+        for name in settings.get('exporters', ['jsonl']) or []:
+            if name == 'jsonl':
+                exporters.append(JsonlExporter(_project_path(settings.get('jsonl_path', 'logs/traces.jsonl'))))
+            elif name == 'otel':
+                try:
+                    exporters.append(OpenTelemetryExporter())
+                except ImportError:
+                    print("[Tracing] opentelemetry is not installed; skipping the otel exporter")
+            else:
+                raise ValueError(f"Invalid tracing.exporters in adk.yaml: unknown exporter '{name}'")
+        _tracer = Tracer(exporters, recent_turns=settings.get('recent_turns', 200))
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> None:
+    """Replace the process-wide tracer (e.g. with one without exporters in tests)."""
+    global _tracer
+    _tracer = tracer
+
+
+@contextlib.contextmanager
+def trace_turn(session_id: str, query: str) -> Iterator[Optional[TurnTrace]]:
+    """Trace one player turn; yields None when tracing is disabled."""
+    tracer = get_tracer()
+    if tracer is None:
+        yield None
+        return
+    with tracer.turn(session_id, query) as trace:
+        yield trace
+
+
+def annotate_turn(**attributes) -> None:
+    """Set attributes on the current turn span (e.g. attempts, scheduler wait), if a turn is traced."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.root.attributes.update(attributes)
+
+
+def format_turn_summary(trace: Optional[TurnTrace]) -> Optional[str]:
+    """One-line timing breakdown of a finished turn, e.g. for the console."""
+    if trace is None or not trace.root.finished:
+        return None
+    parts = []
+    for span in trace.spans[1:]:
+        if span.kind == AGENT:
+            parts.append(f"{span.name} {span.duration_ms or 0:.0f}ms")
+    slowest = sorted((s for s in trace.spans if s.kind in (MODEL, TOOL) and s.finished), key=lambda s: -s.duration_ms)[:3]
+    detail = ', '.join(f"{s.kind} {s.name} {s.duration_ms:.0f}ms" for s in slowest)
+    return f"[Trace] turn {trace.root.duration_ms:.0f}ms: {' → '.join(parts) or 'no agents'}" + (f" (slowest: {detail})" if detail else '')
+
+
+# --- callbacks ---
+
+def _content_chars(contents) -> int:
+    total = 0
+    for content in contents or []:
+        for part in getattr(content, 'parts', None) or []:
+            if part.text:
+                total += len(part.text)
+            elif part.function_call:
+                total += len(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                total += len(json.dumps(part.function_response.response or {}, default=str))
+    return total
+
+
+def _payload_chars(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+async def trace_before_agent(callback_context):
+    """before_agent_callback that opens an agent span."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.start((AGENT, callback_context.invocation_id, callback_context.agent_name),
+                    callback_context.agent_name, AGENT, callback_context.agent_name)
+    return None
+
+
+async def trace_after_agent(callback_context):
+    """after_agent_callback that closes the agent span."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.end((AGENT, callback_context.invocation_id, callback_context.agent_name))
+    return None
+
+
+async def trace_before_model(callback_context, llm_request):
+    """before_model_callback that opens a model span; runs after callbacks that change the request."""
+    trace = _current_trace.get()
+    if trace is not None:
+        config = llm_request.config
+        trace.start(
+            (MODEL, callback_context.invocation_id, callback_context.agent_name), llm_request.model, MODEL,
+            callback_context.agent_name,
+            request_chars=_content_chars(llm_request.contents),
+            system_instruction_chars=len(str(config.system_instruction or '')) if config else 0,
+            cached_prefix=bool(config and config.cached_content),
+        )
+    return None
+
+
+async def trace_after_model(callback_context, llm_response):
+    """after_model_callback that closes the model span (on the final chunk when streaming)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    key = (MODEL, callback_context.invocation_id, callback_context.agent_name)
+    span = trace.get_open(key)
+    if span is None:
+        return None
+    if 'first_chunk_ms' not in span.attributes:
+        span.attributes['first_chunk_ms'] = round((time.perf_counter() - span._start) * 1000, 3)
+    span.attributes['response_chars'] = span.attributes.get('response_chars', 0) + _content_chars(
+        [llm_response.content] if llm_response.content else [])
+    if llm_response.partial:
+        return None
+    usage = llm_response.usage_metadata
+    attributes = {}
+    if usage is not None:
+        attributes = {
+            'prompt_tokens': usage.prompt_token_count or 0,
+            'cached_tokens': usage.cached_content_token_count or 0,
+            'output_tokens': usage.candidates_token_count or 0,
+        }
+    trace.end(key, 'error' if llm_response.error_code else 'ok', **attributes)
+    return None
+
+
+async def trace_model_error(callback_context, llm_request, error):
+    """on_model_error_callback that closes the model span with the error."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.end((MODEL, callback_context.invocation_id, callback_context.agent_name), 'error', error=str(error)[:200])
+    return None
+
+
+async def trace_before_tool(tool, args, tool_context):
+    """before_tool_callback that opens a tool span; runs before callbacks that may answer the call."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.start((TOOL, tool_context.function_call_id), tool.name, TOOL, tool_context.agent_name,
+                    args_chars=_payload_chars(args))
+    return None
+
+
+async def trace_after_tool(tool, args, tool_context, tool_response):
+    """after_tool_callback that closes the tool span."""
+    trace = _current_trace.get()
+    if trace is not None:
+        is_error = isinstance(tool_response, dict) and 'error' in tool_response
+        trace.end((TOOL, tool_context.function_call_id), 'error' if is_error else 'ok',
+                  result_chars=_payload_chars(tool_response))
+    return None
+
+
+# --- summaries ---
+
+def slowest_spans(spans: Iterable[Dict[str, Any]], limit: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """The slowest finished spans among span dicts, optionally of one kind."""
+    candidates = [span for span in spans if span.get('duration_ms') is not None and (kind is None or span['kind'] == kind)]
+    return sorted(candidates, key=lambda span: -span['duration_ms'])[:limit]
+
+
+def summarize(spans: List[Dict[str, Any]], limit: int = 10) -> str:
+    """Text report: per-kind/name latency aggregates and the slowest spans."""
+    totals: Dict[tuple, List[float]] = {}
+    for span in spans:
+        if span.get('duration_ms') is not None:
+            totals.setdefault((span['kind'], span['name']), []).append(span['duration_ms'])
+    lines = [f"{'kind':<6} {'name':<40} {'count':>6} {'avg ms':>10} {'p95 ms':>10} {'max ms':>10}"]
+    for (kind, name), durations in sorted(totals.items(), key=lambda item: -sum(item[1])):
+        durations.sort()
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        lines.append(f"{kind:<6} {name[:40]:<40} {len(durations):>6} {sum(durations) / len(durations):>10.1f} {p95:>10.1f} {durations[-1]:>10.1f}")
+    lines.append('')
+    lines.append(f"Slowest {limit} spans:")
+    for span in slowest_spans(spans, limit):
+        lines.append(f"  {span['duration_ms']:>10.1f} ms  {span['kind']:<6} {span['name']}  trace={span['trace_id'][:8]} {span['status']}")
+    return '\n'.join(lines)
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == '__main__':
+    trace_path = sys.argv[1] if len(sys.argv) > 1 else _project_path('logs/traces.jsonl')
+    print(summarize(load_spans(trace_path)))
@@ -0,0 +1,304 @@
+"""
+Token and cost accounting per model call, aggregated per agent, turn and campaign.
+
+usage_after_model records the prompt, cached and output token counts of every
+model call (from the response's usage metadata) and prices them with the
+per-model rates in the usage section of adk.yaml. The ledger keeps running
+totals per agent, per campaign and overall, plus the most recent calls and
+turns, and serves them to the /api/usage endpoints. Per-campaign totals are
+kept for the max_campaigns most recently active campaigns; the least
+recently used one is dropped first.
+
+Budgets are soft or hard limits on a turn's tokens and on a campaign's cost
+over a rolling window. usage_before_model enforces them on the next model call:
+over a soft limit, the request is sent to the cheaper budget model; over a hard
+limit, its output length is capped as well. Play never stops on a budget.
+"""
+
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterator, List, Optional
+
+# Model calls awaiting their usage metadata, kept per (invocation, agent)
+MAX_PENDING_CALLS = 256
+
+OK = 'ok'
+SOFT = 'soft'
+HARD = 'hard'
+
+_turn_ids = itertools.count(1)
+
+
+def _empty_totals() -> Dict[str, float]:
+    return {'calls': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'output_tokens': 0, 'total_tokens': 0, 'cost_usd': 0.0}
+
+
+def _add(totals: Dict[str, float], record: Dict[str, Any]) -> None:
+    totals['calls'] += 1
+    for key in ('prompt_tokens', 'cached_tokens', 'output_tokens', 'total_tokens'):
+        totals[key] += record[key]
+    totals['cost_usd'] += record['cost_usd']
+
+
+class TurnUsage:
+    """Token usage of one player turn."""
+
+    def __init__(self, campaign_id: str):
+        self.turn_id = f"{campaign_id}:{next(_turn_ids)}"
+        self.campaign_id = campaign_id
+        self.started_at = time.time()
+        self.totals = _empty_totals()
+        self.by_agent: Dict[str, Dict[str, float]] = {}
+
+    def add(self, record: Dict[str, Any]) -> None:
+        # The session's campaign_id, once the agents report it, names the turn's campaign
+        self.campaign_id = record['campaign_id']
+        _add(self.totals, record)
+        _add(self.by_agent.setdefault(record['agent'], _empty_totals()), record)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'turn_id': self.turn_id, 'campaign_id': self.campaign_id, 'started_at': self.started_at,
+                **self.totals, 'by_agent': self.by_agent}
+
+
+class UsageLedger:
+    """Process-wide token and cost totals, with budget checks."""
+
+    def __init__(self, pricing: Optional[Dict[str, Dict[str, float]]] = None, budgets: Optional[Dict[str, Any]] = None,
+                 recent_calls: int = 500, recent_turns: int = 200, max_campaigns: int = 1000):
+        """
+        Args:
+            pricing: Dict - USD per million tokens per model: {model: {input, cached_input, output}}
+            budgets: Dict - The budgets block of the usage section (turn, campaign, actions)
+            recent_calls: int - How many individual model calls to keep
+            recent_turns: int - How many finished turns to keep
+            max_campaigns: int - Campaigns with totals and a budget window kept, least recently used first out
+        """
+        self.pricing = pricing or {}
+        self.budgets = budgets or {}
+        self.totals = _empty_totals()
+        self.by_agent: Dict[str, Dict[str, float]] = {}
+        self.by_model: Dict[str, Dict[str, float]] = {}
+        self.max_campaigns = max_campaigns
+        self.by_campaign: 'OrderedDict[str, Dict[str, float]]' = OrderedDict()
+        self.calls: deque = deque(maxlen=recent_calls)
+        self.turns: deque = deque(maxlen=recent_turns)
+        self._campaign_window: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def price(self, model: str, prompt_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+        """Cost in USD of one call; unpriced models cost 0."""
+        rates = self.pricing.get(model)
+        if not rates:
+            return 0.0
+        uncached = max(0, prompt_tokens - cached_tokens)
+        cached_rate = rates.get('cached_input', rates.get('input', 0.0))
+        return (uncached * rates.get('input', 0.0) + cached_tokens * cached_rate
+                + output_tokens * rates.get('output', 0.0)) / 1_000_000
+
+    def record(self, campaign_id: str, agent: str, model: str, usage, turn: Optional[TurnUsage] = None) -> Dict[str, Any]:
+        """
+        Record one model call.
+
+        Args:
+            campaign_id: str - The campaign (session) the call belongs to
+            agent: str - The calling agent
+            model: str - The model that served the call
+            usage: GenerateContentResponseUsageMetadata - The response's usage metadata
+            turn: TurnUsage - The turn in progress, if any
+
+        Returns:
+            dict - The call record
+        """
+        prompt_tokens = usage.prompt_token_count or 0
+        cached_tokens = usage.cached_content_token_count or 0
+        output_tokens = (usage.candidates_token_count or 0) + (getattr(usage, 'thoughts_token_count', None) or 0)
+        record = {
+            'time': time.time(),
+            'campaign_id': campaign_id,
+            'turn_id': turn.turn_id if turn else None,
+            'agent': agent,
+            'model': model,
+            'prompt_tokens': prompt_tokens,
+            'cached_tokens': cached_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': usage.total_token_count or prompt_tokens + output_tokens,
+            'cost_usd': self.price(model, prompt_tokens, cached_tokens, output_tokens),
+        }
+        with self._lock:
+            _add(self.totals, record)
+            _add(self.by_agent.setdefault(agent, _empty_totals()), record)
+            _add(self.by_model.setdefault(model, _empty_totals()), record)
+            _add(self.by_campaign.setdefault(campaign_id, _empty_totals()), record)
+            self.by_campaign.move_to_end(campaign_id)
+            self._campaign_window.setdefault(campaign_id, deque()).append((record['time'], record['cost_usd']))
+            while len(self.by_campaign) > self.max_campaigns:
+                evicted, _ = self.by_campaign.popitem(last=False)
+                self._campaign_window.pop(evicted, None)
+            self.calls.append(record)
+        if turn is not None:
+            turn.add(record)
+        return record
+
+    def finish_turn(self, turn: TurnUsage) -> None:
+        with self._lock:
+            self.turns.append(turn.to_dict())
+
+    def campaign_window_cost(self, campaign_id: str) -> float:
+        """The campaign's cost within the budget window."""
+        window_hours = self.budgets.get('campaign', {}).get('window_hours', 24)
+        cutoff = time.time() - window_hours * 3600
+        with self._lock:
+            window = self._campaign_window.get(campaign_id)
+            if not window:
+                return 0.0
+            while window and window[0][0] < cutoff:
+                window.popleft()
+            return sum(cost for _, cost in window)
+
+    def budget_status(self, campaign_id: str, turn: Optional[TurnUsage] = None) -> str:
+        """
+        Check the turn and campaign budgets.
+
+        Returns:
+            str - OK, SOFT or HARD (the most severe limit reached)
+        """
+        status = OK
+        turn_budget = self.budgets.get('turn', {})
+        if turn is not None:
+            tokens = turn.totals['total_tokens']
+            if turn_budget.get('hard_tokens') and tokens >= turn_budget['hard_tokens']:
+                return HARD
+            if turn_budget.get('soft_tokens') and tokens >= turn_budget['soft_tokens']:
+                status = SOFT
+        campaign_budget = self.budgets.get('campaign', {})
+        if campaign_budget.get('soft_cost_usd') or campaign_budget.get('hard_cost_usd'):
+            cost = self.campaign_window_cost(campaign_id)
+            if campaign_budget.get('hard_cost_usd') and cost >= campaign_budget['hard_cost_usd']:
+                return HARD
+            if campaign_budget.get('soft_cost_usd') and cost >= campaign_budget['soft_cost_usd']:
+                status = SOFT
+        return status
+
+    def summary(self) -> Dict[str, Any]:
+        """Overall totals, per agent, model and campaign, and the most expensive recent turns."""
+        with self._lock:
+            turns = list(self.turns)
+            return {
+                'totals': dict(self.totals),
+                'by_agent': {name: dict(totals) for name, totals in self.by_agent.items()},
+                'by_model': {name: dict(totals) for name, totals in self.by_model.items()},
+                'by_campaign': {name: dict(totals) for name, totals in self.by_campaign.items()},
+                'costliest_turns': sorted(turns, key=lambda turn: -turn['total_tokens'])[:10],
+            }
+
+    def campaign_summary(self, campaign_id: str) -> Dict[str, Any]:
+        """Totals, budget state, recent turns and calls of one campaign."""
+        with self._lock:
+            totals = dict(self.by_campaign.get(campaign_id, _empty_totals()))
+            turns = [turn for turn in self.turns if turn['campaign_id'] == campaign_id]
+            calls = [call for call in self.calls if call['campaign_id'] == campaign_id]
+        return {
+            'campaign_id': campaign_id,
+            'totals': totals,
+            'window_cost_usd': self.campaign_window_cost(campaign_id),
+            'budget_status': self.budget_status(campaign_id),
+            'recent_turns': turns[-20:],
+            'recent_calls': calls[-50:],
+        }
+
+
+_current_turn: contextvars.ContextVar[Optional[TurnUsage]] = contextvars.ContextVar('turn_usage', default=None)
+_ledger: Optional[UsageLedger] = None
+_pending: 'OrderedDict[tuple, str]' = OrderedDict()
+
+
+def get_usage_ledger() -> Optional[UsageLedger]:
+    """
+    Get the process-wide usage ledger configured by the usage section of
+    adk.yaml, or None if usage accounting is disabled.
+    """
+    global _ledger
+    if _ledger is None:
+        from agents.config_loader import get_config_section
+        settings = get_config_section('usage')
+        if not settings.get('enabled', False):
+            return None
+        _ledger = UsageLedger(pricing=settings.get('pricing'), budgets=settings.get('budgets'),
+                              max_campaigns=settings.get('max_campaigns', 1000))
+    return _ledger
+
+
+def set_usage_ledger(ledger: Optional[UsageLedger]) -> None:
+    """Replace the process-wide ledger (e.g. with one with test budgets)."""
+    global _ledger
+    _ledger = ledger
+
+
+@contextlib.contextmanager
+def record_turn_usage(campaign_id: str) -> Iterator[Optional[TurnUsage]]:
+    """Aggregate the usage of one player turn; yields None when accounting is disabled."""
+    ledger = get_usage_ledger()
+    if ledger is None:
+        yield None
+        return
+    turn = TurnUsage(campaign_id)
+    token = _current_turn.set(turn)
+    try:
+        yield turn
+    finally:
+        _current_turn.reset(token)
+        ledger.finish_turn(turn)
+
+
+def _campaign_id(callback_context) -> str:
+    return callback_context.state.get('campaign_id') or callback_context.session.id
+
+
+async def usage_before_model(callback_context, llm_request):
+    """
+    before_model_callback that applies the turn and campaign budgets and notes
+    the model serving the call. Runs after model fallback, before the context cache.
+    """
+    ledger = get_usage_ledger()
+    if ledger is None:
+        return None
+    status = ledger.budget_status(_campaign_id(callback_context), _current_turn.get())
+    if status != OK:
+        actions = ledger.budgets.get('actions', {})
+        budget_model = actions.get('budget_model')
+        if budget_model and llm_request.model != budget_model:
+            print(f"[Usage] {status} budget reached: {callback_context.agent_name} using {budget_model} instead of {llm_request.model}")
+            llm_request.model = budget_model
+        max_output_tokens = actions.get('hard_max_output_tokens')
+        if status == HARD and max_output_tokens and llm_request.config is not None:
+            current = llm_request.config.max_output_tokens
+            llm_request.config.max_output_tokens = min(current, max_output_tokens) if current else max_output_tokens
+    _pending[(callback_context.invocation_id, callback_context.agent_name)] = llm_request.model
+    while len(_pending) > MAX_PENDING_CALLS:
+        _pending.popitem(last=False)
+    return None
+
+
+async def usage_after_model(callback_context, llm_response):
+    """after_model_callback that records the call's token usage (on the final chunk when streaming)."""
+    ledger = get_usage_ledger()
+    if ledger is None or llm_response.partial or llm_response.usage_metadata is None:
+        return None
+    model = _pending.pop((callback_context.invocation_id, callback_context.agent_name), None) or 'unknown'
+    ledger.record(_campaign_id(callback_context), callback_context.agent_name, model,
+                  llm_response.usage_metadata, _current_turn.get())
+    return None
+
+
+def format_turn_usage(turn: Optional[TurnUsage]) -> Optional[str]:
+    """One-line token and cost summary of a turn, e.g. for the console."""
+    if turn is None or not turn.totals['calls']:
+        return None
+    totals = turn.totals
+    return (f"[Usage] {totals['calls']} model calls, {totals['prompt_tokens']} prompt "
+            f"({totals['cached_tokens']} cached) + {totals['output_tokens']} output tokens, ${totals['cost_usd']:.5f}")
@@ -1,5 +1,13 @@
 import asyncio
 from google.genai import types
+from .fast_path import try_fast_path
+from .dispatch import select_runner
+from .retry import get_retry_engine, classify_error, CircuitOpenError, RATE_LIMITED
+from .scheduler import schedule_turn, INTERACTIVE
+from .checkpoints import turn_checkpoint, start_attempt
+from .tracing import trace_turn, format_turn_summary, annotate_turn
+from .usage import record_turn_usage, format_turn_usage
+from .autosave import request_autosave
 
 class Colors:
     RESET = "\033[0m"
@@ -27,93 +35,70 @@ class Colors:
     BG_WHITE = "\033[47m"
 
 
-async def run_agent_with_retry(runner, user_id, session_id, content, max_retries=10):
+async def run_agent_with_retry(runner, user_id, session_id, content, max_retries=None, priority=INTERACTIVE):
     """
-    Run an agent with retry logic for model overload errors.
+    Run an agent, retrying transient model errors (overload, quota) through the
+    shared retry engine: jittered exponential backoff, server retry hints and a
+    process-wide circuit breaker.
     
     Args:
         runner: The runner instance
         user_id: User ID for the session
         session_id: Session ID
         content: The content to send to the agent
-        max_retries: Maximum number of retry attempts (default: 10)
+        max_retries: Maximum number of retry attempts (default: the retry section of adk.yaml)
+        priority: Scheduler priority of the turn (INTERACTIVE or BACKGROUND)
     
     Returns:
         tuple: (success: bool, final_response: str, agent_name: str)
     """
-    retry_count = 0
+    engine = get_retry_engine()
+    max_attempts = engine.max_attempts if max_retries is None else max_retries + 1
     final_response_text = None
     agent_name = None
+    scheduler_wait = 0.0
 
-    while retry_count <= max_retries:
+    def report_retry(e, attempt, delay):
+        print(f"{Colors.BG_RED}{Colors.WHITE}ERROR during agent run: {e}{Colors.RESET}")
+        if getattr(e, 'fallback_model', None):
+            print(f"{Colors.BG_YELLOW}{Colors.BLACK}{Colors.BOLD}🔀 Switching to {e.fallback_model}. Retry attempt {attempt}/{max_attempts - 1}. Waiting {delay:.1f} seconds...{Colors.RESET}")
+        elif classify_error(e) == RATE_LIMITED:
+            print(f"{Colors.BG_MAGENTA}{Colors.WHITE}{Colors.BOLD}💰 Resource exhausted. Retry attempt {attempt}/{max_attempts - 1}. Waiting {delay:.1f} seconds...{Colors.RESET}")
+        else:
+            print(f"{Colors.BG_YELLOW}{Colors.BLACK}{Colors.BOLD}🔄 Model overloaded. Retry attempt {attempt}/{max_attempts - 1}. Waiting {delay:.1f} seconds...{Colors.RESET}")
+
+    # Completed state-changing tool calls are replayed from the journal on retries
+    with turn_checkpoint(session_id) as journal:
         try:
-            async for event in runner.run_async(
-                user_id=user_id, session_id=session_id, new_message=content
-            ):
-                if event.author:
-                    agent_name = event.author
-
-                response = await process_agent_response(event)
-                if response:
-                    final_response_text = response
-            
-            return True, final_response_text, agent_name
-            
-        except Exception as e:
-            error_message = str(e)
-            print(f"{Colors.BG_RED}{Colors.WHITE}ERROR during agent run: {error_message}{Colors.RESET}")
-            
-            # Check if the error is due to model overload
-            if "The model is overloaded" in error_message:
-                retry_count += 1
-                if retry_count <= max_retries:
-                    print(f"{Colors.BG_YELLOW}{Colors.BLACK}{Colors.BOLD}🔄 Model overloaded. Retry attempt {retry_count}/{max_retries}. Waiting 3 seconds...{Colors.RESET}")
-                    await asyncio.sleep(3)
-                    continue
-                else:
-                    print(f"{Colors.BG_RED}{Colors.WHITE}{Colors.BOLD}❌ Maximum retries ({max_retries}) reached. Giving up.{Colors.RESET}")
-                    return False, None, agent_name
-            
-            # Check if the error is due to quota/resource exhausted
-            elif "You exceeded your current quota" in error_message or "RESOURCE_EXHAUSTED" in error_message:
-                quota_retry_count = 0
-                quota_max_retries = 5
-                
-                while quota_retry_count < quota_max_retries:
-                    quota_retry_count += 1
-                    print(f"{Colors.BG_MAGENTA}{Colors.WHITE}{Colors.BOLD}💰 Resource exhausted. Retry attempt {quota_retry_count}/{quota_max_retries}. Waiting 30 seconds...{Colors.RESET}")
-                    await asyncio.sleep(30)
-                    
-                    try:
+            async for attempt in engine.attempts(max_attempts, on_retry=report_retry):
+                async with attempt:
+                    start_attempt(journal)
+                    # Each attempt waits for a turn slot; backoff sleeps do not hold one
+                    async with schedule_turn(session_id, priority) as slot:
+                        scheduler_wait += slot.waited
+                        annotate_turn(attempts=attempt.number, scheduler_wait_ms=round(scheduler_wait * 1000, 3))
                         async for event in runner.run_async(
                             user_id=user_id, session_id=session_id, new_message=content
                         ):
+                            slot.record_event(event)
                             if event.author:
                                 agent_name = event.author
 
                             response = await process_agent_response(event)
                             if response:
                                 final_response_text = response
-                        
-                        return True, final_response_text, agent_name
-                        
-                    except Exception as quota_e:
-                        quota_error_message = str(quota_e)
-                        print(f"{Colors.BG_RED}{Colors.WHITE}ERROR during quota retry: {quota_error_message}{Colors.RESET}")
-                        
-                        if ("You exceeded your current quota" in quota_error_message or "RESOURCE_EXHAUSTED" in quota_error_message) and quota_retry_count < quota_max_retries:
-                            continue
-                        else:
-                            print(f"{Colors.BG_RED}{Colors.WHITE}{Colors.BOLD}❌ Resource exhausted retries exhausted. Giving up.{Colors.RESET}")
-                            return False, None, agent_name
-                
-                # If we get here, quota retries were exhausted
-                return False, None, agent_name
-            
+            return True, final_response_text, agent_name
+
+        except CircuitOpenError as e:
+            print(f"{Colors.BG_RED}{Colors.WHITE}{Colors.BOLD}❌ {e}. Giving up.{Colors.RESET}")
+            return False, None, agent_name
+        except Exception as e:
+            print(f"{Colors.BG_RED}{Colors.WHITE}ERROR during agent run: {e}{Colors.RESET}")
+            if classify_error(e) is None:
+                print(f"{Colors.BG_RED}{Colors.WHITE}Non-retryable error: {e}{Colors.RESET}")
             else:
-                # If it's not a model overload or quota error, don't retry
-                print(f"{Colors.BG_RED}{Colors.WHITE}Non-retryable error: {error_message}{Colors.RESET}")
-                return False, None, agent_name
+                print(f"{Colors.BG_RED}{Colors.WHITE}{Colors.BOLD}❌ Maximum attempts ({max_attempts}) reached. Giving up.{Colors.RESET}")
+            return False, None, agent_name
 
 
 async def process_agent_response(event):
@@ -152,16 +137,32 @@ async def process_agent_response(event):
     return final_response
 
 
-async def call_agent_async(runner, user_id, session_id, query):
-    """Call the agent asynchronously with the user's query."""
+async def call_agent_async(runner, user_id, session_id, query, priority=INTERACTIVE):
+    """Call the agent asynchronously with the user's query (priority: scheduler priority of the turn)."""
     content = types.Content(role="user", parts=[types.Part(text=query)])
     print(
         f"\n{Colors.BG_GREEN}{Colors.BLACK}{Colors.BOLD}--- Running Query: {query} ---{Colors.RESET}"
     )
-    
-    success, final_response_text, agent_name = await run_agent_with_retry(
-        runner, user_id, session_id, content
-    )
 
+    with trace_turn(session_id, query) as trace, record_turn_usage(session_id) as turn_usage:
+        # Well-formed commands (save, roll, show character, get state) skip the model call
+        final_response_text = await try_fast_path(runner, user_id, session_id, query)
+        if final_response_text is not None:
+            print(f"{Colors.CYAN}{Colors.BOLD}{final_response_text}{Colors.RESET}")
+        else:
+            # During a specialist phase (e.g. combat) the owning agent answers directly
+            runner = await select_runner(runner, user_id, session_id)
+
+            success, final_response_text, agent_name = await run_agent_with_retry(
+                runner, user_id, session_id, content, priority=priority
+            )
+            if trace is not None and not success:
+                trace.status = 'error'
+
+    request_autosave(runner, user_id, session_id)
+
+    for summary in (format_turn_summary(trace), format_turn_usage(turn_usage)):
+        if summary:
+            print(f"{Colors.MAGENTA}{summary}{Colors.RESET}")
     print(f"{Colors.YELLOW}{'-' * 30}{Colors.RESET}")
     return final_response_text
\ No newline at end of file
@@ -24,7 +24,8 @@ from .tools import (
     traits,
     subraces,
     subclasses,
-    rules
+    rules,
+    srd_batch
 )
 
 __all__ = [
@@ -42,5 +43,6 @@ __all__ = [
     "traits",
     "subraces",
     "subclasses",
-    "rules"
+    "rules",
+    "srd_batch"
 ]
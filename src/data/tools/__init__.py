@@ -3,6 +3,7 @@
 from .tools import _get_item_details, _fetch_index
 from .campaign_outline import generate_campaign_outline, load_campaign_outline, generate_random_campaign_outline
 from .misc_tools import (roll_dice)
+from .srd_batch import srd_lookup
 from .game_mechanics import (get_condition_details, get_damage_type_details, 
                            get_all_conditions, get_all_damage_types,
                            calculate_hp, start_combat, get_combat_state,
@@ -16,6 +17,7 @@ __all__ = [
     'load_campaign_outline', 
     'generate_random_campaign_outline',
     'roll_dice',
+    'srd_lookup',
     'get_condition_details',
     'get_damage_type_details',
     'get_all_conditions',
@@ -2,16 +2,18 @@
 Campaign Outline Generation Tool
 
 This module provides tools for generating and saving campaign story outlines
-to the Firestore database. The outline includes the main quest, plot acts,
-key NPCs, and monsters for a cohesive campaign narrative.
+to the campaign store (Firestore or SQLite, see src/core/campaign_store.py).
+The tools are coroutines so their database I/O does not block the event loop.
+The outline includes the main quest, plot acts, key NPCs, and monsters for a
+cohesive campaign narrative.
 """
 
-from .misc_tools import get_db_client
+from .misc_tools import _campaign_store
 import random
 
-def generate_campaign_outline(campaign_id: str, outline_data: dict) -> str:
+async def generate_campaign_outline(campaign_id: str, outline_data: dict) -> str:
     """
-    Saves a campaign outline to the Firestore database.
+    Saves a campaign outline to the campaign store.
     
     Args:
         campaign_id: str - The ID of the campaign
@@ -30,34 +32,23 @@ def generate_campaign_outline(campaign_id: str, outline_data: dict) -> str:
         str - Success or error message
     """
     try:
-        # Get the database client
-        db = get_db_client()
-        if not db:
+        store = _campaign_store()
+        if not store:
             return "Error: Database client is not available."
         
-        # Save the outline to the campaign document
-        campaign_ref = db.collection('campaigns').document(campaign_id)
-        
-        # Check if campaign exists
-        campaign_doc = campaign_ref.get()
-        if not campaign_doc.exists:
+        # Save the outline with the campaign; fails if the campaign does not exist
+        if not await store.save_outline_async(campaign_id, outline_data):
             return f"Error: Campaign '{campaign_id}' not found."
         
-        # Update the campaign with the outline data
-        campaign_ref.update({
-            'campaign_outline': outline_data,
-            'outline_created': firestore.SERVER_TIMESTAMP
-        })
-        
         print(f"[CampaignOutline] Campaign outline saved for campaign '{campaign_id}'")
         return f"Campaign outline saved successfully for campaign '{campaign_id}'"
         
     except Exception as e:
         return f"Error saving campaign outline: {e}"
 
-def load_campaign_outline(campaign_id: str) -> dict:
+async def load_campaign_outline(campaign_id: str) -> dict:
     """
-    Loads a campaign outline from the Firestore database.
+    Loads a campaign outline from the campaign store.
     
     Args:
         campaign_id: str - The ID of the campaign
@@ -66,20 +57,14 @@ def load_campaign_outline(campaign_id: str) -> dict:
         dict - The campaign outline data or error message
     """
     try:
-        # Get the database client
-        db = get_db_client()
-        if not db:
+        store = _campaign_store()
+        if not store:
             return {"error": "Database client is not available."}
         
-        # Load the campaign document
-        campaign_ref = db.collection('campaigns').document(campaign_id)
-        campaign_doc = campaign_ref.get()
-        
-        if not campaign_doc.exists:
+        if not await store.campaign_exists_async(campaign_id):
             return {"error": f"Campaign '{campaign_id}' not found."}
         
-        campaign_data = campaign_doc.to_dict()
-        outline_data = campaign_data.get('campaign_outline')
+        outline_data = await store.load_outline_async(campaign_id)
         
         if not outline_data:
             return {"error": f"No campaign outline found for campaign '{campaign_id}'"}
@@ -90,7 +75,7 @@ def load_campaign_outline(campaign_id: str) -> dict:
     except Exception as e:
         return {"error": f"Error loading campaign outline: {e}"}
 
-def generate_random_campaign_outline(campaign_id: str, theme: str = "classic fantasy") -> str:
+async def generate_random_campaign_outline(campaign_id: str, theme: str = "classic fantasy") -> str:
     """
     Generates a random campaign outline based on a theme and saves it to the database.
     
@@ -106,7 +91,7 @@ def generate_random_campaign_outline(campaign_id: str, theme: str = "classic fan
         outline_data = _create_outline_from_theme(theme)
         
         # Save the outline
-        return generate_campaign_outline(campaign_id, outline_data)
+        return await generate_campaign_outline(campaign_id, outline_data)
         
     except Exception as e:
         return f"Error generating campaign outline: {e}"
@@ -58,7 +58,7 @@ def get_all_alignments() -> list[dict]:
   return _fetch_index("alignments")
 
 # --- Character Creation Tools ---
-def finalize_character(
+async def finalize_character(
     name: str, 
     race: str, 
     char_class: str, 
@@ -142,7 +142,7 @@ def finalize_character(
         equipment,
     )
 
-    set_character(char_data, tool_context)
+    await set_character(char_data, tool_context)
     return {'action': 'create_character', 'character_data': char_data, 'success': True}
 
 def create_character_data(
@@ -192,7 +192,7 @@ def create_character_data(
     return character_data
 
 
-def set_character(character_data: dict, tool_context: ToolContext) -> dict:
+async def set_character(character_data: dict, tool_context: ToolContext) -> dict:
     """
     Set characters to given value.
 
@@ -204,6 +204,9 @@ def set_character(character_data: dict, tool_context: ToolContext) -> dict:
         dict - True if the characters were set successfully, False otherwise
     """
     try:
+      # Imported here: the core package imports the agents, whose tool registry imports this module
+      from core.lazy_state import resolve_lazy_fields_async
+      await resolve_lazy_fields_async(tool_context.state, 'characters')
       tool_context.state['characters'][character_data['name']] = character_data
       return {'action': 'set_character', 'character_data': character_data, 'success': True}
     except Exception as e:
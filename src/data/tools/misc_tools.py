@@ -1,8 +1,6 @@
 import random
 from google.adk.tools.tool_context import ToolContext
 import os
-from google.cloud import firestore
-from google.oauth2 import service_account
 
 # Set up Google Cloud credentials using service account key
 SERVICE_ACCOUNT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), "config", "service-account-key.json")
@@ -11,19 +9,34 @@ SERVICE_ACCOUNT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirn
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = SERVICE_ACCOUNT_PATH
 
 def get_db_client():
-    """Initializes and returns a Firestore client."""
-    try:
-        # Use service account credentials
-        credentials = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_PATH)
-        db = firestore.Client(credentials=credentials)
-        print("[DatabaseManager] Firestore client initialized successfully.")
-        return db
-    except Exception as e:
-        print(f"[DatabaseManager] FATAL: Could not initialize Firestore client: {e}")
-        print(f"[DatabaseManager] Please ensure the service account key file exists at: {SERVICE_ACCOUNT_PATH}")
-        return None
+    """Returns the process-wide Firestore client, creating it on first use (None if unavailable)."""
+    # Imported here: the core package imports the agents, whose tool registry imports this module
+    from core.firestore_client import get_firestore_client
+    return get_firestore_client()
+
+# Campaigns whose state document is known to exist, so saves skip the existence check
+_known_campaigns = set()
+
+def _campaign_store():
+    """The configured campaign store (Firestore or SQLite), or None if it is not available."""
+    from core.campaign_store import get_campaign_store
+    return get_campaign_store()
 
-db_ = get_db_client()
+def _campaign_writer():
+    """The write-behind writer for campaign saves, or None if saves are written synchronously."""
+    from core.persistence import get_campaign_writer
+    store = _campaign_store()
+    return get_campaign_writer(store.write_fields) if store else None
+
+def _campaign_loader():
+    """The lazy campaign loader, or None if campaigns are loaded in full."""
+    from core.lazy_state import get_campaign_loader
+    return get_campaign_loader()
+
+async def _resolve_lazy_field(state, state_name: str) -> None:
+    """Make sure a field a lazy load left out is in the state before it is read or changed (without blocking the event loop)."""
+    from core.lazy_state import resolve_lazy_fields_async
+    await resolve_lazy_fields_async(state, state_name)
 
 def roll_dice(dice_notation: str) -> str:
     """
@@ -77,7 +90,7 @@ def roll_dice(dice_notation: str) -> str:
     except (ValueError, IndexError) as e:
         return f"Error parsing dice notation '{dice_notation}': {e}"
     
-def set_state(state_name: str, state_value: str, tool_context: ToolContext) -> dict:
+async def set_state(state_name: str, state_value: str, tool_context: ToolContext) -> dict:
     """
     Set given state variable to given value.
 
@@ -89,6 +102,7 @@ def set_state(state_name: str, state_value: str, tool_context: ToolContext) -> d
         dict - Action, state_name, state_value, and success
     """
     try:
+      await _resolve_lazy_field(tool_context.state, state_name)
       print(f"Current state: {tool_context.state.get(state_name, 'None')}")
       tool_context.state[state_name] = state_value
       print(f"{state_name} set to {state_value}")
@@ -97,7 +111,7 @@ def set_state(state_name: str, state_value: str, tool_context: ToolContext) -> d
       print(f"Error setting game state: {e}")
       return {'action': 'set_state', 'state_name': state_name, 'state_value': state_value, 'success': False}
     
-def get_state(state_name: str, tool_context: ToolContext) -> dict:
+async def get_state(state_name: str, tool_context: ToolContext) -> dict:
     """
     Get given state variable.
 
@@ -107,6 +121,7 @@ def get_state(state_name: str, tool_context: ToolContext) -> dict:
         dict - Action, state_name, and state_value
     """
     try:
+      await _resolve_lazy_field(tool_context.state, state_name)
       state_value = tool_context.state.get(state_name, "")
       print(f"State {state_name} set to {state_value}")
       return {'action': 'get_state', 'state_name': state_name, 'state_value': state_value, 'success': True}
@@ -115,6 +130,23 @@ def get_state(state_name: str, tool_context: ToolContext) -> dict:
       return {'action': 'get_state', 'state_name': state_name, 'state_value': None, 'success': False}
 
 
+def return_control_to_root(reason: str, tool_context: ToolContext) -> dict:
+    """
+    Hand control of the conversation back to the root agent. Call this when your
+    phase is over (combat ended, characters finished) or the player asks for
+    something outside your role; the root agent then handles the player's message.
+
+    Args:
+        reason: str - Why control is being returned, e.g. 'combat ended'
+
+    Returns:
+        dict - Action, reason, and success
+    """
+    print(f"[Dispatch] {tool_context.agent_name} returning control to root_agent: {reason}")
+    tool_context.actions.transfer_to_agent = 'root_agent'
+    return {'action': 'return_control_to_root', 'reason': reason, 'success': True}
+
+
 def create_campaign(campaign_id: str) -> dict:
   """
   Creates a new entry for a campaign in the 'campaigns' collection in the database.
@@ -124,12 +156,10 @@ def create_campaign(campaign_id: str) -> dict:
   Returns:
       dict - Action, created, and message
   """
-  if not db_:
+  store = _campaign_store()
+  if not store:
       return {'action': 'create_campaign', 'created': False, 'message': "Error: Database client is not available."}
       
-  # Create the campaign collection and relevant documents
-  campaign_ref = db_.collection(campaign_id).document('state')
-  
   initial_state = {
       'campaign_id': campaign_id,
       'game_state': 'new_campaign',
@@ -139,54 +169,86 @@ def create_campaign(campaign_id: str) -> dict:
       'characters': {},
       'combat_participants': {},
       'location': '',
-      'current_act': ''
+      'current_act': '',
+      'campaign_memory': {}
   }
   
-  campaign_ref.set(initial_state)
+  store.create_campaign(campaign_id, initial_state)
+  _known_campaigns.add(campaign_id)
+  writer = _campaign_writer()
+  if writer:
+      writer.prime(campaign_id, initial_state)
       
   print(f"[DatabaseManager] Campaign '{campaign_id}' created successfully with state document.")
   return initial_state
 
-def save_campaign(tool_context: ToolContext) -> dict:
+def campaign_state_fields(state) -> dict:
+    """
+    The campaign fields of a session state, as save_campaign and autosave store them.
+
+    Args:
+        state: State or dict - The session state
+
+    Returns:
+        dict - State fields to store (fields a lazy load has not fetched yet are left out)
+    """
+    state_data = {
+        'campaign_id': state.get('campaign_id'),
+        'game_state': state.get('game_state', ''),
+        'last_scene': state.get('last_scene', ''),
+        'campaign_outline': state.get('campaign_outline', ''),
+        'last_action': state.get('last_action', ''),
+        'characters': state.get('characters', {}),
+        'combat_participants': state.get('combat_participants', {}),
+        'location': state.get('location', ''),
+        'current_act': state.get('current_act', ''),
+        'campaign_memory': state.get('campaign_memory', {}),
+    }
+    # Fields a lazy load has not fetched yet are still stored as they were
+    from core.lazy_state import lazy_fields
+    for name in lazy_fields(state):
+        state_data.pop(name, None)
+    return state_data
+
+async def save_campaign(tool_context: ToolContext) -> dict:
     """
     Saves the current state variables to an existing campaign's state document.
     This is the only save function that should be called by agents.
+    With write-behind persistence enabled, only the fields changed since the last
+    write are queued and written in the background: the result then reports the
+    save as queued (queued True, saved False) rather than saved.
 
     Args:
         campaign_id: str - The ID of the campaign to save.
         tool_context: ToolContext - The tool context containing state variables.
 
     Returns:
-        dict - Action, saved, and message
+        dict - Action, saved, queued (write-behind only), and message
     """
     campaign_id = tool_context.state.get('campaign_id')
-    if not db_:
+    store = _campaign_store()
+    if not store:
         return {'action': 'save_campaign', 'saved': False, 'message': "Error: Database client is not available."}
 
     try:
-        campaign_ref = db_.collection(campaign_id).document('state')
-        
         # Check if campaign exists
-        campaign_doc = campaign_ref.get()
-        if not campaign_doc.exists:
-            return {'action': 'save_campaign', 'saved': False, 'message': f"Campaign '{campaign_id}' does not exist. Use create_campaign first."}
+        if campaign_id not in _known_campaigns:
+            if not await store.campaign_exists_async(campaign_id):
+                return {'action': 'save_campaign', 'saved': False, 'message': f"Campaign '{campaign_id}' does not exist. Use create_campaign first."}
+            _known_campaigns.add(campaign_id)
         
         # Get all state variables from tool_context
-        state_data = {
-            'campaign_id': campaign_id,
-            'game_state': tool_context.state.get('game_state', ''),
-            'last_scene': tool_context.state.get('last_scene', ''),
-            'campaign_outline': tool_context.state.get('campaign_outline', ''),
-            'last_action': tool_context.state.get('last_action', ''),
-            'characters': tool_context.state.get('characters', {}),
-            'combat_participants': tool_context.state.get('combat_participants', {}),
-            'location': tool_context.state.get('location', ''),
-            'current_act': tool_context.state.get('current_act', ''),
-            'last_saved': firestore.SERVER_TIMESTAMP,
-        }
+        state_data = campaign_state_fields(tool_context.state)
+        
+        writer = _campaign_writer()
+        if writer:
+            changed = writer.mark(campaign_id, state_data)
+            print(f"[DatabaseManager] Campaign '{campaign_id}' save queued ({len(changed)} changed fields).")
+            return {'action': 'save_campaign', 'saved': False, 'queued': True,
+                    'message': f"Campaign '{campaign_id}' save queued ({len(changed)} changed fields); it will be written in the background shortly."}
         
         # Update the state document
-        campaign_ref.update(state_data)
+        await store.write_fields_async({campaign_id: state_data})
         
         print(f"[DatabaseManager] Campaign '{campaign_id}' saved successfully.")
         return {'action': 'save_campaign', 'saved': True, 'message': f"Campaign '{campaign_id}' has been saved successfully."}
@@ -194,25 +256,32 @@ def save_campaign(tool_context: ToolContext) -> dict:
     except Exception as e:
         return {'action': 'save_campaign', 'saved': False, 'message': f"Error saving campaign '{campaign_id}': {e}"}
     
-def load_campaign(campaign_id: str) -> dict:
+async def load_campaign(campaign_id: str) -> dict:
     """
     Loads a campaign by its ID and retrieves state variables.
+    With lazy loading enabled, only the hot fields and the party roster are read;
+    the other fields are fetched in the background (see core.lazy_state).
+    Reads go through the store's async methods, so loading does not block the event loop.
     Args:
         campaign_id: str - The ID of the campaign to load.
 
     Returns:
         dict - State variables
     """
-    if not db_:
+    store = _campaign_store()
+    if not store:
         return {"error": "Database client is not available."}
 
     try:
-        campaign_ref = db_.collection(campaign_id).document('state')
-        campaign_doc = campaign_ref.get()
+        loader = _campaign_loader()
+        if loader:
+            return await _load_campaign_hot(loader, campaign_id)
+
+        campaign_data = await store.load_state_async(campaign_id)
         
-        if campaign_doc.exists:
-            campaign_data = campaign_doc.to_dict()
-            
+        if campaign_data is not None:
+
+            state = {}
             state['campaign_id'] = campaign_data.get('campaign_id', campaign_id)
             state['game_state'] = campaign_data.get('game_state', '')
             state['last_scene'] = campaign_data.get('last_scene', '')
@@ -222,10 +291,39 @@ def load_campaign(campaign_id: str) -> dict:
             state['combat_participants'] = campaign_data.get('combat_participants', {})
             state['location'] = campaign_data.get('location', '')
             state['current_act'] = campaign_data.get('current_act', '')
+            state['campaign_memory'] = campaign_data.get('campaign_memory', {})
+            _known_campaigns.add(campaign_id)
+            writer = _campaign_writer()
+            if writer:
+                writer.prime(campaign_id, state)
             
             print(f"[DatabaseManager] Campaign '{campaign_id}' loaded successfully with all state variables.")
             return state
         else:
             return {"error": f"Campaign with ID '{campaign_id}' not found."}
     except Exception as e:
-        return {"error": f"Error loading campaign '{campaign_id}': {e}"}
\ No newline at end of file
+        return {"error": f"Error loading campaign '{campaign_id}': {e}"}
+
+async def _load_campaign_hot(loader, campaign_id: str) -> dict:
+    """Loads a campaign's hot fields, leaving the rest to the background fetch."""
+    state = await loader.load_hot(campaign_id, {
+        'campaign_id': campaign_id,
+        'game_state': '',
+        'last_scene': '',
+        'campaign_outline': '',
+        'last_action': '',
+        'characters': {},
+        'combat_participants': {},
+        'location': '',
+        'current_act': '',
+        'campaign_memory': {},
+    })
+    if state is None:
+        return {"error": f"Campaign with ID '{campaign_id}' not found."}
+    from core.lazy_state import LAZY_FIELDS_KEY, PARTY_ROSTER_KEY
+    _known_campaigns.add(campaign_id)
+    writer = _campaign_writer()
+    if writer:
+        writer.prime(campaign_id, {name: value for name, value in state.items() if name not in (LAZY_FIELDS_KEY, PARTY_ROSTER_KEY)})
+    print(f"[DatabaseManager] Campaign '{campaign_id}' loaded with its hot fields; loading {', '.join(state[LAZY_FIELDS_KEY])} in the background.")
+    return state
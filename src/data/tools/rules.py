@@ -18,7 +18,7 @@ def get_all_rules() -> list:
 
 def get_all_rules_sections() -> list:
     """Tool to get all rules sections."""
-    result = _fetch_index("rules")
+    result = _fetch_index("rule-sections")
     return result.get('results', []) if isinstance(result, dict) else result
 
 if __name__ == "__main__":
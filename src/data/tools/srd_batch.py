@@ -0,0 +1,215 @@
+"""
+Consolidated SRD Lookup Tool
+
+A single batch lookup over every D&D 5e SRD API category. One srd_lookup call
+can fetch several entities at once, replacing the per-category
+get_X_details / get_all_X wrappers for agents configured with
+`srd_lookup: true` in adk.yaml.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from .tools import _fetch_index, _search_index, _fetch_data_by_url
+
+# Maximum number of entities fetched by a single srd_lookup call
+MAX_BATCH_SIZE = 20
+
+# Worker threads used to fetch entity details in parallel
+MAX_WORKERS = 8
+
+# Friendly category names (singular, plural, snake_case) -> API category
+SRD_CATEGORIES = {
+    "ability-scores": "ability-scores",
+    "alignments": "alignments",
+    "backgrounds": "backgrounds",
+    "classes": "classes",
+    "conditions": "conditions",
+    "damage-types": "damage-types",
+    "equipment": "equipment",
+    "equipment-categories": "equipment-categories",
+    "languages": "languages",
+    "magic-items": "magic-items",
+    "magic-schools": "magic-schools",
+    "monsters": "monsters",
+    "proficiencies": "proficiencies",
+    "races": "races",
+    "rules": "rules",
+    "rule-sections": "rule-sections",
+    "skills": "skills",
+    "spells": "spells",
+    "subclasses": "subclasses",
+    "subraces": "subraces",
+    "traits": "traits",
+    "weapon-properties": "weapon-properties",
+}
+
+_CATEGORY_ALIASES = {
+    "ability-score": "ability-scores",
+    "alignment": "alignments",
+    "background": "backgrounds",
+    "class": "classes",
+    "condition": "conditions",
+    "damage-type": "damage-types",
+    "equipment-category": "equipment-categories",
+    "item": "equipment",
+    "language": "languages",
+    "magic-item": "magic-items",
+    "magic-school": "magic-schools",
+    "monster": "monsters",
+    "proficiency": "proficiencies",
+    "race": "races",
+    "rule": "rules",
+    "rule-section": "rule-sections",
+    "skill": "skills",
+    "spell": "spells",
+    "subclass": "subclasses",
+    "subrace": "subraces",
+    "trait": "traits",
+    "weapon-property": "weapon-properties",
+}
+
+# Fields kept by view="summary", per category (name and index are always kept)
+SUMMARY_FIELDS = {
+    "monsters": ["size", "type", "alignment", "armor_class", "hit_points", "hit_dice", "speed", "challenge_rating"],
+    "spells": ["level", "school", "casting_time", "range", "components", "duration", "concentration", "ritual"],
+    "classes": ["hit_die", "saving_throws", "subclasses"],
+    "races": ["speed", "size", "ability_bonuses", "subraces"],
+    "equipment": ["equipment_category", "cost", "weight", "damage", "armor_class"],
+    "magic-items": ["equipment_category", "rarity"],
+    "backgrounds": ["starting_proficiencies", "feature"],
+}
+
+# Per-category wrapper tools that srd_lookup replaces when an agent is
+# configured with `srd_lookup: true` in adk.yaml
+SRD_LOOKUP_REPLACES = {
+    "get_ability_score_details": "ability-scores", "get_all_ability_scores": "ability-scores",
+    "get_alignment_details": "alignments", "get_all_alignments": "alignments",
+    "get_background_details": "backgrounds", "get_all_backgrounds": "backgrounds",
+    "get_class_details": "classes", "get_all_classes": "classes",
+    "get_condition_details": "conditions", "get_all_conditions": "conditions",
+    "get_damage_type_details": "damage-types", "get_all_damage_types": "damage-types",
+    "get_equipment_details": "equipment", "get_all_equipment": "equipment",
+    "get_all_equipment_categories": "equipment-categories",
+    "get_language_details": "languages", "get_all_languages": "languages",
+    "get_magic_item_details": "magic-items", "get_all_magic_items": "magic-items",
+    "get_all_magic_schools": "magic-schools",
+    "get_monster_details": "monsters", "get_all_monsters": "monsters",
+    "get_proficiency_details": "proficiencies", "get_all_proficiencies": "proficiencies",
+    "get_race_details": "races", "get_all_races": "races",
+    "get_rules_details": "rules", "get_rules_by_section": "rules", "get_all_rules": "rules",
+    "get_all_rules_sections": "rule-sections",
+    "get_skill_details": "skills", "get_all_skills": "skills",
+    "get_spell_details": "spells", "get_all_spells": "spells",
+    "get_subclass_details": "subclasses", "get_all_subclasses": "subclasses",
+    "get_subrace_details": "subraces", "get_all_subraces": "subraces",
+    "get_trait_details": "traits", "get_all_traits": "traits",
+    "get_weapon_property_details": "weapon-properties", "get_all_weapon_properties": "weapon-properties",
+}
+
+# Appended to the instructions of agents using srd_lookup in place of the wrappers
+SRD_LOOKUP_INSTRUCTION = """## SRD LOOKUP TOOL
+The per-category lookup tools mentioned above (get_*_details and get_all_*) are provided through a single tool:
+- **srd_lookup(category, names, view)**: Look up one or more D&D entities in one call.
+  - `category`: e.g. 'monsters', 'spells', 'races', 'classes', 'magic-items', 'backgrounds'
+  - `names`: the entity names to fetch, e.g. ['goblin', 'owlbear']. Pass an empty list to browse the whole category.
+  - `view`: 'full' for complete data, 'summary' for key fields only, 'index' to only resolve names.
+Fetch everything you need for a step in a single srd_lookup call instead of one call per entity."""
+
+
+def normalize_category(category: str) -> str | None:
+    """
+    Map a user-facing category name to its SRD API category.
+
+    Args:
+        category: str - e.g. 'spell', 'Magic Items', 'damage_types'
+
+    Returns:
+        str | None - The API category, or None if unknown
+    """
+    key = str(category or "").strip().lower().replace("_", "-").replace(" ", "-")
+    if key in SRD_CATEGORIES:
+        return SRD_CATEGORIES[key]
+    return _CATEGORY_ALIASES.get(key)
+
+
+def _index_items(index: list | dict) -> list:
+    """Flatten an API index response to its list of items."""
+    if isinstance(index, dict):
+        return index.get('results', [])
+    return index or []
+
+
+def _summarize(category: str, data: dict) -> dict:
+    """Reduce full entity data to the fields used by view='summary'."""
+    summary = {"name": data.get("name"), "index": data.get("index")}
+    for field in SUMMARY_FIELDS.get(category, []):
+        if field in data:
+            summary[field] = data[field]
+    desc = data.get("desc")
+    if isinstance(desc, list):
+        desc = desc[0] if desc else ""
+    if desc:
+        summary["desc"] = desc if len(desc) <= 300 else desc[:297] + "..."
+    return summary
+
+
+def srd_lookup(category: str, names: list[str], view: str = "full") -> dict:
+    """
+    Look up one or more D&D 5e SRD entities from a category in a single call.
+
+    Args:
+        category: str - SRD category, e.g. 'monsters', 'spells', 'races', 'classes', 'magic-items'
+        names: list[str] - Entity names or indexes to fetch. Empty to list the whole category.
+        view: str - 'full' (complete data), 'summary' (key fields only) or 'index' (name/index/url only)
+
+    Returns:
+        dict - category, view, results keyed by requested name, and names not found
+    """
+    api_category = normalize_category(category)
+    if not api_category:
+        return {"error": f"Unknown category '{category}'. Valid categories: {sorted(SRD_CATEGORIES)}"}
+    if view not in ("full", "summary", "index"):
+        return {"error": f"Unknown view '{view}'. Use 'full', 'summary' or 'index'."}
+
+    index = _fetch_index(api_category)
+    if not index:
+        return {"error": f"Could not retrieve index for {api_category}."}
+    items = _index_items(index)
+
+    # An empty batch browses the category
+    if not names:
+        return {"category": api_category, "view": "index", "count": len(items), "results": items}
+
+    requested = list(dict.fromkeys(str(name) for name in names))
+    skipped = requested[MAX_BATCH_SIZE:]
+    requested = requested[:MAX_BATCH_SIZE]
+
+    matches: Dict[str, dict] = {}
+    not_found: List[str] = []
+    for name in requested:
+        found_item = _search_index(name, items)
+        if found_item:
+            matches[name] = found_item
+        else:
+            not_found.append(name)
+
+    if view == "index":
+        results = matches
+    else:
+        urls = [item.get('url') for item in matches.values()]
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, max(1, len(urls)))) as executor:
+            details = list(executor.map(_fetch_data_by_url, urls))
+        results = {}
+        for name, data in zip(matches, details):
+            if data is None:
+                not_found.append(name)
+            else:
+                results[name] = _summarize(api_category, data) if view == "summary" else data
+
+    response = {"category": api_category, "view": view, "results": results, "not_found": not_found}
+    if skipped:
+        response["skipped"] = skipped
+        response["message"] = f"Only the first {MAX_BATCH_SIZE} names are fetched per call."
+    print(f"[SRDLookup] {api_category}: {len(results)} found, {len(not_found)} not found ({view})")
+    return response
@@ -1,9 +1,13 @@
 import uuid
-from google.adk.sessions import InMemorySessionService
 from agents.agent import root_agent
+from agents.instruction_sections import NEW_CAMPAIGN_MESSAGE, EXISTING_CAMPAIGN_MESSAGE
 from google.adk.runners import Runner
 import asyncio
 from core.utils import call_agent_async
+from core.context_cache import get_cache_manager
+from core.persistence import flush_campaign_writes
+from core.autosave import close_autosave
+from core.session_store import get_session_service, close_session_service
 from data.tools.misc_tools import load_campaign, save_campaign, create_campaign
 from dotenv import load_dotenv
 load_dotenv()
@@ -18,7 +22,7 @@ async def main_async():
 
     # load initial state from db
     try:
-      initial_state = load_campaign(campaign_id)
+      initial_state = await load_campaign(campaign_id)
     except:
       print("Campaign not found")
       return
@@ -29,16 +33,20 @@ async def main_async():
 
   SESSION_ID = campaign_id
 
-  session_service = InMemorySessionService()
+  session_service = get_session_service()
 
-  session = await session_service.create_session(
-      app_name=APP_NAME,
-      user_id=USER_ID,
-      session_id=SESSION_ID,
-      state=initial_state
-  )
-
-  print(f"Session created: {SESSION_ID}")
+  # A durable session survives restarts; resume it rather than starting over from the saved campaign
+  session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+  if session is None:
+    session = await session_service.create_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=SESSION_ID,
+        state=initial_state
+    )
+    print(f"Session created: {SESSION_ID}")
+  else:
+    print(f"Session resumed: {SESSION_ID}")
 
   runner = Runner(
       agent=root_agent,
@@ -46,17 +54,27 @@ async def main_async():
       session_service=session_service
   )
 
-  # Send initial context message to the agent
+  # Send initial context message to the agent; it opens the startup turn, also for a resumed session
   if new_campaign.lower() == "y":
-    initial_message = "NEW CAMPAIGN"
+    initial_message = NEW_CAMPAIGN_MESSAGE
   else:
-    initial_message = "EXISTING CAMPAIGN"
+    initial_message = EXISTING_CAMPAIGN_MESSAGE
   
   await call_agent_async(runner, USER_ID, SESSION_ID, initial_message)
 
-  while True:
-    user_input = input("\n[Player]> ")
-    await call_agent_async(runner, USER_ID, SESSION_ID, user_input)
+  try:
+    while True:
+      user_input = input("\n[Player]> ")
+      await call_agent_async(runner, USER_ID, SESSION_ID, user_input)
+  finally:
+    # Delete provider-side instruction caches so they don't outlive the session
+    cache_manager = get_cache_manager()
+    if cache_manager:
+      await cache_manager.close()
+    # Snapshot the session a last time, then write everything still queued
+    await close_autosave()
+    flush_campaign_writes()
+    close_session_service()
 
 def main():
     """Entry point for the application."""
@@ -1,10 +1,26 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, Response, stream_with_context
 import sys
 import os
+import asyncio
+import queue
+import threading
+from google.adk.runners import Runner
 from ..agents.agent import root_agent
+from ..agents.instruction_sections import EXISTING_CAMPAIGN_MESSAGE
 import datetime
 import json
 from ..main import main_async
+from ..core.streaming import stream_agent_events
+from ..core.scheduler import get_scheduler_metrics
+from ..core.retry import get_retry_metrics
+from ..core.tracing import get_tracer
+from ..core.usage import get_usage_ledger
+from ..core.history import get_history_compactor
+from ..core.tool_outputs import get_tool_output_elider
+from ..core.tool_memo import get_tool_memo
+from ..core.campaign_store import get_campaign_store
+from ..core.session_store import get_session_service
+from ..data.tools.misc_tools import load_campaign as load_campaign_state
 
 def make_json_serializable(obj):
     if isinstance(obj, dict):
@@ -19,6 +35,75 @@ def make_json_serializable(obj):
 # Initialize the Flask application
 app = Flask(__name__, template_folder='.')
 
+APP_NAME = "dungeon_master"
+USER_ID = "user_1"
+
+# Agent sessions for the web UI, one per campaign ID (durable with the sqlite sessions backend)
+session_service = get_session_service()
+runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
+
+# Agent turns run on one background event loop shared by all requests
+_agent_loop = None
+_agent_loop_lock = threading.Lock()
+
+def get_agent_loop():
+    """
+    Get the background event loop that runs agent turns, starting it on first use.
+    """
+    global _agent_loop
+    with _agent_loop_lock:
+        if _agent_loop is None:
+            _agent_loop = asyncio.new_event_loop()
+            threading.Thread(target=_agent_loop.run_forever, name="agent-loop", daemon=True).start()
+    return _agent_loop
+
+async def ensure_session(campaign_id):
+    """
+    Get the agent session for a campaign, loading its state from the database on first use.
+
+    Returns:
+        bool - True if the session was just created, so the turn is its startup turn
+    """
+    session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=campaign_id)
+    if session is not None:
+        return False
+    state = await load_campaign_state(campaign_id)
+    if 'error' in state:
+        raise LookupError(state['error'])
+    await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=campaign_id, state=state)
+    return True
+
+def iterate_on_agent_loop(async_iterable):
+    """
+    Consume an async iterable on the agent loop and yield its items from this thread.
+    If the client disconnects, the turn still runs to completion so the session stays consistent.
+    """
+    items = queue.Queue()
+    finished = object()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put(item)
+        except Exception as e:
+            items.put({'type': 'error', 'message': str(e)})
+            items.put({'type': 'done'})
+        finally:
+            items.put(finished)
+
+    asyncio.run_coroutine_threadsafe(pump(), get_agent_loop())
+    while True:
+        item = items.get()
+        if item is finished:
+            return
+        yield item
+
+def format_sse(update):
+    """
+    Format a stream update as a Server-Sent Events message.
+    """
+    return f"event: {update['type']}\ndata: {json.dumps(make_json_serializable(update))}\n\n"
+
 # ==============================================================================
 #  FLASK ROUTES (API Endpoints)
 #  These are the URLs that the frontend JavaScript will call.
@@ -176,6 +261,76 @@ def get_proficiencies_index():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def get_runtime_metrics():
+    """
+    Returns agent runtime metrics: turn scheduler queue depths and waits, model retry counters, history compaction and tool output elision counters, tool memo hits, and session hot tier counters.
+    """
+    compactor = get_history_compactor()
+    elider = get_tool_output_elider()
+    memo = get_tool_memo()
+    return jsonify({
+        "status": "success",
+        "scheduler": get_scheduler_metrics(),
+        "retry": get_retry_metrics(),
+        "history": dict(compactor.stats) if compactor is not None else None,
+        "tool_outputs": dict(elider.stats) if elider is not None else None,
+        "tool_memo": memo.metrics() if memo is not None else None,
+        "sessions": session_service.metrics() if hasattr(session_service, 'metrics') else None,
+    })
+
+@app.route('/api/traces/slowest', methods=['GET'])
+def get_slowest_spans():
+    """
+    Returns the slowest spans of recent turns. Optional query parameters: limit (default 10)
+    and kind (turn, agent, model or tool).
+    """
+    from flask import request
+
+    tracer = get_tracer()
+    if tracer is None:
+        return jsonify({"status": "error", "message": "Tracing is disabled in adk.yaml"}), 404
+    limit = request.args.get('limit', 10, type=int)
+    return jsonify({"status": "success", "spans": tracer.slowest_spans(limit, request.args.get('kind'))})
+
+@app.route('/api/usage', methods=['GET'])
+def get_usage():
+    """
+    Returns token and cost totals overall and per agent, model and campaign, and the costliest recent turns.
+    """
+    ledger = get_usage_ledger()
+    if ledger is None:
+        return jsonify({"status": "error", "message": "Usage accounting is disabled in adk.yaml"}), 404
+    return jsonify({"status": "success", **ledger.summary()})
+
+@app.route('/api/usage/<string:campaign_id>', methods=['GET'])
+def get_campaign_usage(campaign_id):
+    """
+    Returns token and cost totals, budget status and recent turns and model calls of one campaign.
+    """
+    ledger = get_usage_ledger()
+    if ledger is None:
+        return jsonify({"status": "error", "message": "Usage accounting is disabled in adk.yaml"}), 404
+    return jsonify({"status": "success", **ledger.campaign_summary(campaign_id)})
+
+@app.route('/api/campaigns', methods=['GET'])
+def list_campaigns():
+    """
+    Returns one page of the campaign catalog (title, party, location and last save), most recently
+    saved first. Optional query parameters: limit (default 20, at most 100) and cursor (the
+    next_cursor of the previous page).
+    """
+    from flask import request
+
+    store = get_campaign_store()
+    if store is None:
+        return jsonify({"status": "error", "message": "Database client is not available."}), 503
+    try:
+        campaigns, next_cursor = store.list_campaigns(request.args.get('limit', 20, type=int), request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "campaigns": campaigns, "next_cursor": next_cursor})
+
 @app.route('/load-campaign/<string:campaign_id>', methods=['GET'])
 def load_campaign(campaign_id):
     """
@@ -223,6 +378,43 @@ def chat():
             "message": str(e)
         }), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    API endpoint to stream the agent's response to a chat message as Server-Sent Events.
+    Partial text, tool progress and complete messages are sent as soon as the agents produce them.
+    """
+    from flask import request
+
+    data = request.get_json() or {}
+    campaign_id = data.get('campaign_id')
+    message = data.get('message')
+
+    if not campaign_id or not message:
+        return jsonify({"status": "error", "message": "Campaign ID and message are required"}), 400
+
+    async def turn():
+        try:
+            created = await ensure_session(campaign_id)
+        except LookupError as e:
+            yield {'type': 'error', 'message': str(e)}
+            yield {'type': 'done'}
+            return
+        # A campaign's first message in a new session opens its startup turn
+        query = f"{EXISTING_CAMPAIGN_MESSAGE}\n\n{message}" if created else message
+        async for update in stream_agent_events(runner, USER_ID, campaign_id, query):
+            yield update
+
+    def generate():
+        for update in iterate_on_agent_loop(turn()):
+            yield format_sse(update)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
 # ==============================================================================
 #  MAIN EXECUTION BLOCK
 # ==============================================================================
@@ -0,0 +1,13 @@
+"""
+Shared helpers for the test suite.
+"""
+
+
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test suite for the background autosave scheduler.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+# and the project root for the shared test helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.sessions import InMemorySessionService
+
+from tests.helpers import FakeClock
+from core.autosave import AutosaveScheduler
+from core.persistence import WriteBehindWriter
+
+APP_NAME = 'dungeon_master'
+USER_ID = 'user_1'
+
+
+def snapshot_fields(state):
+    return {'campaign_id': state.get('campaign_id'), 'location': state.get('location', '')}
+
+
+class FlakySessionService(InMemorySessionService):
+    """Session service whose reads fail a given number of times"""
+
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.reads = 0
+
+    async def get_session(self, **kwargs):
+        self.reads += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('session backend unavailable')
+        return await super().get_session(**kwargs)
+
+
+class TestAutosaveScheduler(unittest.TestCase):
+    """Test cases for autosave snapshots"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.batches = []
+        self.writer = WriteBehindWriter(self.batches.append, start=False)
+        self.service = FlakySessionService()
+        self.scheduler = AutosaveScheduler(self.writer, snapshot_fields, interval_seconds=30, max_pending_campaigns=2,
+                                           clock=self.clock)
+
+    def run_async(self, coroutine_fn):
+        """Run with a session c1 in Phandalin; the background task is cancelled at the end"""
+        async def wrapped():
+            await self.service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id='c1',
+                                              state={'campaign_id': 'c1', 'location': 'Phandalin'})
+            try:
+                return await coroutine_fn()
+            finally:
+                if self.scheduler._task is not None:
+                    self.scheduler._task.cancel()
+        return asyncio.run(wrapped())
+
+    def request(self, session_id='c1'):
+        self.scheduler.request(self.service, APP_NAME, USER_ID, session_id)
+
+    async def set_location(self, location):
+        from google.adk.events import Event, EventActions
+        session = await self.service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id='c1')
+        await self.service.append_event(session, Event(author='narrative_agent', actions=EventActions(state_delta={'location': location})))
+
+    def test_turn_requests_coalesced(self):
+        async def scenario():
+            self.request()
+            self.request()
+            return await self.scheduler.run_once()
+
+        self.assertEqual(self.run_async(scenario), 1)
+        self.assertEqual(self.scheduler.stats['coalesced'], 1)
+        self.assertEqual(self.writer.pending_fields(), {'c1': ['campaign_id', 'location']})
+
+    def test_timer_snapshot(self):
+        """A session is snapshotted again once interval_seconds have passed"""
+        async def scenario():
+            self.request()
+            await self.scheduler.run_once()
+            self.writer.flush()
+            await self.set_location('Neverwinter')
+            self.clock.now = 10
+            early = await self.scheduler.run_once()
+            self.clock.now = 31
+            return early, await self.scheduler.run_once()
+
+        self.assertEqual(self.run_async(scenario), (0, 1))
+        self.assertEqual(self.writer.pending_fields(), {'c1': ['location']})
+
+    def test_backpressure(self):
+        """Snapshots wait while the writer is behind, and the request is kept"""
+        self.writer.mark('other-1', {'location': 'a'})
+        self.writer.mark('other-2', {'location': 'b'})
+
+        async def scenario():
+            self.request()
+            deferred = await self.scheduler.run_once()
+            self.writer.flush()
+            return deferred, await self.scheduler.run_once()
+
+        self.assertEqual(self.run_async(scenario), (0, 1))
+        self.assertEqual(self.scheduler.stats['deferred'], 1)
+
+    def test_failed_snapshot_retried(self):
+        self.service.failures = 1
+
+        async def scenario():
+            self.request()
+            first = await self.scheduler.run_once()
+            retry_too_soon = await self.scheduler.run_once()
+            self.clock.now = 1.5
+            return first, retry_too_soon, await self.scheduler.run_once()
+
+        self.assertEqual(self.run_async(scenario), (0, 0, 1))
+        self.assertEqual(self.scheduler.stats['failures'], 1)
+        self.assertIn('c1', self.writer.pending_fields())
+
+    def test_background_task(self):
+        """A turn's request is snapshotted without anyone awaiting it"""
+        async def scenario():
+            self.request()
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                if self.scheduler.stats['snapshots']:
+                    break
+            return self.scheduler.stats['snapshots']
+
+        self.assertEqual(self.run_async(scenario), 1)
+
+    def test_close_snapshots_everything(self):
+        async def scenario():
+            self.request()
+            await self.scheduler.run_once()
+            await self.set_location('Neverwinter')
+            await self.scheduler.close()
+
+        self.run_async(scenario)
+        self.assertEqual(self.scheduler.stats['snapshots'], 2)
+        self.writer.flush()
+        self.assertEqual(self.batches[-1]['c1']['location'], 'Neverwinter')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Test suite for the campaign storage backends.
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from core import campaign_store, lazy_state, persistence
+from core.campaign_store import CATALOG_COLLECTION, CampaignStore, FirestoreCampaignStore, SQLiteCampaignStore, catalog_fields
+from core.lazy_state import CampaignLoader, resolve_lazy_fields_async
+from core.persistence import WriteBehindWriter
+from google.cloud import firestore
+
+ARIA = {'name': 'Aria', 'race': 'Elf', 'class': 'Wizard', 'level': 3, 'hit_points': 14}
+
+STATE = {
+    'campaign_id': 'c1',
+    'game_state': 'new_campaign',
+    'location': '',
+    'characters': {},
+    'campaign_memory': {},
+}
+
+
+class FakeSnapshot:
+    def __init__(self, document_id, data):
+        self.id = document_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocument:
+    def __init__(self, documents, path):
+        self.documents = documents
+        self.path = path
+
+    def get(self):
+        return FakeSnapshot(self.path[1], self.documents.get(self.path))
+
+    def set(self, data, merge=False):
+        current = dict(self.documents.get(self.path) or {}) if merge else {}
+        for key, value in data.items():
+            if value is firestore.DELETE_FIELD:
+                current.pop(key, None)
+            else:
+                current[key] = value
+        self.documents[self.path] = current
+        self.documents.writes.append(self.path)
+
+    def delete(self):
+        self.documents.pop(self.path, None)
+
+
+class FakeCollection:
+    def __init__(self, documents, name):
+        self.documents = documents
+        self.name = name
+
+    def document(self, document_id):
+        return FakeDocument(self.documents, (self.name, document_id))
+
+
+class FakeBatch:
+    def __init__(self):
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref, data, merge))
+
+    def delete(self, ref):
+        self.writes.append((ref, None, False))
+
+    def commit(self):
+        for ref, data, merge in self.writes:
+            if data is None:
+                ref.delete()
+            else:
+                ref.set(data, merge=merge)
+
+
+class FakeDocuments(dict):
+    """Documents by (collection, document id), with a log of written paths"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+
+class FakeFirestore:
+    """Firestore client stand-in keeping documents in a dict"""
+
+    def __init__(self):
+        self.documents = FakeDocuments()
+
+    def get_all(self, refs):
+        for ref in refs:
+            yield ref.get()
+
+    def collection(self, name):
+        return FakeCollection(self.documents, name)
+
+    def batch(self):
+        return FakeBatch()
+
+
+class FakeAsyncDocument(FakeDocument):
+    async def get(self):
+        return super().get()
+
+    async def set(self, data, merge=False):
+        super().set(data, merge=merge)
+
+
+class FakeAsyncCollection(FakeCollection):
+    def document(self, document_id):
+        return FakeAsyncDocument(self.documents, (self.name, document_id))
+
+
+class FakeAsyncBatch(FakeBatch):
+    async def commit(self):
+        for ref, data, merge in self.writes:
+            if data is None:
+                ref.delete()
+            else:
+                await ref.set(data, merge=merge)
+
+
+class FakeAsyncFirestore(FakeFirestore):
+    """AsyncClient stand-in sharing the documents of a FakeFirestore"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.requests = 0
+
+    def collection(self, name):
+        self.requests += 1
+        return FakeAsyncCollection(self.documents, name)
+
+    def batch(self):
+        return FakeAsyncBatch()
+
+    async def get_all(self, refs):
+        for ref in refs:
+            yield await ref.get()
+
+
+class StoreContract:
+    """Behaviour every campaign store must share"""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.store = self.make_store()
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_create_and_load(self):
+        self.assertFalse(self.store.campaign_exists('c1'))
+        self.assertIsNone(self.store.load_state('c1'))
+        self.store.create_campaign('c1', STATE)
+        self.assertTrue(self.store.campaign_exists('c1'))
+        self.assertEqual(self.store.load_state('c1'), STATE)
+
+    def test_write_fields_merges(self):
+        self.store.create_campaign('c1', STATE)
+        self.store.create_campaign('c2', {**STATE, 'campaign_id': 'c2'})
+        self.store.write_fields({'c1': {'location': 'Phandalin', 'characters': {'Aria': {'hp': 8}}},
+                                 'c2': {'game_state': 'exploration'}})
+        self.assertEqual(self.store.load_state('c1'),
+                         {**STATE, 'location': 'Phandalin', 'characters': {'Aria': {'hp': 8}}})
+        self.assertEqual(self.store.load_state('c2')['game_state'], 'exploration')
+
+    def test_create_resets_state(self):
+        self.store.create_campaign('c1', STATE)
+        self.store.write_fields({'c1': {'extra': 1}})
+        self.store.create_campaign('c1', STATE)
+        self.assertEqual(self.store.load_state('c1'), STATE)
+
+    def test_outline(self):
+        outline = {'title': 'The Lost Mine', 'plot_acts': {'act_1': 'Goblin ambush'}}
+        self.assertFalse(self.store.save_outline('c1', outline))
+        self.store.create_campaign('c1', STATE)
+        self.assertIsNone(self.store.load_outline('c1'))
+        self.assertTrue(self.store.save_outline('c1', outline))
+        self.assertEqual(self.store.load_outline('c1'), outline)
+        # The outline is kept apart from the campaign state
+        self.assertEqual(self.store.load_state('c1'), STATE)
+
+    def catalog_entry(self, campaign_id):
+        raise NotImplementedError
+
+    def test_catalog_follows_writes(self):
+        self.store.create_campaign('c1', STATE)
+        self.assertEqual(self.catalog_entry('c1')['party'], [])
+        self.store.write_fields({'c1': {'characters': {'Aria': ARIA}, 'location': 'Phandalin'}})
+        self.store.save_outline('c1', {'title': 'The Lost Mine'})
+        entry = self.catalog_entry('c1')
+        self.assertEqual(entry['title'], 'The Lost Mine')
+        self.assertEqual(entry['party'], [{'name': 'Aria', 'race': 'Elf', 'class': 'Wizard', 'level': 3}])
+        self.assertEqual(entry['location'], 'Phandalin')
+        # Saving the empty state outline keeps the title
+        self.store.write_fields({'c1': {'campaign_outline': ''}})
+        self.assertEqual(self.catalog_entry('c1')['title'], 'The Lost Mine')
+
+    def test_async_methods(self):
+        outline = {'title': 'The Lost Mine'}
+
+        async def run():
+            missing = await self.store.save_outline_async('c1', outline)
+            self.store.create_campaign('c1', STATE)
+            saved = await self.store.save_outline_async('c1', outline)
+            await self.store.write_fields_async({'c1': {'characters': {'Aria': ARIA}}})
+            return (missing, saved, await self.store.load_outline_async('c1'), await self.store.load_state_async('c1'),
+                    await self.store.load_fields_async('c1', ['location', 'characters']),
+                    (await self.store.load_catalog_entry_async('c1'))['party'][0]['name'])
+
+        self.assertEqual(asyncio.run(run()), (False, True, outline, {**STATE, 'characters': {'Aria': ARIA}},
+                                              {'location': STATE['location'], 'characters': {'Aria': ARIA}}, 'Aria'))
+
+
+class TestSQLiteCampaignStore(StoreContract, unittest.TestCase):
+    """Test cases for the SQLite backend"""
+
+    def make_store(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        return SQLiteCampaignStore(os.path.join(self.directory.name, 'campaigns.db'))
+
+    def catalog_entry(self, campaign_id):
+        return next(entry for entry in self.store.list_campaigns(100)[0] if entry['campaign_id'] == campaign_id)
+
+    def test_list_campaigns_paginated(self):
+        for index in range(25):
+            self.store.create_campaign(f'c{index:02d}', {**STATE, 'campaign_id': f'c{index:02d}'})
+        # A save moves a campaign to the front
+        self.store.write_fields({'c03': {'location': 'Neverwinter'}})
+        pages, cursor = [], None
+        while True:
+            entries, cursor = self.store.list_campaigns(10, cursor)
+            pages.append([entry['campaign_id'] for entry in entries])
+            if cursor is None:
+                break
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        listed = [campaign_id for page in pages for campaign_id in page]
+        self.assertEqual(listed[0], 'c03')
+        self.assertEqual(sorted(listed), sorted(f'c{index:02d}' for index in range(25)))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            self.store.list_campaigns(10, 'not-a-cursor')
+
+    def test_rebuild_catalog(self):
+        self.store.create_campaign('c1', STATE)
+        self.store.write_fields({'c1': {'characters': {'Aria': ARIA}}})
+        self.store.save_outline('c1', {'title': 'The Lost Mine'})
+        self.store._conn.execute('DELETE FROM campaign_catalog')
+        self.assertEqual(self.store.rebuild_catalog(), 1)
+        entry = self.catalog_entry('c1')
+        self.assertEqual((entry['title'], entry['party'][0]['name']), ('The Lost Mine', 'Aria'))
+
+    def test_wal_mode(self):
+        mode = self.store._conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_reopened_database(self):
+        self.store.create_campaign('c1', STATE)
+        self.store.write_fields({'c1': {'location': 'Phandalin'}})
+        reopened = SQLiteCampaignStore(self.store.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.load_state('c1')['location'], 'Phandalin')
+
+
+class TestFirestoreCampaignStore(StoreContract, unittest.TestCase):
+    """Test cases for the Firestore backend"""
+
+    def make_store(self):
+        client = FakeFirestore()
+        self.async_client = FakeAsyncFirestore(client.documents)
+        return FirestoreCampaignStore(client, lambda: self.async_client)
+
+    def test_large_fields_sharded(self):
+        """Large fields get their own documents and a save only writes the ones it changes"""
+        self.store.create_campaign('c1', {**STATE, 'campaign_outline': {'title': 'The Lost Mine'}})
+        documents = self.store.client.documents
+        self.assertNotIn('characters', documents[('c1', 'state')])
+        self.assertEqual(documents[('c1', 'outline')]['value'], {'title': 'The Lost Mine'})
+        documents.writes.clear()
+        self.store.write_fields({'c1': {'characters': {'Aria': ARIA}, 'location': 'Phandalin'}})
+        self.assertEqual(sorted(path for path in documents.writes if path[0] == 'c1'), [('c1', 'characters'), ('c1', 'state')])
+        self.assertEqual(self.store.load_state('c1')['characters'], {'Aria': ARIA})
+
+    def test_unsharded_campaign_migrated(self):
+        """A campaign saved with everything in its state document still loads, and moves to shards on save"""
+        documents = self.store.client.documents
+        documents[('c1', 'state')] = {**STATE, 'characters': {'Aria': ARIA}, 'last_saved': 'yesterday'}
+        self.assertEqual(self.store.load_state('c1'), {**STATE, 'characters': {'Aria': ARIA}})
+        self.store.write_fields({'c1': {'characters': {'Aria': {**ARIA, 'level': 4}}}})
+        self.assertNotIn('characters', documents[('c1', 'state')])
+        self.assertEqual(self.store.load_state('c1')['characters']['Aria']['level'], 4)
+
+    def test_async_methods_use_async_client(self):
+        self.test_async_methods()
+        self.assertGreater(self.async_client.requests, 0)
+
+    def test_tools_use_async_client(self):
+        """Loading and saving a campaign from the tools goes through the AsyncClient"""
+        from data.tools import misc_tools
+        self.store.create_campaign('c1', {**STATE, 'characters': {'Aria': ARIA}})
+        loader = CampaignLoader(self.store, ['campaign_id', 'location'])
+        sync_reads = []
+        self.store.client.get_all = lambda refs: sync_reads.append(refs)
+        with patch.object(campaign_store, '_store', self.store), patch.object(misc_tools, '_campaign_writer', lambda: None), \
+                patch.object(lazy_state, '_loader', loader), patch.object(misc_tools, '_known_campaigns', set()):
+            async def run():
+                state = await misc_tools.load_campaign('c1')
+                await resolve_lazy_fields_async(state)
+                saved = await misc_tools.save_campaign(SimpleNamespace(state={**state, 'location': 'Neverwinter'}))
+                return state, saved
+
+            state, saved = asyncio.run(run())
+        self.assertEqual(state['characters'], {'Aria': ARIA})
+        self.assertTrue(saved['saved'])
+        self.assertEqual(self.store.client.documents[('c1', 'state')]['location'], 'Neverwinter')
+        self.assertEqual(sync_reads, [])
+
+    def catalog_entry(self, campaign_id):
+        return self.store.client.documents[(CATALOG_COLLECTION, campaign_id)]
+
+
+class TestCampaignStoreInterface(unittest.TestCase):
+    """Test cases for the backend interface"""
+
+    def test_incomplete_backend_rejected(self):
+        """A backend missing a method fails when it is created, not when the method is first called"""
+        class PartialStore(CampaignStore):
+            def load_state(self, campaign_id):
+                return None
+
+        with self.assertRaises(TypeError):
+            PartialStore()
+
+
+class TestCatalogFields(unittest.TestCase):
+    """Test cases for deriving catalog entries from state fields"""
+
+    def test_only_present_fields(self):
+        self.assertEqual(catalog_fields({'last_scene': 'A goblin ambush'}), {})
+        self.assertEqual(catalog_fields({'game_state': 'combat'}), {'game_state': 'combat'})
+
+    def test_title_and_party(self):
+        entry = catalog_fields({'campaign_outline': {'title': 'The Lost Mine'}, 'characters': {'Aria': ARIA}})
+        self.assertEqual(entry['title'], 'The Lost Mine')
+        self.assertEqual(entry['party'][0]['class'], 'Wizard')
+
+
+class TestCampaignTools(unittest.TestCase):
+    """Test cases for the campaign tools on the SQLite backend"""
+
+    def setUp(self):
+        from data.tools import misc_tools
+        self.misc_tools = misc_tools
+        self.store = SQLiteCampaignStore(':memory:')
+        self.writer = WriteBehindWriter(self.store.write_fields, start=False)
+        for patcher in (patch.object(campaign_store, '_store', self.store), patch.object(persistence, '_writer', self.writer),
+                        patch.object(lazy_state, '_loader', None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.store.close)
+
+    def test_create_save_load(self):
+        state = self.misc_tools.create_campaign('c9')
+        self.assertEqual(state['game_state'], 'new_campaign')
+
+        tool_context = SimpleNamespace(state={**state, 'location': 'Phandalin'})
+        result = asyncio.run(self.misc_tools.save_campaign(tool_context))
+        self.assertTrue(result['queued'])
+        self.writer.flush()
+        self.assertEqual(asyncio.run(self.misc_tools.load_campaign('c9'))['location'], 'Phandalin')
+
+    def test_outline_tools(self):
+        from data.tools.campaign_outline import generate_campaign_outline, load_campaign_outline
+        self.assertIn('not found', asyncio.run(generate_campaign_outline('c9', {'title': 'Lost Mine'})))
+        self.misc_tools.create_campaign('c9')
+        self.assertIn('saved successfully', asyncio.run(generate_campaign_outline('c9', {'title': 'Lost Mine'})))
+        self.assertEqual(asyncio.run(load_campaign_outline('c9')), {'title': 'Lost Mine'})
+
+
+if __name__ == '__main__':
+    unittest.main()
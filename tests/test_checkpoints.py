@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test suite for turn checkpoints (replaying completed tool calls on retries).
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from typing import AsyncGenerator, ClassVar
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.config_loader import get_config_section
+from agents.tool_registry import TOOL_REGISTRY
+from core import checkpoints, utils
+from core.checkpoints import TurnJournal, checkpoint_after_tool, checkpoint_before_tool, turn_checkpoint
+from core.retry import RetryEngine
+
+SETTINGS = {'enabled': True, 'tools': ['apply_damage']}
+
+damage_log = []
+
+
+def apply_damage(target: str, amount: int) -> dict:
+    """Apply damage to a combat participant."""
+    damage_log.append((target, amount))
+    return {'success': True, 'target': target, 'remaining_hp': 10 - amount * len(damage_log)}
+
+
+class OverloadedError(Exception):
+    code = 503
+
+
+class FakeLlm(BaseLlm):
+    """Model stand-in that applies damage, then is overloaded once before narrating"""
+
+    failures_left: ClassVar[int] = 1
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        last_part = llm_request.contents[-1].parts[0]
+        if last_part.function_response is None:
+            call = types.FunctionCall(name='apply_damage', args={'target': 'goblin', 'amount': 4})
+            yield LlmResponse(content=types.Content(role='model', parts=[types.Part(function_call=call)]))
+            return
+        if FakeLlm.failures_left:
+            FakeLlm.failures_left -= 1
+            raise OverloadedError('The model is overloaded. Please try again later.')
+        yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text='The goblin staggers.')]))
+
+
+class TestTurnJournal(unittest.TestCase):
+    """Test cases for the per-turn journal"""
+
+    def test_replays_in_order(self):
+        """Identical calls replay their results in the order they completed"""
+        journal = TurnJournal('s1:1', {'roll_dice'})
+        key = TurnJournal.call_key('rules_lawyer_agent', 'roll_dice', {'dice_notation': '1d20'})
+        journal.start_attempt()
+        self.assertIsNone(journal.replay(key, 'c1'))
+        journal.record(key, 'c1', {'result': 7})
+        self.assertIsNone(journal.replay(key, 'c2'))
+        journal.record(key, 'c2', {'result': 15})
+
+        journal.start_attempt()
+        self.assertEqual(journal.replay(key, 'c3'), {'result': 7})
+        journal.record(key, 'c3', {'result': 7})
+        self.assertEqual(journal.replay(key, 'c4'), {'result': 15})
+        self.assertIsNone(journal.replay(key, 'c5'))
+        self.assertEqual(journal.stats, {'recorded': 2, 'replayed': 2})
+
+    def test_arguments_distinguish_calls(self):
+        journal = TurnJournal('s1:1', {'set_state'})
+        journal.start_attempt()
+        journal.record(TurnJournal.call_key('root_agent', 'set_state', {'state_name': 'location', 'state_value': 'cave'}), 'c1', {'success': True})
+        journal.start_attempt()
+        other = TurnJournal.call_key('root_agent', 'set_state', {'state_name': 'location', 'state_value': 'forest'})
+        self.assertIsNone(journal.replay(other, 'c2'))
+
+
+class TestCheckpointCallbacks(unittest.TestCase):
+    """Test cases for the tool callbacks"""
+
+    def test_outside_a_turn(self):
+        """Without a turn in progress tools run normally"""
+        tool = type('Tool', (), {'name': 'apply_damage'})()
+        context = type('Context', (), {'agent_name': 'rules_lawyer_agent', 'function_call_id': 'c1'})()
+        self.assertIsNone(asyncio.run(checkpoint_before_tool(tool, {}, context)))
+        self.assertIsNone(asyncio.run(checkpoint_after_tool(tool, {}, context, {'success': True})))
+
+    def test_errors_are_not_journaled(self):
+        """A failed tool call runs again on the retry"""
+        tool = type('Tool', (), {'name': 'apply_damage'})()
+        context = type('Context', (), {'agent_name': 'rules_lawyer_agent', 'function_call_id': 'c1'})()
+        with patch.object(checkpoints, '_get_settings', return_value=SETTINGS):
+            with turn_checkpoint('s1') as journal:
+                journal.start_attempt()
+                asyncio.run(checkpoint_after_tool(tool, {}, context, {'error': 'Firestore unavailable'}))
+        self.assertEqual(journal.completed_calls, 0)
+
+    def test_configured_tools_are_registered(self):
+        for name in get_config_section('turn_checkpoints').get('tools', []):
+            self.assertIn(name, TOOL_REGISTRY)
+
+
+class TestRetriedTurn(unittest.TestCase):
+    """Test cases for a turn retried after a tool already ran"""
+
+    def test_tool_runs_once(self):
+        """Damage applied before the failure is replayed, not applied again"""
+        damage_log.clear()
+        FakeLlm.failures_left = 1
+        agent = LlmAgent(
+            name='rules_lawyer_agent', model=FakeLlm(model='fake'), tools=[apply_damage],
+            before_tool_callback=[checkpoint_before_tool], after_tool_callback=[checkpoint_after_tool],
+        )
+        runner = Runner(agent=agent, app_name='dungeon_master', session_service=InMemorySessionService())
+
+        async def no_sleep(delay):
+            pass
+
+        engine = RetryEngine(max_attempts=3, sleep=no_sleep)
+
+        async def run_turn():
+            await runner.session_service.create_session(app_name='dungeon_master', user_id='user_1', session_id='s1')
+            content = types.Content(role='user', parts=[types.Part(text='I hit the goblin')])
+            return await utils.run_agent_with_retry(runner, 'user_1', 's1', content)
+
+        with patch.object(checkpoints, '_get_settings', return_value=SETTINGS), \
+                patch.object(utils, 'get_retry_engine', return_value=engine):
+            success, response, _ = asyncio.run(run_turn())
+
+        self.assertTrue(success)
+        self.assertEqual(response, 'The goblin staggers.')
+        self.assertEqual(damage_log, [('goblin', 4)])
+        self.assertEqual(engine.metrics['attempts'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test suite for context caching of static agent instructions, using the
+in-memory cache backend.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+# and the project root for the shared test helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import types
+from tests.helpers import FakeClock
+from core.context_cache import ContextCacheManager, InMemoryCacheBackend, fingerprint_prefix
+
+INSTRUCTION = "You are an impartial rules lawyer. " * 400
+TOOLS = [types.Tool(function_declarations=[types.FunctionDeclaration(name="roll_dice", description="Roll dice")])]
+
+
+class FailingBackend(InMemoryCacheBackend):
+    """Backend whose cache creation always fails"""
+
+    async def create(self, *args, **kwargs):
+        raise RuntimeError("caching not supported for this model")
+
+
+class GatedBackend(InMemoryCacheBackend):
+    """Backend whose cache creation for one agent waits until released"""
+
+    def __init__(self, slow_agent):
+        super().__init__()
+        self.slow_agent = slow_agent
+        self.release = asyncio.Event()
+
+    async def create(self, model, system_instruction, tools, ttl_seconds, display_name):
+        if display_name.startswith(self.slow_agent):
+            await self.release.wait()
+        return await super().create(model, system_instruction, tools, ttl_seconds, display_name)
+
+
+def _request(instruction=INSTRUCTION, tools=TOOLS, model="gemini-2.5-flash-lite"):
+    return SimpleNamespace(model=model, config=types.GenerateContentConfig(system_instruction=instruction, tools=tools))
+
+
+class TestContextCacheManager(unittest.TestCase):
+    """Test cases for the cache lifecycle"""
+
+    def setUp(self):
+        self.backend = InMemoryCacheBackend()
+        self.clock = FakeClock(1000.0)
+        self.manager = ContextCacheManager(self.backend, ttl_seconds=600, refresh_margin_seconds=60,
+                                           min_tokens=100, max_entries_per_agent=2, clock=self.clock)
+
+    def _acquire(self, agent="rules_lawyer_agent", instruction=INSTRUCTION, model="gemini-2.5-flash-lite"):
+        return asyncio.run(self.manager.acquire(agent, model, instruction, TOOLS))
+
+    def test_cache_created_once_and_reused(self):
+        """The prefix is uploaded once and reused on later turns"""
+        first = self._acquire()
+        second = self._acquire()
+        self.assertEqual(first, second)
+        self.assertEqual([call[0] for call in self.backend.calls], ['create'])
+        self.assertEqual(self.manager.stats['hits'], 1)
+
+    def test_refresh_before_expiry(self):
+        """A cache close to expiry has its TTL extended instead of being recreated"""
+        name = self._acquire()
+        self.clock.now += 570
+        self.assertEqual(self._acquire(), name)
+        self.assertEqual(self.backend.calls[-1], ('refresh', name))
+
+    def test_recreate_after_expiry(self):
+        """An expired cache is recreated"""
+        name = self._acquire()
+        self.clock.now += 601
+        self.assertNotEqual(self._acquire(), name)
+
+    def test_instruction_change_creates_new_cache(self):
+        """A different instruction or model gets its own cache"""
+        first = self._acquire()
+        self.assertNotEqual(self._acquire(instruction=INSTRUCTION + " COMBAT"), first)
+        self.assertNotEqual(self._acquire(model="gemini-2.5-flash"), first)
+
+    def test_lru_eviction_per_agent(self):
+        """Beyond the per-agent limit the least recently used cache is deleted"""
+        first = self._acquire(instruction=INSTRUCTION + " a")
+        self.clock.now += 1
+        self._acquire(instruction=INSTRUCTION + " b")
+        self.clock.now += 1
+        self._acquire(instruction=INSTRUCTION + " c")
+        self.assertIn(('delete', first), self.backend.calls)
+        self.assertEqual(len(self.backend.caches), 2)
+
+    def test_small_prefix_not_cached(self):
+        """Prefixes below the provider minimum are sent as-is"""
+        self.assertIsNone(self._acquire(instruction="short"))
+        self.assertEqual(self.backend.calls, [])
+
+    def test_close_deletes_everything(self):
+        """Shutdown deletes every cache the manager created"""
+        self._acquire()
+        self._acquire(agent="character_creation_agent")
+        asyncio.run(self.manager.close())
+        self.assertEqual(self.backend.caches, {})
+
+    def test_slow_create_does_not_block_other_prefixes(self):
+        """A cache being created only holds up requests for the same prefix"""
+        self.manager.backend = GatedBackend('narrative_agent')
+
+        async def run():
+            done = []
+
+            async def acquire(agent):
+                name = await self.manager.acquire(agent, "gemini-2.5-flash-lite", INSTRUCTION, TOOLS)
+                done.append(agent)
+                return name
+
+            slow = [asyncio.ensure_future(acquire('narrative_agent')) for _ in range(2)]
+            await asyncio.sleep(0)
+            await asyncio.wait_for(acquire('rules_lawyer_agent'), 2)
+            # The other agent's cache is ready while the first create is still waiting
+            self.assertEqual(done, ['rules_lawyer_agent'])
+            self.manager.backend.release.set()
+            return await asyncio.gather(*slow)
+
+        first, second = asyncio.run(run())
+        self.assertEqual(first, second)
+        self.assertEqual(self.manager.stats['created'], 2)
+
+    def test_fingerprint_is_stable(self):
+        """Identical prefixes fingerprint identically"""
+        self.assertEqual(fingerprint_prefix("m", INSTRUCTION, TOOLS), fingerprint_prefix("m", INSTRUCTION, list(TOOLS)))
+
+
+class TestApplyToRequest(unittest.TestCase):
+    """Test cases for rewriting outgoing LLM requests"""
+
+    def test_request_uses_cached_content(self):
+        """The instruction and tools are replaced by a cache reference"""
+        manager = ContextCacheManager(InMemoryCacheBackend(), min_tokens=100)
+        request = _request()
+        name = asyncio.run(manager.apply("rules_lawyer_agent", request))
+        self.assertEqual(request.config.cached_content, name)
+        self.assertIsNone(request.config.system_instruction)
+        self.assertIsNone(request.config.tools)
+
+    def test_backend_failure_falls_back(self):
+        """If the provider rejects caching the full prefix is still sent"""
+        manager = ContextCacheManager(FailingBackend(), min_tokens=100)
+        request = _request()
+        self.assertIsNone(asyncio.run(manager.apply("rules_lawyer_agent", request)))
+        self.assertEqual(request.config.system_instruction, INSTRUCTION)
+        self.assertEqual(manager.stats['errors'], 1)
+
+    def test_failed_prefix_backs_off(self):
+        """A prefix that cannot be cached is not retried on every model call"""
+        clock = FakeClock(1000.0)
+        backend = FailingBackend()
+        manager = ContextCacheManager(backend, min_tokens=100, retry_base_seconds=60, clock=clock)
+        for _ in range(3):
+            self.assertIsNone(asyncio.run(manager.apply("rules_lawyer_agent", _request())))
+        self.assertEqual((manager.stats['errors'], manager.stats['backed_off']), (1, 2))
+        clock.now += 61
+        asyncio.run(manager.apply("rules_lawyer_agent", _request()))
+        self.assertEqual(manager.stats['errors'], 2)
+        clock.now += 61
+        asyncio.run(manager.apply("rules_lawyer_agent", _request()))
+        self.assertEqual(manager.stats['errors'], 2, "second failure doubles the wait")
+        backend.create = InMemoryCacheBackend().create
+        clock.now += 60
+        self.assertIsNotNone(asyncio.run(manager.apply("rules_lawyer_agent", _request())))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test suite for sticky dispatch to specialist agents.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from google.adk.events import Event, EventActions
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agents.agent import root_agent
+from core.dispatch import StickyDispatcher
+from data.tools.misc_tools import return_control_to_root
+
+PHASES = {'combat': 'rules_lawyer_agent', 'character_creation': 'character_creation_agent'}
+
+
+class TestStickyDispatcher(unittest.TestCase):
+    """Test cases for choosing the runner per player message"""
+
+    def setUp(self):
+        self.session_service = InMemorySessionService()
+        self.root_runner = Runner(agent=root_agent, app_name='dungeon_master', session_service=self.session_service)
+        self.dispatcher = StickyDispatcher(self.root_runner, PHASES)
+
+    def _session(self, game_state, authors=(), hand_back=False):
+        """Create a session whose history has events from the given authors"""
+        session = asyncio.run(self.session_service.create_session(
+            app_name='dungeon_master', user_id='user_1', state={'game_state': game_state}))
+        for author in authors:
+            asyncio.run(self.session_service.append_event(session, Event(invocation_id='inv-1', author=author)))
+        if hand_back:
+            asyncio.run(self.session_service.append_event(session, Event(
+                invocation_id='inv-2', author='rules_lawyer_agent',
+                actions=EventActions(transfer_to_agent='root_agent'))))
+        return session
+
+    def _select(self, session):
+        return asyncio.run(self.dispatcher.select_runner('user_1', session.id))
+
+    def test_combat_goes_to_rules_lawyer(self):
+        """Once the rules lawyer has taken part in combat, messages skip root_agent"""
+        runner = self._select(self._session('combat', ['user', 'root_agent', 'rules_lawyer_agent']))
+        self.assertEqual(runner.agent.name, 'rules_lawyer_agent')
+        self.assertIs(runner.session_service, self.session_service)
+
+    def test_runner_is_reused(self):
+        """Each owning agent gets one runner"""
+        session = self._session('combat', ['rules_lawyer_agent'])
+        self.assertIs(self._select(session), self._select(session))
+
+    def test_first_message_of_phase_goes_to_root(self):
+        """root_agent routes the phase until the owner has replied"""
+        self.assertIs(self._select(self._session('combat', ['root_agent'])), self.root_runner)
+
+    def test_hand_back_returns_to_root(self):
+        """A transfer back to root_agent ends the sticky routing"""
+        session = self._session('combat', ['rules_lawyer_agent'], hand_back=True)
+        self.assertIs(self._select(session), self.root_runner)
+
+    def test_sticky_again_after_root_transfers_back(self):
+        """Sticky routing resumes when root_agent hands the phase to the owner again"""
+        session = self._session('combat', ['rules_lawyer_agent'], hand_back=True)
+        asyncio.run(self.session_service.append_event(session, Event(invocation_id='inv-3', author='rules_lawyer_agent')))
+        self.assertEqual(self._select(session).agent.name, 'rules_lawyer_agent')
+
+    def test_leaving_phase_returns_to_root(self):
+        """Outside a configured phase every message goes to root_agent"""
+        self.assertIs(self._select(self._session('exploration', ['rules_lawyer_agent'])), self.root_runner)
+
+    def test_invalid_phase_owner(self):
+        """Phase owners must be sub agents of the root agent"""
+        with self.assertRaises(ValueError):
+            StickyDispatcher(self.root_runner, {'combat': 'ghost_agent'})
+
+
+class TestReturnControlToRoot(unittest.TestCase):
+    """Test cases for the hand-back tool"""
+
+    def test_transfers_to_root(self):
+        """The tool transfers the rest of the turn to root_agent"""
+        tool_context = SimpleNamespace(agent_name='rules_lawyer_agent', actions=EventActions())
+        result = return_control_to_root('combat ended', tool_context)
+        self.assertTrue(result['success'])
+        self.assertEqual(tool_context.actions.transfer_to_agent, 'root_agent')
+
+
+if __name__ == '__main__':
+    unittest.main()
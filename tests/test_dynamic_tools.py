@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test suite for game-state-aware dynamic tool sets.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+# Add the src directory to the path so we can import the agents package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from agents.dynamic_tools import GameStateToolset, validate_tool_profiles
+from agents.config_loader import load_agent_definitions
+
+
+def roll(dice_notation: str) -> str:
+    """Roll some dice."""
+    return dice_notation
+
+def lookup_monster(monster_name: str) -> dict:
+    """Look up a monster."""
+    return {}
+
+def lookup_background(background_name: str) -> dict:
+    """Look up a background."""
+    return {}
+
+
+def _context(game_state):
+    """Minimal readonly context exposing session state"""
+    return SimpleNamespace(state={'game_state': game_state}, invocation_id='inv-1')
+
+
+class TestGameStateToolset(unittest.TestCase):
+    """Test cases for per-game_state tool filtering"""
+
+    def setUp(self):
+        self.toolset = GameStateToolset(
+            'test_agent',
+            [roll, lookup_monster, lookup_background],
+            {'combat': ['lookup_monster', 'roll']},
+        )
+
+    def _names(self, game_state):
+        tools = asyncio.run(self.toolset.get_tools(_context(game_state)))
+        return [tool.name for tool in tools]
+
+    def test_combat_profile(self):
+        """Combat only exposes the combat profile, in configured order"""
+        self.assertEqual(self._names('combat'), ['roll', 'lookup_monster'])
+
+    def test_state_without_profile(self):
+        """States without a profile expose every tool"""
+        self.assertEqual(self._names('exploration'), ['roll', 'lookup_monster', 'lookup_background'])
+
+    def test_no_context(self):
+        """Without a context the full tool list is returned"""
+        tools = asyncio.run(self.toolset.get_tools(None))
+        self.assertEqual(len(tools), 3)
+
+    def test_tools_are_reused(self):
+        """The same tool objects are returned across turns"""
+        first = asyncio.run(self.toolset.get_tools(_context('combat')))
+        second = asyncio.run(self.toolset.get_tools(_context('combat')))
+        self.assertIs(first[0], second[0])
+
+    def test_profile_with_unknown_tool(self):
+        """Profiles may only reference the agent's own tools"""
+        with self.assertRaises(ValueError):
+            GameStateToolset('test_agent', [roll], {'combat': ['roll', 'lookup_monster']})
+
+
+class TestConfiguredProfiles(unittest.TestCase):
+    """Test cases for the tool profiles in adk.yaml"""
+
+    def test_profiles_are_valid(self):
+        """Every configured profile is a subset of the agent's tools"""
+        for agent_name, definition in load_agent_definitions().items():
+            validate_tool_profiles(agent_name, definition.get('tools', []), definition.get('tool_profiles'))
+
+    def test_rules_lawyer_combat_profile_is_smaller(self):
+        """The rules lawyer sends far fewer schemas during combat"""
+        from agents.sub_agents import rules_lawyer_agent
+        toolset = rules_lawyer_agent.tools[0]
+        self.assertIsInstance(toolset, GameStateToolset)
+        combat = toolset.tool_names_for_state('combat')
+        self.assertIn('roll_dice', combat)
+        self.assertIn('update_combat_participant_hp', combat)
+        self.assertNotIn('get_all_backgrounds', combat)
+        self.assertLess(len(combat), len(toolset.tool_names) / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
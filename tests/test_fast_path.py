@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test suite for the deterministic fast-path command router.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from google.adk.sessions import InMemorySessionService
+
+from core import fast_path, tracing, utils
+from core.fast_path import match_command, try_fast_path
+
+SETTINGS = {'enabled': True, 'record_in_session': True, 'skip_game_states': ['character_creation']}
+
+STATE = {
+    'campaign_id': 'test-campaign',
+    'game_state': 'exploration',
+    'location': 'Oakdale',
+    'characters': {'Thorin': {'name': 'Thorin', 'race': 'Dwarf', 'char_class': 'Fighter', 'level': 3}},
+}
+
+
+class TestMatchCommand(unittest.TestCase):
+    """Test cases for the fast-path grammar"""
+
+    def test_commands(self):
+        """Well-formed commands map to their tool"""
+        cases = {
+            'save campaign': 'save_campaign',
+            'Save the game!': 'save_campaign',
+            '/save': 'save_campaign',
+            'roll 2d6+3': 'roll_dice',
+            'Roll a d20': 'roll_dice',
+            'roll 1d8 - 1': 'roll_dice',
+            'show my character': 'show_characters',
+            'show the party': 'show_characters',
+            "what's the location?": 'get_state',
+            'show current act': 'get_state',
+        }
+        for text, command in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(match_command(text)[0], command)
+
+    def test_ambiguous_input_falls_through(self):
+        """Anything that is not exactly a command goes to the agents"""
+        for text in ['save the princess', 'I roll under the table', 'roll 2d6 to climb the wall',
+                     'show me the way to the castle', 'attack the goblin', '']:
+            with self.subTest(text=text):
+                self.assertIsNone(match_command(text))
+
+
+class TestTryFastPath(unittest.TestCase):
+    """Test cases for executing fast-path commands against a session"""
+
+    def setUp(self):
+        self.session_service = InMemorySessionService()
+        self.runner = SimpleNamespace(app_name='dungeon_master', agent=SimpleNamespace(name='root_agent'),
+                                      session_service=self.session_service)
+        asyncio.run(self.session_service.create_session(
+            app_name='dungeon_master', user_id='user_1', session_id='s1', state=dict(STATE)))
+        self.settings_patch = patch.object(fast_path, '_get_settings', return_value=SETTINGS)
+        self.settings_patch.start()
+
+    def tearDown(self):
+        self.settings_patch.stop()
+
+    def _run(self, query):
+        return asyncio.run(try_fast_path(self.runner, 'user_1', 's1', query))
+
+    def _events(self):
+        session = asyncio.run(self.session_service.get_session(app_name='dungeon_master', user_id='user_1', session_id='s1'))
+        return session.events
+
+    def test_roll_is_recorded_in_session(self):
+        """A handled command is appended to the session as a user/agent turn"""
+        response = self._run('roll 2d6+3')
+        self.assertIn('2d6+3', response)
+        events = self._events()
+        self.assertEqual([event.author for event in events], ['user', 'root_agent'])
+        self.assertEqual(events[1].content.parts[0].text, response)
+
+    def test_show_character(self):
+        """Characters are read from the session state"""
+        self.assertIn('Thorin: Dwarf Fighter (Level 3)', self._run('show my character'))
+
+    def test_get_state(self):
+        """State variables are read through get_state"""
+        self.assertEqual(self._run('where is the location'), 'Location: Oakdale')
+
+    def test_save_uses_session_state(self):
+        """save_campaign runs against the session state"""
+        with patch.object(fast_path, 'save_campaign', return_value={'saved': True, 'message': 'Saved.'}) as mock_save:
+            self.assertEqual(self._run('save campaign'), 'Saved.')
+        self.assertEqual(mock_save.call_args[0][0].state['campaign_id'], 'test-campaign')
+
+    def test_unmatched_input_untouched(self):
+        """Free-form input returns None and leaves the session alone"""
+        self.assertIsNone(self._run('I search the room for traps'))
+        self.assertEqual(self._events(), [])
+
+    def test_skipped_game_state(self):
+        """Commands in skipped game states go to the active agent"""
+        asyncio.run(self.session_service.create_session(
+            app_name='dungeon_master', user_id='user_1', session_id='s2', state={'game_state': 'character_creation'}))
+        self.assertIsNone(asyncio.run(try_fast_path(self.runner, 'user_1', 's2', 'roll 4d6')))
+
+    def test_combat_roll_goes_to_rules_lawyer(self):
+        """With the shipped config, a roll during combat is left to the agents to resolve"""
+        from agents.config_loader import get_config_section
+        asyncio.run(self.session_service.create_session(
+            app_name='dungeon_master', user_id='user_1', session_id='s3', state={'game_state': 'combat'}))
+        with patch.object(fast_path, '_get_settings', return_value=get_config_section('fast_path')):
+            self.assertIsNone(asyncio.run(try_fast_path(self.runner, 'user_1', 's3', 'roll 1d20')))
+            self.assertIsNotNone(self._run('roll 1d20'))
+
+    def test_turn_epilogue(self):
+        """A fast-path turn is autosaved and summarized like a model turn"""
+        with patch.object(utils, 'request_autosave') as autosave, patch.object(tracing, '_tracer', tracing.Tracer()), \
+                patch.object(utils, 'format_turn_summary', return_value=None) as turn_summary:
+            response = asyncio.run(utils.call_agent_async(self.runner, 'user_1', 's1', 'roll 2d6'))
+        self.assertIn('2d6', response)
+        autosave.assert_called_once_with(self.runner, 'user_1', 's1')
+        turn_summary.assert_called_once()
+
+    def test_disabled(self):
+        """Nothing is handled when the fast path is disabled"""
+        with patch.object(fast_path, '_get_settings', return_value={'enabled': False}):
+            self.assertIsNone(self._run('roll 1d20'))
+
+
+if __name__ == '__main__':
+    unittest.main()
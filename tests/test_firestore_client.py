@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test suite for the shared Firestore client manager.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+# and the project root for the shared test helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.helpers import FakeClock
+from core.firestore_client import FirestoreClientManager
+
+
+class FakeClient:
+    """Firestore client stand-in counting constructions"""
+    created = 0
+
+    def __init__(self, project=None, credentials=None):
+        FakeClient.created += 1
+        self.credentials = credentials
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestFirestoreClientManager(unittest.TestCase):
+    """Test cases for client reuse and failure handling"""
+
+    def setUp(self):
+        FakeClient.created = 0
+        self.clock = FakeClock()
+        self.manager = FirestoreClientManager('/nonexistent/key.json', retry_seconds=60, clock=self.clock)
+
+    def fake_firestore(self):
+        patchers = [patch('google.cloud.firestore.Client', FakeClient),
+                    patch('google.cloud.firestore.AsyncClient', FakeClient),
+                    patch.object(FirestoreClientManager, '_load_credentials', lambda manager: 'credentials')]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_client_shared(self):
+        self.fake_firestore()
+        clients = {id(self.manager.client()) for _ in range(5)}
+        self.assertEqual(len(clients), 1)
+        self.assertEqual(FakeClient.created, 1)
+        self.assertEqual(self.manager.metrics()['client_requests'], 5)
+
+    def test_failure_remembered(self):
+        """Missing credentials are not re-read on every call"""
+        self.assertIsNone(self.manager.client())
+        self.assertIsNone(self.manager.client())
+        self.assertEqual(self.manager.stats['failures'], 1)
+        self.clock.now = 61
+        self.assertIsNone(self.manager.client())
+        self.assertEqual(self.manager.stats['failures'], 2)
+
+    def test_async_client_per_loop(self):
+        self.fake_firestore()
+
+        async def get_twice():
+            return self.manager.async_client(), self.manager.async_client()
+
+        first, again = asyncio.run(get_twice())
+        self.assertIs(first, again)
+        second, _ = asyncio.run(get_twice())
+        self.assertIsNot(first, second)
+        self.assertEqual(self.manager.stats['async_clients_created'], 2)
+
+    def test_close(self):
+        self.fake_firestore()
+        client = self.manager.client()
+        self.manager.close()
+        self.assertTrue(client.closed)
+        self.assertIsNot(self.manager.client(), client)
+
+
+if __name__ == '__main__':
+    unittest.main()
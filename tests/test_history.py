@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Test suite for history compaction.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from types import SimpleNamespace
+from typing import AsyncGenerator, ClassVar
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from core import history, retry, scheduler, usage
+from core.history import MEMORY_HEADER, SUMMARIZER_AGENT, HistoryCompactor, content_tokens, split_turns
+from core.retry import RetryEngine
+from core.scheduler import TurnScheduler
+from core.usage import UsageLedger
+
+
+def text_content(role, text):
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+class FakeSummarizer:
+    """Summarizer stand-in that records the transcripts it is given"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.transcripts = []
+
+    async def summarize(self, summary, transcript):
+        if self.fail:
+            raise RuntimeError('summarizer unavailable')
+        self.transcripts.append(transcript)
+        return {'summary': f"{summary} [{transcript.count('Player:')} turns]".strip(),
+                'last_scene': 'The party rests at the inn', 'location': 'Phandalin'}
+
+
+class FakeLlm(BaseLlm):
+    """Model stand-in that answers at length and records request sizes"""
+
+    request_tokens: ClassVar[list] = []
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self.request_tokens.append(content_tokens(llm_request.contents))
+        yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text='The story goes on. ' * 50)]))
+
+
+def make_turns(count):
+    """Session events and request contents for count player turns"""
+    events, contents = [], []
+    for index in range(count):
+        message = f'I look around the room {index}'
+        events.append(SimpleNamespace(author='user', timestamp=float(index), content=text_content('user', message)))
+        contents.append(text_content('user', message))
+        contents.append(text_content('model', 'You see a dusty room. ' * 20))
+    return events, contents
+
+
+class TestSplitTurns(unittest.TestCase):
+    """Test cases for splitting request contents into player turns"""
+
+    def test_turns_start_at_player_messages(self):
+        events, contents = make_turns(3)
+        contents.insert(3, text_content('user', 'For context: [rules_lawyer_agent] said: roll initiative'))
+        preamble, turns = split_turns(contents, [(e.timestamp, e.content.parts[0].text) for e in events])
+        self.assertEqual(preamble, [])
+        self.assertEqual([started for started, _ in turns], [0.0, 1.0, 2.0])
+        self.assertEqual(len(turns[1][1]), 3)
+
+    def test_repeated_messages_matched_in_order(self):
+        messages = [(0.0, 'yes'), (1.0, 'yes')]
+        contents = [text_content('user', 'yes'), text_content('model', 'ok'), text_content('user', 'yes')]
+        _, turns = split_turns(contents, messages)
+        self.assertEqual([started for started, _ in turns], [0.0, 1.0])
+
+
+class TestHistoryCompactor(unittest.TestCase):
+    """Test cases for compacting a model request"""
+
+    def setUp(self):
+        self.summarizer = FakeSummarizer()
+        self.compactor = HistoryCompactor(self.summarizer, max_history_tokens=500, keep_recent_turns=2)
+
+    def compact(self, turn_count, state=None):
+        """Compact one request, then let a summary it started finish"""
+        events, contents = make_turns(turn_count)
+        context = SimpleNamespace(state=state if state is not None else {}, session=SimpleNamespace(id='s1', events=events))
+        request = SimpleNamespace(contents=contents)
+
+        async def run():
+            await self.compactor.compact(context, request)
+            await self.compactor.wait('s1')
+
+        asyncio.run(run())
+        return context.state, request
+
+    def test_small_history_untouched(self):
+        state, request = self.compact(2)
+        self.assertEqual(len(request.contents), 4)
+        self.assertNotIn('campaign_memory', state)
+        self.assertEqual(self.summarizer.transcripts, [])
+
+    def test_older_turns_summarized(self):
+        """Over the threshold, all but the recent turns are replaced by the memory from the next request on"""
+        state, request = self.compact(6)
+        self.assertEqual(len(request.contents), 12)
+        self.assertNotIn('campaign_memory', state)
+        state, request = self.compact(6, state)
+        self.assertEqual(len(self.summarizer.transcripts), 1)
+        self.assertEqual(self.summarizer.transcripts[0].count('Player:'), 4)
+        self.assertEqual(state['campaign_memory']['summarized_until'], 4.0)
+        self.assertEqual(state['campaign_memory']['turns_summarized'], 4)
+        self.assertTrue(request.contents[0].parts[0].text.startswith(MEMORY_HEADER))
+        self.assertEqual(len(request.contents), 5)
+        self.assertEqual(request.contents[1].parts[0].text, 'I look around the room 4')
+        self.assertEqual(state['last_scene'], 'The party rests at the inn')
+        self.assertEqual(state['location'], 'Phandalin')
+
+    def test_summarized_turns_stay_dropped(self):
+        """A later request drops the summarized turns without summarizing again"""
+        state, _ = self.compact(6)
+        state, _ = self.compact(6, state)
+        state, request = self.compact(7, state)
+        self.assertEqual(len(self.summarizer.transcripts), 1)
+        self.assertEqual(len(request.contents), 7)
+        self.assertEqual(request.contents[1].parts[0].text, 'I look around the room 4')
+
+    def test_agent_state_not_overwritten(self):
+        state, _ = self.compact(6, {'location': 'Neverwinter'})
+        state, _ = self.compact(6, state)
+        self.assertEqual(state['location'], 'Neverwinter')
+
+    def test_summarizer_failure_sends_full_history(self):
+        self.compactor.summarizer = FakeSummarizer(fail=True)
+        state, _ = self.compact(6)
+        state, request = self.compact(6, state)
+        self.assertEqual(len(request.contents), 12)
+        self.assertNotIn('campaign_memory', state)
+        self.assertEqual(self.compactor.stats['errors'], 2)
+
+    def test_turn_does_not_wait_for_summary(self):
+        """The request that starts a summary is sent while the summarizer is still running"""
+        release = asyncio.Event()
+
+        class SlowSummarizer(FakeSummarizer):
+            async def summarize(self, summary, transcript):
+                await release.wait()
+                return await super().summarize(summary, transcript)
+
+        self.compactor.summarizer = SlowSummarizer()
+        events, contents = make_turns(6)
+        context = SimpleNamespace(state={}, session=SimpleNamespace(id='s1', events=events))
+
+        async def run():
+            first = SimpleNamespace(contents=list(contents))
+            await self.compactor.compact(context, first)
+            second = SimpleNamespace(contents=list(contents))
+            await self.compactor.compact(context, second)
+            release.set()
+            await self.compactor.wait('s1')
+            third = SimpleNamespace(contents=list(contents))
+            await self.compactor.compact(context, third)
+            return first, second, third
+
+        first, second, third = asyncio.run(run())
+        self.assertEqual((len(first.contents), len(second.contents), len(third.contents)), (12, 12, 5))
+        self.assertEqual(len(self.compactor.summarizer.transcripts), 1)
+
+    def test_summarizer_retried_and_recorded(self):
+        """An overloaded summarizer is retried, and its tokens go to the campaign in the usage ledger"""
+        class OverloadedError(Exception):
+            code = 503
+
+        class FlakySummarizer(FakeSummarizer):
+            model = 'gemini-2.5-flash-lite'
+            calls = 0
+
+            async def summarize(self, summary, transcript):
+                self.calls += 1
+                if self.calls == 1:
+                    raise OverloadedError('The model is overloaded. Please try again later.')
+                usage = types.GenerateContentResponseUsageMetadata(prompt_token_count=900, candidates_token_count=100,
+                                                                   total_token_count=1000)
+                return {**await super().summarize(summary, transcript), 'usage': usage}
+
+        async def no_sleep(delay):
+            pass
+
+        self.compactor.summarizer = FlakySummarizer()
+        ledger = UsageLedger()
+        with patch.object(retry, '_retry_engine', RetryEngine(max_attempts=3, sleep=no_sleep)), \
+                patch.object(usage, '_ledger', ledger):
+            state, _ = self.compact(6, {'campaign_id': 'c1'})
+            state, request = self.compact(6, state)
+        self.assertEqual(self.compactor.summarizer.calls, 2)
+        self.assertEqual(len(request.contents), 5)
+        self.assertEqual(ledger.by_campaign['c1']['total_tokens'], 1000)
+        self.assertEqual(ledger.by_agent[SUMMARIZER_AGENT]['calls'], 1)
+
+    def test_summarizer_is_background_work(self):
+        """The summarizer holds a background scheduler slot, charged with its tokens"""
+        turn_scheduler = TurnScheduler(max_concurrent=4, background_max_concurrent=1)
+        running = []
+
+        class ScheduledSummarizer(FakeSummarizer):
+            async def summarize(self, summary, transcript):
+                running.append(turn_scheduler.metrics()['running'])
+                usage = types.GenerateContentResponseUsageMetadata(prompt_token_count=100, candidates_token_count=20,
+                                                                   total_token_count=120)
+                return {**await super().summarize(summary, transcript), 'usage': usage}
+
+        self.compactor.summarizer = ScheduledSummarizer()
+        with patch.object(scheduler, '_scheduler', turn_scheduler), patch.object(usage, '_ledger', UsageLedger()):
+            state, _ = self.compact(6)
+            state, _ = self.compact(6, state)
+        self.assertEqual(running, [{'interactive': 0, 'background': 1}])
+        self.assertEqual(turn_scheduler.stats['tokens_used'], 120)
+        self.assertNotIn('usage', state['campaign_memory'])
+
+    def test_memory_carried_into_new_session(self):
+        """A reloaded campaign's memory is sent even though its old events are gone"""
+        state = {'campaign_memory': {'summary': 'The party cleared the mine.', 'summarized_until': 0.0}}
+        _, request = self.compact(1, state)
+        self.assertIn('The party cleared the mine.', request.contents[0].parts[0].text)
+        self.assertEqual(len(request.contents), 3)
+
+
+class TestCompactedSession(unittest.TestCase):
+    """Test cases for request size over a long session"""
+
+    def test_request_size_stays_bounded(self):
+        FakeLlm.request_tokens = []
+        compactor = HistoryCompactor(FakeSummarizer(), max_history_tokens=1500, keep_recent_turns=2)
+        agent = LlmAgent(name='narrative_agent', model=FakeLlm(model='gemini-2.5-flash-lite'),
+                         before_model_callback=[history.compact_history])
+        runner = Runner(agent=agent, app_name='dungeon_master', session_service=InMemorySessionService())
+
+        async def play(turns):
+            await runner.session_service.create_session(app_name='dungeon_master', user_id='user_1', session_id='s1')
+            for index in range(turns):
+                content = text_content('user', f'I search the next room {index}')
+                async for _ in runner.run_async(user_id='user_1', session_id='s1', new_message=content):
+                    pass
+            return await runner.session_service.get_session(app_name='dungeon_master', user_id='user_1', session_id='s1')
+
+        with patch.object(history, '_compactor', compactor):
+            session = asyncio.run(play(20))
+
+        self.assertGreater(compactor.stats['compactions'], 0)
+        self.assertLessEqual(max(FakeLlm.request_tokens), 1500 + 300)
+        self.assertIn('summary', session.state['campaign_memory'])
+        # The session itself keeps every event
+        self.assertEqual(len([event for event in session.events if event.author == 'user']), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
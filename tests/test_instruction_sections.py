@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test suite for game-state-aware instruction sections.
+"""
+
+import sys
+import os
+import unittest
+from types import SimpleNamespace
+
+from google.genai import types
+
+# Add the src directory to the path so we can import the agents package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from agents.instruction_sections import SectionedInstruction, parse_sections
+from agents.config_loader import load_agent_definitions
+
+SAMPLE = """Intro text.
+
+<!-- section: character_data -->
+## CHARACTER DATA
+Load the character.
+
+<!-- section: combat -->
+## COMBAT
+Roll initiative.
+
+<!-- section: core -->
+## BOUNDARIES
+Be precise."""
+
+PROFILES = {
+    'startup': ['character_data'],
+    'combat': ['combat'],
+    'exploration': [],
+}
+
+
+def _context(game_state, invocation_id='inv-2', message='I look around'):
+    """Minimal stand-in for the ReadonlyContext fields the provider reads"""
+    return SimpleNamespace(
+        state={'game_state': game_state},
+        invocation_id=invocation_id,
+        user_content=types.Content(role='user', parts=[types.Part(text=message)]),
+    )
+
+
+class TestParseSections(unittest.TestCase):
+    """Test cases for splitting instruction files"""
+
+    def test_blocks_in_file_order(self):
+        """Unmarked text is core and markers start named sections"""
+        blocks = parse_sections(SAMPLE)
+        self.assertEqual([name for name, _ in blocks], ['core', 'character_data', 'combat', 'core'])
+        self.assertEqual(blocks[0][1], 'Intro text.')
+
+    def test_markers_are_not_rendered(self):
+        """Rendered instructions never contain the marker lines"""
+        self.assertNotIn('<!--', SectionedInstruction('agent', parse_sections(SAMPLE)).render())
+
+    def test_unmarked_file_is_unchanged(self):
+        """Files without markers render to their original text"""
+        text = "## ONE\nFirst.\n\n## TWO\nSecond."
+        self.assertEqual(SectionedInstruction('agent', parse_sections(text)).render(), text)
+
+
+class TestSectionedInstruction(unittest.TestCase):
+    """Test cases for assembling instructions per game_state"""
+
+    def setUp(self):
+        self.instruction = SectionedInstruction('rules_lawyer_agent', parse_sections(SAMPLE), PROFILES)
+
+    def test_combat_excludes_character_data(self):
+        """Combat turns only carry the core and combat sections"""
+        text = self.instruction.render('combat')
+        self.assertIn('Roll initiative.', text)
+        self.assertIn('Be precise.', text)
+        self.assertNotIn('Load the character.', text)
+
+    def test_empty_profile_is_core_only(self):
+        """A state mapped to no sections gets only the core"""
+        self.assertEqual(self.instruction.render('exploration'), 'Intro text.\n\n## BOUNDARIES\nBe precise.')
+
+    def test_unknown_state_gets_everything(self):
+        """States without an entry fall back to every section"""
+        self.assertEqual(self.instruction.sections_for_state('dialogue'), ['character_data', 'combat'])
+        self.assertEqual(self.instruction.sections_for_state(None), ['character_data', 'combat'])
+
+    def test_startup_sections_on_startup_turn(self):
+        """Startup sections are added on the turn opened by a startup message only"""
+        for message in ('NEW CAMPAIGN', 'EXISTING CAMPAIGN', 'EXISTING CAMPAIGN\n\nI look around'):
+            with self.subTest(message=message):
+                self.assertIn('Load the character.', self.instruction(_context('combat', invocation_id=message, message=message)))
+        later = self.instruction(_context('combat', invocation_id='inv-3'))
+        self.assertNotIn('Load the character.', later)
+
+    def test_instruction_pinned_for_the_turn(self):
+        """A game_state change mid-turn does not change the turn's instruction"""
+        before = self.instruction(_context('combat'))
+        after = self.instruction(_context('exploration'))
+        self.assertEqual(before, after)
+        self.assertNotEqual(self.instruction(_context('exploration', invocation_id='inv-3')), before)
+
+    def test_unknown_section_fails_validation(self):
+        """Profiles must reference sections of the instruction file"""
+        with self.assertRaises(ValueError) as ctx:
+            SectionedInstruction('rules_lawyer_agent', parse_sections(SAMPLE), {'combat': ['equipment']})
+        self.assertIn('equipment', str(ctx.exception))
+
+
+class TestConfiguredSections(unittest.TestCase):
+    """Test cases for the instruction sections configured in adk.yaml"""
+
+    def test_rules_lawyer_combat_instruction(self):
+        """The rules lawyer's combat turns skip character-data and equipment-inquiry prose"""
+        from agents.agent import root_agent
+        rules_lawyer = next(agent for agent in root_agent.sub_agents if agent.name == 'rules_lawyer_agent')
+        text = rules_lawyer.instruction.render('combat')
+        self.assertIn('## COMBAT WORKFLOW', text)
+        self.assertNotIn('## CHARACTER DATA HANDLING', text)
+        self.assertNotIn('## RULES INFORMATION', text)
+        self.assertLess(len(text), len(rules_lawyer.instruction.render()))
+
+    def test_configured_sections_exist(self):
+        """Every agent with instruction_sections builds against its instruction file"""
+        from agents.agent import root_agent
+        definitions = load_agent_definitions()
+        for agent in [root_agent] + list(root_agent.sub_agents):
+            if definitions[agent.name].get('instruction_sections'):
+                self.assertIsInstance(agent.instruction, SectionedInstruction)
+            else:
+                self.assertIsInstance(agent.instruction, str)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test suite for lazy, partial campaign loading.
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from core import campaign_store, lazy_state, persistence
+from core.campaign_store import SQLiteCampaignStore
+from core.lazy_state import LAZY_FIELDS_KEY, PARTY_ROSTER_KEY, CampaignLoader, hydrate_lazy_fields, resolve_lazy_fields_async
+from core.persistence import WriteBehindWriter
+
+HOT_FIELDS = ['campaign_id', 'game_state', 'location', 'last_scene', 'campaign_memory']
+ARIA = {'name': 'Aria', 'race': 'Elf', 'class': 'Wizard', 'level': 3}
+DEFAULTS = {'campaign_id': '', 'game_state': '', 'location': '', 'last_scene': '', 'campaign_memory': {},
+            'characters': {}, 'campaign_outline': ''}
+
+
+class GatedStore(SQLiteCampaignStore):
+    """SQLite store whose partial loads of cold fields wait until released"""
+
+    def __init__(self):
+        super().__init__(':memory:')
+        self.release = threading.Event()
+        self.loads = []
+
+    def load_fields(self, campaign_id, fields):
+        self.loads.append(sorted(fields))
+        if 'characters' in fields:
+            self.release.wait(5)
+        return super().load_fields(campaign_id, fields)
+
+
+class TestCampaignLoader(unittest.TestCase):
+    """Test cases for hot loads and background fetches"""
+
+    def setUp(self):
+        self.store = GatedStore()
+        self.addCleanup(self.store.close)
+        self.store.create_campaign('c1', {**DEFAULTS, 'campaign_id': 'c1', 'game_state': 'exploration',
+                                          'location': 'Phandalin', 'characters': {'Aria': ARIA},
+                                          'campaign_outline': {'title': 'The Lost Mine'}})
+        self.loader = CampaignLoader(self.store, HOT_FIELDS)
+
+    def test_hot_load(self):
+        """The hot fields and the party roster are there before the cold fields arrive"""
+        async def run():
+            state = await self.loader.load_hot('c1', DEFAULTS)
+            self.assertEqual(state['location'], 'Phandalin')
+            self.assertEqual(state[PARTY_ROSTER_KEY][0]['name'], 'Aria')
+            self.assertEqual(sorted(state[LAZY_FIELDS_KEY]), ['campaign_outline', 'characters'])
+            self.assertNotIn('characters', state)
+            self.assertIsNone(self.loader.ready('c1'))
+            self.store.release.set()
+            return await self.loader.wait('c1', state[LAZY_FIELDS_KEY])
+
+        self.assertEqual(asyncio.run(run())['characters'], {'Aria': ARIA})
+
+    def test_missing_campaign(self):
+        self.assertIsNone(asyncio.run(self.loader.load_hot('nope', DEFAULTS)))
+
+    def test_fetch_from_closed_loop_restarted(self):
+        """A fetch cut short by the end of its event loop is started again on the next one"""
+        state = asyncio.run(self.loader.load_hot('c1', DEFAULTS))
+        self.assertIsNone(self.loader.ready('c1'))
+        self.store.release.set()
+        loaded = asyncio.run(self.loader.wait('c1', state[LAZY_FIELDS_KEY]))
+        self.assertEqual(loaded['characters'], {'Aria': ARIA})
+        self.assertEqual(self.loader.stats['prefetches'], 2)
+
+    def test_resolve_on_access(self):
+        async def run():
+            state = await self.loader.load_hot('c1', DEFAULTS)
+            self.store.release.set()
+            await resolve_lazy_fields_async(state, 'location')
+            self.assertIn(LAZY_FIELDS_KEY, state)
+            self.assertTrue(state[LAZY_FIELDS_KEY])
+            await resolve_lazy_fields_async(state, 'characters')
+            return state
+
+        with patch.object(lazy_state, '_loader', self.loader):
+            state = asyncio.run(run())
+        self.assertEqual(state['characters'], {'Aria': ARIA})
+        self.assertEqual(state['campaign_outline'], {'title': 'The Lost Mine'})
+        self.assertEqual(state[LAZY_FIELDS_KEY], [])
+
+    def test_resolve_after_restart(self):
+        """A session whose fetch was lost starts a new one"""
+        self.store.release.set()
+        state = {'campaign_id': 'c1', LAZY_FIELDS_KEY: ['characters']}
+        with patch.object(lazy_state, '_loader', self.loader):
+            asyncio.run(resolve_lazy_fields_async(state))
+        self.assertEqual(state['characters'], {'Aria': ARIA})
+
+    def test_hydrate_does_not_wait(self):
+        async def run():
+            state = await self.loader.load_hot('c1', DEFAULTS)
+            context = SimpleNamespace(state=state)
+            await hydrate_lazy_fields(context, None)
+            self.assertNotIn('characters', state)
+            self.store.release.set()
+            await self.loader.wait('c1', state[LAZY_FIELDS_KEY])
+            await hydrate_lazy_fields(context, None)
+            return state
+
+        with patch.object(lazy_state, '_loader', self.loader):
+            state = asyncio.run(run())
+        self.assertEqual(state['characters'], {'Aria': ARIA})
+        self.assertEqual(self.loader.stats['hydrations'], 1)
+
+
+class TestLazyCampaignTools(unittest.TestCase):
+    """Test cases for the campaign tools with lazy loading"""
+
+    def setUp(self):
+        from data.tools import misc_tools
+        self.misc_tools = misc_tools
+        self.store = GatedStore()
+        self.addCleanup(self.store.close)
+        self.writer = WriteBehindWriter(self.store.write_fields, start=False)
+        self.loader = CampaignLoader(self.store, HOT_FIELDS, on_loaded=self.writer.prime)
+        for patcher in (patch.object(campaign_store, '_store', self.store), patch.object(persistence, '_writer', self.writer),
+                        patch.object(lazy_state, '_loader', self.loader)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.misc_tools.create_campaign('c1')
+        self.store.write_fields({'c1': {'characters': {'Aria': ARIA}, 'location': 'Phandalin'}})
+
+    def test_save_keeps_unloaded_fields(self):
+        state = asyncio.run(self.misc_tools.load_campaign('c1'))
+        self.assertIn('characters', state[LAZY_FIELDS_KEY])
+        result = asyncio.run(self.misc_tools.save_campaign(SimpleNamespace(state={**state, 'location': 'Neverwinter'})))
+        self.assertTrue(result['queued'])
+        self.assertEqual(self.writer.pending_fields(), {'c1': ['location']})
+        self.writer.flush()
+        self.store.release.set()
+        stored = self.store.load_state('c1')
+        self.assertEqual((stored['location'], stored['characters']), ('Neverwinter', {'Aria': ARIA}))
+
+    def test_get_state_resolves(self):
+        async def run():
+            state = await self.misc_tools.load_campaign('c1')
+            self.store.release.set()
+            return await self.misc_tools.get_state('characters', SimpleNamespace(state=state))
+
+        result = asyncio.run(run())
+        self.assertEqual(result['state_value'], {'Aria': ARIA})
+
+    def test_pending_field_does_not_block_loop(self):
+        """Other coroutines keep running while get_state waits for a cold field"""
+        async def run():
+            state = await self.misc_tools.load_campaign('c1')
+            ticks = []
+
+            async def other_session():
+                for _ in range(3):
+                    ticks.append(len(ticks))
+                    await asyncio.sleep(0.01)
+                self.store.release.set()
+
+            async def read_characters():
+                result = await self.misc_tools.get_state('characters', SimpleNamespace(state=state))
+                # The fetch only finishes once the other session has run and released it
+                return result, self.store.release.is_set()
+
+            (result, released), _ = await asyncio.gather(read_characters(), other_session())
+            return result, released, ticks
+
+        result, released, ticks = asyncio.run(run())
+        self.assertTrue(released)
+        self.assertEqual(ticks, [0, 1, 2])
+        self.assertEqual(result['state_value'], {'Aria': ARIA})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test suite for per-agent model fallback tiers.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from types import SimpleNamespace
+from typing import AsyncGenerator, ClassVar
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+# and the project root for the shared test helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.agent_builder import validate_agent_definitions
+from tests.helpers import FakeClock
+from core import utils
+from core.model_fallback import ModelFallback, ModelHealthTracker, validate_fallback_models
+from core.retry import RetryEngine
+
+TIERS = ['gemini-2.5-flash-lite', 'gemini-2.0-flash-lite', 'gemini-2.5-flash']
+
+
+class OverloadedError(Exception):
+    code = 503
+
+
+class FakeLlm(BaseLlm):
+    """Model stand-in that is overloaded for the models in failing_models"""
+
+    failing_models: ClassVar[set] = set()
+    calls: ClassVar[list] = []
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self.calls.append(llm_request.model)
+        if llm_request.model in self.failing_models:
+            raise OverloadedError('The model is overloaded. Please try again later.')
+        yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text=f'answered by {llm_request.model}')]))
+
+
+class TestModelHealthTracker(unittest.TestCase):
+    """Test cases for tracking model health"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.tracker = ModelHealthTracker(failure_threshold=2, cooldown_seconds=30, max_cooldown_seconds=100, clock=self.clock)
+
+    def test_primary_while_healthy(self):
+        self.tracker.record_failure(TIERS[0])
+        self.assertEqual(self.tracker.select_model(TIERS), TIERS[0])
+
+    def test_switches_after_threshold(self):
+        """Consecutive failures move requests to the next tier"""
+        self.tracker.record_failure(TIERS[0])
+        self.tracker.record_failure(TIERS[0])
+        self.assertEqual(self.tracker.select_model(TIERS), TIERS[1])
+
+    def test_drifts_back_after_cooldown(self):
+        """The primary is tried again once its cooldown ends"""
+        self.tracker.record_failure(TIERS[0])
+        self.tracker.record_failure(TIERS[0])
+        self.clock.now = 31
+        self.assertEqual(self.tracker.select_model(TIERS), TIERS[0])
+
+    def test_cooldown_grows_while_failing(self):
+        """A model that fails again right after its cooldown is skipped for longer"""
+        self.tracker.record_failure(TIERS[0])
+        self.tracker.record_failure(TIERS[0])
+        self.clock.now = 31
+        self.tracker.record_failure(TIERS[0])
+        self.assertEqual(self.tracker.snapshot()[TIERS[0]]['cooldown_remaining'], 60)
+        self.tracker.record_success(TIERS[0])
+        self.assertEqual(self.tracker.snapshot()[TIERS[0]]['trips'], 0)
+
+    def test_all_tiers_unhealthy(self):
+        """With every tier failing, the one that recovers soonest is used"""
+        for model in TIERS:
+            self.tracker.record_failure(model)
+            self.tracker.record_failure(model)
+            self.clock.now += 1
+        self.assertEqual(self.tracker.select_model(TIERS), TIERS[0])
+
+
+class TestModelFallbackCallbacks(unittest.TestCase):
+    """Test cases for the agent callbacks"""
+
+    def setUp(self):
+        self.tracker = ModelHealthTracker(failure_threshold=1, clock=FakeClock())
+        self.fallback = ModelFallback('narrative_agent', TIERS, tracker=self.tracker)
+        self.context = SimpleNamespace(invocation_id='inv-1')
+
+    def test_error_tagged_with_fallback(self):
+        """A transient error names the model the retry will use"""
+        request = SimpleNamespace(model=TIERS[0])
+        error = OverloadedError('The model is overloaded')
+        asyncio.run(self.fallback.on_model_error(self.context, request, error))
+        self.assertEqual(error.fallback_model, TIERS[1])
+        asyncio.run(self.fallback.before_model(self.context, request))
+        self.assertEqual(request.model, TIERS[1])
+
+    def test_outcome_recorded_for_budget_model(self):
+        """A call switched to the budget model after fallback is not credited to or failed over from a tier"""
+        self.tracker.record_failure(TIERS[0])
+        self.tracker.clock.now = 60.0
+        request = SimpleNamespace(model=TIERS[0])
+        asyncio.run(self.fallback.before_model(self.context, request))
+        self.assertEqual(request.model, TIERS[0])
+        request.model = 'gemini-budget'
+        asyncio.run(self.fallback.after_model(self.context, SimpleNamespace(error_code=None)))
+        # The primary is still on probation: it did not serve the call
+        self.assertEqual(self.tracker.snapshot()[TIERS[0]]['trips'], 1)
+        self.assertIn('gemini-budget', self.tracker.snapshot())
+
+        asyncio.run(self.fallback.before_model(self.context, request))
+        request.model = 'gemini-budget'
+        error = OverloadedError('The model is overloaded')
+        asyncio.run(self.fallback.on_model_error(self.context, request, error))
+        self.assertFalse(hasattr(error, 'fallback_model'))
+        self.assertTrue(self.tracker.is_healthy(TIERS[0]))
+        self.assertFalse(self.tracker.is_healthy('gemini-budget'))
+
+    def test_non_transient_error_ignored(self):
+        error = ValueError('bad request')
+        asyncio.run(self.fallback.on_model_error(self.context, SimpleNamespace(model=TIERS[0]), error))
+        self.assertFalse(hasattr(error, 'fallback_model'))
+        self.assertTrue(self.tracker.is_healthy(TIERS[0]))
+
+
+class TestFallbackTurn(unittest.TestCase):
+    """Test cases for a whole turn failing over to the next tier"""
+
+    def test_turn_fails_over_without_backoff(self):
+        """An overloaded primary is replaced by the next tier on the immediate retry"""
+        FakeLlm.failing_models = {TIERS[0]}
+        FakeLlm.calls = []
+        fallback = ModelFallback('narrative_agent', TIERS, tracker=ModelHealthTracker(failure_threshold=1))
+        agent = LlmAgent(
+            name='narrative_agent', model=FakeLlm(model=TIERS[0]),
+            before_model_callback=[fallback.before_model],
+            after_model_callback=[fallback.after_model],
+            on_model_error_callback=[fallback.on_model_error],
+        )
+        runner = Runner(agent=agent, app_name='dungeon_master', session_service=InMemorySessionService())
+        sleeps = []
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+
+        engine = RetryEngine(max_attempts=3, failover_delay=0.5, sleep=fake_sleep)
+
+        async def run_turn():
+            await runner.session_service.create_session(app_name='dungeon_master', user_id='user_1', session_id='s1')
+            content = types.Content(role='user', parts=[types.Part(text='Describe the tavern')])
+            with patch.object(utils, 'get_retry_engine', return_value=engine):
+                return await utils.run_agent_with_retry(runner, 'user_1', 's1', content)
+
+        success, response, _ = asyncio.run(run_turn())
+        self.assertTrue(success)
+        self.assertEqual(response, f'answered by {TIERS[1]}')
+        self.assertEqual(FakeLlm.calls, TIERS[:2])
+        self.assertEqual(engine.metrics['failovers'], 1)
+        self.assertTrue(all(delay <= 0.5 for delay in sleeps))
+        self.assertEqual(engine.breaker.consecutive_failures, 0)
+
+
+class TestValidateFallbackModels(unittest.TestCase):
+    """Test cases for fallback_models validation"""
+
+    def test_valid(self):
+        validate_fallback_models('root_agent', TIERS[0], TIERS[1:])
+        validate_fallback_models('root_agent', TIERS[0], None)
+
+    def test_invalid(self):
+        for fallback_models in ('gemini-2.5-flash', [TIERS[0]], [TIERS[1], TIERS[1]], ['']):
+            with self.subTest(fallback_models=fallback_models):
+                with self.assertRaises(ValueError):
+                    validate_fallback_models('root_agent', TIERS[0], fallback_models)
+
+    def test_adk_yaml_is_valid(self):
+        from agents.config_loader import load_agent_definitions
+        validate_agent_definitions(load_agent_definitions())
+
+
+if __name__ == '__main__':
+    unittest.main()
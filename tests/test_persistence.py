@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test suite for write-behind campaign persistence.
+"""
+
+import sys
+import os
+import threading
+import unittest
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+# and the project root for the shared test helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.helpers import FakeClock
+from core.persistence import WriteBehindWriter
+
+STATE = {
+    'campaign_id': 'c1',
+    'game_state': 'exploration',
+    'location': 'Phandalin',
+    'characters': {'Aria': {'class': 'wizard', 'hp': 8}},
+    'campaign_outline': {'title': 'The Lost Mine', 'acts': ['one', 'two', 'three']},
+}
+
+
+class FakeStore:
+    """Write function that records batches and can be made to fail"""
+
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+        self.written = threading.Event()
+
+    def __call__(self, batch):
+        if self.fail:
+            raise ConnectionError('Firestore unavailable')
+        self.batches.append(batch)
+        self.written.set()
+
+
+class TestWriteBehindWriter(unittest.TestCase):
+    """Test cases for dirty-field tracking, debouncing and retries"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = FakeStore()
+        self.writer = WriteBehindWriter(self.store, debounce_seconds=2, max_delay_seconds=10, retry_base_seconds=1,
+                                        clock=self.clock, start=False)
+        self.writer.prime('c1', STATE)
+
+    def due_batches(self):
+        """Write what is due at the current time, as the background thread would"""
+        batch = self.writer._take(force=False)
+        if batch:
+            self.writer._write(batch)
+        return self.store.batches
+
+    def test_only_changed_fields_queued(self):
+        """Unchanged blobs are not rewritten"""
+        changed = self.writer.mark('c1', {**STATE, 'location': 'Neverwinter'})
+        self.assertEqual(changed, ['location'])
+        self.assertEqual(self.writer.mark('c1', {**STATE, 'location': 'Neverwinter'}), [])
+        self.writer.flush()
+        self.assertEqual(self.store.batches, [{'c1': {'location': 'Neverwinter'}}])
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.writer.mark('c1', STATE), [])
+        self.assertTrue(self.writer.flush())
+        self.assertEqual(self.store.batches, [])
+
+    def test_nested_change_detected(self):
+        characters = {'Aria': {'class': 'wizard', 'hp': 3}}
+        self.assertEqual(self.writer.mark('c1', {**STATE, 'characters': characters}), ['characters'])
+
+    def test_reverted_change_dropped(self):
+        self.writer.mark('c1', {**STATE, 'location': 'Neverwinter'})
+        self.writer.mark('c1', STATE)
+        self.assertEqual(self.writer.pending_fields(), {})
+
+    def test_reverted_during_write_queued(self):
+        """A field changed back while its new value is being written is written again"""
+        self.writer.mark('c1', {**STATE, 'location': 'Neverwinter'})
+        batch = self.writer._take(force=True)
+        self.assertEqual(self.writer.mark('c1', STATE), ['location'])
+        self.writer._write(batch)
+        self.writer.flush()
+        self.assertEqual(self.store.batches, [{'c1': {'location': 'Neverwinter'}}, {'c1': {'location': 'Phandalin'}}])
+        self.assertEqual(self.writer.mark('c1', STATE), [])
+
+    def test_debounced(self):
+        """A campaign is written once it has been quiet for the debounce time"""
+        self.writer.mark('c1', {**STATE, 'location': 'Neverwinter'})
+        self.clock.now = 1.5
+        self.writer.mark('c1', {**STATE, 'location': 'Waterdeep'})
+        self.clock.now = 3
+        self.assertEqual(self.due_batches(), [])
+        self.clock.now = 3.5
+        self.assertEqual(self.due_batches(), [{'c1': {'location': 'Waterdeep'}}])
+
+    def test_max_delay(self):
+        """A campaign that keeps changing is still written after the max delay"""
+        for second in range(11):
+            self.clock.now = second
+            self.writer.mark('c1', {**STATE, 'last_scene': f'Scene {second}'})
+        self.assertEqual(len(self.due_batches()), 1)
+
+    def test_campaigns_batched(self):
+        self.writer.mark('c1', {'location': 'Neverwinter'})
+        self.writer.mark('c2', {'location': 'Waterdeep'})
+        self.writer.flush()
+        self.assertEqual(self.store.batches, [{'c1': {'location': 'Neverwinter'}, 'c2': {'location': 'Waterdeep'}}])
+
+    def test_failed_write_retried(self):
+        """A failed batch is requeued with backoff, without losing newer values"""
+        self.writer.mark('c1', {'location': 'Neverwinter', 'last_scene': 'Gates'})
+        self.store.fail = True
+        self.clock.now = 2
+        self.due_batches()
+        self.assertEqual(self.writer.stats['failures'], 1)
+        self.writer.mark('c1', {'location': 'Waterdeep'})
+        self.store.fail = False
+        self.clock.now = 2.5
+        self.assertEqual(self.due_batches(), [])
+        self.clock.now = 4.5
+        self.assertEqual(self.due_batches(), [{'c1': {'location': 'Waterdeep', 'last_scene': 'Gates'}}])
+
+    def test_written_fields_not_rewritten(self):
+        self.writer.mark('c1', {'location': 'Neverwinter'})
+        self.writer.flush()
+        self.assertEqual(self.writer.mark('c1', {'location': 'Neverwinter'}), [])
+
+
+class TestBackgroundWrites(unittest.TestCase):
+    """Test cases for the background thread and shutdown"""
+
+    def test_background_write(self):
+        store = FakeStore()
+        writer = WriteBehindWriter(store, debounce_seconds=0.01, max_delay_seconds=0.05)
+        writer.mark('c1', {'location': 'Neverwinter'})
+        self.assertTrue(store.written.wait(2))
+        writer.close()
+        self.assertEqual(store.batches, [{'c1': {'location': 'Neverwinter'}}])
+
+    def test_close_flushes_pending(self):
+        """Pending changes are written on shutdown even before they are due"""
+        store = FakeStore()
+        writer = WriteBehindWriter(store, debounce_seconds=60)
+        writer.mark('c1', {'location': 'Neverwinter'})
+        self.assertTrue(writer.close())
+        self.assertEqual(store.batches, [{'c1': {'location': 'Neverwinter'}}])
+
+
+if __name__ == '__main__':
+    unittest.main()
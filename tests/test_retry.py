@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Test suite for the model call retry engine.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+# and the project root for the shared test helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import errors
+
+from tests.helpers import FakeClock
+from core.retry import (
+    CircuitBreaker, CircuitOpenError, RetryEngine, RetryPolicy,
+    OVERLOADED, RATE_LIMITED, classify_error, parse_retry_after,
+)
+
+
+def _api_error(code, status, message, details=None, headers=None):
+    response_json = {'error': {'code': code, 'status': status, 'message': message, 'details': details or []}}
+    response = SimpleNamespace(headers=headers or {})
+    error_class = errors.ClientError if code < 500 else errors.ServerError
+    return error_class(code, response_json, response)
+
+
+class TestClassifyError(unittest.TestCase):
+    """Test cases for deciding which errors are transient"""
+
+    def test_overloaded(self):
+        """503 and 'model is overloaded' errors are overloads"""
+        self.assertEqual(classify_error(_api_error(503, 'UNAVAILABLE', 'The model is overloaded.')), OVERLOADED)
+        self.assertEqual(classify_error(RuntimeError('The model is overloaded. Please try again later.')), OVERLOADED)
+
+    def test_rate_limited(self):
+        """429 and quota errors are rate limits"""
+        self.assertEqual(classify_error(_api_error(429, 'RESOURCE_EXHAUSTED', 'Quota')), RATE_LIMITED)
+        self.assertEqual(classify_error(RuntimeError('You exceeded your current quota')), RATE_LIMITED)
+
+    def test_other_errors_not_retried(self):
+        """Client errors and bugs are not retried"""
+        self.assertIsNone(classify_error(_api_error(400, 'INVALID_ARGUMENT', 'Bad request')))
+        self.assertIsNone(classify_error(KeyError('game_state')))
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    """Test cases for reading server retry hints"""
+
+    def test_retry_after_header(self):
+        """The Retry-After header wins"""
+        error = _api_error(429, 'RESOURCE_EXHAUSTED', 'Quota', headers={'retry-after': '12'})
+        self.assertEqual(parse_retry_after(error), 12.0)
+
+    def test_retry_info_details(self):
+        """google.rpc.RetryInfo details are honored"""
+        details = [{'@type': 'type.googleapis.com/google.rpc.RetryInfo', 'retryDelay': '27s'}]
+        self.assertEqual(parse_retry_after(_api_error(429, 'RESOURCE_EXHAUSTED', 'Quota', details=details)), 27.0)
+
+    def test_message_hint(self):
+        """A 'retry in Ns' message is used when there is no structured hint"""
+        self.assertAlmostEqual(parse_retry_after(RuntimeError('Please retry in 8.5s.')), 8.5)
+
+    def test_no_hint(self):
+        self.assertIsNone(parse_retry_after(RuntimeError('The model is overloaded')))
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test cases for backoff delays"""
+
+    def test_window_grows_and_caps(self):
+        """The jitter window doubles per attempt up to max_delay"""
+        policy = RetryPolicy(base_delay=2, max_delay=10, rng=lambda a, b: b)
+        self.assertEqual([policy.compute_delay(n) for n in range(1, 5)], [2, 4, 8, 10])
+
+    def test_jitter_spreads_delays(self):
+        """Delays are random within the window, so sessions do not retry in lockstep"""
+        policy = RetryPolicy(base_delay=3, max_delay=60)
+        delays = {round(policy.compute_delay(1), 3) for _ in range(50)}
+        self.assertGreater(len(delays), 10)
+        self.assertTrue(all(0 <= d <= 3 for d in delays))
+
+    def test_server_hint_is_lower_bound(self):
+        """Never retry sooner than the server asked"""
+        policy = RetryPolicy(base_delay=2, max_delay=60, rng=lambda a, b: a)
+        self.assertEqual(policy.compute_delay(1, retry_after=30), 30)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for the process-wide circuit breaker"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=30, clock=self.clock)
+
+    def _open(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+    def test_opens_after_threshold(self):
+        """Consecutive failures open the breaker and block calls"""
+        self._open()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_half_open_allows_single_probe(self):
+        """After the recovery timeout exactly one probe goes through"""
+        self._open()
+        self.clock.now = 31
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_probe_success_closes(self):
+        self._open()
+        self.clock.now = 31
+        self.breaker.allow_request()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_probe_failure_reopens(self):
+        self._open()
+        self.clock.now = 31
+        self.breaker.allow_request()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertAlmostEqual(self.breaker.time_until_retry(), 30)
+
+
+class TestRetryEngine(unittest.TestCase):
+    """Test cases for running operations with retries"""
+
+    def setUp(self):
+        self.sleeps = []
+
+        async def fake_sleep(delay):
+            self.sleeps.append(delay)
+
+        policy = RetryPolicy(base_delay=1, max_delay=4, rng=lambda a, b: b)
+        self.engine = RetryEngine({OVERLOADED: policy, RATE_LIMITED: policy}, max_attempts=4,
+                                  breaker=CircuitBreaker(failure_threshold=10), sleep=fake_sleep)
+
+    def _run(self, operation):
+        async def run():
+            async for attempt in self.engine.attempts():
+                async with attempt:
+                    return await operation()
+        return asyncio.run(run())
+
+    def _operation(self, failures):
+        calls = []
+
+        async def operation():
+            calls.append(1)
+            if len(calls) <= len(failures):
+                raise failures[len(calls) - 1]
+            return 'ok'
+        return operation, calls
+
+    def test_retries_transient_errors(self):
+        """Transient errors are retried with growing delays"""
+        operation, calls = self._operation([RuntimeError('The model is overloaded')] * 2)
+        self.assertEqual(self._run(operation), 'ok')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.sleeps, [1, 2])
+        self.assertEqual(self.engine.metrics['retries'], 2)
+        self.assertEqual(self.engine.metrics['successes'], 1)
+
+    def test_gives_up_after_max_attempts(self):
+        operation, calls = self._operation([RuntimeError('The model is overloaded')] * 10)
+        with self.assertRaises(RuntimeError):
+            self._run(operation)
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(self.engine.metrics['give_ups'], 1)
+
+    def test_non_retryable_raises_immediately(self):
+        operation, calls = self._operation([ValueError('bad tool args')])
+        with self.assertRaises(ValueError):
+            self._run(operation)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_open_breaker_gives_up(self):
+        """Callers stop waiting on a breaker that stays open"""
+        self.engine.breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=1000)
+        self.engine.max_breaker_wait = 5
+        self.engine.breaker.record_failure()
+        operation, calls = self._operation([])
+        with self.assertRaises(CircuitOpenError):
+            self._run(operation)
+        self.assertEqual(calls, [])
+
+    def test_attempt_that_cannot_be_repeated(self):
+        """An attempt marked can_retry=False fails without a retry"""
+        async def run():
+            async for attempt in self.engine.attempts():
+                async with attempt:
+                    attempt.can_retry = False
+                    raise RuntimeError('The model is overloaded')
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(run())
+        self.assertEqual((self.engine.metrics['attempts'], self.engine.metrics['give_ups']), (1, 1))
+        self.assertEqual(self.sleeps, [])
+
+
+    def test_cancelled_probe_releases_breaker(self):
+        """A half-open probe cancelled mid-call lets the next attempt through"""
+        clock = FakeClock()
+        self.engine.breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30, clock=clock)
+        self.engine.max_breaker_wait = 5
+        self.engine.breaker.record_failure()
+        clock.now = 31
+
+        async def cancelled_call():
+            raise asyncio.CancelledError()
+
+        with self.assertRaises(asyncio.CancelledError):
+            self._run(cancelled_call)
+        self.assertEqual(self.engine.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.engine.breaker.probe_in_flight)
+        operation, calls = self._operation([])
+        self.assertEqual(self._run(operation), 'ok')
+        self.assertEqual(self.engine.breaker.state, CircuitBreaker.CLOSED)
+
+if __name__ == '__main__':
+    unittest.main()
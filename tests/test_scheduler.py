@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test suite for the agent turn scheduler.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from core.scheduler import TurnScheduler, INTERACTIVE, BACKGROUND
+
+
+async def run_turns(scheduler, turns, tokens_used=0):
+    """
+    Start the given (key, priority) turns one after another while a blocker turn
+    holds the only slot, release it, and return the order the turns ran in.
+    """
+    order = []
+    blocker = await scheduler.acquire('blocker')
+
+    async def turn(key, priority):
+        async with scheduler.slot(key, priority) as slot:
+            order.append(key)
+            slot.tokens_used = tokens_used
+            await asyncio.sleep(0)
+
+    tasks = []
+    for key, priority in turns:
+        tasks.append(asyncio.create_task(turn(key, priority)))
+        await asyncio.sleep(0)
+    scheduler.release(blocker)
+    await asyncio.gather(*tasks)
+    return order
+
+
+class TestTurnScheduler(unittest.TestCase):
+    """Test cases for admitting agent turns"""
+
+    def test_concurrency_limit(self):
+        """No more than max_concurrent turns run at once"""
+        scheduler = TurnScheduler(max_concurrent=2)
+        running = []
+        peak = []
+
+        async def turn(key):
+            async with scheduler.slot(key):
+                running.append(key)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.remove(key)
+
+        async def main():
+            await asyncio.gather(*(turn(f'campaign-{i}') for i in range(6)))
+
+        asyncio.run(main())
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(scheduler.stats['completed'], 6)
+
+    def test_interactive_before_background(self):
+        """Queued player turns go ahead of earlier background work"""
+        scheduler = TurnScheduler(max_concurrent=1)
+        order = asyncio.run(run_turns(scheduler, [('summary', BACKGROUND), ('player', INTERACTIVE)]))
+        self.assertEqual(order, ['player', 'summary'])
+
+    def test_background_cap(self):
+        """Background turns are capped separately"""
+        scheduler = TurnScheduler(max_concurrent=4, background_max_concurrent=1)
+
+        async def main():
+            first = await scheduler.acquire('a', BACKGROUND)
+            second = asyncio.create_task(scheduler.acquire('b', BACKGROUND))
+            await asyncio.sleep(0)
+            self.assertFalse(second.done())
+            self.assertEqual(scheduler.metrics()['queue_depth'], {'interactive': 0, 'background': 1})
+            scheduler.release(first)
+            scheduler.release(await second)
+
+        asyncio.run(main())
+
+    def test_fair_across_campaigns(self):
+        """A campaign with a backlog does not delay another campaign's single turn"""
+        scheduler = TurnScheduler(max_concurrent=1)
+        turns = [('chatty', INTERACTIVE)] * 4 + [('quiet', INTERACTIVE)]
+        order = asyncio.run(run_turns(scheduler, turns))
+        self.assertLessEqual(order.index('quiet'), 1)
+
+    def test_weights(self):
+        """A campaign with twice the weight gets about twice the turns"""
+        scheduler = TurnScheduler(max_concurrent=1, weights={'heavy': 2})
+        turns = [('heavy', INTERACTIVE)] * 4 + [('light', INTERACTIVE)] * 4
+        order = asyncio.run(run_turns(scheduler, turns))
+        self.assertEqual(order[:6].count('heavy'), 4)
+
+    def test_token_usage_counts_against_campaign(self):
+        """Campaigns whose turns use more tokens than estimated fall behind in the queue"""
+        scheduler = TurnScheduler(max_concurrent=1, default_turn_tokens=100)
+
+        async def main():
+            async with scheduler.slot('chatty') as slot:
+                slot.tokens_used = 1000
+            return await run_turns(scheduler, [('chatty', INTERACTIVE), ('quiet', INTERACTIVE)])
+
+        self.assertEqual(asyncio.run(main()), ['quiet', 'chatty'])
+
+    def test_token_budget(self):
+        """Turns wait for the token bucket to refill"""
+        scheduler = TurnScheduler(max_concurrent=4, tokens_per_minute=60000, burst_tokens=100, default_turn_tokens=100)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            first = await scheduler.acquire('a')
+            started = loop.time()
+            second = await scheduler.acquire('b')
+            waited = loop.time() - started
+            scheduler.release(first)
+            scheduler.release(second)
+            return waited
+
+        self.assertGreater(asyncio.run(main()), 0.05)
+
+    def test_cancelled_waiter_releases_nothing(self):
+        """A turn cancelled while queued never takes a slot"""
+        scheduler = TurnScheduler(max_concurrent=1)
+
+        async def main():
+            held = await scheduler.acquire('a')
+            waiting = asyncio.create_task(scheduler.acquire('b'))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+            scheduler.release(held)
+            return scheduler.metrics()
+
+        metrics = asyncio.run(main())
+        self.assertEqual(metrics['running'], {'interactive': 0, 'background': 0})
+        self.assertEqual(metrics['cancelled'], 1)
+        self.assertEqual(metrics['queue_depth']['interactive'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test suite for the durable session service.
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import unittest
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+# and the project root for the shared test helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event, EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.genai import types
+
+from tests.helpers import FakeClock
+from core.session_store import PersistentSessionService
+
+APP_NAME = 'dungeon_master'
+USER_ID = 'user_1'
+
+
+def message(author, text, timestamp, state_delta=None):
+    return Event(author=author, timestamp=timestamp, content=types.Content(role='user' if author == 'user' else 'model',
+                                                                           parts=[types.Part(text=text)]),
+                 actions=EventActions(state_delta=state_delta or {}))
+
+
+class TestPersistentSessionService(unittest.TestCase):
+    """Test cases for write-through, hibernation and rehydration"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'sessions.db')
+        self.clock = FakeClock()
+        self.service = self.open()
+
+    def open(self, **kwargs):
+        service = PersistentSessionService(self.path, clock=self.clock, **kwargs)
+        self.addCleanup(service.close)
+        return service
+
+    def create(self, service, session_id, **state):
+        return asyncio.run(service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id,
+                                                  state={'campaign_id': session_id, **state}))
+
+    def get(self, service, session_id, config=None):
+        return asyncio.run(service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id, config=config))
+
+    def test_restart_keeps_sessions(self):
+        session = self.create(self.service, 'c1', location='Phandalin')
+        asyncio.run(self.service.append_event(session, message('user', 'I open the door', 1.0)))
+        asyncio.run(self.service.append_event(session, message('narrative_agent', 'It creaks open.', 2.0,
+                                                                {'location': 'Cragmaw Hideout', 'user:style': 'grim'})))
+        self.service.close()
+
+        restarted = self.open()
+        resumed = self.get(restarted, 'c1')
+        self.assertEqual(resumed.state['location'], 'Cragmaw Hideout')
+        self.assertEqual(resumed.state['user:style'], 'grim')
+        self.assertEqual([event.content.parts[0].text for event in resumed.events], ['I open the door', 'It creaks open.'])
+        with self.assertRaises(AlreadyExistsError):
+            self.create(restarted, 'c1')
+
+    def test_resumed_session_gets_startup_instruction(self):
+        """EXISTING CAMPAIGN opens the startup turn of a resumed session that keeps its earlier events"""
+        from types import SimpleNamespace
+        from agents.agent import root_agent
+        session = self.create(self.service, 'c1', game_state='exploration')
+        asyncio.run(self.service.append_event(session, message('user', 'EXISTING CAMPAIGN', 1.0)))
+        asyncio.run(self.service.append_event(session, message('root_agent', 'Welcome back, adventurer.', 2.0)))
+        self.service.close()
+
+        resumed = self.get(self.open(), 'c1')
+        self.assertEqual(len(resumed.events), 2)
+
+        def instruction(text, invocation_id):
+            context = SimpleNamespace(invocation_id=invocation_id, state=resumed.state, session=resumed,
+                                      user_content=types.Content(role='user', parts=[types.Part(text=text)]))
+            return root_agent.instruction(context)
+
+        self.assertIn('Always greet the player', instruction('EXISTING CAMPAIGN', 'resume-1'))
+        self.assertNotIn('Always greet the player', instruction('I open the door', 'resume-2'))
+
+    def test_lru_hibernation(self):
+        service = self.open(max_hot_sessions=2)
+        for session_id in ('c1', 'c2', 'c3'):
+            self.create(service, session_id)
+        self.assertEqual(service.metrics()['hot_sessions'], 2)
+        self.assertNotIn('c1', service.sessions[APP_NAME][USER_ID])
+        self.assertEqual(self.get(service, 'c1').state['campaign_id'], 'c1')
+        self.assertEqual(service.stats['rehydrations'], 1)
+        self.assertNotIn('c2', service.sessions[APP_NAME][USER_ID])
+
+    def test_idle_hibernation(self):
+        self.create(self.service, 'c1')
+        self.clock.now = 100
+        self.create(self.service, 'c2')
+        self.clock.now = 950
+        self.assertEqual(self.service.hibernate_idle(), 1)
+        self.assertEqual(list(self.service.sessions[APP_NAME][USER_ID]), ['c2'])
+
+    def test_append_after_hibernation(self):
+        """A turn whose session was hibernated mid-turn still appends to it"""
+        service = self.open(max_hot_sessions=1)
+        session = self.create(service, 'c1')
+        self.create(service, 'c2')
+        asyncio.run(service.append_event(session, message('narrative_agent', 'Goblins!', 1.0, {'game_state': 'combat'})))
+        self.assertEqual(self.get(service, 'c1').state['game_state'], 'combat')
+        self.assertEqual(len(self.get(self.open(), 'c1').events), 1)
+
+    def test_rehydrates_unsummarized_events(self):
+        """Turns folded into the campaign memory are not read back"""
+        session = self.create(self.service, 'c1')
+        for timestamp in (1.0, 2.0, 3.0):
+            asyncio.run(self.service.append_event(session, message('user', f'turn {timestamp}', timestamp)))
+        asyncio.run(self.service.append_event(session, message('narrative_agent', 'summary', 3.5,
+                                                               {'campaign_memory': {'summary': '...', 'summarized_until': 3.0}})))
+        resumed = self.get(self.open(), 'c1')
+        self.assertEqual([event.content.parts[0].text for event in resumed.events], ['turn 3.0', 'summary'])
+
+    def test_state_only_read_does_not_rehydrate(self):
+        service = self.open(max_hot_sessions=1)
+        self.create(service, 'c1', location='Phandalin')
+        self.create(service, 'c2')
+        peeked = self.get(service, 'c1', GetSessionConfig(num_recent_events=0))
+        self.assertEqual(peeked.state['location'], 'Phandalin')
+        self.assertEqual(service.stats['rehydrations'], 0)
+        self.assertEqual(list(service.sessions[APP_NAME][USER_ID]), ['c2'])
+
+    def test_list_and_delete(self):
+        service = self.open(max_hot_sessions=1)
+        self.create(service, 'c1')
+        self.create(service, 'c2')
+        listed = asyncio.run(service.list_sessions(app_name=APP_NAME, user_id=USER_ID))
+        self.assertEqual([session.id for session in listed.sessions], ['c1', 'c2'])
+        asyncio.run(service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id='c1'))
+        self.assertIsNone(self.get(service, 'c1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test suite for the consolidated srd_lookup tool.
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the data package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from data.tools import srd_batch as srd
+from agents.tool_registry import TOOL_REGISTRY, consolidate_srd_lookup_tools
+
+MONSTER_INDEX = {"count": 3, "results": [
+    {"index": "goblin", "name": "Goblin", "url": "/api/2014/monsters/goblin"},
+    {"index": "owlbear", "name": "Owlbear", "url": "/api/2014/monsters/owlbear"},
+    {"index": "adult-red-dragon", "name": "Adult Red Dragon", "url": "/api/2014/monsters/adult-red-dragon"},
+]}
+
+MONSTERS = {
+    "/api/2014/monsters/goblin": {"index": "goblin", "name": "Goblin", "armor_class": [{"value": 15}],
+                                  "hit_points": 7, "challenge_rating": 0.25, "actions": [{"name": "Scimitar"}]},
+    "/api/2014/monsters/owlbear": {"index": "owlbear", "name": "Owlbear", "armor_class": [{"value": 13}],
+                                   "hit_points": 59, "challenge_rating": 3, "actions": [{"name": "Beak"}]},
+}
+
+
+class TestSrdLookup(unittest.TestCase):
+    """Test cases for srd_lookup"""
+
+    def setUp(self):
+        self.index_patch = patch.object(srd, '_fetch_index', return_value=MONSTER_INDEX)
+        self.data_patch = patch.object(srd, '_fetch_data_by_url', side_effect=lambda url: MONSTERS.get(url))
+        self.mock_index = self.index_patch.start()
+        self.mock_data = self.data_patch.start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_batch_full(self):
+        """Several entities come back from a single call"""
+        result = srd.srd_lookup("monsters", ["goblin", "Owlbear"])
+        self.assertEqual(set(result["results"]), {"goblin", "Owlbear"})
+        self.assertEqual(result["results"]["goblin"]["hit_points"], 7)
+        self.assertEqual(result["not_found"], [])
+        self.mock_index.assert_called_once_with("monsters")
+        self.assertEqual(self.mock_data.call_count, 2)
+
+    def test_category_aliases(self):
+        """Singular and snake_case category names are accepted"""
+        self.assertEqual(srd.normalize_category("monster"), "monsters")
+        self.assertEqual(srd.normalize_category("Magic Items"), "magic-items")
+        self.assertEqual(srd.normalize_category("damage_types"), "damage-types")
+        self.assertIsNone(srd.normalize_category("vehicles"))
+
+    def test_summary_view(self):
+        """Summary view keeps key fields and drops the rest"""
+        result = srd.srd_lookup("monster", ["goblin"], view="summary")
+        goblin = result["results"]["goblin"]
+        self.assertEqual(goblin["challenge_rating"], 0.25)
+        self.assertNotIn("actions", goblin)
+
+    def test_index_view(self):
+        """Index view resolves names without fetching details"""
+        result = srd.srd_lookup("monsters", ["dragon"], view="index")
+        self.assertEqual(result["results"]["dragon"]["index"], "adult-red-dragon")
+        self.mock_data.assert_not_called()
+
+    def test_empty_names_lists_category(self):
+        """An empty batch browses the category"""
+        result = srd.srd_lookup("monsters", [])
+        self.assertEqual(result["count"], 3)
+
+    def test_not_found(self):
+        """Missing names are reported, found ones still returned"""
+        result = srd.srd_lookup("monsters", ["goblin", "tarrasque"])
+        self.assertEqual(result["not_found"], ["tarrasque"])
+        self.assertIn("goblin", result["results"])
+
+    def test_duplicates_and_batch_limit(self):
+        """Duplicate names are fetched once and oversized batches are capped"""
+        names = ["goblin"] * 3 + [f"monster-{i}" for i in range(srd.MAX_BATCH_SIZE + 5)]
+        result = srd.srd_lookup("monsters", names, view="index")
+        self.assertEqual(len(result["skipped"]), 6)
+
+    def test_invalid_arguments(self):
+        """Unknown categories and views return errors"""
+        self.assertIn("error", srd.srd_lookup("vehicles", ["cart"]))
+        self.assertIn("error", srd.srd_lookup("monsters", ["goblin"], view="everything"))
+
+
+class TestSrdLookupConsolidation(unittest.TestCase):
+    """Test cases for replacing wrapper tools with srd_lookup"""
+
+    def test_wrappers_collapse_into_srd_lookup(self):
+        """Covered wrappers collapse into one srd_lookup at the first wrapper's position"""
+        names = ['get_state', 'get_all_monsters', 'get_monster_details', 'roll_dice', 'get_spell_details']
+        self.assertEqual(consolidate_srd_lookup_tools(names), ['get_state', 'srd_lookup', 'roll_dice'])
+
+    def test_filtered_lookups_are_kept(self):
+        """Filtered queries not covered by srd_lookup stay registered"""
+        names = ['get_monster_by_challenge_rating', 'get_spells_by_school', 'get_starting_equipment']
+        self.assertEqual(consolidate_srd_lookup_tools(names), names)
+
+    def test_replaced_wrappers_use_the_same_category(self):
+        """srd_lookup is given the category each replaced wrapper reads"""
+        for name, category in srd.SRD_LOOKUP_REPLACES.items():
+            with self.subTest(tool=name):
+                wrapper = TOOL_REGISTRY[name]
+                module = sys.modules[wrapper.__module__]
+                categories = []
+                with patch.object(module, '_fetch_index', side_effect=lambda c: categories.append(c) or {"results": []}), \
+                        patch.object(module, '_get_item_details', side_effect=lambda c, _: categories.append(c) or {}):
+                    wrapper(*['goblin'] * wrapper.__code__.co_argcount)
+                self.assertEqual(categories[:1], [category])
+        # Rule sections are an SRD category of their own, not the top-level rules
+        self.assertEqual(srd.SRD_LOOKUP_REPLACES['get_all_rules_sections'], 'rule-sections')
+
+    def test_configured_agent_uses_srd_lookup(self):
+        """Agents configured with srd_lookup get the batch tool in place of wrappers"""
+        from agents.sub_agents import narrative_agent
+        names = [tool.__name__ for tool in narrative_agent.tools]
+        self.assertIn('srd_lookup', names)
+        self.assertNotIn('get_monster_details', names)
+        self.assertIn('srd_lookup', narrative_agent.instruction)
+
+
+if __name__ == '__main__':
+    unittest.main()
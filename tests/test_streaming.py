@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test suite for streaming agent output.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.agent import root_agent
+from core import fast_path
+from core import streaming
+from core import tracing
+from core.retry import RetryEngine, RetryPolicy, OVERLOADED, RATE_LIMITED
+from core.streaming import event_to_updates, stream_agent_events
+
+
+def _event(author, parts, partial=False):
+    return Event(invocation_id='inv-1', author=author, partial=partial, content=types.Content(role='model', parts=parts))
+
+
+class FakeRunner:
+    """Runner stand-in replaying a fixed list of events"""
+
+    def __init__(self, events, error=None):
+        self.agent = root_agent
+        self.app_name = 'dungeon_master'
+        self.session_service = InMemorySessionService()
+        self.events = events
+        self.error = error
+        self.repeat_error = True
+        self.run_config = None
+
+    async def run_async(self, user_id, session_id, new_message, run_config=None):
+        self.run_config = run_config
+        for event in self.events:
+            yield event
+        if self.error:
+            error, self.error = self.error, self.error if self.repeat_error else None
+            raise error
+
+
+class TestEventToUpdates(unittest.TestCase):
+    """Test cases for converting runner events to stream updates"""
+
+    def test_partial_text(self):
+        """Partial events become text deltas"""
+        updates = event_to_updates(_event('narrative_agent', [types.Part(text='The door creaks')], partial=True))
+        self.assertEqual(updates, [{'type': 'text', 'author': 'narrative_agent', 'text': 'The door creaks'}])
+
+    def test_complete_message(self):
+        """Non-partial text is a complete message"""
+        updates = event_to_updates(_event('narrative_agent', [types.Part(text='The door creaks open.')]))
+        self.assertEqual(updates[0]['type'], 'message')
+
+    def test_tool_progress(self):
+        """Function calls and responses become tool progress updates"""
+        call = _event('rules_lawyer_agent', [types.Part(function_call=types.FunctionCall(name='roll_dice', args={}))])
+        result = _event('rules_lawyer_agent', [types.Part(function_response=types.FunctionResponse(name='roll_dice', response={}))])
+        self.assertEqual(event_to_updates(call), [{'type': 'tool_call', 'author': 'rules_lawyer_agent', 'name': 'roll_dice'}])
+        self.assertEqual(event_to_updates(result)[0]['type'], 'tool_result')
+
+    def test_thoughts_are_hidden(self):
+        """Model thoughts are not streamed to the player"""
+        self.assertEqual(event_to_updates(_event('root_agent', [types.Part(text='planning...', thought=True)])), [])
+
+
+class TestStreamAgentEvents(unittest.TestCase):
+    """Test cases for streaming a player turn"""
+
+    def setUp(self):
+        self.settings_patch = patch.object(fast_path, '_get_settings', return_value={'enabled': False})
+        self.settings_patch.start()
+
+        async def no_sleep(delay):
+            pass
+
+        policy = RetryPolicy(base_delay=1, max_delay=1, rng=lambda a, b: b)
+        self.engine = RetryEngine({OVERLOADED: policy, RATE_LIMITED: policy}, max_attempts=3, sleep=no_sleep)
+        self.engine_patch = patch.object(streaming, 'get_retry_engine', return_value=self.engine)
+        self.engine_patch.start()
+        self.tracer = tracing.Tracer()
+        self.tracer_patch = patch.object(tracing, '_tracer', self.tracer)
+        self.tracer_patch.start()
+
+    def tearDown(self):
+        self.settings_patch.stop()
+        self.engine_patch.stop()
+        self.tracer_patch.stop()
+
+    def _collect(self, runner):
+        async def collect():
+            await runner.session_service.create_session(
+                app_name='dungeon_master', user_id='user_1', session_id='s1', state={'game_state': 'exploration'})
+            return [update async for update in stream_agent_events(runner, 'user_1', 's1', 'I open the door')]
+        return asyncio.run(collect())
+
+    def test_updates_in_order(self):
+        """Updates arrive in event order and the turn ends with done"""
+        runner = FakeRunner([
+            _event('narrative_agent', [types.Part(text='The door ')], partial=True),
+            _event('narrative_agent', [types.Part(text='creaks.')], partial=True),
+            _event('narrative_agent', [types.Part(text='The door creaks.')]),
+        ])
+        updates = self._collect(runner)
+        self.assertEqual([u['type'] for u in updates], ['text', 'text', 'message', 'done'])
+        self.assertEqual(runner.run_config.streaming_mode.name, 'SSE')
+
+    def test_error_is_streamed(self):
+        """A failing turn reports the error and still ends with done"""
+        updates = self._collect(FakeRunner([], error=RuntimeError('The model is overloaded')))
+        self.assertEqual(updates[-2], {'type': 'error', 'message': 'The model is overloaded'})
+        self.assertEqual(updates[-1], {'type': 'done'})
+        self.assertEqual(self.engine.metrics['attempts'], 3)
+        self.assertEqual(self.tracer.recent[-1][0]['status'], 'error')
+
+    def test_transient_error_before_output_is_retried(self):
+        """An overload before anything was streamed is retried transparently"""
+        runner = FakeRunner([], error=RuntimeError('The model is overloaded'))
+        runner.repeat_error = False
+        updates = self._collect(runner)
+        self.assertEqual(updates, [{'type': 'done'}])
+        self.assertEqual(self.engine.metrics['retries'], 1)
+
+    def test_error_after_output_is_not_retried(self):
+        """Once the player has seen output, a transient error is reported instead of replayed"""
+        runner = FakeRunner([_event('narrative_agent', [types.Part(text='The door ')], partial=True)],
+                            error=RuntimeError('The model is overloaded'))
+        updates = self._collect(runner)
+        self.assertEqual([u['type'] for u in updates], ['text', 'error', 'done'])
+        self.assertEqual(self.engine.metrics['attempts'], 1)
+
+    def test_fast_path_turn_is_autosaved(self):
+        """A command answered by the fast path ends like any other turn"""
+        runner = FakeRunner([])
+
+        async def collect():
+            await runner.session_service.create_session(
+                app_name='dungeon_master', user_id='user_1', session_id='s1', state={'game_state': 'exploration'})
+            return [update async for update in stream_agent_events(runner, 'user_1', 's1', 'roll 1d20')]
+
+        with patch.object(fast_path, '_get_settings', return_value={'enabled': True}), \
+                patch.object(streaming, 'request_autosave') as autosave:
+            updates = asyncio.run(collect())
+        self.assertEqual([u['type'] for u in updates], ['message', 'done'])
+        autosave.assert_called_once_with(runner, 'user_1', 's1')
+        self.assertEqual(self.tracer.recent[-1][0]['status'], 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
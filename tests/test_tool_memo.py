@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test suite for session-scoped tool memoization.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from typing import AsyncGenerator
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from core import tool_memo
+from core.tool_memo import UNCHANGED_KEY, ToolMemo
+
+ELF = {'name': 'Elf', 'speed': 30}
+
+
+def make_memo(**kwargs):
+    return ToolMemo(mutating_tools=['set_state'], state_tools=['get_state'], exclude=['roll_dice'], **kwargs)
+
+
+class TestToolMemo(unittest.TestCase):
+    """Test cases for memo lookups and invalidation"""
+
+    def setUp(self):
+        self.memo = make_memo()
+
+    def store(self, tool, args, result, state=None, invocation='inv-1', agent='character_creation_agent', call_id=None):
+        self.memo.store('s1', tool, args, state or {}, result, invocation, agent, call_id)
+
+    def lookup(self, tool, args, state=None, invocation='inv-1', agent='character_creation_agent', call_id=None):
+        return self.memo.lookup('s1', tool, args, state or {}, invocation, agent, call_id)
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.lookup('get_race_details', {'race_name': 'elf'}))
+        self.store('get_race_details', {'race_name': 'elf'}, ELF)
+        result = self.lookup('get_race_details', {'race_name': 'elf'}, invocation='inv-2')
+        self.assertEqual(result, {**ELF, UNCHANGED_KEY: True})
+        self.assertIsNone(self.lookup('get_race_details', {'race_name': 'dwarf'}))
+
+    def test_repeat_in_same_turn_gets_notice(self):
+        """The agent that already has the result this turn is told it is unchanged"""
+        self.store('get_race_details', {'race_name': 'elf'}, ELF)
+        notice = self.lookup('get_race_details', {'race_name': 'elf'})
+        self.assertTrue(notice[UNCHANGED_KEY])
+        self.assertNotIn('speed', notice)
+        # Another agent in the same turn gets the full result
+        self.assertEqual(self.lookup('get_race_details', {'race_name': 'elf'}, agent='rules_lawyer_agent')['speed'], 30)
+        self.assertEqual(self.memo.stats['unchanged_notices'], 1)
+
+    def test_sessions_are_separate(self):
+        self.store('get_all_classes', {}, {'count': 12})
+        self.assertIsNone(self.memo.lookup('s2', 'get_all_classes', {}, {}, 'inv-2', 'character_creation_agent'))
+
+    def test_mutating_tool_invalidates_state_tools(self):
+        """State lookups are dropped after a state change; SRD lookups are kept"""
+        self.store('get_state', {'state_name': 'location'}, {'location': 'Phandalin'})
+        self.store('get_race_details', {'race_name': 'elf'}, ELF)
+        self.store('set_state', {'state_name': 'location', 'value': 'Neverwinter'}, {'success': True})
+        self.assertIsNone(self.lookup('get_state', {'state_name': 'location'}, invocation='inv-2'))
+        self.assertIsNotNone(self.lookup('get_race_details', {'race_name': 'elf'}, invocation='inv-2'))
+        self.assertEqual(self.memo.stats['invalidations'], 1)
+
+    def test_state_change_outside_tools(self):
+        self.store('get_state', {'state_name': 'location'}, {'location': 'Phandalin'}, state={'location': 'Phandalin'})
+        self.assertIsNone(self.lookup('get_state', {'state_name': 'location'}, state={'location': 'Neverwinter'}, invocation='inv-2'))
+
+    def test_not_memoized(self):
+        """Excluded tools, mutating tools and errors always run"""
+        self.store('roll_dice', {'dice_notation': '1d20'}, 'Rolled 1d20: 14')
+        self.store('get_race_details', {'race_name': 'orc'}, {'error': 'not found'})
+        # A failed SRD request returns None; the campaign tools report failures as "Error..." strings
+        self.store('get_race_details', {'race_name': 'elf'}, None)
+        self.store('get_next_turn', {'campaign_id': 'c1'}, "Error: No active combat in campaign 'c1'.")
+        self.assertIsNone(self.lookup('roll_dice', {'dice_notation': '1d20'}, invocation='inv-2'))
+        self.assertIsNone(self.lookup('get_race_details', {'race_name': 'orc'}, invocation='inv-2'))
+        self.assertIsNone(self.lookup('get_race_details', {'race_name': 'elf'}, invocation='inv-2'))
+        self.assertIsNone(self.lookup('get_next_turn', {'campaign_id': 'c1'}, invocation='inv-2'))
+        self.assertEqual(self.memo.stats['stored'], 0)
+
+    def test_configured_outline_tools(self):
+        """Generating an outline drops the memoized outline of the campaign (adk.yaml tool lists)"""
+        from agents.config_loader import get_config_section
+        settings = get_config_section('tool_memo')
+        memo = ToolMemo(settings['mutating_tools'], settings['state_tools'], settings['exclude'])
+        outline = {'title': 'The Dragon\'s Hoard'}
+        memo.store('s1', 'load_campaign_outline', {'campaign_id': 'c1'}, {}, outline, 'inv-1', 'narrative_agent')
+        for tool in ('generate_campaign_outline', 'generate_random_campaign_outline'):
+            with self.subTest(tool=tool):
+                memo.store('s1', tool, {'campaign_id': 'c1'}, {}, "Campaign outline saved successfully for campaign 'c1'",
+                           'inv-1', 'narrative_agent')
+                self.assertFalse(memo.is_memoizable(tool))
+                self.assertIsNone(memo.lookup('s1', 'load_campaign_outline', {'campaign_id': 'c1'}, {}, 'inv-2', 'narrative_agent'))
+                memo.store('s1', 'load_campaign_outline', {'campaign_id': 'c1'}, {}, outline, 'inv-1', 'narrative_agent')
+
+    def test_served_call_not_stored_again(self):
+        self.store('get_all_classes', {}, {'count': 12})
+        self.lookup('get_all_classes', {}, invocation='inv-2', call_id='call-1')
+        self.store('get_all_classes', {}, {'count': 12, UNCHANGED_KEY: True}, invocation='inv-2', call_id='call-1')
+        self.assertEqual(self.memo.stats['stored'], 1)
+
+    def test_entries_bounded(self):
+        memo = make_memo(max_entries_per_session=2)
+        for race in ('elf', 'dwarf', 'gnome'):
+            memo.store('s1', 'get_race_details', {'race_name': race}, {}, {'name': race}, 'inv-1', 'agent')
+        self.assertIsNone(memo.lookup('s1', 'get_race_details', {'race_name': 'elf'}, {}, 'inv-2', 'agent'))
+        self.assertEqual(memo.metrics()['entries'], 2)
+
+
+class FakeLlm(BaseLlm):
+    """Model stand-in that looks up the elf race, then answers"""
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        last = llm_request.contents[-1].parts[0]
+        if last.text:
+            part = types.Part(function_call=types.FunctionCall(name='get_race_details', args={'race_name': 'elf'}))
+        else:
+            part = types.Part(text='Elves have a speed of 30 feet.')
+        yield LlmResponse(content=types.Content(role='model', parts=[part]))
+
+
+class TestMemoizedSession(unittest.TestCase):
+    """Test cases for memoized tool calls across turns"""
+
+    def test_repeated_lookup_runs_once(self):
+        calls = []
+
+        def get_race_details(race_name: str, tool_context: ToolContext) -> dict:
+            """Returns details of a race."""
+            calls.append(race_name)
+            return dict(ELF)
+
+        memo = make_memo()
+        agent = LlmAgent(name='character_creation_agent', model=FakeLlm(model='gemini-2.5-flash-lite'),
+                         tools=[get_race_details],
+                         before_tool_callback=[tool_memo.memo_before_tool],
+                         after_tool_callback=[tool_memo.memo_after_tool])
+        runner = Runner(agent=agent, app_name='dungeon_master', session_service=InMemorySessionService())
+
+        async def play(messages):
+            await runner.session_service.create_session(app_name='dungeon_master', user_id='user_1', session_id='s1')
+            responses = []
+            for message in messages:
+                content = types.Content(role='user', parts=[types.Part(text=message)])
+                async for event in runner.run_async(user_id='user_1', session_id='s1', new_message=content):
+                    responses.extend(event.get_function_responses())
+            return responses
+
+        with patch.object(tool_memo, '_memo', memo):
+            responses = asyncio.run(play(['Tell me about elves', 'How fast are elves again?']))
+
+        self.assertEqual(calls, ['elf'])
+        self.assertEqual(memo.stats['hits'], 1)
+        self.assertTrue(responses[1].response[UNCHANGED_KEY])
+        self.assertEqual(responses[1].response['speed'], 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
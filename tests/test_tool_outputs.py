@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test suite for tool output elision.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from types import SimpleNamespace
+from typing import AsyncGenerator, ClassVar
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from core import tool_outputs
+from core.history import content_tokens
+from core.tool_outputs import ToolOutputElider, elision_stub, expand_tool_output, output_ref
+
+SPELL_LIST = {'count': 300, 'results': [{'index': f'spell-{i}', 'name': f'Spell {i}'} for i in range(300)]}
+SMALL_RESULT = {'result': 'Rolled 1d20: 14'}
+
+
+def text_content(role, text):
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+def tool_turn(message, name, response):
+    """Contents of one turn: player message, tool call, tool result and answer"""
+    return [
+        text_content('user', message),
+        types.Content(role='model', parts=[types.Part(function_call=types.FunctionCall(name=name, args={}))]),
+        types.Content(role='user', parts=[types.Part(function_response=types.FunctionResponse(name=name, response=response))]),
+        text_content('model', 'Done.'),
+    ]
+
+
+def make_session(turns):
+    """A session whose events hold the given turns, and the matching request contents"""
+    events, contents = [], []
+    for index, turn in enumerate(turns):
+        for content in turn:
+            author = 'user' if content.role == 'user' and content.parts[0].text else 'agent'
+            events.append(SimpleNamespace(author=author, timestamp=float(index), content=content))
+            contents.append(content)
+    return SimpleNamespace(events=events), contents
+
+
+def responses(contents):
+    return [part.function_response.response for content in contents for part in content.parts if part.function_response]
+
+
+class FakeLlm(BaseLlm):
+    """Model stand-in that lists all spells on the first turn and chats afterwards"""
+
+    request_tokens: ClassVar[list] = []
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self.request_tokens.append(content_tokens(llm_request.contents))
+        last = llm_request.contents[-1].parts[0]
+        if last.text == 'List every spell':
+            part = types.Part(function_call=types.FunctionCall(name='get_all_spells', args={}))
+        else:
+            part = types.Part(text='Understood.')
+        yield LlmResponse(content=types.Content(role='model', parts=[part]))
+
+
+def get_all_spells() -> dict:
+    """Returns every spell."""
+    return SPELL_LIST
+
+
+class TestElisionStub(unittest.TestCase):
+    """Test cases for the compact stand-in"""
+
+    def test_short_fields_kept(self):
+        stub = elision_stub('get_all_spells', SPELL_LIST)
+        self.assertEqual(stub['count'], 300)
+        self.assertEqual(stub['results'], '<list of 300 items>')
+        self.assertTrue(stub['elided'])
+        self.assertEqual(stub['ref'], output_ref('get_all_spells', SPELL_LIST))
+
+    def test_ref_is_stable(self):
+        self.assertEqual(output_ref('x', {'a': 1, 'b': 2}), output_ref('x', {'b': 2, 'a': 1}))
+        self.assertNotEqual(output_ref('x', {'a': 1}), output_ref('y', {'a': 1}))
+
+
+class TestToolOutputElider(unittest.TestCase):
+    """Test cases for eliding tool results in a request"""
+
+    def setUp(self):
+        self.elider = ToolOutputElider(max_output_bytes=4000, elide_after_turns=2, min_output_bytes=10)
+
+    def test_current_turn_kept(self):
+        session, contents = make_session([tool_turn('List every spell', 'get_all_spells', SPELL_LIST)])
+        request = SimpleNamespace(contents=contents)
+        self.assertEqual(self.elider.elide(request, session), 0)
+        self.assertEqual(responses(request.contents), [SPELL_LIST])
+
+    def test_large_output_elided_next_turn(self):
+        session, contents = make_session([
+            tool_turn('List every spell', 'get_all_spells', SPELL_LIST),
+            [text_content('user', 'Thanks')],
+        ])
+        request = SimpleNamespace(contents=contents)
+        self.assertEqual(self.elider.elide(request, session), 1)
+        self.assertTrue(responses(request.contents)[0]['elided'])
+        # The session's own events are untouched
+        self.assertEqual(responses([event.content for event in session.events]), [SPELL_LIST])
+
+    def test_small_output_elided_when_old(self):
+        turns = [tool_turn('Roll', 'roll_dice', {'result': 'Rolled 1d20: 14, a solid hit'}),
+                 [text_content('user', 'Next')]]
+        session, contents = make_session(turns)
+        self.assertEqual(self.elider.elide(SimpleNamespace(contents=contents), session), 0)
+        session, contents = make_session(turns + [[text_content('user', 'And then')]])
+        self.assertEqual(self.elider.elide(SimpleNamespace(contents=contents), session), 1)
+
+    def test_tiny_output_never_elided(self):
+        turns = [tool_turn('Roll', 'roll_dice', {'ok': 1})] + [[text_content('user', f'Turn {i}')] for i in range(3)]
+        session, contents = make_session(turns)
+        self.assertEqual(self.elider.elide(SimpleNamespace(contents=contents), session), 0)
+
+    def test_expand_finds_original(self):
+        session, _ = make_session([tool_turn('List every spell', 'get_all_spells', SPELL_LIST)])
+        context = SimpleNamespace(session=session)
+        with patch.object(tool_outputs, '_elider', self.elider):
+            self.assertEqual(expand_tool_output(output_ref('get_all_spells', SPELL_LIST), context), SPELL_LIST)
+            self.assertIn('error', expand_tool_output('get_all_spells#000000000000', context))
+        self.assertEqual(self.elider.stats['expanded'], 1)
+
+
+class TestElidedSession(unittest.TestCase):
+    """Test cases for request size after a large lookup"""
+
+    def test_later_turns_do_not_resend_output(self):
+        FakeLlm.request_tokens = []
+        elider = ToolOutputElider(max_output_bytes=4000)
+        agent = LlmAgent(name='rules_lawyer_agent', model=FakeLlm(model='gemini-2.5-flash-lite'),
+                         tools=[get_all_spells], before_model_callback=[tool_outputs.elide_tool_outputs])
+        runner = Runner(agent=agent, app_name='dungeon_master', session_service=InMemorySessionService())
+
+        async def play(messages):
+            await runner.session_service.create_session(app_name='dungeon_master', user_id='user_1', session_id='s1')
+            for message in messages:
+                async for _ in runner.run_async(user_id='user_1', session_id='s1', new_message=text_content('user', message)):
+                    pass
+
+        with patch.object(tool_outputs, '_elider', elider):
+            asyncio.run(play(['List every spell', 'Thanks', 'What next?']))
+
+        # Request 2 reads the full result within its turn; later turns send the stub
+        self.assertGreater(FakeLlm.request_tokens[1], 2000)
+        self.assertLess(FakeLlm.request_tokens[2], 200)
+        self.assertLess(FakeLlm.request_tokens[3], 200)
+        self.assertEqual(elider.stats['elided'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
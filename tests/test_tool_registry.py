@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test suite for the tool registry and declarative agent construction from adk.yaml.
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the agents package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from agents import agent_builder
+from agents.dynamic_tools import GameStateToolset
+from agents.config_loader import load_agent_definitions
+from agents.tool_registry import TOOL_REGISTRY, get_tool, resolve_tools, validate_tool_names, consolidate_srd_lookup_tools
+from core.tool_outputs import EXPAND_TOOL_NAME, get_tool_output_elider
+
+
+def _tool_names(agent):
+    """Full configured tool names of an agent, looking inside game-state toolsets"""
+    names = []
+    for tool in agent.tools:
+        names.extend(tool.tool_names if isinstance(tool, GameStateToolset) else [tool.__name__])
+    return names
+
+
+class TestToolRegistry(unittest.TestCase):
+    """Test cases for the tool registry"""
+
+    def test_every_configured_tool_is_registered(self):
+        """Every tool listed in adk.yaml resolves through the registry"""
+        for agent_name, definition in load_agent_definitions().items():
+            tools = resolve_tools(agent_name, definition.get('tools', []))
+            self.assertEqual(len(tools), len(definition.get('tools', [])))
+
+    def test_get_tool_returns_function(self):
+        """Registered names map to the underlying function"""
+        from data.tools.misc_tools import roll_dice
+        self.assertIs(get_tool('roll_dice'), roll_dice)
+
+    def test_get_tool_unknown(self):
+        """Unknown tool names raise KeyError"""
+        with self.assertRaises(KeyError):
+            get_tool('not_a_tool')
+
+    def test_validate_unknown_tool(self):
+        """Unknown tools fail validation with the agent name in the message"""
+        with self.assertRaises(ValueError) as ctx:
+            validate_tool_names('test_agent', ['get_state', 'get_everything'])
+        self.assertIn('test_agent', str(ctx.exception))
+        self.assertIn('get_everything', str(ctx.exception))
+
+    def test_validate_duplicate_tool(self):
+        """Duplicate tools fail validation"""
+        with self.assertRaises(ValueError) as ctx:
+            validate_tool_names('test_agent', ['get_all_spells', 'get_all_spells'])
+        self.assertIn('get_all_spells', str(ctx.exception))
+
+    def test_registry_names_match_functions(self):
+        """Registry keys are the tool names the model sees"""
+        for name, func in TOOL_REGISTRY.items():
+            self.assertEqual(name, func.__name__)
+
+
+class TestAgentBuilder(unittest.TestCase):
+    """Test cases for building agents from adk.yaml"""
+
+    def test_built_agents_match_config(self):
+        """Agents expose exactly the tools listed in adk.yaml, plus expand_tool_output while elision is enabled"""
+        from agents.agent import root_agent
+        definitions = load_agent_definitions()
+        agents = [root_agent] + list(root_agent.sub_agents)
+        for agent in agents:
+            configured = definitions[agent.name].get('tools', [])
+            if definitions[agent.name].get('srd_lookup'):
+                configured = consolidate_srd_lookup_tools(configured)
+            if configured and get_tool_output_elider() is not None:
+                configured = configured + [EXPAND_TOOL_NAME]
+            self.assertEqual(_tool_names(agent), configured)
+
+    def test_root_sub_agents_follow_config(self):
+        """Root agent sub agents are attached in adk.yaml order"""
+        from agents.agent import root_agent
+        configured = load_agent_definitions()['root_agent']['sub_agents']
+        self.assertEqual([agent.name for agent in root_agent.sub_agents], configured)
+
+    def test_invalid_config_fails_at_build(self):
+        """A misconfigured tool list stops agent construction"""
+        definitions = {
+            'broken_agent': {'name': 'broken_agent', 'model': 'gemini-2.5-flash-lite', 'tools': ['get_state', 'missing_tool']}
+        }
+        with patch.object(agent_builder, 'load_agent_definitions', return_value=definitions):
+            with self.assertRaises(ValueError):
+                agent_builder.build_agent('broken_agent')
+
+    def test_unknown_sub_agent_fails_validation(self):
+        """Sub agent references must name defined agents"""
+        definitions = {
+            'root_agent': {'name': 'root_agent', 'tools': [], 'sub_agents': ['ghost_agent']}
+        }
+        with self.assertRaises(ValueError):
+            agent_builder.validate_agent_definitions(definitions)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test suite for per-turn latency tracing.
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import unittest
+from typing import AsyncGenerator
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from core import tracing, utils
+from core.retry import RetryEngine
+from core.tracing import (
+    JsonlExporter, OpenTelemetryExporter, Tracer, load_spans, summarize, trace_turn,
+    trace_before_agent, trace_after_agent, trace_before_model, trace_after_model,
+    trace_model_error, trace_before_tool, trace_after_tool,
+)
+
+
+def roll_dice(dice_notation: str) -> str:
+    """Roll dice."""
+    return "You rolled 1d20 and got a total of 12."
+
+
+class FakeLlm(BaseLlm):
+    """Model stand-in that rolls once, then narrates"""
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        if llm_request.contents[-1].parts[0].function_response is None:
+            call = types.FunctionCall(name='roll_dice', args={'dice_notation': '1d20'})
+            yield LlmResponse(content=types.Content(role='model', parts=[types.Part(function_call=call)]))
+            return
+        yield LlmResponse(
+            content=types.Content(role='model', parts=[types.Part(text='You hit the goblin.')]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=120, candidates_token_count=6),
+        )
+
+
+def run_traced_turn(tracer):
+    """Run one turn of a traced agent that calls roll_dice"""
+    agent = LlmAgent(
+        name='rules_lawyer_agent', model=FakeLlm(model='fake'), tools=[roll_dice],
+        before_agent_callback=[trace_before_agent], after_agent_callback=[trace_after_agent],
+        before_model_callback=[trace_before_model], after_model_callback=[trace_after_model],
+        on_model_error_callback=[trace_model_error],
+        before_tool_callback=[trace_before_tool], after_tool_callback=[trace_after_tool],
+    )
+    runner = Runner(agent=agent, app_name='dungeon_master', session_service=InMemorySessionService())
+
+    async def turn():
+        await runner.session_service.create_session(app_name='dungeon_master', user_id='user_1', session_id='s1')
+        content = types.Content(role='user', parts=[types.Part(text='I attack the goblin')])
+        with trace_turn('s1', 'I attack the goblin') as trace:
+            await utils.run_agent_with_retry(runner, 'user_1', 's1', content)
+        return trace
+
+    with patch.object(tracing, '_tracer', tracer), \
+            patch.object(utils, 'get_retry_engine', return_value=RetryEngine()):
+        return asyncio.run(turn())
+
+
+class TestTurnTracing(unittest.TestCase):
+    """Test cases for the spans of a traced turn"""
+
+    def test_nested_spans(self):
+        """A turn has agent, model and tool spans nested turn -> agent -> model/tool"""
+        trace = run_traced_turn(Tracer())
+        spans = {(span.kind, span.name): span for span in trace.spans}
+        turn = trace.root
+        agent = spans[('agent', 'rules_lawyer_agent')]
+        tool = spans[('tool', 'roll_dice')]
+        self.assertEqual(agent.parent_id, turn.span_id)
+        self.assertEqual(tool.parent_id, agent.span_id)
+        models = [span for span in trace.spans if span.kind == 'model']
+        self.assertEqual(len(models), 2)
+        self.assertTrue(all(span.parent_id == agent.span_id for span in models))
+        self.assertTrue(all(span.finished for span in trace.spans))
+        self.assertEqual(turn.attributes['attempts'], 1)
+
+    def test_payload_sizes(self):
+        """Spans carry payload sizes and token counts"""
+        trace = run_traced_turn(Tracer())
+        tool = next(span for span in trace.spans if span.kind == 'tool')
+        self.assertEqual(tool.attributes['args_chars'], len('{"dice_notation": "1d20"}'))
+        self.assertGreater(tool.attributes['result_chars'], 0)
+        last_model = [span for span in trace.spans if span.kind == 'model'][-1]
+        self.assertEqual(last_model.attributes['prompt_tokens'], 120)
+        self.assertEqual(last_model.attributes['response_chars'], len('You hit the goblin.'))
+
+    def test_no_spans_outside_a_turn(self):
+        """Callbacks do nothing when no turn is being traced"""
+        context = type('Context', (), {'invocation_id': 'inv-1', 'agent_name': 'root_agent'})()
+        self.assertIsNone(asyncio.run(trace_before_agent(context)))
+        self.assertIsNone(asyncio.run(trace_after_agent(context)))
+
+    def test_failed_turn_closes_open_spans(self):
+        """Spans left open by an exception are closed as unfinished"""
+        tracer = Tracer()
+        with patch.object(tracing, '_tracer', tracer):
+            with self.assertRaises(RuntimeError):
+                with trace_turn('s1', 'hello') as trace:
+                    trace.start(('tool', 'c1'), 'save_campaign', 'tool')
+                    raise RuntimeError('Firestore unavailable')
+        self.assertEqual(trace.root.status, 'error')
+        self.assertEqual(trace.spans[1].status, 'unfinished')
+        self.assertEqual(tracer.slowest_spans(1)[0]['kind'], 'turn')
+
+
+class TestExporters(unittest.TestCase):
+    """Test cases for exporting and summarizing spans"""
+
+    def test_jsonl_round_trip(self):
+        """Spans are written one per line and summarized by kind and name"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'traces.jsonl')
+            run_traced_turn(Tracer([JsonlExporter(path)]))
+            spans = load_spans(path)
+        self.assertEqual([span['kind'] for span in spans].count('model'), 2)
+        report = summarize(spans, limit=3)
+        self.assertIn('roll_dice', report)
+        self.assertIn('Slowest 3 spans', report)
+
+    def test_opentelemetry(self):
+        """Spans are re-emitted with their nesting to an OpenTelemetry provider"""
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        memory = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(memory))
+        run_traced_turn(Tracer([OpenTelemetryExporter(provider)]))
+        exported = {span.name: span for span in memory.get_finished_spans()}
+        self.assertEqual(exported['agent rules_lawyer_agent'].parent.span_id, exported['turn'].context.span_id)
+        self.assertEqual(exported['tool roll_dice'].parent.span_id, exported['agent rules_lawyer_agent'].context.span_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
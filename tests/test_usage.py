@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Test suite for token and cost accounting and budgets.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from types import SimpleNamespace
+from typing import AsyncGenerator, ClassVar
+from unittest.mock import patch
+
+# Add the src directory to the path so we can import the core package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from core import usage, utils
+from core.retry import RetryEngine
+from core.usage import HARD, OK, SOFT, TurnUsage, UsageLedger, record_turn_usage
+
+PRICING = {
+    'gemini-2.5-flash-lite': {'input': 0.10, 'cached_input': 0.025, 'output': 0.40},
+    'gemini-2.0-flash-lite': {'input': 0.075, 'output': 0.30},
+}
+BUDGETS = {
+    'turn': {'soft_tokens': 1000, 'hard_tokens': 2000},
+    'campaign': {'window_hours': 24, 'soft_cost_usd': 1.0, 'hard_cost_usd': 2.0},
+    'actions': {'budget_model': 'gemini-2.0-flash-lite', 'hard_max_output_tokens': 256},
+}
+
+
+def usage_metadata(prompt, output, cached=0):
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt, candidates_token_count=output,
+        cached_content_token_count=cached, total_token_count=prompt + output,
+    )
+
+
+def callback_context(agent_name='narrative_agent', campaign_id=None, session_id='s1'):
+    state = {'campaign_id': campaign_id} if campaign_id else {}
+    return SimpleNamespace(invocation_id='inv-1', agent_name=agent_name, state=state, session=SimpleNamespace(id=session_id))
+
+
+class FakeLlm(BaseLlm):
+    """Model stand-in that reports a fixed token usage"""
+
+    requests: ClassVar[list] = []
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self.requests.append(llm_request)
+        yield LlmResponse(
+            content=types.Content(role='model', parts=[types.Part(text='The tavern is warm.')]),
+            usage_metadata=usage_metadata(1200, 300, cached=800),
+        )
+
+
+class TestUsageLedger(unittest.TestCase):
+    """Test cases for pricing and aggregation"""
+
+    def setUp(self):
+        self.ledger = UsageLedger(pricing=PRICING, budgets=BUDGETS)
+
+    def test_price_with_cached_tokens(self):
+        """Cached prompt tokens are billed at the cached rate"""
+        cost = self.ledger.price('gemini-2.5-flash-lite', 1_000_000, 400_000, 100_000)
+        self.assertAlmostEqual(cost, 0.6 * 0.10 + 0.4 * 0.025 + 0.1 * 0.40)
+
+    def test_cached_rate_defaults_to_input(self):
+        self.assertAlmostEqual(self.ledger.price('gemini-2.0-flash-lite', 1_000_000, 1_000_000, 0), 0.075)
+
+    def test_unpriced_model(self):
+        self.assertEqual(self.ledger.price('unknown', 1000, 0, 1000), 0.0)
+
+    def test_aggregation(self):
+        """Calls add up per agent, model, campaign and turn"""
+        turn = TurnUsage('c1')
+        self.ledger.record('c1', 'narrative_agent', 'gemini-2.5-flash-lite', usage_metadata(100, 20), turn)
+        self.ledger.record('c1', 'rules_lawyer_agent', 'gemini-2.5-flash-lite', usage_metadata(50, 10), turn)
+        self.ledger.record('c2', 'narrative_agent', 'gemini-2.0-flash-lite', usage_metadata(10, 5))
+        self.ledger.finish_turn(turn)
+
+        summary = self.ledger.summary()
+        self.assertEqual(summary['totals']['calls'], 3)
+        self.assertEqual(summary['by_agent']['narrative_agent']['total_tokens'], 135)
+        self.assertEqual(summary['by_model']['gemini-2.0-flash-lite']['calls'], 1)
+        self.assertEqual(summary['by_campaign']['c1']['output_tokens'], 30)
+        self.assertEqual(turn.totals['total_tokens'], 180)
+        self.assertEqual(set(turn.by_agent), {'narrative_agent', 'rules_lawyer_agent'})
+        self.assertEqual(summary['costliest_turns'][0]['turn_id'], turn.turn_id)
+
+        campaign = self.ledger.campaign_summary('c1')
+        self.assertEqual(campaign['totals']['calls'], 2)
+        self.assertEqual(len(campaign['recent_calls']), 2)
+        self.assertEqual(len(campaign['recent_turns']), 1)
+
+    def test_turn_budget(self):
+        turn = TurnUsage('c1')
+        self.assertEqual(self.ledger.budget_status('c1', turn), OK)
+        self.ledger.record('c1', 'narrative_agent', 'gemini-2.5-flash-lite', usage_metadata(900, 100), turn)
+        self.assertEqual(self.ledger.budget_status('c1', turn), SOFT)
+        self.ledger.record('c1', 'narrative_agent', 'gemini-2.5-flash-lite', usage_metadata(900, 100), turn)
+        self.assertEqual(self.ledger.budget_status('c1', turn), HARD)
+        # A new turn starts from zero tokens
+        self.assertEqual(self.ledger.budget_status('c1', TurnUsage('c1')), OK)
+
+    def test_campaign_budget(self):
+        """Campaign budgets cover the cost within the window only"""
+        self.ledger.record('c1', 'narrative_agent', 'gemini-2.5-flash-lite', usage_metadata(0, 3_000_000))
+        self.assertEqual(self.ledger.budget_status('c1'), SOFT)
+        self.assertEqual(self.ledger.budget_status('c2'), OK)
+        with patch.object(usage.time, 'time', return_value=usage.time.time() + 25 * 3600):
+            self.assertEqual(self.ledger.budget_status('c1'), OK)
+
+
+    def test_campaigns_capped(self):
+        """Only the most recently active campaigns keep their totals and budget window"""
+        ledger = UsageLedger(pricing=PRICING, budgets=BUDGETS, max_campaigns=2)
+        for campaign_id in ('c1', 'c2', 'c1', 'c3'):
+            ledger.record(campaign_id, 'narrative_agent', 'gemini-2.5-flash-lite', usage_metadata(10, 5))
+        self.assertEqual(list(ledger.summary()['by_campaign']), ['c1', 'c3'])
+        self.assertEqual(set(ledger._campaign_window), {'c1', 'c3'})
+        self.assertEqual(ledger.summary()['totals']['calls'], 4)
+
+
+class TestBudgetCallbacks(unittest.TestCase):
+    """Test cases for enforcing budgets on model requests"""
+
+    def setUp(self):
+        self.ledger = UsageLedger(pricing=PRICING, budgets=BUDGETS)
+        self.patcher = patch.object(usage, '_ledger', self.ledger)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def request(self, max_output_tokens=None):
+        return SimpleNamespace(model='gemini-2.5-flash-lite',
+                               config=types.GenerateContentConfig(max_output_tokens=max_output_tokens))
+
+    def test_within_budget(self):
+        request = self.request()
+        asyncio.run(usage.usage_before_model(callback_context(), request))
+        self.assertEqual(request.model, 'gemini-2.5-flash-lite')
+        self.assertIsNone(request.config.max_output_tokens)
+
+    def test_soft_budget_uses_budget_model(self):
+        self.ledger.record('s1', 'narrative_agent', 'gemini-2.5-flash-lite', usage_metadata(0, 3_000_000))
+        request = self.request()
+        asyncio.run(usage.usage_before_model(callback_context(), request))
+        self.assertEqual(request.model, 'gemini-2.0-flash-lite')
+        self.assertIsNone(request.config.max_output_tokens)
+
+    def test_hard_budget_caps_output(self):
+        """A hard turn budget also shortens the response"""
+        with record_turn_usage('s1') as turn:
+            self.ledger.record('s1', 'narrative_agent', 'gemini-2.5-flash-lite', usage_metadata(2000, 100), turn)
+            request = self.request(max_output_tokens=1024)
+            asyncio.run(usage.usage_before_model(callback_context(), request))
+        self.assertEqual(request.model, 'gemini-2.0-flash-lite')
+        self.assertEqual(request.config.max_output_tokens, 256)
+
+    def test_partial_responses_not_recorded(self):
+        response = LlmResponse(partial=True, usage_metadata=usage_metadata(10, 1))
+        asyncio.run(usage.usage_after_model(callback_context(), response))
+        self.assertEqual(self.ledger.totals['calls'], 0)
+
+    def test_campaign_id_from_state(self):
+        context = callback_context(campaign_id='campaign-7')
+        asyncio.run(usage.usage_before_model(context, self.request()))
+        asyncio.run(usage.usage_after_model(context, LlmResponse(usage_metadata=usage_metadata(10, 1))))
+        self.assertIn('campaign-7', self.ledger.by_campaign)
+        self.assertEqual(self.ledger.calls[-1]['model'], 'gemini-2.5-flash-lite')
+
+
+class TestUsageTurn(unittest.TestCase):
+    """Test cases for accounting a whole agent turn"""
+
+    def test_turn_usage_recorded(self):
+        FakeLlm.requests = []
+        ledger = UsageLedger(pricing=PRICING, budgets=BUDGETS)
+        agent = LlmAgent(
+            name='narrative_agent', model=FakeLlm(model='gemini-2.5-flash-lite'),
+            before_model_callback=[usage.usage_before_model],
+            after_model_callback=[usage.usage_after_model],
+        )
+        runner = Runner(agent=agent, app_name='dungeon_master', session_service=InMemorySessionService())
+        engine = RetryEngine(max_attempts=1)
+
+        async def run_turn():
+            await runner.session_service.create_session(app_name='dungeon_master', user_id='user_1', session_id='s1')
+            content = types.Content(role='user', parts=[types.Part(text='Describe the tavern')])
+            with patch.object(utils, 'get_retry_engine', return_value=engine), record_turn_usage('s1') as turn:
+                await utils.run_agent_with_retry(runner, 'user_1', 's1', content)
+            return turn
+
+        with patch.object(usage, '_ledger', ledger):
+            turn = asyncio.run(run_turn())
+
+        self.assertEqual(turn.totals['calls'], 1)
+        self.assertEqual(turn.totals['cached_tokens'], 800)
+        self.assertEqual(ledger.by_agent['narrative_agent']['total_tokens'], 1500)
+        self.assertAlmostEqual(ledger.totals['cost_usd'], (400 * 0.10 + 800 * 0.025 + 300 * 0.40) / 1_000_000)
+        self.assertEqual(ledger.summary()['costliest_turns'][0]['turn_id'], turn.turn_id)
+        self.assertIn('300 output tokens', usage.format_turn_usage(turn))
+
+
+if __name__ == '__main__':
+    unittest.main()